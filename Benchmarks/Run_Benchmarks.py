@@ -0,0 +1,486 @@
+# -*- coding: utf-8 -*-
+"""
+Authors: Tim Hessels
+         UNESCO-IHE 2018
+Contact: t.hessels@unesco-ihe.org
+Repository: https://github.com/wateraccounting/wa
+Module: Benchmarks
+
+Description:
+Times the hot paths of the accounting pipeline on synthetic data and writes
+the results to a JSON file. No data is downloaded, so the suite runs offline.
+
+Example:
+from wa.Benchmarks import Run_Benchmarks
+Run_Benchmarks.main('C:/file/to/path/benchmarks.json', Size = [100, 120],
+                    Startdate = '2005-01-01', Enddate = '2005-12-31')
+"""
+# General modules
+import os
+import sys
+import time
+import json
+import shutil
+import tempfile
+import platform
+import traceback
+import pandas as pd
+
+import wa.Benchmarks.Synthetic_Data as SD
+
+# All the benchmarks in the order they are run
+Benchmark_Names = ['Get3Darray_time_series_monthly',
+                   'Day_to_monthly_flux',
+                   'Eightdaily_to_monthly_state',
+                   'Sixteendaily_to_monthly_state',
+                   'Weekly_to_monthly_flux',
+                   'Monthly_to_yearly_flux',
+                   'SplitET_ITE',
+                   'Sheet2_CSV',
+                   'SurfWAT',
+                   'SurfWAT_Part1',
+                   'SurfWAT_Part1_topological',
+                   'SurfWAT_Part2',
+                   'SurfWAT_Part3',
+                   'SurfWAT_Part4',
+                   'waterpix_pixel',
+                   'waterpix_array',
+                   'OPeNDAP_dods',
+                   'OPeNDAP_ascii']
+
+
+def main(Output_JSON, Dir_Benchmark = None, Size = [100, 120], Startdate = '2005-01-01',
+         Enddate = '2005-12-31', Repeats = 1, Benchmarks = None, seed = 0):
+    """
+    This function creates the synthetic data, runs the benchmarks and writes
+    the timings to a JSON file
+
+    Keyword arguments:
+    Output_JSON -- 'C:/file/to/path/benchmarks.json'
+    Dir_Benchmark -- 'C:/file/to/path/', folder for the synthetic data (a
+                     temporary folder that is removed afterwards if None)
+    Size -- [rows, columns] of the synthetic grid
+    Startdate -- 'yyyy-mm-dd'
+    Enddate -- 'yyyy-mm-dd'
+    Repeats -- integer, number of times every benchmark is timed
+    Benchmarks -- list with the names of the benchmarks to run (all the
+                  Benchmark_Names if None)
+    seed -- integer, seed of the random generator
+
+    Returns:
+    dictionary with the results that is written to the JSON file
+    """
+    if Benchmarks is None:
+        Benchmarks = Benchmark_Names
+    for Name in Benchmarks:
+        if Name not in Benchmark_Names:
+            raise ValueError('Unknown benchmark: %s' %Name)
+
+    Remove_Dir = Dir_Benchmark is None
+    if Remove_Dir:
+        Dir_Benchmark = tempfile.mkdtemp(prefix = 'wa_benchmark_')
+    elif not os.path.exists(Dir_Benchmark):
+        os.makedirs(Dir_Benchmark)
+
+    Parameters = {'Size': [int(Size[0]), int(Size[1])],
+                  'Startdate': Startdate,
+                  'Enddate': Enddate,
+                  'Repeats': int(Repeats),
+                  'seed': int(seed)}
+
+    Results = {'parameters': Parameters,
+               'versions': Get_Versions(),
+               'platform': platform.platform(),
+               'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+               'benchmarks': dict()}
+
+    Cache = dict()
+    try:
+        for Name in Benchmarks:
+            print 'Benchmark %s ...' %Name
+            Results['benchmarks'][Name] = Run_Benchmark(Name, Dir_Benchmark, Parameters, Cache)
+    finally:
+        if 'OPeNDAP' in Cache:
+            Cache['OPeNDAP'].close()
+        if Remove_Dir:
+            shutil.rmtree(Dir_Benchmark, ignore_errors = True)
+
+    with open(Output_JSON, 'w') as f:
+        json.dump(Results, f, indent = 2, sort_keys = True)
+
+    return(Results)
+
+
+def Run_Benchmark(Name, Dir_Benchmark, Parameters, Cache):
+    """
+    This function creates the input data of one benchmark and times it, an
+    error is written in the results instead of stopping the suite
+
+    Keyword arguments:
+    Name -- string, name of the benchmark
+    Dir_Benchmark -- 'C:/file/to/path/'
+    Parameters -- dictionary with Size, Startdate, Enddate, Repeats and seed
+    Cache -- dictionary with the input data that is shared by the benchmarks
+    """
+    Dir_Current = os.getcwd()
+    try:
+        Start_Setup = time.time()
+        Function = globals()['Setup_%s' %Name](Dir_Benchmark, Parameters, Cache)
+        Setup_seconds = time.time() - Start_Setup
+        if isinstance(Function, str):
+            return({'skipped': Function})
+
+        Result = Time_Function(Function, Parameters['Repeats'])
+        Result['setup_seconds'] = Setup_seconds
+
+    except Exception:
+        Result = {'error': traceback.format_exc()}
+
+    finally:
+        # Get3Darray_time_series_monthly changes the working directory
+        os.chdir(Dir_Current)
+
+    return(Result)
+
+
+def Time_Function(Function, Repeats):
+    """
+    This function runs the function Repeats times and returns the timings
+
+    Keyword arguments:
+    Function -- function without arguments
+    Repeats -- integer, number of runs
+    """
+    seconds = []
+    for i in range(max(int(Repeats), 1)):
+        Start = time.time()
+        Function()
+        seconds.append(time.time() - Start)
+
+    return({'seconds': seconds,
+            'min': min(seconds),
+            'mean': sum(seconds) / len(seconds)})
+
+
+def Get_Versions():
+    """
+    This function returns the versions of the python modules that are timed
+    """
+    Versions = {'python': platform.python_version()}
+    for Module in ['numpy', 'scipy', 'pandas', 'netCDF4', 'gdal', 'joblib']:
+        try:
+            Versions[Module] = __import__(Module).__version__
+        except (ImportError, AttributeError):
+            Versions[Module] = None
+
+    return(Versions)
+
+
+def Get_Dates(Parameters, freq = 'MS'):
+    """
+    This function returns the dates of the benchmark period
+    """
+    return(pd.date_range(Parameters['Startdate'], Parameters['Enddate'], freq = freq))
+
+
+def Get_Years(Parameters):
+    """
+    This function returns the years of the benchmark period
+    """
+    return(range(pd.Timestamp(Parameters['Startdate']).year, pd.Timestamp(Parameters['Enddate']).year + 1))
+
+
+def Get_Monthly_Tiffs(Dir_Benchmark, Parameters, Cache):
+    """
+    This function creates the monthly precipitation tiffs once
+    """
+    if 'Monthly' not in Cache:
+        Dir_in = os.path.join(Dir_Benchmark, 'P', 'Monthly')
+        SD.Create_Tiffs(Dir_in, 'P_Synthetic_mm-month-1_monthly', Get_Dates(Parameters),
+                        Parameters['Size'], 0.0, 200.0, Parameters['seed'])
+        Cache['Monthly'] = Dir_in
+
+    return(Cache['Monthly'])
+
+
+def Get_Sheet_Files(Dir_Benchmark, Parameters, Cache):
+    """
+    This function creates the land use map and the yearly sheet netCDF files
+    with all the variables of sheet 2 once
+    """
+    if 'Sheet' not in Cache:
+        Dir_Basin = os.path.join(Dir_Benchmark, 'Basin')
+        Dir_Simulation = os.path.join(Dir_Basin, 'Simulations', 'Simulation_1')
+        if not os.path.exists(Dir_Simulation):
+            os.makedirs(Dir_Simulation)
+
+        import wa.General.data_conversions as DC
+        Example_dataset = os.path.join(Dir_Basin, 'LU_Synthetic.tif')
+        LU = SD.Create_Landuse(Parameters['Size'], Parameters['seed'])
+        DC.Save_as_tiff(Example_dataset, LU, SD.Create_Geo(Parameters['Size']), "WGS84")
+
+        Variables = [['Precipitation', 'mm/month', 0.0, 200.0],
+                     ['Actual_Evapotranspiration', 'mm/month', 10.0, 120.0],
+                     ['LAI', 'm2/m2', 0.2, 4.0],
+                     ['Rainy_Days', 'days/month', 2.0, 20.0],
+                     ['Normalized_Dry_Matter', 'kg_ha', 100.0, 2000.0],
+                     ['Interception', 'mm/month', 0.0, 10.0],
+                     ['Transpiration', 'mm/month', 5.0, 80.0],
+                     ['Evaporation', 'mm/month', 5.0, 40.0]]
+
+        nc_outnames = []
+        for year in Get_Years(Parameters):
+            nc_outname = os.path.join(Dir_Simulation, '%d.nc' %year)
+            SD.Create_Sheet_NC(nc_outname, Example_dataset, 'Synthetic', Variables, Parameters['seed'])
+            nc_outnames.append(nc_outname)
+
+        Cache['Sheet'] = [Dir_Basin, nc_outnames, Example_dataset]
+
+    return(Cache['Sheet'])
+
+
+def Get_SurfWAT_Input(Dir_Benchmark, Parameters, Cache):
+    """
+    This function creates the SurfWAT input file once
+    """
+    if 'SurfWAT_in' not in Cache:
+        input_nc = os.path.join(Dir_Benchmark, 'SurfWAT_in.nc')
+        SD.Create_SurfWAT_NC(input_nc, Parameters['Startdate'], Parameters['Enddate'],
+                             Parameters['Size'], Parameters['seed'])
+        Cache['SurfWAT_in'] = input_nc
+
+    return(Cache['SurfWAT_in'])
+
+
+def Get_SurfWAT_Output(Dir_Benchmark, Parameters, Cache):
+    """
+    This function runs SurfWAT once without reservoirs, so the parts that
+    read the results of the previous parts can be timed on the output file
+    """
+    if 'SurfWAT_out' not in Cache:
+        import wa.Models.SurfWAT.Run_SurfWAT as Run_SurfWAT
+
+        input_nc = Get_SurfWAT_Input(Dir_Benchmark, Parameters, Cache)
+        output_nc = os.path.join(Dir_Benchmark, 'SurfWAT_out.nc')
+        Run_SurfWAT.main(input_nc, output_nc, None, [], include_reservoirs = 0)
+        Cache['SurfWAT_out'] = output_nc
+
+    return(Cache['SurfWAT_in'], Cache['SurfWAT_out'])
+
+
+def Setup_Get3Darray_time_series_monthly(Dir_Benchmark, Parameters, Cache):
+    import wa.General.raster_conversions as RC
+
+    Dir_in = Get_Monthly_Tiffs(Dir_Benchmark, Parameters, Cache)
+    Example_data = sorted(os.listdir(Dir_in))[0]
+
+    return(lambda: RC.Get3Darray_time_series_monthly(Dir_in, Parameters['Startdate'], Parameters['Enddate'],
+                                                     Example_data = os.path.join(Dir_in, Example_data)))
+
+
+def Setup_Temporal(Dir_Benchmark, Parameters, Name, Module, Dates, Low, High):
+    """
+    This function creates the tiffs of a temporal aggregator of Functions/Start
+    """
+    Dir_in = os.path.join(Dir_Benchmark, 'Start', Module)
+    Dir_out = os.path.join(Dir_Benchmark, 'Start', Module + '_out')
+    SD.Create_Tiffs(Dir_in, Name, Dates, Parameters['Size'], Low, High, Parameters['seed'])
+    if not os.path.exists(Dir_out):
+        os.makedirs(Dir_out)
+
+    Start = __import__('wa.Functions.Start.%s' %Module, fromlist = [Module])
+
+    return(lambda: Start.Nearest_Interpolate(Dir_in, Parameters['Startdate'], Parameters['Enddate'], Dir_out))
+
+
+def Setup_Day_to_monthly_flux(Dir_Benchmark, Parameters, Cache):
+    return(Setup_Temporal(Dir_Benchmark, Parameters, 'P_Synthetic_mm-day-1_daily', 'Day_to_monthly_flux',
+                          Get_Dates(Parameters, 'D'), 0.0, 10.0))
+
+
+def Setup_Eightdaily_to_monthly_state(Dir_Benchmark, Parameters, Cache):
+    return(Setup_Temporal(Dir_Benchmark, Parameters, 'LAI_Synthetic_m2-m-2_8-daily', 'Eightdaily_to_monthly_state',
+                          SD.Composite_Dates(Parameters['Startdate'], Parameters['Enddate'], 8), 0.2, 4.0))
+
+
+def Setup_Sixteendaily_to_monthly_state(Dir_Benchmark, Parameters, Cache):
+    return(Setup_Temporal(Dir_Benchmark, Parameters, 'NDVI_Synthetic_-_16-daily', 'Sixteendaily_to_monthly_state',
+                          SD.Composite_Dates(Parameters['Startdate'], Parameters['Enddate'], 16), 0.0, 1.0))
+
+
+def Setup_Weekly_to_monthly_flux(Dir_Benchmark, Parameters, Cache):
+    Dates = pd.date_range(Parameters['Startdate'], Parameters['Enddate'], freq = '7D')
+    return(Setup_Temporal(Dir_Benchmark, Parameters, 'ET_Synthetic_mm-week-1_weekly', 'Weekly_to_monthly_flux',
+                          Dates, 5.0, 40.0))
+
+
+def Setup_Monthly_to_yearly_flux(Dir_Benchmark, Parameters, Cache):
+    return(Setup_Temporal(Dir_Benchmark, Parameters, 'P_Synthetic_mm-month-1_monthly', 'Monthly_to_yearly_flux',
+                          Get_Dates(Parameters), 0.0, 200.0))
+
+
+def Setup_SplitET_ITE(Dir_Benchmark, Parameters, Cache):
+    import matplotlib.pyplot as plt
+    import wa.Functions.Two.SplitET as SplitET
+
+    # The images are saved without a display
+    plt.switch_backend('Agg')
+    Dir_Basin, nc_outnames, Example_dataset = Get_Sheet_Files(Dir_Benchmark, Parameters, Cache)
+
+    def Function():
+        for year, nc_outname in zip(Get_Years(Parameters), nc_outnames):
+            SplitET.ITE(Dir_Basin, nc_outname, '%d-01-01' %year, '%d-12-31' %year, 1)
+            plt.close('all')
+
+    return(Function)
+
+
+def Setup_Sheet2_CSV(Dir_Benchmark, Parameters, Cache):
+    import wa.Generator.Sheet2.CSV as CSV
+
+    Dir_Basin, nc_outnames, Example_dataset = Get_Sheet_Files(Dir_Benchmark, Parameters, Cache)
+
+    def Function():
+        for year, nc_outname in zip(Get_Years(Parameters), nc_outnames):
+            CSV.Create(Dir_Basin, 1, 'Synthetic', '%d-01-01' %year, '%d-12-31' %year, nc_outname, Example_dataset)
+
+    return(Function)
+
+
+def Setup_SurfWAT(Dir_Benchmark, Parameters, Cache):
+    import wa.Models.SurfWAT.Run_SurfWAT as Run_SurfWAT
+
+    input_nc = Get_SurfWAT_Input(Dir_Benchmark, Parameters, Cache)
+    output_nc_run = os.path.join(Dir_Benchmark, 'SurfWAT_out_run.nc')
+
+    return(lambda: Run_SurfWAT.main(input_nc, output_nc_run, None, [], include_reservoirs = 0))
+
+
+def Setup_SurfWAT_Routing(Dir_Benchmark, Parameters, Cache, Routing_Method):
+    """
+    This function reads the input of the channel routing of SurfWAT Part 1
+    """
+    import wa.General.raster_conversions as RC
+    import wa.Models.SurfWAT.Part1_Channel_Routing as Part1_Channel_Routing
+
+    input_nc = Get_SurfWAT_Input(Dir_Benchmark, Parameters, Cache)
+    Runoff = RC.Open_nc_array(input_nc, Var = 'Runoff_M')
+    flow_directions = RC.Open_nc_array(input_nc, Var = 'demdir')
+    Basin = RC.Open_nc_array(input_nc, Var = 'basin')
+    Areas_in_m2 = RC.Open_nc_array(input_nc, Var = 'area')
+    Runoff_in_m3_month = ((Runoff/1000) * Areas_in_m2)
+
+    return(lambda: Part1_Channel_Routing.Run(Runoff_in_m3_month, flow_directions, Basin, Routing_Method))
+
+
+def Setup_SurfWAT_Part1(Dir_Benchmark, Parameters, Cache):
+    return(Setup_SurfWAT_Routing(Dir_Benchmark, Parameters, Cache, 'sweep'))
+
+
+def Setup_SurfWAT_Part1_topological(Dir_Benchmark, Parameters, Cache):
+    return(Setup_SurfWAT_Routing(Dir_Benchmark, Parameters, Cache, 'topological'))
+
+
+def Setup_SurfWAT_Part2(Dir_Benchmark, Parameters, Cache):
+    import wa.Models.SurfWAT.Part2_Create_Dictionaries as Part2_Create_Dictionaries
+
+    input_nc, output_nc = Get_SurfWAT_Output(Dir_Benchmark, Parameters, Cache)
+
+    return(lambda: Part2_Create_Dictionaries.Run(input_nc, output_nc))
+
+
+def Setup_SurfWAT_Part3(Dir_Benchmark, Parameters, Cache):
+    return('Part 3 calculates the reservoir areas with Google Earth Engine and the JRC water occurrence map, so it cannot run offline')
+
+
+def Setup_SurfWAT_Part4(Dir_Benchmark, Parameters, Cache):
+    import wa.Models.SurfWAT.Part4_Withdrawals as Part4_Withdrawals
+
+    input_nc, output_nc = Get_SurfWAT_Output(Dir_Benchmark, Parameters, Cache)
+
+    return(lambda: Part4_Withdrawals.Run(input_nc, output_nc))
+
+
+def Setup_waterpix(Dir_Benchmark, Parameters, Cache, engine):
+    """
+    This function creates the waterpix input file once, the infz is
+    interpolated with the numpy kriging so no R installation is needed
+    """
+    import wa.Models.waterpix.main as waterpix
+
+    if 'waterpix' not in Cache:
+        input_nc = os.path.join(Dir_Benchmark, 'waterpix_in.nc')
+        SD.Create_Waterpix_NC(input_nc, Parameters['Startdate'], Parameters['Enddate'],
+                              Parameters['Size'], Parameters['seed'])
+        Cache['waterpix'] = input_nc
+
+    input_nc = Cache['waterpix']
+    output_nc = os.path.join(Dir_Benchmark, 'waterpix_out_%s.nc' %engine)
+
+    return(lambda: waterpix.run(input_nc, output_nc, engine = engine, kriging_engine = 'numpy'))
+
+
+def Setup_waterpix_pixel(Dir_Benchmark, Parameters, Cache):
+    return(Setup_waterpix(Dir_Benchmark, Parameters, Cache, 'pixel'))
+
+
+def Setup_waterpix_array(Dir_Benchmark, Parameters, Cache):
+    return(Setup_waterpix(Dir_Benchmark, Parameters, Cache, 'array'))
+
+
+def Setup_OPeNDAP(Dir_Benchmark, Parameters, Cache, extension):
+    """
+    This function serves a monthly precipitation Grid on localhost once, the
+    whole array is downloaded as a .dods subset or as an .ascii subset that
+    is parsed with genfromtxt like the collectors did before
+    """
+    import numpy as np
+    import requests
+    import wa.General.opendap as DAP
+
+    Dates = Get_Dates(Parameters)
+    Size = Parameters['Size']
+    if 'OPeNDAP' not in Cache:
+        np.random.seed(Parameters['seed'])
+        Data = (np.random.rand(len(Dates), Size[0], Size[1]) * 200).astype(np.float32)
+        Maps = [('time', np.arange(len(Dates), dtype = np.float64)),
+                ('lat', np.linspace(10, -10, Size[0])),
+                ('lon', np.linspace(30, 50, Size[1]))]
+        Cache['OPeNDAP'] = DAP.Fixture_Server({'synthetic/precipitation.nc': {'precipitation': (Data, Maps)}})
+
+    url = Cache['OPeNDAP'].url + '/synthetic/precipitation.nc.%s?precipitation[0:1:%d][0:1:%d][0:1:%d]' %(extension, len(Dates) - 1, Size[0] - 1, Size[1] - 1)
+
+    if extension == 'dods':
+        return(lambda: DAP.Get_dods(url, 'precipitation'))
+
+    pathtext = os.path.join(Dir_Benchmark, 'precipitation.txt')
+
+    def Function():
+        dataset = requests.get(url, stream = True)
+        with open(pathtext, 'wb') as f:
+            f.write(dataset.content)
+        data_start = np.genfromtxt(pathtext, dtype = float, skip_header = 1, delimiter = ',')
+        return(data_start[:, 1:].reshape(len(Dates), Size[0], Size[1]))
+
+    return(Function)
+
+
+def Setup_OPeNDAP_dods(Dir_Benchmark, Parameters, Cache):
+    return(Setup_OPeNDAP(Dir_Benchmark, Parameters, Cache, 'dods'))
+
+
+def Setup_OPeNDAP_ascii(Dir_Benchmark, Parameters, Cache):
+    return(Setup_OPeNDAP(Dir_Benchmark, Parameters, Cache, 'ascii'))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print 'Usage: python Run_Benchmarks.py output.json [rows columns [startdate enddate [repeats]]]'
+        sys.exit(1)
+
+    Arguments = sys.argv[1:]
+    Size = [int(Arguments[1]), int(Arguments[2])] if len(Arguments) > 2 else [100, 120]
+    Startdate = Arguments[3] if len(Arguments) > 4 else '2005-01-01'
+    Enddate = Arguments[4] if len(Arguments) > 4 else '2005-12-31'
+    Repeats = int(Arguments[5]) if len(Arguments) > 5 else 1
+    main(Arguments[0], Size = Size, Startdate = Startdate, Enddate = Enddate, Repeats = Repeats)
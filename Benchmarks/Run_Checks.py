@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+"""
+Authors: Tim Hessels
+         UNESCO-IHE 2018
+Contact: t.hessels@unesco-ihe.org
+Repository: https://github.com/wateraccounting/wa
+Module: Benchmarks
+
+Description:
+Checks the behaviour that the optimized paths of the accounting pipeline
+promise (caches that are used, engines that agree) on synthetic data. No
+data is downloaded, so the checks run offline.
+
+Example:
+from wa.Benchmarks import Run_Checks
+Run_Checks.main()
+"""
+# General modules
+import os
+import sys
+import time
+import shutil
+import tempfile
+import traceback
+
+# All the checks in the order they are run
+Check_Names = ['raster_catalog_cache', 'waterpix_engines', 'waterpix_closed_forms', 'waterpix_kriging', 'opendap_decoder', 'SurfWAT_routing']
+
+
+def main(Dir_Check = None, Checks = None):
+    """
+    This function runs the checks and prints the result of every check
+
+    Keyword arguments:
+    Dir_Check -- 'C:/file/to/path/', folder for the synthetic data (a
+                 temporary folder that is removed afterwards if None)
+    Checks -- list with the names of the checks to run (all the Check_Names
+              if None)
+
+    Returns:
+    dictionary {name: None if the check passed, otherwise the error}
+    """
+    if Checks is None:
+        Checks = Check_Names
+    for Name in Checks:
+        if Name not in Check_Names:
+            raise ValueError('Unknown check: %s' %Name)
+
+    Remove_Dir = Dir_Check is None
+    if Remove_Dir:
+        Dir_Check = tempfile.mkdtemp(prefix = 'wa_check_')
+    elif not os.path.exists(Dir_Check):
+        os.makedirs(Dir_Check)
+
+    Results = dict()
+    try:
+        for Name in Checks:
+            Dir_One = os.path.join(Dir_Check, Name)
+            if not os.path.exists(Dir_One):
+                os.makedirs(Dir_One)
+            try:
+                globals()['Check_%s' %Name](Dir_One)
+                Results[Name] = None
+            except Exception:
+                Results[Name] = traceback.format_exc()
+            print 'Check %s ... %s' %(Name, 'ok' if Results[Name] is None else 'FAILED')
+    finally:
+        if Remove_Dir:
+            shutil.rmtree(Dir_Check, ignore_errors = True)
+
+    return(Results)
+
+
+def Check_raster_catalog_cache(Dir_Check):
+    """
+    A query on the catalog of a directory that did not change must not list
+    the directory again, also not after the catalog itself is written
+    """
+    import wa.General.raster_catalog as RCat
+
+    for month in range(1, 13):
+        open(os.path.join(Dir_Check, 'P_CHIRPS.v2.0_mm-month-1_monthly_2005.%02d.01.tif' %month), 'w').close()
+
+    # First query creates the catalog, the directory is then made older than
+    # the margin of the modification time
+    RCat.Find_dates(Dir_Check)
+    Past = time.time() - 10 * RCat.Margin
+    os.utime(Dir_Check, (Past, Past))
+    RCat.Find_dates(Dir_Check)
+
+    Listed = []
+    listdir = RCat.os.listdir
+    def Count_listdir(folder):
+        Listed.append(folder)
+        return(listdir(folder))
+
+    RCat.os.listdir = Count_listdir
+    try:
+        RCat.Register(os.path.join(Dir_Check, 'P_CHIRPS.v2.0_mm-month-1_monthly_2005.01.01.tif'))
+        Files = RCat.Find_dates(Dir_Check, '2005-01-01', '2005-03-31')
+        RCat.Find(Dir_Check, '*monthly_2005.02.01.tif')
+    finally:
+        RCat.os.listdir = listdir
+
+    if len(Listed) > 0:
+        raise AssertionError('The directory is listed %d times by cached queries' %len(Listed))
+    if len(Files) != 3:
+        raise AssertionError('Expected 3 dates, found %d' %len(Files))
+
+    return()
+
+
+def Check_waterpix_engines(Dir_Check):
+    """
+    The array engine of waterpix with the fsolve solver must give the same
+    output as the per-pixel engine, value for value
+    """
+    import numpy as np
+    import netCDF4
+    import wa.Models.waterpix.main as waterpix
+    import wa.Benchmarks.Synthetic_Data as SD
+
+    input_nc = os.path.join(Dir_Check, 'waterpix_in.nc')
+    SD.Create_Waterpix_NC(input_nc, '2005-01-01', '2006-12-31', [8, 10], 0)
+
+    # Gaps in the soil moisture (missing scenes) and rainy days, as in the
+    # real inputs
+    nc_file = netCDF4.Dataset(input_nc, 'a')
+    rs = np.random.RandomState(0)
+    Gaps_SWI = rs.rand(*nc_file.variables['SWI_M'].shape) < 0.05
+    Gaps_RainyDays = rs.rand(*nc_file.variables['RainyDays_M'].shape) < 0.05
+    for name, Gaps in [['SWI_M', Gaps_SWI], ['SWIo_M', Gaps_SWI], ['SWIx_M', Gaps_SWI], ['RainyDays_M', Gaps_RainyDays]]:
+        Data = nc_file.variables[name][:]
+        Data[Gaps] = np.ma.masked
+        nc_file.variables[name][:] = Data
+    nc_file.close()
+
+    Outputs = []
+    for engine in ['pixel', 'array']:
+        output_nc = os.path.join(Dir_Check, 'waterpix_out_%s.nc' %engine)
+        waterpix.run(input_nc, output_nc, engine = engine, kriging_engine = 'numpy', array_solver = 'fsolve')
+        Outputs.append(netCDF4.Dataset(output_nc))
+
+    Different = []
+    try:
+        for name in Outputs[0].variables:
+            Data_pixel = np.ma.filled(Outputs[0].variables[name][:].astype('f8'), np.nan)
+            Data_array = np.ma.filled(Outputs[1].variables[name][:].astype('f8'), np.nan)
+            Equal = (Data_pixel == Data_array) | (np.isnan(Data_pixel) & np.isnan(Data_array))
+            if not Equal.all():
+                Different.append('%s (%d values)' %(name, np.sum(~Equal)))
+    finally:
+        for nc_file in Outputs:
+            nc_file.close()
+
+    if len(Different) > 0:
+        raise AssertionError('The engines differ in: %s' %', '.join(Different))
+
+    return()
+
+
+def Check_waterpix_closed_forms(Dir_Check):
+    """
+    The closed forms of the baseflow and the incremental surface runoff of
+    the waterpix array engine must agree with the fsolve calls of the
+    per-pixel functions within a relative tolerance of 1e-12
+    """
+    import numpy as np
+    import pandas as pd
+    import warnings
+    import wa.Models.waterpix.functions as functions
+    import wa.Models.waterpix.array_functions as array_functions
+
+    Tolerance = 1e-12
+    rs = np.random.RandomState(0)
+    Pixels = 200
+
+    def Check_Close(name, Reference, Closed):
+        Scale = np.maximum(np.abs(Reference), 1.0)
+        Error = np.nanmax(np.abs(Closed - Reference) / Scale)
+        if not np.array_equal(np.isnan(Reference), np.isnan(Closed)) or Error > Tolerance:
+            raise AssertionError('%s: relative difference of %g' %(name, Error))
+
+    # Baseflow
+    qsw = rs.uniform(0.0, 50.0, (12, Pixels))
+    qratio = rs.uniform(0.1, 0.9, Pixels)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        Reference = np.column_stack([functions.baseflow_calculation(qsw[:, j], 0.5, qratio[j]) for j in range(Pixels)])
+    Check_Close('baseflow', Reference, array_functions.baseflow_calculation_array(qsw, 0.5, qratio))
+
+    # Incremental surface runoff of a year
+    p = rs.uniform(20.0, 200.0, (12, Pixels))
+    et = rs.uniform(10.0, 120.0, (12, Pixels))
+    et_green = et * rs.uniform(0.3, 1.0, (12, Pixels))
+    ds = {'p': p, 'et': et, 'et_green': et_green, 'et_blue': et - et_green,
+          'perc': rs.uniform(0.0, 20.0, (12, Pixels)),
+          'perc_green': rs.uniform(0.0, 10.0, (12, Pixels)),
+          'delta_perc': rs.uniform(0.0, 5.0, (12, Pixels)),
+          'Qsw_green': rs.uniform(0.0, 30.0, (12, Pixels)),
+          'Qgw_green': rs.uniform(0.0, 10.0, (12, Pixels)),
+          'dsm': rs.uniform(-20.0, 20.0, (12, Pixels)),
+          'thetasat': np.ones((12, Pixels)) * rs.uniform(0.3, 0.5, Pixels),
+          'theta0': rs.uniform(0.05, 0.3, (12, Pixels)),
+          'qratio': np.ones((12, Pixels)) * qratio}
+    for name in ['delta_Qsw', 'Qsw', 'Qgw', 'supply', 'eff']:
+        ds[name] = np.full((12, Pixels), np.nan)
+    ds['rainfed'] = np.ones(Pixels)
+    infz = rs.uniform(500.0, 5000.0, Pixels)
+    factor = rs.uniform(1.0, 15.0, Pixels)
+
+    Names = ['delta_Qsw', 'Qsw', 'supply', 'eff', 'perc', 'perc_green']
+    Reference = dict((name, np.full((12, Pixels), np.nan)) for name in Names)
+    Reference_Error = np.full(Pixels, np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        for j in range(Pixels):
+            df = pd.DataFrame(dict((name, ds[name][:, j]) for name in ds if name != 'rainfed'))
+            Reference_Error[j] = functions.incremental_runoff_calculation(factor[j], df.copy(), infz[j], 5, True)
+            df = functions.incremental_runoff_calculation(factor[j], df, infz[j], 5, False)
+            for name in Names:
+                Reference[name][:, j] = df[name]
+
+    with np.errstate(invalid = 'ignore'):
+        Error = array_functions.incremental_runoff_calculation_array(factor, dict((name, np.array(ds[name])) for name in ds), infz, 5, True)
+        ds = array_functions.incremental_runoff_calculation_array(factor, ds, infz, 5, False)
+    Check_Close('incremental runoff error', Reference_Error, Error)
+    for name in Names:
+        Check_Close(name, Reference[name], ds[name])
+
+    return()
+
+
+def Check_waterpix_kriging(Dir_Check):
+    """
+    The numpy kriging of waterpix must fill the gaps of a smooth field with
+    values in the range of the field, also when the gaussian variogram fits
+    best (a nearly singular kriging system without nugget)
+    """
+    import numpy as np
+    import wa.Models.waterpix.kriging as kriging
+
+    x_vector = np.linspace(0, 1.2, 120)
+    y_vector = np.linspace(0, 1.0, 100)
+    Y, X = np.meshgrid(y_vector, x_vector, indexing = 'ij')
+
+    Fields = [['wave', np.sin(8 * X) * np.cos(6 * Y)], ['plane', 2 * X + Y]]
+    for name, Field in Fields:
+        Gaps = np.random.RandomState(0).rand(*Field.shape) < 0.3
+        Data = np.where(Gaps, np.nan, Field)
+        Data_Filled = kriging.ordinary_kriging_array(Data, x_vector, y_vector)
+
+        # Condition of the kriging system of the 32 values closest to the
+        # centre with the fitted variogram
+        Points = np.column_stack((X[~Gaps], Y[~Gaps]))
+        model, nugget, psill, rng = kriging.fit_variogram(Points, Field[~Gaps], ('Sph', 'Exp', 'Gau'))
+        Closest = Points[np.argsort(np.hypot(Points[:, 0] - 0.6, Points[:, 1] - 0.5))[:32]]
+        Distance = np.hypot(Closest[:, None, 0] - Closest[None, :, 0], Closest[:, None, 1] - Closest[None, :, 1])
+        System = np.ones((33, 33))
+        System[:32, :32] = kriging.VARIOGRAM_MODELS[model](Distance, nugget, psill, rng)
+        System[32, 32] = 0
+        if np.linalg.cond(System) > 1e10:
+            raise AssertionError('%s: kriging system of the %s variogram is nearly singular (condition %g)' %(name, model, np.linalg.cond(System)))
+
+        Predicted = Data_Filled[Gaps]
+        Range = np.ptp(Field)
+        if not np.all(np.isfinite(Predicted)):
+            raise AssertionError('%s: gaps are not filled' %name)
+        if np.min(Predicted) < np.min(Field) - 0.05 * Range or np.max(Predicted) > np.max(Field) + 0.05 * Range:
+            raise AssertionError('%s: predictions from %g to %g outside the range of the field' %(name, np.min(Predicted), np.max(Predicted)))
+        RMSE = np.sqrt(np.mean((Predicted - Field[Gaps])**2))
+        if RMSE > 0.01 * Range:
+            raise AssertionError('%s: RMSE of %g' %(name, RMSE))
+
+    return()
+
+
+def Check_opendap_decoder(Dir_Check):
+    """
+    Subsets of Grids served by the fixture server must be decoded to the
+    values of the source array, also for Byte values (padded to 4 bytes) and
+    Int16 values (sent as 32 bits)
+    """
+    import numpy as np
+    import requests
+    import wa.General.opendap as DAP
+
+    np.random.seed(3)
+    time_map = np.arange(3, dtype=np.float64)
+    lat_map = np.linspace(-30, 30, 5).astype(np.float32)
+    lon_map = np.linspace(0, 60, 7)
+    maps = [('time', time_map), ('lat', lat_map), ('lon', lon_map)]
+    Variables = {'precip': np.random.rand(3, 5, 7).astype(np.float32) * 100,
+                 'quality': np.random.randint(0, 256, (3, 5, 7)).astype(np.uint8),
+                 'elevation': np.random.randint(-32768, 32768, (3, 5, 7)).astype(np.int16)}
+
+    server = DAP.Fixture_Server({'grids/fixture.nc': dict([(Var, (Variables[Var], maps)) for Var in Variables])})
+    try:
+        # An odd number of values, so the Byte array is followed by padding
+        for constraint in ['[1][0:1:2][1:2:6]', '[0:1:2][4][0:1:6]', '[2][0:2:4][3]']:
+            for Var in Variables:
+                url = server.url + '/grids/fixture.nc.dods?%s%s' %(Var, constraint)
+                data = DAP.Get_dods(url, Var)
+                Expected = DAP.Subset_array(Variables[Var], constraint)
+                if data.shape != Expected.shape or not np.array_equal(data, Expected.astype(np.float64)):
+                    raise AssertionError('%s%s: decoded values differ from the source array' %(Var, constraint))
+
+                # The maps follow the array, they are only found at the
+                # right offset if the array is read with its padding
+                content = requests.get(url).content
+                lon = DAP.Decode_dods(content, 'lon')
+                parts = constraint[1:-1].split('][')
+                if not np.array_equal(lon, DAP.Subset_array(lon_map, '[%s]' %parts[2])):
+                    raise AssertionError('%s%s: map after the array is not decoded' %(Var, constraint))
+    finally:
+        server.close()
+
+    return()
+
+
+def Check_SurfWAT_routing(Dir_Check):
+    """
+    The topological routing of SurfWAT Part 1 must give the routed runoff,
+    the accumulated pixels and the rivers of the sweep routing on the
+    synthetic DEM
+    """
+    import numpy as np
+    import pandas as pd
+    import wa.Functions.Start.Area_converter as AC
+    import wa.Models.SurfWAT.Part1_Channel_Routing as Part1_Channel_Routing
+    import wa.Benchmarks.Synthetic_Data as SD
+
+    # The inputs of Create_SurfWAT_NC, in m3 per month as in Run_SurfWAT
+    Size = [60, 50]
+    Dates = pd.date_range('2005-01-01', '2006-12-31', freq = 'MS')
+    DEM, flow_directions, Basin = SD.Create_DEM(Size, 0)
+    dlat, dlon = AC.Calc_dlat_dlon(np.array(SD.Create_Geo(Size)), Size[1], Size[0])
+    Runoff = SD.Create_Time_Series(Dates, Size, 0.0, 60.0, 1)
+    Runoff_in_m3_month = (Runoff/1000) * (dlat * dlon)
+
+    Outputs = dict()
+    for Routing_Method in ['sweep', 'topological']:
+        Outputs[Routing_Method] = Part1_Channel_Routing.Run(np.copy(Runoff_in_m3_month), flow_directions, Basin, Routing_Method)
+
+    for name, Data_sweep, Data_topological in zip(['Routed_Array', 'Accumulated_Pixels', 'Rivers'], Outputs['sweep'], Outputs['topological']):
+        Difference = np.max(np.abs(Data_topological - Data_sweep)) / np.max(np.abs(Data_sweep))
+        if Difference > 1e-12:
+            raise AssertionError('%s of the routing methods differs by %g (relative to the maximum)' %(name, Difference))
+
+    # The flow must be routed over more pixels than one column
+    if np.max(Outputs['sweep'][1]) <= Size[0]:
+        raise AssertionError('The largest river accumulates only %d pixels' %np.max(Outputs['sweep'][1]))
+
+    return()
+
+
+if __name__ == '__main__':
+    Results = main()
+    sys.exit(0 if all([Error is None for Error in Results.values()]) else 1)
@@ -0,0 +1,353 @@
+# -*- coding: utf-8 -*-
+"""
+Authors: Tim Hessels
+         UNESCO-IHE 2018
+Contact: t.hessels@unesco-ihe.org
+Repository: https://github.com/wateraccounting/wa
+Module: Benchmarks
+
+Description:
+Creates synthetic input data (GeoTIFF and netCDF files) of any extent and
+duration in the formats that are used by the WA+ functions and models, so the
+accounting pipeline can be run and timed without downloading data.
+"""
+# General modules
+import os
+import numpy as np
+import pandas as pd
+import netCDF4
+
+# D8 flow directions (ArcGIS coding) and the shift [dy, dx] to the next pixel
+Directions = [(1, (0, 1)), (2, (1, 1)), (4, (1, 0)), (8, (1, -1)),
+              (16, (0, -1)), (32, (-1, -1)), (64, (-1, 0)), (128, (-1, 1))]
+
+# Land use values of the WA+ LULC map
+Landuse_Values = np.arange(1, 81)
+
+
+def Create_Geo(Size, Resolution = 0.05, Origin = (30.0, 10.0)):
+    """
+    This function returns the geotransform of the synthetic grid
+
+    Keyword arguments:
+    Size -- [rows, columns] of the grid
+    Resolution -- float, pixel size in degrees
+    Origin -- (lon, lat) of the upper left corner
+    """
+    return((Origin[0], Resolution, 0.0, Origin[1], 0.0, -Resolution))
+
+
+def Create_DEM(Size, seed = 0):
+    """
+    This function creates a DEM without pits that drains towards the middle of
+    the bottom edge, with the D8 flow directions and the basin mask
+
+    Keyword arguments:
+    Size -- [rows, columns] of the grid
+    seed -- integer, seed of the random generator
+
+    Returns:
+    DEM, Flow_Directions, Basin as 2D arrays
+    """
+    rs = np.random.RandomState(seed)
+    size_Y, size_X = int(Size[0]), int(Size[1])
+
+    # Slope towards the bottom edge and the middle column, the noise is smaller
+    # than the slope so no pits are created
+    y, x = np.indices((size_Y, size_X))
+    DEM = (size_Y - y) * 1.0 + rs.rand(size_Y, size_X) * 0.9 + np.abs(x - size_X / 2.0) * 0.3
+
+    # Steepest descent direction, the pixels outside the grid are very low
+    Flow_Directions = np.zeros((size_Y, size_X))
+    Steepest = np.zeros((size_Y, size_X))
+    DEM_padded = np.pad(DEM, 1, mode = 'constant', constant_values = -1e9)
+    for Direction, (dy, dx) in Directions:
+        Drop = (DEM - DEM_padded[1 + dy:size_Y + 1 + dy, 1 + dx:size_X + 1 + dx]) / np.hypot(dy, dx)
+        Steeper = Drop > Steepest
+        Steepest[Steeper] = Drop[Steeper]
+        Flow_Directions[Steeper] = Direction
+
+    # The basin leaves a border of two pixels, except at the outlet
+    Basin = np.zeros((size_Y, size_X))
+    Basin[2:-2, 2:-2] = 1
+    Basin[-2:, max(size_X // 2 - 3, 0):size_X // 2 + 3] = 1
+    Flow_Directions[Basin == 0] = 0
+
+    return(DEM, Flow_Directions, Basin)
+
+
+def Create_Landuse(Size, seed = 0):
+    """
+    This function creates a land use map with patches of WA+ LULC classes
+
+    Keyword arguments:
+    Size -- [rows, columns] of the grid
+    seed -- integer, seed of the random generator
+    """
+    rs = np.random.RandomState(seed)
+    size_Y, size_X = int(Size[0]), int(Size[1])
+
+    # One class per patch of 5 by 5 pixels
+    Patches = rs.choice(Landuse_Values, ((size_Y + 4) // 5, (size_X + 4) // 5))
+    LU = np.repeat(np.repeat(Patches, 5, axis = 0), 5, axis = 1)[:size_Y, :size_X]
+
+    return(np.float_(LU))
+
+
+def Create_Time_Series(Dates, Size, Low, High, seed = 0):
+    """
+    This function creates a 3D array with a seasonal cycle and noise
+
+    Keyword arguments:
+    Dates -- pandas DatetimeIndex of the time steps
+    Size -- [rows, columns] of the grid
+    Low -- float, minimum value
+    High -- float, maximum value
+    seed -- integer, seed of the random generator
+    """
+    rs = np.random.RandomState(seed)
+    Season = 0.5 + 0.5 * np.sin(2 * np.pi * (np.array(Dates.dayofyear, dtype = float) - 80) / 365.)
+    Noise = rs.rand(len(Dates), int(Size[0]), int(Size[1]))
+    Data = Low + (High - Low) * (0.7 * Season[:, None, None] + 0.3 * Noise)
+
+    return(Data)
+
+
+def Create_Tiffs(Dir, Name, Dates, Size, Low, High, seed = 0, Resolution = 0.05):
+    """
+    This function saves a time series as tiff files named as the WA+ products,
+    e.g. Name = 'P_CHIRPS.v2.0_mm-month-1_monthly' gives
+    'P_CHIRPS.v2.0_mm-month-1_monthly_2005.01.01.tif'
+
+    Keyword arguments:
+    Dir -- 'C:/file/to/path/'
+    Name -- string, begin of the file names
+    Dates -- pandas DatetimeIndex of the time steps
+    Size -- [rows, columns] of the grid
+    Low -- float, minimum value
+    High -- float, maximum value
+    seed -- integer, seed of the random generator
+    Resolution -- float, pixel size in degrees
+
+    Returns:
+    list with the names of the tiff files
+    """
+    import wa.General.data_conversions as DC
+
+    if not os.path.exists(Dir):
+        os.makedirs(Dir)
+
+    Data = Create_Time_Series(Dates, Size, Low, High, seed)
+    geo = Create_Geo(Size, Resolution)
+
+    files = []
+    for i, Date in enumerate(Dates):
+        file_name = os.path.join(Dir, '%s_%d.%02d.%02d.tif' %(Name, Date.year, Date.month, Date.day))
+        DC.Save_as_tiff(file_name, Data[i, :, :], geo, "WGS84")
+        files.append(file_name)
+
+    return(files)
+
+
+def Composite_Dates(Startdate, Enddate, Length):
+    """
+    This function returns the start dates of the MODIS composites (8 or 16
+    days) that start again on the first of January of every year
+
+    Keyword arguments:
+    Startdate -- 'yyyy-mm-dd'
+    Enddate -- 'yyyy-mm-dd'
+    Length -- integer, days of a composite
+    """
+    Dates = []
+    for year in range(pd.Timestamp(Startdate).year, pd.Timestamp(Enddate).year + 1):
+        Dates.extend(pd.date_range('%d-01-01' %year, '%d-12-31' %year, freq = '%dD' %Length))
+
+    return(pd.DatetimeIndex(Dates))
+
+
+def Create_Sheet_NC(nc_outname, Example_dataset, Basin, Variables, seed = 0):
+    """
+    This function creates the yearly netCDF file of a sheet (as the
+    Generator does) with the given monthly variables
+
+    Keyword arguments:
+    nc_outname -- 'C:/file/to/path/2005.nc', the name must be the year
+    Example_dataset -- string, tiff file that contains the land use map
+    Basin -- string, name of the basin
+    Variables -- list of [name, unit, Low, High]
+    seed -- integer, seed of the random generator
+    """
+    import wa.General.raster_conversions as RC
+    import wa.General.data_conversions as DC
+
+    year = int(os.path.basename(nc_outname).split(".")[0])
+    Dates = pd.date_range("%d-01-01" %year, "%d-12-31" %year, freq = "MS")
+    geo, proj, size_X, size_Y = RC.Open_array_info(Example_dataset)
+
+    DC.Create_new_NC_file(nc_outname, Example_dataset, Basin)
+    with DC.NC_Writer(nc_outname) as nc:
+        for i, (name, unit, Low, High) in enumerate(Variables):
+            Data = Create_Time_Series(Dates, [size_Y, size_X], Low, High, seed + i)
+            nc.Add_Variable(Data, name, unit, 0.01)
+
+    return()
+
+
+def Create_SurfWAT_NC(input_nc, Startdate, Enddate, Size, seed = 0, Resolution = 0.05):
+    """
+    This function creates the input netCDF file of SurfWAT (as
+    Create_input_nc does) with a synthetic basin
+
+    Keyword arguments:
+    input_nc -- 'C:/file/to/path/SurfWAT_in.nc'
+    Startdate -- 'yyyy-mm-dd'
+    Enddate -- 'yyyy-mm-dd'
+    Size -- [rows, columns] of the grid
+    seed -- integer, seed of the random generator
+    Resolution -- float, pixel size in degrees
+    """
+    import wa.General.raster_conversions as RC
+    import wa.Functions.Start.Area_converter as AC
+
+    DEM, Flow_Directions, Basin = Create_DEM(Size, seed)
+    geo = np.array(Create_Geo(Size, Resolution))
+    size_Y, size_X = DEM.shape
+
+    Dates = pd.date_range(Startdate, Enddate, freq = 'MS')
+    time_or = np.array([Date.toordinal() for Date in Dates], dtype = float)
+    Runoff = Create_Time_Series(Dates, Size, 0.0, 60.0, seed + 1)
+    Extraction = Create_Time_Series(Dates, Size, 0.0, 5.0, seed + 2)
+    Runoff[:, Basin == 0] = -9999
+    Extraction[:, Basin == 0] = -9999
+
+    # Area per pixel of the grid
+    dlat, dlon = AC.Calc_dlat_dlon(geo, size_X, size_Y)
+    Area = dlat * dlon
+
+    lon_ls = np.arange(size_X) * geo[1] + geo[0] + 0.5 * geo[1]
+    lat_ls = np.arange(size_Y) * geo[5] + geo[3] - 0.5 * geo[5]
+
+    # Create NetCDF file
+    RC.Close_nc_handle(input_nc)
+    nc_file = netCDF4.Dataset(input_nc, 'w')
+    nc_file.set_fill_on()
+    nc_file.createDimension('latitude', size_Y)
+    nc_file.createDimension('longitude', size_X)
+    nc_file.createDimension('time', None)
+
+    crso = nc_file.createVariable('crs', 'i4')
+    crso.long_name = 'Lon/Lat Coords in WGS84'
+    crso.standard_name = 'crs'
+    crso.grid_mapping_name = 'latitude_longitude'
+    crso.projection = 'WGS84'
+    crso.longitude_of_prime_meridian = 0.0
+    crso.semi_major_axis = 6378137.0
+    crso.inverse_flattening = 298.257223563
+    crso.geo_reference = geo
+
+    lat_var = nc_file.createVariable('latitude', 'f8', ('latitude',))
+    lat_var.units = 'degrees_north'
+    lat_var.standard_name = 'latitude'
+    lat_var.pixel_size = geo[5]
+
+    lon_var = nc_file.createVariable('longitude', 'f8', ('longitude',))
+    lon_var.units = 'degrees_east'
+    lon_var.standard_name = 'longitude'
+    lon_var.pixel_size = geo[1]
+
+    timeo = nc_file.createVariable('time', 'f4', ('time',))
+    timeo.units = 'Monthly'
+    timeo.standard_name = 'time'
+
+    Static = [['demdir', 'i', Flow_Directions], ['dem', 'f8', DEM],
+              ['basin', 'i', Basin], ['area', 'f8', Area]]
+    for name, dtype, Data in Static:
+        var = nc_file.createVariable(name, dtype, ('latitude', 'longitude'), fill_value=-9999)
+        var.grid_mapping = 'crs'
+        var[:, :] = Data
+
+    Dynamic = [['Runoff_M', Runoff], ['Extraction_M', Extraction]]
+    for name, Data in Dynamic:
+        var = nc_file.createVariable(name, 'f8', ('time', 'latitude', 'longitude'), fill_value=-9999)
+        var.units = 'mm/month'
+        var.grid_mapping = 'crs'
+        var[:, :, :] = Data
+
+    lat_var[:] = lat_ls
+    lon_var[:] = lon_ls
+    timeo[:] = time_or
+
+    nc_file.close()
+    return()
+
+
+def Create_Waterpix_NC(input_nc, Startdate, Enddate, Size, seed = 0, Resolution = 0.05):
+    """
+    This function creates the input netCDF file of waterpix with monthly
+    data for complete years
+
+    Keyword arguments:
+    input_nc -- 'C:/file/to/path/waterpix_in.nc'
+    Startdate -- 'yyyy-mm-dd', the year of the date is used
+    Enddate -- 'yyyy-mm-dd', the year of the date is used
+    Size -- [rows, columns] of the grid
+    seed -- integer, seed of the random generator
+    Resolution -- float, pixel size in degrees
+    """
+    rs = np.random.RandomState(seed)
+    size_Y, size_X = int(Size[0]), int(Size[1])
+    years = range(pd.Timestamp(Startdate).year, pd.Timestamp(Enddate).year + 1)
+    Dates = pd.date_range('%d-01-01' %years[0], '%d-12-31' %years[-1], freq = 'MS')
+    geo = Create_Geo(Size, Resolution)
+    DEM, Flow_Directions, Basin = Create_DEM(Size, seed)
+
+    nc_file = netCDF4.Dataset(input_nc, 'w', format="NETCDF4")
+    nc_file.createDimension('latitude', size_Y)
+    nc_file.createDimension('longitude', size_X)
+    nc_file.createDimension('time_yyyymm', len(Dates))
+    nc_file.createDimension('time_yyyy', len(years))
+
+    crs_var = nc_file.createVariable('crs', 'i', (), fill_value=-9999)
+    crs_var.standard_name = 'crs'
+    crs_var.grid_mapping_name = 'latitude_longitude'
+    crs_var.crs_wkt = 'WGS84'
+
+    lat_var = nc_file.createVariable('latitude', 'f8', ('latitude',), fill_value=-9999)
+    lat_var.units = 'degrees_north'
+    lat_var.standard_name = 'latitude'
+    lon_var = nc_file.createVariable('longitude', 'f8', ('longitude',), fill_value=-9999)
+    lon_var.units = 'degrees_east'
+    lon_var.standard_name = 'longitude'
+    month_var = nc_file.createVariable('time_yyyymm', 'l', ('time_yyyymm',), fill_value=-9999)
+    month_var.standard_name = 'time'
+    month_var.format = 'YYYYMM'
+    year_var = nc_file.createVariable('time_yyyy', 'l', ('time_yyyy',), fill_value=-9999)
+    year_var.standard_name = 'time'
+    year_var.format = 'YYYY'
+
+    lat_var[:] = np.arange(size_Y) * geo[5] + geo[3] + 0.5 * geo[5]
+    lon_var[:] = np.arange(size_X) * geo[1] + geo[0] + 0.5 * geo[1]
+    month_var[:] = [Date.year * 100 + Date.month for Date in Dates]
+    year_var[:] = list(years)
+
+    Monthly = [['Precipitation_M', 0.0, 200.0], ['Evapotranspiration_M', 10.0, 120.0],
+               ['ReferenceET_M', 60.0, 180.0], ['LeafAreaIndex_M', 0.2, 4.0],
+               ['SWI_M', 10.0, 90.0], ['SWIo_M', 10.0, 90.0], ['SWIx_M', 10.0, 90.0],
+               ['RainyDays_M', 2.0, 20.0]]
+    for i, (name, Low, High) in enumerate(Monthly):
+        var = nc_file.createVariable(name, 'f8', ('time_yyyymm', 'latitude', 'longitude'), fill_value=-9999)
+        var[:] = Create_Time_Series(Dates, Size, Low, High, seed + i)
+
+    Static = [['RunoffRatio_Y', ('time_yyyy', 'latitude', 'longitude'), rs.uniform(0.05, 0.6, (len(years), size_Y, size_X))],
+              ['SaturatedWaterContent', ('latitude', 'longitude'), rs.uniform(0.3, 0.5, (size_Y, size_X))],
+              ['RootDepth', ('latitude', 'longitude'), rs.uniform(50.0, 150.0, (size_Y, size_X))]]
+    for name, dims, Data in Static:
+        var = nc_file.createVariable(name, 'f8', dims, fill_value=-9999)
+        var[:] = Data
+
+    basin_var = nc_file.createVariable('BasinBuffer', 'l', ('latitude', 'longitude'), fill_value=0)
+    basin_var[:] = np.int_(Basin)
+
+    nc_file.close()
+    return()
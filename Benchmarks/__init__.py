@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""
+Authors: Tim Hessels
+         UNESCO-IHE 2018
+Contact: t.hessels@unesco-ihe.org
+Repository: https://github.com/wateraccounting/wa
+Module: Benchmarks
+
+Description:
+This module creates synthetic input data, times the hot paths of the
+accounting pipeline on this data and checks their behaviour without network
+access.
+"""
+
+from wa.Benchmarks import Synthetic_Data, Run_Benchmarks, Run_Checks
+
+__all__ = ['Synthetic_Data', 'Run_Benchmarks', 'Run_Checks']
+
+__version__ = '0.1'
@@ -27,7 +27,6 @@ ETmonitor.monthly(Dir='C:/Temp/', Startdate='2003-02-24', Enddate='2003-03-09',
 import numpy as np
 import os
 import pandas as pd
-from ftplib import FTP
 import datetime
 import math
 import glob
@@ -35,6 +34,7 @@ import glob
 # Water Accounting Modules
 import wa.WebAccounts as WebAccounts
 import wa.General.raster_conversions as RC
+import wa.General.ftp_download as FD
 import wa.General.data_conversions as DC
 
 def DownloadData(Dir, Startdate, Enddate, latlim, lonlim, TimeStep, Waitbar):
@@ -248,16 +248,11 @@ def Download_ALEXI_from_WA_FTP(local_filename, DirFile, filename, lonlim, latlim
     ftpserver = "ftp.wateraccounting.unesco-ihe.org"
 
     # Download data from FTP
-    ftp=FTP(ftpserver)
-    ftp.login(username,password)
     if TimeStep is "weekly":
         directory="/WaterAccounting/Data_Satellite/Evaporation/ALEXI/World/"
     if TimeStep is "daily":
         directory="/WaterAccounting/Data_Satellite/Evaporation/ALEXI/World_05182018/"
-    ftp.cwd(directory)
-    lf = open(local_filename, "wb")
-    ftp.retrbinary("RETR " + filename, lf.write)
-    lf.close()
+    FD.Download_file(ftpserver, directory, filename, local_filename, username, password)
 
     if TimeStep is "weekly":
 
@@ -17,6 +17,7 @@ from joblib import Parallel, delayed
 # WA+ modules
 from wa.Collect.CFSR.Download_data_CFSR import Download_data
 from wa.General import data_conversions as DC
+from wa.General import raster_conversions as RC
 
 def CollectData(Dir, Var, Startdate, Enddate, latlim, lonlim, Waitbar, cores, Version):    
     """
@@ -162,8 +163,8 @@ def RetrieveData(Date, args):
                 Ystart = np.floor((latlim[0] + 89.9171038899) / 0.3122121663)
                 Yend = np.ceil((latlim[1] + 89.9171038899) / 0.3122121663)
             
-                # Create a new dataset   
-                Datatot = np.zeros([576, 1152])	
+                # Size of the global grid
+                Size_Y, Size_X = 576, 1152
 
             else:
                 Version = 2																
@@ -176,27 +177,26 @@ def RetrieveData(Date, args):
             Ystart = np.floor((latlim[0] + 89.9462116040955806) / 0.204423)
             Yend = np.ceil((latlim[1] + 89.9462116040955806) / 0.204423)
             
-            # Create a new dataset   
-            Datatot = np.zeros([880, 1760])		
+            # Size of the global grid
+            Size_Y, Size_X = 880, 1760
 					
-        # Open 4 times 6 hourly dataset 
+        # Define the window of the extent difined by the user, the columns of
+        # the grid start at 0 degrees and are shifted half the grid to -180 degrees
+        Xstart, Xend, Ystart, Yend = RC.Limit_window([Xstart, Xend, Ystart, Yend], Size_X, Size_Y)
+        Columns = Get_columns(Xstart, Xend, Size_X)
+
+        # Open 4 times 6 hourly dataset, only the window is read
+        Datatot = np.zeros([Yend - Ystart, Xend - Xstart])
         for i in range (0, 4):
             nameNC = 'Output' + str(Date.strftime('%Y')) + str(Date.strftime('%m')) + str(Date.strftime('%d')) + '-' + str(i + 1) + '.nc'
             FileNC6hour = os.path.join(output_folder, nameNC)
             f = Dataset(FileNC6hour, mode = 'r')
-            Data = f.variables['Band1'][0:int(Datatot.shape[0]), 0:int(Datatot.shape[1])]
+            data = np.hstack([np.array(f.variables['Band1'][Ystart:Yend, Start:End]) for Start, End in Columns])
             f.close()
-            data = np.array(Data)
             Datatot = Datatot + data
-           			
-        # Calculate the average in W/m^2 over the day   
-        DatatotDay = Datatot / 4
-        DatatotDayEnd = np.zeros([int(Datatot.shape[0]), int(Datatot.shape[1])])
-        DatatotDayEnd[:,0:int(Datatot.shape[0])] = DatatotDay[:, int(Datatot.shape[0]):int(Datatot.shape[1])]
-        DatatotDayEnd[:,int(Datatot.shape[0]):int(Datatot.shape[1])] = DatatotDay[:, 0:int(Datatot.shape[0])]
-            
-        # clip the data to the extent difined by the user
-        DatasetEnd = DatatotDayEnd[int(Ystart):int(Yend), int(Xstart):int(Xend)]											
+
+        # Calculate the average in W/m^2 over the day
+        DatasetEnd = Datatot / 4
 											
         # save file
         if Version == 1:
@@ -207,3 +207,26 @@ def RetrieveData(Date, args):
         DC.Save_as_tiff(data = np.flipud(DatasetEnd), name = outputnamePath, geo = geo, projection = "WGS84") 	
 				
     return()
+
+
+def Get_columns(Xstart, Xend, Size_X):
+    """
+    This function gives the column ranges of the CFSR grid (starting at 0
+    degrees) that cover the columns Xstart to Xend of the grid shifted to
+    -180 degrees, the range is split in two if it crosses 0 degrees
+
+    Keyword arguments:
+    Xstart -- first column of the shifted grid
+    Xend -- last column (excluded) of the shifted grid
+    Size_X -- number of columns of the grid
+    """
+    Start = Xstart + Size_X / 2
+    End = Xend + Size_X / 2
+    if End <= Size_X:
+        Columns = [(Start, End)]
+    elif Start >= Size_X:
+        Columns = [(Start - Size_X, End - Size_X)]
+    else:
+        Columns = [(Start, Size_X), (0, End - Size_X)]
+
+    return(Columns)
@@ -12,12 +12,13 @@ Module: Collect/CHIRPS
 import os
 import numpy as np
 import pandas as pd
-from ftplib import FTP
+import gdal
 from joblib import Parallel, delayed
 
 # WA+ modules
 import wa.General.raster_conversions as RC
 import wa.General.data_conversions as DC
+import wa.General.ftp_download as FD
 
 def DownloadData(Dir, Startdate, Enddate, latlim, lonlim, Waitbar, cores, TimeCase):
     """
@@ -109,10 +110,6 @@ def RetrieveData(Date, args):
     # Argument
     [output_folder, TimeCase, xID, yID, lonlim, latlim] = args
 				
-    # open ftp server
-    ftp = FTP("chg-ftpout.geog.ucsb.edu", "", "")
-    ftp.login()
-				
 	# Define FTP path to directory 			
     if TimeCase == 'daily':
         pathFTP = 'pub/org/chg/products/CHIRPS-2.0/global_daily/tifs/p05/%s/' %Date.strftime('%Y') 
@@ -121,13 +118,6 @@ def RetrieveData(Date, args):
     else:
         raise KeyError("The input time interval is not supported")
 								
-    # find the document name in this directory								
-    ftp.cwd(pathFTP)
-    listing = []
-				
-	# read all the file names in the directory			
-    ftp.retrlines("LIST", listing.append)
-				
 	# create all the input name (filename) and output (outfilename, filetif, DiFileEnd) names			
     if TimeCase == 'daily':
         filename = 'chirps-v2.0.%s.%02s.%02s.tif.gz' %(Date.strftime('%Y'), Date.strftime('%m'), Date.strftime('%d'))
@@ -140,31 +130,47 @@ def RetrieveData(Date, args):
     else:
         raise KeyError("The input time interval is not supported")
 
-    # download the global rainfall file
+    # download the global rainfall file, the archive is kept for later runs
     try:
         local_filename = os.path.join(output_folder, filename)
-        lf = open(local_filename, "wb")
-        ftp.retrbinary("RETR " + filename, lf.write, 8192)
-        lf.close()
-
-        # unzip the file
-        zip_filename = os.path.join(output_folder, filename)
-        DC.Extract_Data_gz(zip_filename, outfilename)
-
-        # open tiff file
-        dataset = RC.Open_tiff_array(outfilename)
-
-        # clip dataset to the given extent
-        data = dataset[yID[0]:yID[1], xID[0]:xID[1]]
+        if not os.path.exists(local_filename):
+            Download_archive(pathFTP, filename, local_filename)
+
+        # open only the given extent of the compressed tiff file
+        dest = gdal.Open('/vsigzip/' + local_filename)
+        if dest is not None:
+            data = RC.Open_tiff_array(dest, window = [xID[0], xID[1], yID[0], yID[1]])
+            dest = None
+        else:
+            DC.Extract_Data_gz(local_filename, outfilename, remove_zip = False)
+            data = RC.Open_tiff_array(outfilename, window = [xID[0], xID[1], yID[0], yID[1]])
+            os.remove(outfilename)
         data[data < 0] = -9999
 
         # save dataset as geotiff file
         geo = [lonlim[0], 0.05, 0, latlim[1], 0, -0.05]
         DC.Save_as_tiff(name=DirFileEnd, data=data, geo=geo, projection="WGS84")
 
-        # delete old tif file
-        os.remove(outfilename)
-
     except:
         print "file not exists"
     return True
+
+
+def Download_archive(pathFTP, filename, local_filename):
+    """
+    This function downloads one compressed CHIRPS file from the
+    ftp://chg-ftpout.geog.ucsb.edu server, the logged in ftp session and the
+    listing of the directory are reused for all the files
+
+    Keyword arguments:
+    pathFTP -- FTP path to the directory of the file
+    filename -- name of the file on the server
+    local_filename -- 'C:/file/to/path/file.tif.gz'
+    """
+    ftpserver = "chg-ftpout.geog.ucsb.edu"
+    if filename not in FD.Get_listing(ftpserver, pathFTP):
+        raise IOError("%s is not on the CHIRPS server" %filename)
+
+    FD.Download_file(ftpserver, pathFTP, filename, local_filename)
+
+    return()
@@ -27,11 +27,11 @@ CMRSET.monthly(Dir='C:/Temp/', Startdate='2003-02-24', Enddate='2003-03-09',
 import numpy as np
 import os
 import pandas as pd
-from ftplib import FTP
 
 # Water Accounting Modules
 import wa.WebAccounts as WebAccounts
 import wa.General.raster_conversions as RC
+import wa.General.ftp_download as FD
 
 
 def DownloadData(Dir, Startdate, Enddate, latlim, lonlim, Waitbar):
@@ -131,12 +131,7 @@ def Download_CMRSET_from_WA_FTP(local_filename, Filename_in):
     ftpserver = "ftp.wateraccounting.unesco-ihe.org"
 						
     # Download data from FTP 													
-    ftp=FTP(ftpserver)
-    ftp.login(username,password)
     directory="/WaterAccounting/Data_Satellite/Evaporation/CMRSET/Global/"
-    ftp.cwd(directory)
-    lf = open(local_filename, "wb")
-    ftp.retrbinary("RETR " + Filename_in, lf.write)
-    lf.close()
+    FD.Download_file(ftpserver, directory, Filename_in, local_filename, username, password)
       							
     return
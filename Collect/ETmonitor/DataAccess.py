@@ -32,6 +32,7 @@ from ftplib import FTP
 # Water Accounting Modules
 import wa.WebAccounts as WebAccounts
 import wa.General.raster_conversions as RC
+import wa.General.data_conversions as DC
 
 
 def DownloadData(Dir, Startdate, Enddate, latlim, lonlim, Type, Waitbar):
@@ -131,11 +132,12 @@ def DownloadData(Dir, Startdate, Enddate, latlim, lonlim, Type, Waitbar):
         
                 # Reproject dataset
                 epsg_to ='4326'
-                name_reprojected_ETmonitor = RC.reproject_MODIS(local_filename, epsg_to)
+                dest_reprojected_ETmonitor = RC.reproject_MODIS_MEM(local_filename, epsg_to)
         
                 # Clip dataset
-                RC.Clip_Dataset_GDAL(name_reprojected_ETmonitor, Filename_out, latlim, lonlim)
-                os.remove(name_reprojected_ETmonitor)  
+                data, geo = RC.clip_data(dest_reprojected_ETmonitor, latlim, lonlim)
+                dest_reprojected_ETmonitor = None
+                DC.Save_as_tiff(name=Filename_out, data=data, geo=geo, projection='WGS84')
                 os.remove(local_filename)  
                 
             except:
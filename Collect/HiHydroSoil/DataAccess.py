@@ -23,12 +23,12 @@ HiHydroSoil.ThetaSat(Dir='C:/Temp/', latlim=[50,54], lonlim=[3,7])
 # General modules
 import numpy as np
 import os
-from ftplib import FTP
 import scipy.io as spio
 
 # Water Accounting Modules
 import wa.WebAccounts as WebAccounts
 import wa.General.data_conversions as DC
+import wa.General.ftp_download as FD
 
 def DownloadData(Dir, latlim, lonlim, Waitbar):
     """
@@ -107,13 +107,8 @@ def Download_HiHydroSoil_from_WA_FTP(local_filename, Filename_in):
     ftpserver = "ftp.wateraccounting.unesco-ihe.org"
 						
     # Download data from FTP 													
-    ftp=FTP(ftpserver)
-    ftp.login(username,password)
     directory="/WaterAccounting_Guest/Static_WA_Datasets/"
-    ftp.cwd(directory)
-    lf = open(local_filename, "wb")
-    ftp.retrbinary("RETR " + Filename_in, lf.write)
-    lf.close()
+    FD.Download_file(ftpserver, directory, Filename_in, local_filename, username, password)
       							
     return
 
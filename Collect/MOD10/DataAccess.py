@@ -15,9 +15,6 @@ import pandas as pd
 import gdal
 import urllib
 import urllib2
-from bs4 import BeautifulSoup
-import re
-import urlparse
 import math
 import datetime
 import requests
@@ -27,6 +24,7 @@ from joblib import Parallel, delayed
 # Water Accounting modules
 import wa.General.raster_conversions as RC
 import wa.General.data_conversions as DC
+import wa.General.web_download as WD
 from wa import WebAccounts
 
 def DownloadData(Dir, Startdate, Enddate, latlim, lonlim, Waitbar, cores, hdf_library, remove_hdf):
@@ -151,10 +149,10 @@ def RetrieveData(Date, args):
 
     # Reproject the MODIS product to epsg_to
     epsg_to ='4326'
-    name_reprojected = RC.reproject_MODIS(name_collect, epsg_to)
+    dest_reprojected = RC.reproject_MODIS_MEM(name_collect, epsg_to)
 
     # Clip the data to the users extend
-    data, geo = RC.clip_data(name_reprojected, latlim, lonlim)
+    data, geo = RC.clip_data(dest_reprojected, latlim, lonlim)
 
     # Save the file as tiff
     FPARfileName = os.path.join(output_folder, 'SnowFrac_MOD10_unitless_8-daily_'  + Date.strftime('%Y') + '.' + Date.strftime('%m') + '.' + Date.strftime('%d') + '.tif')
@@ -162,7 +160,6 @@ def RetrieveData(Date, args):
 
     # remove the side products
     os.remove(os.path.join(output_folder, name_collect))
-    os.remove(os.path.join(output_folder, name_reprojected))
 
     return True
 
@@ -245,20 +242,15 @@ def Collect_data(TilesHorizontal,TilesVertical,Date,output_folder, hdf_library):
     # Download the MODIS FPAR data
     url = 'https://n5eil01u.ecs.nsidc.org/MOST/MOD10A2.006/' + Date.strftime('%Y') + '.' + Date.strftime('%m') + '.' + Date.strftime('%d') + '/'
 
-    dataset = requests.get(url, allow_redirects=False,stream = True)
-    try:
-        get_dataset = requests.get(dataset.headers['location'], auth = (username,password),stream = True).content
-    except:
-        from requests.packages.urllib3.exceptions import InsecureRequestWarning
-        requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
-        get_dataset  = requests.get(dataset.headers['location'], auth = (username, password), verify = False).content
-
-    soup = BeautifulSoup(get_dataset, "lxml")
+    Listing = WD.Get_listing(url, username, password)
 
-    if len(str(soup)) < 300:
+    if len(Listing) == 0:
         print 'Download was not succesfull, please check NASA account'
         sys.exit(1)
 
+    # Download all the tiles of this date at once
+    Tiles = WD.Download_MODIS_Tiles(url, TilesHorizontal, TilesVertical, output_folder, username, password, min_size = 1000)
+
     # Create the Lat and Long of the MODIS tile in meters
     for Vertical in range(int(TilesVertical[0]), int(TilesVertical[1])+1):
         Distance = 231.65635826395834*2 # resolution of a MODIS pixel in meter
@@ -267,91 +259,44 @@ def Collect_data(TilesHorizontal,TilesVertical,Date,output_folder, hdf_library):
         for Horizontal in range(int(TilesHorizontal[0]), int(TilesHorizontal[1]) + 1):
             countX=Horizontal - TilesHorizontal[0] + 1
 
-            for i in soup.findAll('a', attrs = {'href': re.compile('(?i)(hdf)$')}):
-
-                # Find the file with the wanted tile number
-                Vfile=str(i)[30:32]
-                Hfile=str(i)[27:29]
-                if int(Vfile) is int(Vertical) and int(Hfile) is int(Horizontal):
-
-                    # Define the whole url name
-                    full_url = urlparse.urljoin(url, i['href'])
-
-		              # Reset the begin parameters for downloading
-                    downloaded = 0
-                    N=0
-
-                    # if not downloaded try to download file
-                    while downloaded == 0:
-
-                        try:# open http and download whole .hdf
-                            nameDownload_url = full_url
-                            file_name = os.path.join(output_folder,nameDownload_url.split('/')[-1])
-                            if os.path.isfile(file_name):
-                                downloaded = 1
-                            else:
-                                x = requests.get(nameDownload_url, allow_redirects = False)
-                                try:
-                                    y = requests.get(x.headers['location'], auth = (username, password))
-                                except:
-                                    from requests.packages.urllib3.exceptions import InsecureRequestWarning
-                                    requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
-
-                                    y = requests.get(x.headers['location'], auth = (username, password), verify = False)
-                                z = open(file_name, 'wb')
-                                z.write(y.content)
-                                z.close()
-                                statinfo = os.stat(file_name)
-                                # Say that download was succesfull
-                                if int(statinfo.st_size) > 1000:
-                                     downloaded = 1
-
-                        # If download was not succesfull
-                        except:
-
-                            # Try another time
-                            N = N + 1
-
-						      # Stop trying after 10 times
-                        if N == 10:
-                            print 'Data from ' + Date.strftime('%Y-%m-%d') + ' is not available'
-                            downloaded = 1
-
-                    try:
-                        # Open .hdf only band with SnowFrac and collect all tiles to one array
-                        scale_factor = 1
-                        dataset = gdal.Open(file_name)
-                        sdsdict = dataset.GetMetadata('SUBDATASETS')
-                        sdslist = [sdsdict[k] for k in sdsdict.keys() if '_1_NAME' in k]
-                        sds = []
-
-                        for n in sdslist:
-                            sds.append(gdal.Open(n))
-                            full_layer = [i for i in sdslist if 'MOD_Grid_Snow_500m' in i]
-                            idx = sdslist.index(full_layer[0])
-                            if Horizontal == TilesHorizontal[0] and Vertical == TilesVertical[0]:
-                                geo_t = sds[idx].GetGeoTransform()
-
-                                # get the projection value
-                                proj = sds[idx].GetProjection()
-
-                            data = sds[idx].ReadAsArray()
-                            countYdata = (TilesVertical[1] - TilesVertical[0] + 2) - countY
-                            DataTot[int((countYdata - 1) * 2400):int(countYdata * 2400), int((countX - 1) * 2400):int(countX * 2400)]=data * scale_factor
-                        del data
-
-                    # if the tile not exists or cannot be opened, create a nan array with the right projection
-                    except:
-                        if Horizontal==TilesHorizontal[0] and Vertical==TilesVertical[0]:
-                             x1 = (TilesHorizontal[0] - 19) * 2400 * Distance
-                             x4 = (TilesVertical[0] - 9) * 2400 * -1 * Distance
-                             geo = 	[x1, Distance, 0.0, x4, 0.0, -Distance]
-                             geo_t=tuple(geo)
-
-                        proj='PROJCS["unnamed",GEOGCS["Unknown datum based upon the custom spheroid",DATUM["Not specified (based on custom spheroid)",SPHEROID["Custom spheroid",6371007.181,0]],PRIMEM["Greenwich",0],UNIT["degree",0.0174532925199433]],PROJECTION["Sinusoidal"],PARAMETER["longitude_of_center",0],PARAMETER["false_easting",0],PARAMETER["false_northing",0],UNIT["Meter",1]]'
-                        data=np.ones((2400, 2400)) * (-9999)
-                        countYdata=(TilesVertical[1] - TilesVertical[0] + 2) - countY
-                        DataTot[(countYdata - 1) * 2400:countYdata * 2400,(countX - 1) * 2400:countX * 2400] = data * 0.01
+            # Get the downloaded tile
+            file_name = Tiles[(Horizontal, Vertical)]
+
+            try:
+                # Open .hdf only band with SnowFrac and collect all tiles to one array
+                scale_factor = 1
+                dataset = gdal.Open(file_name)
+                sdsdict = dataset.GetMetadata('SUBDATASETS')
+                sdslist = [sdsdict[k] for k in sdsdict.keys() if '_1_NAME' in k]
+                sds = []
+
+                for n in sdslist:
+                    sds.append(gdal.Open(n))
+                    full_layer = [i for i in sdslist if 'MOD_Grid_Snow_500m' in i]
+                    idx = sdslist.index(full_layer[0])
+                    if Horizontal == TilesHorizontal[0] and Vertical == TilesVertical[0]:
+                        geo_t = sds[idx].GetGeoTransform()
+
+                        # get the projection value
+                        proj = sds[idx].GetProjection()
+
+                    data = sds[idx].ReadAsArray()
+                    countYdata = (TilesVertical[1] - TilesVertical[0] + 2) - countY
+                    DataTot[int((countYdata - 1) * 2400):int(countYdata * 2400), int((countX - 1) * 2400):int(countX * 2400)]=data * scale_factor
+                del data
+
+            # if the tile not exists or cannot be opened, create a nan array with the right projection
+            except:
+                if Horizontal==TilesHorizontal[0] and Vertical==TilesVertical[0]:
+                     x1 = (TilesHorizontal[0] - 19) * 2400 * Distance
+                     x4 = (TilesVertical[0] - 9) * 2400 * -1 * Distance
+                     geo = 	[x1, Distance, 0.0, x4, 0.0, -Distance]
+                     geo_t=tuple(geo)
+
+                proj='PROJCS["unnamed",GEOGCS["Unknown datum based upon the custom spheroid",DATUM["Not specified (based on custom spheroid)",SPHEROID["Custom spheroid",6371007.181,0]],PRIMEM["Greenwich",0],UNIT["degree",0.0174532925199433]],PROJECTION["Sinusoidal"],PARAMETER["longitude_of_center",0],PARAMETER["false_easting",0],PARAMETER["false_northing",0],UNIT["Meter",1]]'
+                data=np.ones((2400, 2400)) * (-9999)
+                countYdata=(TilesVertical[1] - TilesVertical[0] + 2) - countY
+                DataTot[(countYdata - 1) * 2400:countYdata * 2400,(countX - 1) * 2400:countX * 2400] = data * 0.01
 
 
     # Make geotiff file
@@ -14,13 +14,8 @@ import numpy as np
 import pandas as pd
 import gdal
 import urllib
-import urllib2
-from bs4 import BeautifulSoup
-import re
-import urlparse
 import math
 import datetime
-import requests
 import glob
 from joblib import Parallel, delayed
 
@@ -28,6 +23,7 @@ from joblib import Parallel, delayed
 import wa
 import wa.General.raster_conversions as RC
 import wa.General.data_conversions as DC
+import wa.General.web_download as WD
 from wa import WebAccounts
 
 def DownloadData(Dir, Startdate, Enddate, latlim, lonlim, Waitbar, cores, hdf_library, remove_hdf):
@@ -131,10 +127,10 @@ def RetrieveData(Date, args):
 
     # Reproject the MODIS product to epsg_to
     epsg_to ='4326'
-    name_reprojected = RC.reproject_MODIS(name_collect, epsg_to)
+    dest_reprojected = RC.reproject_MODIS_MEM(name_collect, epsg_to)
 
     # Clip the data to the users extend
-    data, geo = RC.clip_data(name_reprojected, latlim, lonlim)
+    data, geo = RC.clip_data(dest_reprojected, latlim, lonlim)
 
     # Save results as Gtiff
     NDVIfileName = os.path.join(output_folder, 'NDVI_MOD13Q1_-_16-daily_' + Date.strftime('%Y') + '.' + Date.strftime('%m') + '.' + Date.strftime('%d') + '.tif')
@@ -142,7 +138,6 @@ def RetrieveData(Date, args):
 
     # remove the side products
     os.remove(os.path.join(output_folder, name_collect))
-    os.remove(os.path.join(output_folder, name_reprojected))
 
     return True
 
@@ -221,6 +216,13 @@ def Collect_data(TilesHorizontal,TilesVertical,Date,output_folder, hdf_library):
     # Load accounts
     username, password = WebAccounts.Accounts(Type = 'NASA')
 
+    # Download the MODIS NDVI data
+    url = 'https://e4ftl01.cr.usgs.gov/MOLT/MOD13Q1.006/' + Date.strftime('%Y') + '.' + Date.strftime('%m') + '.' + Date.strftime('%d') + '/'
+
+    # Download all the tiles of this date at once (the library given by user is checked first)
+    hdf_pattern = "MOD13Q1.A%s%03s" %(Date.strftime('%Y'), Date.strftime('%j'))
+    Tiles = WD.Download_MODIS_Tiles(url, TilesHorizontal, TilesVertical, output_folder, username, password, hdf_library, hdf_pattern)
+
     # Create the Lat and Long of the MODIS tile in meters
     for Vertical in range(int(TilesVertical[0]), int(TilesVertical[1])+1):
         Distance = 231.65635826395834 # resolution of a MODIS pixel in meter
@@ -229,77 +231,9 @@ def Collect_data(TilesHorizontal,TilesVertical,Date,output_folder, hdf_library):
         for Horizontal in range(int(TilesHorizontal[0]), int(TilesHorizontal[1]) + 1):
             countX=Horizontal - TilesHorizontal[0] + 1
 
-		      # Reset the begin parameters for downloading
-            downloaded = 0
-            N=0
-
-            # Download the MODIS NDVI data
-            url = 'https://e4ftl01.cr.usgs.gov/MOLT/MOD13Q1.006/' + Date.strftime('%Y') + '.' + Date.strftime('%m') + '.' + Date.strftime('%d') + '/'
-
-	         # Check the library given by user
-            if hdf_library is not None:
-                os.chdir(hdf_library)
-                hdf_name = glob.glob("MOD13Q1.A%s%03s.h%02dv%02d.*" %(Date.strftime('%Y'), Date.strftime('%j'), Horizontal, Vertical))
-
-                if len(hdf_name) == 1:
-                    hdf_file = os.path.join(hdf_library, hdf_name[0])
-
-                    if os.path.exists(hdf_file):
-                        downloaded = 1
-                        file_name = hdf_file
-
-            if not downloaded == 1:
-                # Get files on FTP server
-                f = urllib2.urlopen(url)
-
-                # Sum all the files on the server
-                soup = BeautifulSoup(f, "lxml")
-                for i in soup.findAll('a', attrs = {'href': re.compile('(?i)(hdf)$')}):
-
-                    # Find the file with the wanted tile number
-                    Vfile=str(i)[30:32]
-                    Hfile=str(i)[27:29]
-                    if int(Vfile) is int(Vertical) and int(Hfile) is int(Horizontal):
-
-                        # Define the whole url name
-                        full_url = urlparse.urljoin(url, i['href'])
-
-                        # if not downloaded try to download file
-                        while downloaded == 0:
-
-                            try:# open http and download whole .hdf
-                                nameDownload = full_url
-                                file_name = os.path.join(output_folder,nameDownload.split('/')[-1])
-                                if os.path.isfile(file_name):
-                                    #print "file ", file_name, " already exists"
-                                    downloaded = 1
-                                else:
-                                    x = requests.get(nameDownload, allow_redirects = False)
-                                    try:
-                                        y = requests.get(x.headers['location'], auth = (username, password))
-                                    except:
-                                        from requests.packages.urllib3.exceptions import InsecureRequestWarning
-                                        requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
-
-                                        y = requests.get(x.headers['location'], auth = (username, password), verify = False)
-                                    z = open(file_name, 'wb')
-                                    z.write(y.content)
-                                    z.close()
-                                    statinfo = os.stat(file_name)
-                                    # Say that download was succesfull
-                                    if int(statinfo.st_size) > 10000:
-                                         downloaded = 1
-
-                            # If download was not succesfull
-                            except:
-
-                                # Try another time
-                                N = N + 1
-
-            				           # Stop trying after 10 times
-                                if N == 10:
-                                    print 'Data from ' + Date.strftime('%Y-%m-%d') + ' is not available'
-                                    downloaded = 1
+            # Get the downloaded tile
+            file_name = Tiles[(Horizontal, Vertical)]
+
             try:
                 # Open .hdf only band with NDVI and collect all tiles to one array
                 dataset = gdal.Open(file_name)
@@ -4,12 +4,12 @@
 import numpy as np
 import os
 import pandas as pd
-import requests
 from joblib import Parallel, delayed
 
 # Water Accounting modules
 from wa import WebAccounts
 import wa.General.data_conversions as DC
+import wa.General.opendap as DAP
 
 def DownloadData(Dir, Startdate, Enddate, latlim, lonlim, Waitbar, cores, TimeCase):
     """
@@ -143,29 +143,14 @@ def RetrieveData_daily(Date, args):
         year = Date.year
 
         # define total url
-        url_MSWEP = url + '%s%02d.nc.ascii?precipitation[%s][%s:1:%s][%s:1:%s]' %(year, int(month), zID_start,yID[0],yID[1],xID[0],xID[1])
+        url_MSWEP = url + '%s%02d.nc.dods?precipitation[%s][%s:1:%s][%s:1:%s]' %(year, int(month), zID_start,yID[0],yID[1],xID[0],xID[1])
 
         # if not downloaded try to download file
         while downloaded == 0:
             try:
 
-                # open URL
-                try:
-                    dataset = requests.get(url_MSWEP, allow_redirects=False,stream = True)
-                except:
-                    from requests.packages.urllib3.exceptions import InsecureRequestWarning
-                    requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
-                    dataset = requests.get(url_MSWEP, allow_redirects=False,stream = True, verify = False)
-
-                # download data (first save as text file)
-                pathtext = os.path.join(path,'temp.txt')
-                z = open(pathtext,'w')
-                z.write(dataset.content)
-                z.close()
-
-                # Open text file and remove header and footer
-                data_start = np.genfromtxt(pathtext,dtype = float,skip_header = 1,delimiter=',')
-                data = data_start[1:,1:]
+                # download and decode the binary subset
+                data = DAP.Get_dods(url_MSWEP, 'precipitation')[0, :, :]
 
                 # Set Nan value for values lower than -9999
                 data[data < -9998] = np.nan
@@ -194,9 +179,8 @@ def RetrieveData_daily(Date, args):
             geo = [lonlimMSWEP ,0.1,0,latlimMSWEP ,0,-0.1]
             DC.Save_as_tiff(name=BasinDir, data = data, geo=geo, projection="WGS84")
 
-            # Delete data and text file
+            # Delete data
             del data
-            os.remove(pathtext)
 
     return True
 
@@ -229,29 +213,14 @@ def RetrieveData_monthly(Date, args):
         zID = (Y - 1979) * 12 + (M - 1)
 
         # define total url
-        url_MSWEP  = url + '.ascii?precipitation[%s][%s:1:%s][%s:1:%s]' %(zID,yID[0],yID[1],xID[0],xID[1])
+        url_MSWEP  = url + '.dods?precipitation[%s][%s:1:%s][%s:1:%s]' %(zID,yID[0],yID[1],xID[0],xID[1])
 
         # if not downloaded try to download file
         while downloaded == 0:
             try:
 
-                # open URL
-                try:
-                    dataset = requests.get(url_MSWEP , allow_redirects=False,stream = True)
-                except:
-                    from requests.packages.urllib3.exceptions import InsecureRequestWarning
-                    requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
-                    dataset = requests.get(url_MSWEP , allow_redirects=False,stream = True, verify = False)
-
-                # download data (first save as text file)
-                pathtext = os.path.join(path,'temp%s.txt' %str(zID))
-                z = open(pathtext,'w')
-                z.write(dataset.content)
-                z.close()
-
-                # Open text file and remove header and footer
-                data_start = np.genfromtxt(pathtext,dtype = float,skip_header = 1,skip_footer = 6,delimiter=',')
-                data = data_start[1:,1:]
+                # download and decode the binary subset
+                data = DAP.Get_dods(url_MSWEP, 'precipitation')[0, :, :]
 
                 # Set Nan value for values lower than -9999
                 data[data < -9998] = np.nan
@@ -280,9 +249,8 @@ def RetrieveData_monthly(Date, args):
             geo = [lonlimMSWEP ,0.1,0,latlimMSWEP ,0,-0.1]
             DC.Save_as_tiff(name=BasinDir, data = data, geo=geo, projection="WGS84")
 
-            # Delete data and text file
+            # Delete data
             del data
-            os.remove(pathtext)
 
 	    return True
 
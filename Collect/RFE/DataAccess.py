@@ -10,11 +10,11 @@ Module: Collect/RFE
 import numpy as np
 import os
 import pandas as pd
-from ftplib import FTP
 from joblib import Parallel, delayed
 
 import wa.General.data_conversions as DC
 import wa.General.raster_conversions as RC
+import wa.General.ftp_download as FD
 
 def DownloadData(Dir, Startdate, Enddate, latlim, lonlim, Waitbar, cores):
     """
@@ -102,29 +102,17 @@ def RetrieveData(Date, args):
     DirFile = os.path.join(output_folder,'P_RFE.v2.0_mm-day-1_daily_%s.%02s.%02s.tif' %(Date.strftime('%Y'), Date.strftime('%m'), Date.strftime('%d')))
             
     if not os.path.isfile(DirFile):
-        # open ftp server
-        ftp = FTP("ftp.cpc.ncep.noaa.gov", "", "")
-        ftp.login()
-				
     	 # Define FTP path to directory 			
+        ftpserver = "ftp.cpc.ncep.noaa.gov"
         pathFTP = 'fews/fewsdata/africa/rfe2/geotiff/'
 
-        # find the document name in this directory								
-        ftp.cwd(pathFTP)
-        listing = []
-				
-        # read all the file names in the directory			
-        ftp.retrlines("LIST", listing.append)
-				
     	  # create all the input name (filename) and output (outfilename, filetif, DiFileEnd) names			
         filename = 'africa_rfe.%s%02s%02s.tif.zip' %(Date.strftime('%Y'), Date.strftime('%m'), Date.strftime('%d'))
         outfilename = os.path.join(output_folder,'africa_rfe.%s%02s%02s.tif' %(Date.strftime('%Y'), Date.strftime('%m'), Date.strftime('%d'))) 
  
         try:
             local_filename = os.path.join(output_folder, filename)
-            lf = open(local_filename, "wb")
-            ftp.retrbinary("RETR " + filename, lf.write)
-            lf.close()
+            FD.Download_file(ftpserver, pathFTP, filename, local_filename)
 
             # unzip the file
             zip_filename = os.path.join(output_folder, filename)
@@ -10,11 +10,11 @@ Module: Collect/TRMM
 import numpy as np
 import os
 import pandas as pd
-import requests
 import calendar
 from joblib import Parallel, delayed
 
 import wa.General.data_conversions as DC
+import wa.General.opendap as DAP
 
 def DownloadData(Dir, Startdate, Enddate, latlim, lonlim, Waitbar, cores, TimeCase):
     """
@@ -114,45 +114,28 @@ def RetrieveData(Date, args):
 
     # Create https
     if TimeCase == 'daily':
-        URL = 'https://disc2.gesdisc.eosdis.nasa.gov/opendap/TRMM_L3/TRMM_3B42_Daily.7/%d/%02d/3B42_Daily.%d%02d%02d.7.nc4.ascii?precipitation[%d:1:%d][%d:1:%d]'  %(year, month, year, month, day, xID[0], xID[1]-1, yID[0], yID[1]-1)
+        URL = 'https://disc2.gesdisc.eosdis.nasa.gov/opendap/TRMM_L3/TRMM_3B42_Daily.7/%d/%02d/3B42_Daily.%d%02d%02d.7.nc4.dods?precipitation[%d:1:%d][%d:1:%d]'  %(year, month, year, month, day, xID[0], xID[1]-1, yID[0], yID[1]-1)
         DirFile = os.path.join(output_folder, "P_TRMM3B42.V7_mm-day-1_daily_%d.%02d.%02d.tif" %(year, month, day))
         Scaling = 1
 
     if TimeCase == 'monthly':
         if Date >= pd.Timestamp('2010-10-01'):
-            URL = 'https://disc2.gesdisc.eosdis.nasa.gov/opendap/TRMM_L3/TRMM_3B43.7/%d/3B43.%d%02d01.7.HDF.ascii?precipitation[%d:1:%d][%d:1:%d]'  %(year, year, month, xID[0], xID[1]-1, yID[0], yID[1]-1)
+            URL = 'https://disc2.gesdisc.eosdis.nasa.gov/opendap/TRMM_L3/TRMM_3B43.7/%d/3B43.%d%02d01.7.HDF.dods?precipitation[%d:1:%d][%d:1:%d]'  %(year, year, month, xID[0], xID[1]-1, yID[0], yID[1]-1)
 
         else:
-            URL = 'https://disc2.gesdisc.eosdis.nasa.gov/opendap/TRMM_L3/TRMM_3B43.7/%d/3B43.%d%02d01.7A.HDF.ascii?precipitation[%d:1:%d][%d:1:%d]'  %(year, year, month, xID[0], xID[1]-1, yID[0], yID[1]-1)
+            URL = 'https://disc2.gesdisc.eosdis.nasa.gov/opendap/TRMM_L3/TRMM_3B43.7/%d/3B43.%d%02d01.7A.HDF.dods?precipitation[%d:1:%d][%d:1:%d]'  %(year, year, month, xID[0], xID[1]-1, yID[0], yID[1]-1)
 
         Scaling = calendar.monthrange(year,month)[1] * 24
         DirFile = os.path.join(output_folder, "P_TRMM3B43.V7_mm-month-1_monthly_%d.%02d.01.tif" %(year, month))
 
     if not os.path.isfile(DirFile):
-        dataset = requests.get(URL, allow_redirects=False,stream = True)
-        try:
-            get_dataset = requests.get(dataset.headers['location'], auth = (username,password),stream = True)
-        except:
-            from requests.packages.urllib3.exceptions import InsecureRequestWarning
-            requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
-            get_dataset  = requests.get(dataset.headers['location'], auth = (username, password), verify = False)
-
-        # download data (first save as text file)
-        pathtext = os.path.join(output_folder,'temp.txt')
-        z = open(pathtext,'w')
-        z.write(get_dataset.content)
-        z.close()
-
-        # Open text file and remove header and footer
-        data_start = np.genfromtxt(pathtext,dtype = float,skip_header = 1,delimiter=',')
-        data = data_start[:,1:] * Scaling
+
+        # download and decode the binary subset (lon, lat)
+        data = DAP.Get_dods(URL, 'precipitation', username, password) * Scaling
         data[data < 0] = -9999
         data = data.transpose()
         data = np.flipud(data)
 
-        # Delete .txt file
-        os.remove(pathtext)
-
         # Make geotiff file
         geo = [lonlim[0], 0.25, 0, latlim[1], 0, -0.25]
         DC.Save_as_tiff(name=DirFile, data=data, geo=geo, projection="WGS84")
@@ -29,11 +29,11 @@ TWC.Gray_Water_Footprint(Dir='C:/Temp/', latlim=[50,54], lonlim=[3,7])
 # General modules
 import numpy as np
 import os
-from ftplib import FTP
 
 # Water Accounting Modules
 import wa.WebAccounts as WebAccounts
 import wa.General.raster_conversions as RC
+import wa.General.ftp_download as FD
 import wa.General.data_conversions as DC
 
 
@@ -96,13 +96,8 @@ def Download_GWF_from_WA_FTP(output_folder, filename_Out, lonlim, latlim):
         local_filename = os.path.join(output_folder, filename)		
 			
         # Download data from FTP 													
-        ftp=FTP(ftpserver)
-        ftp.login(username,password)
         directory="/WaterAccounting_Guest/Static_WA_Datasets/"
-        ftp.cwd(directory)
-        lf = open(local_filename, "wb")
-        ftp.retrbinary("RETR " + filename, lf.write)
-        lf.close()
+        FD.Download_file(ftpserver, directory, filename, local_filename, username, password)
 
         # Clip extend out of world data
         dataset, Geo_out = RC.clip_data(local_filename, latlim, lonlim)
@@ -93,6 +93,11 @@ def Blue_Green(Dir_Basin, nc_outname, ETref_Product, P_Product, Startdate, Endda
         P_period = P[Start_period:End_period,:,:]
         ETref_period = ETref[Start_period:End_period,:,:]
 
+    # Apply the moving averages with all the tails over the whole datacubes at once
+    Moving_fronts = [int(One_Value) - 1 for One_Value in np.unique(Moving_Window_Per_Class_dict.values()) if One_Value != 1]
+    Values_Ave_ETref_all = RC.Moving_averages(ETref, Moving_fronts, 0)
+    Values_Ave_P_all = RC.Moving_averages(P, Moving_fronts, 0)
+
      # Loop over the different moving average tails
     for One_Value in np.unique(Moving_Window_Per_Class_dict.values()):
 
@@ -103,8 +108,8 @@ def Blue_Green(Dir_Basin, nc_outname, ETref_Product, P_Product, Startdate, Endda
 
         # If there is tail, apply moving average over the whole datacube
         else:
-            Values_Ave_ETref_tot = RC.Moving_average(ETref, One_Value - 1, 0)
-            Values_Ave_P_tot = RC.Moving_average(P, One_Value - 1, 0)
+            Values_Ave_ETref_tot = Values_Ave_ETref_all[int(One_Value) - 1]
+            Values_Ave_P_tot = Values_Ave_P_all[int(One_Value) - 1]
             Values_Ave_ETref = Values_Ave_ETref_tot[int(Values_Ave_ETref_tot.shape[0])-len(Dates):,:,:]
             Values_Ave_P = Values_Ave_P_tot[int(Values_Ave_P_tot.shape[0])-len(Dates):,:,:]
 
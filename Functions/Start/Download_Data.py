@@ -9,7 +9,7 @@ Module: Function/Start
 Those function download the data that is not downloaded yet
 """
 import os
-import glob
+import fnmatch
 import pandas as pd
 import numpy as np
 import calendar
@@ -792,9 +792,11 @@ def Set_Start_End_Dates(Startdate, Enddate, Data_Path, freq):
         Contains all the end dates of data that needs to be downloaded
     """
 
+    # import WA+ modules
+    import wa.General.raster_catalog as RCat
+
     # Check if folder already exists
     if os.path.exists(Data_Path):
-        os.chdir(Data_Path)
 
         # Defines the dates of the 8 daily periods
         if freq == '8D':
@@ -806,6 +808,9 @@ def Set_Start_End_Dates(Startdate, Enddate, Data_Path, freq):
         else:
             Dates = pd.date_range(Startdate, Enddate, freq=freq)
 
+        # Get all the files that already exists in folder per date
+        Files = RCat.Find_dates(Data_Path)
+
         # Check if the dates already exists
         Date_Check = np.zeros([len(Dates) + 2])
         Date_Check_end = np.zeros([len(Dates), 2])
@@ -820,20 +825,18 @@ def Set_Start_End_Dates(Startdate, Enddate, Data_Path, freq):
             year = Date.year
             day = Date.day
 
-            # Get all the files that already exists in folder
+            # Get all the files of the date
             if freq == 'MS':
-                files = glob.glob('*monthly_%d.%02d.01.tif' % (year, month))
+                Pattern = '*monthly_%d.%02d.01.tif' % (year, month)
             if freq == 'AS':
-                files = glob.glob('*yearly_%d.%02d.01.tif' % (year, month))
+                Pattern = '*yearly_%d.%02d.01.tif' % (year, month)
             if freq == 'D':
-                files = glob.glob('*daily_%d.%02d.%02d.tif' % (year, month,
-                                                               day))
+                Pattern = '*daily_%d.%02d.%02d.tif' % (year, month, day)
             if freq == '8D':
-                files = glob.glob('*8-daily_%d.%02d.%02d.tif' % (year, month,
-                                                                 day))
+                Pattern = '*8-daily_%d.%02d.%02d.tif' % (year, month, day)
             if freq == '16D':
-                files = glob.glob('*16-daily_%d.%02d.%02d.tif' % (year, month,
-                                                                 day))
+                Pattern = '*16-daily_%d.%02d.%02d.tif' % (year, month, day)
+            files = fnmatch.filter(Files.get(Date.toordinal(), []), Pattern)
 
             # If file exits put a 1 in the array
             if len(files) == 1:
@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+Authors: Tim Hessels
+         UNESCO-IHE 2018
+Contact: t.hessels@unesco-ihe.org
+Repository: https://github.com/wateraccounting/wa
+Module: Function/Start
+"""
+# General Python modules
+import numpy as np
+import os
+import pandas as pd
+import gdal
+import calendar
+
+
+def Resample(Dir_in, Input_format, Startdate, Enddate, Dir_out, Source_length,
+             Target_freq, Method, Replace, Clip_year = False, Fill_gaps = False,
+             cores = False):
+    """
+    This functions resamples tiff files of one period (daily, 8-daily,
+    monthly...) to tiff files of a longer period (monthly, yearly). The number
+    of days that every source period overlaps with every target period is
+    calculated once from the file names, and every target is calculated from
+    the stack of its overlapping source files.
+
+    Parameters
+    ----------
+    Dir_in : str
+        Path to the input data
+    Input_format : str
+        Glob pattern of the input files, e.g. '*8-daily*.tif'
+    Startdate : str
+        Contains the start date of the model 'yyyy-mm-dd'
+    Enddate : str
+        Contains the end date of the model 'yyyy-mm-dd'
+    Dir_out : str
+        Path to the output data, default is same as Dir_in
+    Source_length : int or 'MS'
+        Number of days of a source period, or 'MS' for monthly source files
+    Target_freq : str
+        'MS' for monthly or 'AS' for yearly output
+    Method : str
+        'flux' for a sum over the target period or 'state' for the weighted
+        average over the target period
+    Replace : list
+        Pairs [old, new] that change a source name into the output name
+    Clip_year : boolean
+        True if the source periods end at the end of the year (MODIS composites)
+    Fill_gaps : boolean
+        True if a flux is calculated from the mean rate of the days that are
+        covered by data, False if days without data count as zero
+    cores : int or False
+        Number of cores used to calculate the targets in parallel
+
+    """
+    # import WA+ modules
+    import wa.General.raster_catalog as RCat
+
+    # Find all the input files in the catalog of the input directory
+    files = RCat.Find(Dir_in, Input_format)
+
+    # Get the periods of the files
+    Source_Start, Source_End = Get_Source_Periods(files, Source_length, Clip_year)
+
+    # Get the target periods
+    Target_Start, Target_End = Get_Target_Periods(Startdate, Enddate, Target_freq)
+
+    # Calculate the overlap in days between all the sources and targets
+    Weights = Overlap_Weights(Source_Start, Source_End, Target_Start, Target_End)
+    Lengths = (Source_End - Source_Start).astype(float) + 1
+    Target_Lengths = (Target_End - Target_Start).astype(float) + 1
+
+    # Define output directory
+    if Dir_out is None:
+        Dir_out = Dir_in
+
+    args = [files, Lengths, Method, Replace, Fill_gaps, Dir_out]
+
+    if not cores:
+        for i in range(len(Target_Start)):
+            Resample_Target(Target_Start[i], Weights[i, :], Target_Lengths[i], args)
+    else:
+        from joblib import Parallel, delayed
+        Parallel(n_jobs=cores)(delayed(Resample_Target)(Target_Start[i], Weights[i, :], Target_Lengths[i], args)
+                               for i in range(len(Target_Start)))
+
+    return
+
+
+def Resample_Target(Target_Start, Weights, Target_Length, args):
+    """
+    This functions calculates and saves one target tiff file
+
+    Parameters
+    ----------
+    Target_Start : int
+        Ordinal of the first day of the target period
+    Weights : array
+        Overlap in days of all the source files with the target period
+    Target_Length : float
+        Number of days of the target period
+    args : list
+        [files, Lengths, Method, Replace, Fill_gaps, Dir_out]
+
+    """
+    # import WA+ modules
+    import wa.General.data_conversions as DC
+    import wa.General.raster_conversions as RC
+
+    [files, Lengths, Method, Replace, Fill_gaps, Dir_out] = args
+    date = pd.Timestamp.fromordinal(int(Target_Start))
+
+    # Get array information and define projection
+    geo_out, proj, size_X, size_Y = RC.Open_array_info(files[0])
+    if int(proj.split('"')[-2]) == 4326:
+        proj = "WGS84"
+
+    # Get the No Data Value
+    dest = gdal.Open(files[0])
+    NDV = dest.GetRasterBand(1).GetNoDataValue()
+    dest = None
+
+    # Stack the source files that overlap with the target
+    Sources = np.nonzero(Weights > 0)[0]
+    Data = np.zeros([len(Sources), size_Y, size_X])
+    for i, Source in enumerate(Sources):
+        Data[i, :, :] = RC.Open_tiff_array(files[Source])
+
+    Data_one_target = Apply_Weights(Data, Weights[Sources], Lengths[Sources], Target_Length, Method, NDV, Fill_gaps)
+
+    if Method == 'flux' and not Fill_gaps and np.sum(Weights) < Target_Length:
+        print("Data is missing for %s!!!" % date.strftime('%Y-%m'))
+
+    # Define output name
+    if len(Sources) > 0:
+        input_name = os.path.basename(files[Sources[-1]])
+    else:
+        input_name = os.path.basename(files[0])
+    for old, new in Replace:
+        input_name = input_name.replace(old, new)
+    output_name = os.path.join(Dir_out, input_name[:-14] + '%d.%02d.01.tif' % (date.year, date.month))
+
+    # Save tiff file
+    DC.Save_as_tiff(output_name, Data_one_target, geo_out, proj)
+
+    return
+
+
+def Apply_Weights(Data, Weights, Lengths, Target_Length, Method, NDV = None, Fill_gaps = False):
+    """
+    This functions combines a stack of source arrays into one target array
+
+    Parameters
+    ----------
+    Data : array
+        3D array [source, y, x] of the sources that overlap with the target
+    Weights : array
+        Overlap in days of every source with the target period
+    Lengths : array
+        Number of days of every source period
+    Target_Length : float
+        Number of days of the target period
+    Method : str
+        'flux' for a sum over the target period or 'state' for the weighted
+        average over the target period
+    NDV : float
+        No data value of the sources (NaN and -9999 are always no data)
+    Fill_gaps : boolean
+        True if a flux is calculated from the mean rate of the days that are
+        covered by data, False if days without data count as zero
+
+    Returns
+    -------
+    Data_one_target : array
+        2D array [y, x] of the target period
+
+    """
+    # Remove NDV
+    Missing = np.logical_or(np.isnan(Data), Data == -9999)
+    if NDV is not None:
+        Missing = np.logical_or(Missing, Data == NDV)
+    Data = np.where(Missing, 0.0, Data)
+
+    # Days of every source within the target for every pixel
+    Weight = np.where(Missing, 0.0, np.asarray(Weights, dtype = float)[:, None, None])
+    Weight_tot = np.sum(Weight, axis = 0)
+
+    if Method == 'state':
+        Total = np.sum(Data * Weight, axis = 0)
+        Data_one_target = np.ones(Total.shape) * np.nan
+        Data_one_target[Weight_tot != 0.] = Total[Weight_tot != 0.] / Weight_tot[Weight_tot != 0.]
+
+    elif Method == 'flux':
+        # The value of a source is spread evenly over the days of its period
+        Total = np.sum(Data / np.asarray(Lengths, dtype = float)[:, None, None] * Weight, axis = 0)
+        if Fill_gaps:
+            Data_one_target = np.ones(Total.shape) * np.nan
+            Data_one_target[Weight_tot != 0.] = Total[Weight_tot != 0.] / Weight_tot[Weight_tot != 0.] * Target_Length
+        else:
+            Data_one_target = Total
+
+    else:
+        raise ValueError("Method must be 'flux' or 'state', not %s" % Method)
+
+    return(Data_one_target)
+
+
+def Overlap_Weights(Source_Start, Source_End, Target_Start, Target_End):
+    """
+    This functions calculates the number of days that every source period
+    overlaps with every target period (first and last day included)
+
+    Parameters
+    ----------
+    Source_Start, Source_End : array
+        Ordinals of the first and last day of the source periods
+    Target_Start, Target_End : array
+        Ordinals of the first and last day of the target periods
+
+    Returns
+    -------
+    Weights : array
+        2D array [target, source] with the overlap in days
+
+    """
+    Start = np.maximum(np.asarray(Target_Start)[:, None], np.asarray(Source_Start)[None, :])
+    End = np.minimum(np.asarray(Target_End)[:, None], np.asarray(Source_End)[None, :])
+
+    return(np.maximum(End - Start + 1, 0).astype(float))
+
+
+def Get_Source_Periods(files, Source_length, Clip_year = False):
+    """
+    This functions gets the first and last day of every source file from the
+    date in the file name (..._yyyy.mm.dd.tif)
+
+    Parameters
+    ----------
+    files : list
+        Names of the source files
+    Source_length : int or 'MS'
+        Number of days of a source period, or 'MS' for monthly source files
+    Clip_year : boolean
+        True if the source periods end at the end of the year
+
+    Returns
+    -------
+    Source_Start, Source_End : array
+        Ordinals of the first and last day of the source periods
+
+    """
+    Source_Start = np.zeros(len(files), dtype = int)
+    Source_End = np.zeros(len(files), dtype = int)
+
+    for i, File in enumerate(files):
+
+        # Get the time characteristics from the filename
+        Name = os.path.basename(File)
+        year = int(Name.split('.')[-4][-4:])
+        month = int(Name.split('.')[-3])
+        day = int(Name.split('.')[-2])
+        Datum = pd.Timestamp('%d-%02d-%02d' % (year, month, day))
+
+        if Source_length == 'MS':
+            Length = calendar.monthrange(year, month)[1]
+        else:
+            Length = int(Source_length)
+
+        Source_Start[i] = Datum.toordinal()
+        Source_End[i] = Source_Start[i] + Length - 1
+
+        # The composite periods start again every year
+        if Clip_year:
+            Source_End[i] = min(Source_End[i], pd.Timestamp('%d-12-31' % year).toordinal())
+
+    return(Source_Start, Source_End)
+
+
+def Get_Target_Periods(Startdate, Enddate, Target_freq):
+    """
+    This functions gets the first and last day of every target period between
+    the start and end date
+
+    Parameters
+    ----------
+    Startdate : str
+        Contains the start date of the model 'yyyy-mm-dd'
+    Enddate : str
+        Contains the end date of the model 'yyyy-mm-dd'
+    Target_freq : str
+        'MS' for monthly or 'AS' for yearly output
+
+    Returns
+    -------
+    Target_Start, Target_End : array
+        Ordinals of the first and last day of the target periods
+
+    """
+    Dates = pd.date_range(Startdate, Enddate, freq = Target_freq)
+    Target_Start = np.array([Date.toordinal() for Date in Dates], dtype = int)
+
+    if Target_freq == 'AS':
+        Target_End = np.array([pd.Timestamp('%d-12-31' % Date.year).toordinal() for Date in Dates], dtype = int)
+    else:
+        Target_End = np.array([Date.toordinal() + calendar.monthrange(Date.year, Date.month)[1] - 1 for Date in Dates], dtype = int)
+
+    return(Target_Start, Target_End)
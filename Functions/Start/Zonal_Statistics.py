@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Authors: Tim Hessels
+         UNESCO-IHE 2017
+Contact: t.hessels@unesco-ihe.org
+Repository: https://github.com/wateraccounting/wa
+Module: Function/Start
+"""
+# import general python modules
+import numpy as np
+
+def Sum_per_Class(LULC, Classes, DataCubes):
+    """
+    This functions calculates the spatial sum of every dataset for every
+    class and time step in one pass over the pixels.
+
+    The pixels are labelled with the index of their LULC value, the sums per
+    LULC value and time step are calculated with one np.bincount per dataset,
+    and these sums are added up for the LULC values of every class. A LULC
+    value can be part of more than one class. NaN values are ignored, as in
+    np.nansum.
+
+    Parameters
+    ----------
+    LULC : array
+        2D array [y, x] containing the land use values
+    Classes : list
+        For every class a list containing the LULC values of this class (an
+        empty list gives zeros)
+    DataCubes : list
+        3D arrays [time, y, x] that must be summed
+
+    Returns
+    -------
+    Sums : list
+        For every DataCube an array [class, time] containing the spatial sums
+
+    """
+    # Get all the LULC values used in the classes
+    Class_Values = [np.unique(np.asarray(Class, dtype = float)) for Class in Classes]
+    if len(Class_Values) > 0:
+        Values = np.unique(np.concatenate(Class_Values))
+    else:
+        Values = np.array([])
+
+    # Create a matrix that combines the LULC values into the classes
+    Membership = np.zeros([len(Classes), len(Values)])
+    for i, Class_Value in enumerate(Class_Values):
+        Membership[i, np.searchsorted(Values, Class_Value)] = 1
+
+    # Label the relevant pixels with the index of their LULC value
+    LULC_flat = np.ravel(LULC)
+    Pixels = np.nonzero(np.in1d(LULC_flat, Values))[0]
+    Value_Index = np.searchsorted(Values, LULC_flat[Pixels])
+
+    Sums = []
+    for DataCube in DataCubes:
+
+        # Combine the time step and the value index into one label
+        Time_steps = DataCube.shape[0]
+        Labels = np.arange(Time_steps)[:, None] * len(Values) + Value_Index[None, :]
+
+        # Sum the data per label
+        Data = DataCube.reshape(Time_steps, -1)[:, Pixels]
+        Data[np.isnan(Data)] = 0
+        Sums_Values = np.bincount(Labels.ravel(), weights = Data.ravel(), minlength = Time_steps * len(Values))
+        Sums_Values = Sums_Values.reshape(Time_steps, len(Values))
+
+        Sums.append(np.dot(Membership, Sums_Values.T))
+
+    return(Sums)
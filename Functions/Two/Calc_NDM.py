@@ -11,7 +11,6 @@ import os
 import gdal
 import numpy as np
 import pandas as pd
-import glob
 
 def NPP_GPP_Based(Dir_Basin, Data_Path_GPP, Data_Path_NPP, Startdate, Enddate):
     """
@@ -41,6 +40,7 @@ def NPP_GPP_Based(Dir_Basin, Data_Path_GPP, Data_Path_NPP, Startdate, Enddate):
     # import WA+ modules
     import wa.General.data_conversions as DC
     import wa.General.raster_conversions as RC
+    import wa.General.raster_catalog as RCat
 
     # Define output folder for Normalized Dry Matter
     Data_Path_NDM = os.path.join(Dir_Basin, "NDM")
@@ -58,11 +58,8 @@ def NPP_GPP_Based(Dir_Basin, Data_Path_GPP, Data_Path_NPP, Startdate, Enddate):
     # Loop over the years
     for year in Years:
 
-        # Change working directory to the NPP folder
-        os.chdir(Data_Path_NPP)
-
-        # Open yearly NPP data
-        yearly_NPP_File = glob.glob('*yearly*%d.01.01.tif' %int(year))[0]
+        # Open yearly NPP data, found in the catalog of the NPP folder
+        yearly_NPP_File = RCat.Find(Data_Path_NPP, '*yearly*%d.01.01.tif' %int(year))[0]
         Yearly_NPP = RC.Open_tiff_array(yearly_NPP_File)
 
         # Get the No Data Value of the NPP file
@@ -72,11 +69,8 @@ def NPP_GPP_Based(Dir_Basin, Data_Path_GPP, Data_Path_NPP, Startdate, Enddate):
         # Set the No Data Value to Nan
         Yearly_NPP[Yearly_NPP == NDV] = np.nan
 
-        # Change working directory to the GPP folder
-        os.chdir(Data_Path_GPP)
-
-        # Find all the monthly files of that year
-        monthly_GPP_Files = glob.glob('*monthly*%d.*.01.tif' %int(year))
+        # Find all the monthly files of that year in the catalog of the GPP folder
+        monthly_GPP_Files = RCat.Find(Data_Path_GPP, '*monthly*%d.*.01.tif' %int(year))
 
         # Check if it are 12 files otherwise something is wrong and send the ERROR
         if not len(monthly_GPP_Files) == 12:
@@ -84,7 +78,7 @@ def NPP_GPP_Based(Dir_Basin, Data_Path_GPP, Data_Path_NPP, Startdate, Enddate):
 
         # Get the projection information of the GPP inputs
         geo_out, proj, size_X, size_Y = RC.Open_array_info(monthly_GPP_Files[0])
-        geo_out_NPP, proj_NPP, size_X_NPP, size_Y_NPP = RC.Open_array_info(os.path.join(Data_Path_NPP,yearly_NPP_File))
+        geo_out_NPP, proj_NPP, size_X_NPP, size_Y_NPP = RC.Open_array_info(yearly_NPP_File)
 
 
         if int(proj.split('"')[-2]) == 4326:
@@ -109,9 +103,10 @@ def NPP_GPP_Based(Dir_Basin, Data_Path_GPP, Data_Path_NPP, Startdate, Enddate):
             # Add data to yearly sum
             Yearly_GPP += Data
 
-        # Check if size is the same of NPP and GPP otherwise resize
-        if not (size_X_NPP is size_X or size_Y_NPP is size_Y):
-            Yearly_NPP = RC.resize_array_example(Yearly_NPP, Yearly_GPP)
+        # Check if size is the same of NPP and GPP otherwise resample NPP to the GPP grid
+        if not (size_X_NPP == size_X and size_Y_NPP == size_Y):
+            Yearly_NPP = RC.reproject_array_example(yearly_NPP_File, monthly_GPP_Files[0],
+                                                    method = 1, Fill = np.nan, Array = Yearly_NPP)
 
         # Loop over the monthly dates
         for Date in Dates:
@@ -125,8 +120,8 @@ def NPP_GPP_Based(Dir_Basin, Data_Path_GPP, Data_Path_NPP, Startdate, Enddate):
                 # Get current month
                 month = Date.month
 
-                # Get the GPP file of the current year and month
-                monthly_GPP_File = glob.glob('*monthly_%d.%02d.01.tif' %(int(year), int(month)))[0]
+                # Get the GPP file of the current year and month from the catalog of the GPP folder
+                monthly_GPP_File = RCat.Find(Data_Path_GPP, '*monthly_%d.%02d.01.tif' %(int(year), int(month)))[0]
                 monthly_GPP = RC.Open_tiff_array(monthly_GPP_File)
                 monthly_GPP[monthly_GPP == NDV] = np.nan
 
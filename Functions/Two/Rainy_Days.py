@@ -8,7 +8,6 @@ Module: Function/Two
 """
 # Import general modules
 import calendar
-import glob
 import os
 import pandas as pd
 import numpy as np
@@ -37,6 +36,7 @@ def Calc_Rainy_Days(Dir_Basin, Data_Path_P, Startdate, Enddate):
     # import WA+ modules
     import wa.General.data_conversions as DC
     import wa.General.raster_conversions as RC
+    import wa.General.raster_catalog as RCat
 
     # Create an output directory to store the rainy days tiffs
     Data_Path_RD = os.path.join(Dir_Basin, 'Rainy_Days')
@@ -46,9 +46,6 @@ def Calc_Rainy_Days(Dir_Basin, Data_Path_P, Startdate, Enddate):
     # Define the dates that must be created
     Dates = pd.date_range(Startdate, Enddate, freq ='MS')
 
-    # Set working directory to the rainfall folder
-    os.chdir(Data_Path_P)
-
     # Open all the daily data and store the data in a 3D array
     for Date in Dates:
         # Define the year and month and amount of days in month
@@ -59,19 +56,18 @@ def Calc_Rainy_Days(Dir_Basin, Data_Path_P, Startdate, Enddate):
         # Set the third (time) dimension of array starting at 0
         i = 0
 
-        # Find all files of that month
-        files = glob.glob('*daily_%d.%02d.*.tif' %(year, month))
+        # Find all files of that month in the catalog of the rainfall folder
+        files = RCat.Find(Data_Path_P, '*daily_%d.%02d.*.tif' %(year, month))
 
         # Check if the amount of files corresponds with the amount of days in month
         if len(files) is not daysinmonth:
             print 'ERROR: Not all Rainfall days for month %d and year %d are downloaded'  %(month, year)
 
         # Loop over the days and store data in raster
-        for File in files:
-            dir_file = os.path.join(Data_Path_P, File)
+        for dir_file in files:
 
             # Get array information and create empty numpy array for daily rainfall when looping the first file
-            if File == files[0]:
+            if dir_file == files[0]:
 
                 # Open geolocation info and define projection
                 geo_out, proj, size_X, size_Y = RC.Open_array_info(dir_file)
@@ -10,8 +10,8 @@ Description:
 This module consists of the general functions that are used in the WA+ toolbox
 """
 
-from wa.General import data_conversions, raster_conversions
+from wa.General import data_conversions, raster_conversions, opendap, web_download, ftp_download, reprojection_plan, raster_catalog
 
-__all__ = ['data_conversions','raster_conversions']
+__all__ = ['data_conversions','raster_conversions','opendap','web_download','ftp_download','reprojection_plan','raster_catalog']
 
 __version__ = '0.1'
\ No newline at end of file
@@ -6,13 +6,13 @@ Created on Sun Dec 18 13:07:32 2016
 """
 import gzip
 import zipfile
+import shutil
 import gdal
 import osr
 import os
 import pandas as pd
 import numpy as np
 import netCDF4
-import time
 
 def Convert_nc_to_tiff(input_nc, output_folder):
     """
@@ -67,15 +67,20 @@ def Convert_grb2_to_nc(input_wgrib, output_nc, band):
 
     import wa.General.raster_conversions as RC
 
-    # Get environmental variable
-    WA_env_paths = os.environ["WA_PATHS"].split(';')
-    GDAL_env_path = WA_env_paths[0]
-    GDAL_TRANSLATE_PATH = os.path.join(GDAL_env_path, 'gdal_translate.exe')
+    if RC.GDAL_Utilities:
+        # The returned dataset is not kept, so it is closed and written at once
+        gdal.Translate(output_nc, input_wgrib, format = 'netCDF', bandList = [band])
 
-    # Create command
-    fullCmd = ' '.join(['"%s" -of netcdf -b %d' %(GDAL_TRANSLATE_PATH, band), input_wgrib, output_nc])  # -r {nearest}
+    else:
+        # Get environmental variable
+        WA_env_paths = os.environ["WA_PATHS"].split(';')
+        GDAL_env_path = WA_env_paths[0]
+        GDAL_TRANSLATE_PATH = os.path.join(GDAL_env_path, 'gdal_translate.exe')
+
+        # Create command
+        fullCmd = ' '.join(['"%s" -of netcdf -b %d' %(GDAL_TRANSLATE_PATH, band), input_wgrib, output_nc])  # -r {nearest}
 
-    RC.Run_command_window(fullCmd)
+        RC.Run_command_window(fullCmd)
 
     return()
 
@@ -89,16 +94,22 @@ def Convert_adf_to_tiff(input_adf, output_tiff):
     """
     import wa.General.raster_conversions as RC
 
-    # Get environmental variable
-    WA_env_paths = os.environ["WA_PATHS"].split(';')
-    GDAL_env_path = WA_env_paths[0]
-    GDAL_TRANSLATE_PATH = os.path.join(GDAL_env_path, 'gdal_translate.exe')
+    if RC.GDAL_Utilities:
+        # convert data from ESRI GRID to GeoTIFF
+        gdal.Translate(output_tiff, input_adf, format = 'GTiff',
+                       creationOptions = ['COMPRESS=DEFLATE', 'PREDICTOR=1', 'ZLEVEL=1'])
 
-    # convert data from ESRI GRID to GeoTIFF
-    fullCmd = ('"%s" -co COMPRESS=DEFLATE -co PREDICTOR=1 -co '
-                   'ZLEVEL=1 -of GTiff %s %s') % (GDAL_TRANSLATE_PATH, input_adf, output_tiff)
+    else:
+        # Get environmental variable
+        WA_env_paths = os.environ["WA_PATHS"].split(';')
+        GDAL_env_path = WA_env_paths[0]
+        GDAL_TRANSLATE_PATH = os.path.join(GDAL_env_path, 'gdal_translate.exe')
 
-    RC.Run_command_window(fullCmd)
+        # convert data from ESRI GRID to GeoTIFF
+        fullCmd = ('"%s" -co COMPRESS=DEFLATE -co PREDICTOR=1 -co '
+                       'ZLEVEL=1 -of GTiff %s %s') % (GDAL_TRANSLATE_PATH, input_adf, output_tiff)
+
+        RC.Run_command_window(fullCmd)
 
     return(output_tiff)
 
@@ -116,7 +127,7 @@ def Extract_Data(input_file, output_folder):
     z.extractall(output_folder)
     z.close()
 
-def Extract_Data_gz(zip_filename, outfilename):
+def Extract_Data_gz(zip_filename, outfilename, remove_zip = True):
     """
     This function extract the zip files
 
@@ -124,15 +135,14 @@ def Extract_Data_gz(zip_filename, outfilename):
     zip_filename -- name, name of the file that must be unzipped
     outfilename -- Dir, directory where the unzipped data must be
                            stored
+    remove_zip -- True (Default) removes the zip file after extracting
     """
-
+    # the file is decompressed in chunks
     with gzip.GzipFile(zip_filename, 'rb') as zf:
-        file_content = zf.read()
-        save_file_content = file(outfilename, 'wb')
-        save_file_content.write(file_content)
-    save_file_content.close()
-    zf.close()
-    os.remove(zip_filename)
+        with open(outfilename, 'wb') as save_file_content:
+            shutil.copyfileobj(zf, save_file_content, 1024 * 1024)
+    if remove_zip:
+        os.remove(zip_filename)
 
 def Save_as_tiff(name='', data='', geo='', projection=''):
     """
@@ -145,6 +155,8 @@ def Save_as_tiff(name='', data='', geo='', projection=''):
             pixelsize], (geospatial dataset)
     projection -- integer, the EPSG code
     """
+    import wa.General.raster_catalog as RCat
+
     # save as a geotiff
     driver = gdal.GetDriverByName("GTiff")
     dst_ds = driver.Create(name, int(data.shape[1]), int(data.shape[0]), 1,
@@ -173,6 +185,9 @@ def Save_as_tiff(name='', data='', geo='', projection=''):
     dst_ds.SetGeoTransform(geo)
     dst_ds.GetRasterBand(1).WriteArray(data)
     dst_ds = None
+
+    # record the tiff in the catalog of the directory
+    RCat.Register(name, geo, int(data.shape[1]), int(data.shape[0]))
     return()
 
 def Save_as_MEM(data='', geo='', projection=''):
@@ -228,6 +243,7 @@ def Save_as_NC(namenc, DataCube, Var, Reference_filename,  Startdate = '', Endda
         lat = np.arange(size_Y)*geo_out[5]+geo_out[3] - 0.5 * geo_out[5]
 
         # Create the nc file
+        RC.Close_nc_handle(namenc)
         nco = Dataset(namenc, 'w', format='NETCDF4_CLASSIC')
         nco.description = '%s data' %Var
 
@@ -333,7 +349,9 @@ def Create_new_NC_file(nc_outname, Basin_Example_File, Basin):
     lons = np.arange(size_X)*Geo[1]+Geo[0] + 0.5 * Geo[1]
     lats = np.arange(size_Y)*Geo[5]+Geo[3] + 0.5 * Geo[5]
 
-    # Create NetCDF file
+    # Create NetCDF file (close the handle that is cached for reading)
+    import wa.General.raster_conversions as RC
+    RC.Close_nc_handle(nc_outname)
     nco = netCDF4.Dataset(nc_outname, 'w', format = 'NETCDF4_CLASSIC')
     nco.set_fill_on()
     nco.description = '%s' %Basin
@@ -391,67 +409,190 @@ def Create_new_NC_file(nc_outname, Basin_Example_File, Basin):
     basin_var[:,:] = Basin_array
 
     # close the file
-    time.sleep(1)
     nco.close()
     return()
 
 def Add_NC_Array_Variable(nc_outname, Array, name, unit, Scaling_factor = 1):
 
-    # create input array
-    Array[np.isnan(Array)] = -9999 * np.float(Scaling_factor)
-    Array = np.int_(Array * 1./np.float(Scaling_factor))
+    # Write the variable in a session of one variable
+    with NC_Writer(nc_outname) as nc:
+        nc.Add_Variable(Array, name, unit, Scaling_factor)
 
-    # Create NetCDF file
-    nco = netCDF4.Dataset(nc_outname, 'r+', format = 'NETCDF4_CLASSIC')
-    nco.set_fill_on()
+    return()
 
-    paro = nco.createVariable('%s' %name, 'i',
-                                   ('time', 'latitude', 'longitude'),fill_value=-9999,
-                                    zlib=True, least_significant_digit=0)
+def Add_NC_Array_Static(nc_outname, Array, name, unit, Scaling_factor = 1):
 
-    paro.scale_factor = Scaling_factor
-    paro.add_offset = 0.00
-    paro.grid_mapping = 'crs'
-    paro.long_name = name
-    paro.units = unit
-    paro.set_auto_maskandscale(False)
+    # Write the variable in a session of one variable
+    with NC_Writer(nc_outname) as nc:
+        nc.Add_Static(Array, name, unit, Scaling_factor)
 
-    # Set the data variable
-    paro[:,:,:] = Array
+    return()
 
-    # close the file
-    time.sleep(1)
-    nco.close()
+class NC_Writer(object):
+    """
+    This class opens a simulation netCDF file (made by Create_new_NC_file)
+    once for writing, adds several variables, and closes the file once. The
+    variables are stored as scaled integers in compressed chunks.
 
-    return()
+    with NC_Writer(nc_outname) as nc:
+        nc.Add_Variable(DataCube_ETblue, "Blue_Evapotranspiration", "mm/month", 0.01)
+        nc.Add_Variable(DataCube_ETgreen, "Green_Evapotranspiration", "mm/month", 0.01)
 
-def Add_NC_Array_Static(nc_outname, Array, name, unit, Scaling_factor = 1):
+    Keyword arguments:
+    nc_outname -- 'C:/file/to/path/file.nc'
+    chunksizes -- [time, latitude, longitude] chunk shape of the time series
+                  variables, None (Default) chooses a shape that is good for
+                  both time series and map access (see Get_chunksizes)
+    complevel -- integer, level of the zlib compression 1-9 (Default is 4),
+                 0 for no compression
+    """
+    def __init__(self, nc_outname, chunksizes = None, complevel = 4):
+
+        # Close the handle that is cached for reading
+        import wa.General.raster_conversions as RC
+        RC.Close_nc_handle(nc_outname)
+
+        self.nc_outname = nc_outname
+        self.chunksizes = chunksizes
+        self.complevel = complevel
+        self.nco = netCDF4.Dataset(nc_outname, 'r+', format = 'NETCDF4_CLASSIC')
+        self.nco.set_fill_on()
+
+    def __enter__(self):
+        return(self)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.Close()
+
+    def Add_Variable(self, Array, name, unit, Scaling_factor = 1):
+        """
+        Add a time series variable [time, latitude, longitude]
+
+        Keyword arguments:
+        Array -- [array], data of the variable (NaN is no data)
+        name -- string, name of the variable
+        unit -- string, unit of the variable
+        Scaling_factor -- float, the data is stored as integers of Scaling_factor
+        """
+        self.Write(Array, name, unit, Scaling_factor, ('time', 'latitude', 'longitude'))
+
+    def Add_Static(self, Array, name, unit, Scaling_factor = 1):
+        """
+        Add a static variable [latitude, longitude]
+
+        Keyword arguments:
+        Array -- [array], data of the variable (NaN is no data)
+        name -- string, name of the variable
+        unit -- string, unit of the variable
+        Scaling_factor -- float, the data is stored as integers of Scaling_factor
+        """
+        self.Write(Array, name, unit, Scaling_factor, ('latitude', 'longitude'))
+
+    def Write(self, Array, name, unit, Scaling_factor, dimensions):
+        """
+        Create the variable with the dimensions and write the scaled array
+        """
+        # create input array
+        Array[np.isnan(Array)] = -9999 * np.float(Scaling_factor)
+        Array = np.int_(Array * 1./np.float(Scaling_factor))
+
+        if self.chunksizes is not None and len(dimensions) == 3:
+            chunksizes = self.chunksizes
+        elif self.chunksizes is not None:
+            chunksizes = self.chunksizes[1:]
+        else:
+            chunksizes = Get_chunksizes(Array.shape)
 
-    # create input array
-    Array[np.isnan(Array)] = -9999 * np.float(Scaling_factor)
-    Array = np.int_(Array * 1./np.float(Scaling_factor))
+        paro = self.nco.createVariable('%s' %name, 'i', dimensions, fill_value=-9999,
+                                       zlib = self.complevel > 0, complevel = max(self.complevel, 1),
+                                       chunksizes = chunksizes, least_significant_digit=0)
 
-    # Create NetCDF file
-    nco = netCDF4.Dataset(nc_outname, 'r+', format = 'NETCDF4_CLASSIC')
-    nco.set_fill_on()
+        paro.scale_factor = Scaling_factor
+        paro.add_offset = 0.00
+        paro.grid_mapping = 'crs'
+        paro.long_name = name
+        paro.units = unit
+        paro.set_auto_maskandscale(False)
 
-    paro = nco.createVariable('%s' %name, 'i',
-                                   ('latitude', 'longitude'),fill_value=-9999,
-                                    zlib=True, least_significant_digit=0)
+        # Set the data variable
+        paro[:] = Array
 
-    paro.scale_factor = Scaling_factor
-    paro.add_offset = 0.00
-    paro.grid_mapping = 'crs'
-    paro.long_name = name
-    paro.units = unit
-    paro.set_auto_maskandscale(False)
+    def Close(self):
+        """
+        Close the netCDF file, the variables are written to disk
+        """
+        if self.nco is not None:
+            self.nco.close()
+            self.nco = None
 
-    # Set the data variable
-    paro[:,:] = Array
+def Get_chunksizes(shape, Chunk_values = 2**18):
+    """
+    This function gives a chunk shape with about Chunk_values values for an
+    array [time, latitude, longitude] or [latitude, longitude]. The chunks of
+    a time series array are chosen so that reading one map and reading the
+    time series of one pixel need about the same number of chunks.
 
-    # close the file
-    time.sleep(1)
-    nco.close()
+    Keyword arguments:
+    shape -- shape of the array
+    Chunk_values -- integer, number of values in one chunk (Default is 2**18,
+                    which is 1 MB of 4 byte integers)
+    """
+    shape = [int(i) for i in shape]
+    Values = float(np.prod(shape))
+    if Values <= Chunk_values:
+        return(shape)
+
+    if len(shape) == 3:
+        # a map needs 1/r**2 chunks and a time series needs T/chunk_T chunks
+        r = (Chunk_values / Values)**0.25
+        chunksizes = [shape[0] * r**2, shape[1] * r, shape[2] * r]
+    else:
+        r = (Chunk_values / Values)**0.5
+        chunksizes = [shape[0] * r, shape[1] * r]
+
+    return([int(np.clip(np.round(c), 1, n)) for c, n in zip(chunksizes, shape)])
+
+def Add_NC_Dict(nc_file, group_name, dictionary):
+    """
+    This function saves a dictionary of arrays (e.g. the SurfWAT river, DEM,
+    distance and discharge dictionaries) in a group of a netCDF4 file as a
+    ragged array: the sorted keys, the offsets and all the arrays after each
+    other. The array of keys[i] is values[..., offsets[i]:offsets[i+1]]. The
+    arrays of a dynamic dictionary (group_name ends with 'dynamic') are 2D
+    [time, pixels].
+
+    Keyword Arguments:
+    nc_file -- netCDF4.Dataset, opened with format NETCDF4 in 'w' or 'r+' mode
+    group_name -- string, name of the group, e.g. 'riverdict_static'
+    dictionary -- dictionary {integer: array}
+    """
+    keys = np.array(sorted(dictionary.keys()), dtype = np.int64)
+    arrays = [np.asarray(dictionary[key]) for key in keys]
+    offsets = np.zeros(len(keys) + 1, dtype = np.int64)
+    offsets[1:] = np.cumsum([array.shape[-1] for array in arrays])
+
+    group = nc_file.createGroup(group_name)
+    group.storage = 'ragged'
+    group.createDimension('keys', len(keys))
+    if len(keys) == 0:
+        return()
+
+    group.createDimension('offsets', len(offsets))
+    group.createDimension('values', offsets[-1])
+    dtype = np.result_type(*arrays)
+    if group_name.split('_')[-1] == 'dynamic':
+        group.createDimension('time', arrays[0].shape[0])
+        dimensions = ('time', 'values')
+    else:
+        dimensions = ('values',)
+
+    keys_var = group.createVariable('keys', 'i8', ('keys',))
+    offsets_var = group.createVariable('offsets', 'i8', ('offsets',))
+    values_var = group.createVariable('values', dtype, dimensions, zlib = True)
+    keys_var[:] = keys
+    offsets_var[:] = offsets
+    if offsets[-1] > 0:
+        values_var[:] = np.concatenate(arrays, axis = -1)
 
     return()
 
@@ -468,22 +609,22 @@ def Convert_dict_to_array(River_dict, Array_dict, Reference_data):
         # Get raster information
         geo_out, proj, size_X, size_Y = RC.Open_array_info(Reference_data)
 
-    # Create ID Matrix
-    y,x = np.indices((size_Y, size_X))
-    ID_Matrix = np.int32(np.ravel_multi_index(np.vstack((y.ravel(),x.ravel())),(size_Y,size_X),mode='clip').reshape(x.shape)) + 1
-
     # Get tiff array time dimension:
     time_dimension = int(np.shape(Array_dict[0])[0])
 
     # create an empty array
     DataCube = np.ones([time_dimension, size_Y, size_X]) * np.nan
 
-    for river_part in range(0,len(River_dict)):
-        for river_pixel in range(1,len(River_dict[river_part])):
-            river_pixel_ID = River_dict[river_part][river_pixel]
-            if len(np.argwhere(ID_Matrix == river_pixel_ID))>0:
-                row, col = np.argwhere(ID_Matrix == river_pixel_ID)[0][:]
-                DataCube[:,row,col] = Array_dict[river_part][:,river_pixel]
+    # Put all the river pixels (except the first pixel of every river part)
+    # after each other, the pixel ID is the flat index + 1
+    river_parts = range(0,len(River_dict))
+    river_pixel_IDs = np.concatenate([np.asarray(River_dict[river_part][1:]) for river_part in river_parts]).astype(np.int64)
+    Values = np.concatenate([np.asarray(Array_dict[river_part])[:, 1:len(River_dict[river_part])] for river_part in river_parts], axis = 1)
+
+    # Keep the pixels in the raster, the last value of a pixel is used
+    Inside = np.logical_and(river_pixel_IDs >= 1, river_pixel_IDs <= size_Y * size_X)
+    rows, cols = np.unravel_index(river_pixel_IDs[Inside] - 1, (size_Y, size_X))
+    DataCube[:, rows, cols] = Values[:, Inside]
 
     return(DataCube)
 
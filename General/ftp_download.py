@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+Authors: Tim Hessels
+         UNESCO-IHE 2017
+Contact: t.hessels@unesco-ihe.org
+Repository: https://github.com/wateraccounting/wa
+Module: General
+
+Description:
+Download of files from ftp servers (WA ftp server, CHIRPS, RFE). The logged in
+ftp sessions are kept in a pool per server and user and reused for all the
+downloads of a process, the directory listings are downloaded once per
+process, and a session that is dropped by the server is replaced by a new
+session without the caller noticing it.
+"""
+# General modules
+import os
+import time
+import socket
+import ftplib
+import threading
+
+# Retry parameters, the waiting time is Backoff * 2**attempt seconds
+Retries = 4
+Backoff = 2.0
+Backoff_Max = 30.0
+
+# Size of the blocks that are written to disk
+Block_Size = 1024 * 1024
+
+# Timeout in seconds of the ftp sockets
+Timeout = 120
+
+# Pool of idle logged in sessions per (server, user), emptied in a forked process
+Sessions = {}
+Sessions_Lock = threading.Lock()
+Sessions_Pid = os.getpid()
+
+# Listings of the directories that are already downloaded
+Listings = {}
+
+# Errors of the connection after which the session is closed and the action
+# is tried again, local errors (e.g. a full disk) are not tried again
+Connection_Errors = (ftplib.error_temp, ftplib.error_reply, ftplib.error_proto,
+                     socket.error, EOFError)
+
+
+def Check_process():
+    """
+    This function empties the pools in a forked process, because the sockets
+    of the parent process cannot be shared
+    """
+    global Sessions_Pid
+    if Sessions_Pid != os.getpid():
+        Sessions.clear()
+        Listings.clear()
+        Sessions_Pid = os.getpid()
+
+
+def Get_session(server, username = '', password = ''):
+    """
+    This function returns an idle logged in session for the server and user,
+    or a new session if all the sessions are in use
+
+    Keyword arguments:
+    server -- string, name of the ftp server, e.g. 'ftp.wateraccounting.unesco-ihe.org'
+    username -- string, user name (anonymous login if empty)
+    password -- string, password
+    """
+    with Sessions_Lock:
+        Check_process()
+        if len(Sessions.get((server, username), [])) > 0:
+            return(Sessions[(server, username)].pop())
+
+    ftp = ftplib.FTP(server, timeout = Timeout)
+    ftp.login(username, password)
+    ftp.wa_directory = None
+
+    return(ftp)
+
+
+def Release_session(server, username, ftp):
+    """
+    This function puts a session back in the pool of the server and user
+
+    Keyword arguments:
+    server -- string, name of the ftp server
+    username -- string, user name
+    ftp -- ftplib.FTP given by Get_session
+    """
+    with Sessions_Lock:
+        if Sessions_Pid == os.getpid():
+            Sessions.setdefault((server, username), []).append(ftp)
+            return
+
+    Drop_session(ftp)
+
+
+def Drop_session(ftp):
+    """
+    This function closes a session that is not used anymore
+
+    Keyword arguments:
+    ftp -- ftplib.FTP given by Get_session
+    """
+    try:
+        ftp.quit()
+    except Exception:
+        ftp.close()
+
+
+def Close_sessions():
+    """
+    This function closes all the idle sessions of the process
+    """
+    with Sessions_Lock:
+        Check_process()
+        for key in Sessions.keys():
+            for ftp in Sessions.pop(key):
+                Drop_session(ftp)
+
+
+def Change_directory(ftp, directory):
+    """
+    This function changes the directory of the session, if the session is
+    not already in this directory
+
+    Keyword arguments:
+    ftp -- ftplib.FTP given by Get_session
+    directory -- string, directory on the ftp server
+    """
+    if ftp.wa_directory != directory:
+        ftp.cwd(directory)
+        ftp.wa_directory = directory
+
+
+def Run(server, directory, username, password, action):
+    """
+    This function runs the action with a session in the directory, a dropped
+    session is replaced by a new session and the action is tried again
+
+    Keyword arguments:
+    server -- string, name of the ftp server
+    directory -- string, directory on the ftp server
+    username -- string, user name (anonymous login if empty)
+    password -- string, password
+    action -- function that gets the session and returns the result
+    """
+    for attempt in range(Retries):
+        ftp = None
+        try:
+            ftp = Get_session(server, username, password)
+            Change_directory(ftp, directory)
+            result = action(ftp)
+            Release_session(server, username, ftp)
+            return(result)
+
+        except ftplib.error_perm:
+            # A missing file or a wrong password is not tried again
+            if ftp is not None:
+                Release_session(server, username, ftp)
+            raise
+
+        except Connection_Errors:
+            if ftp is not None:
+                ftp.close()
+            if attempt == Retries - 1:
+                raise
+            time.sleep(min(Backoff * 2**attempt, Backoff_Max))
+
+        except:
+            # The state of the session is unknown after any other error
+            if ftp is not None:
+                ftp.close()
+            raise
+
+
+def Get_listing(server, directory, username = '', password = ''):
+    """
+    This function returns the names of the files in the directory, the
+    listing is downloaded once per process
+
+    Keyword arguments:
+    server -- string, name of the ftp server
+    directory -- string, directory on the ftp server
+    username -- string, user name (anonymous login if empty)
+    password -- string, password
+    """
+    with Sessions_Lock:
+        Check_process()
+    if (server, directory) in Listings:
+        return(Listings[(server, directory)])
+
+    listing = Run(server, directory, username, password, lambda ftp: ftp.nlst())
+    listing = [os.path.basename(name) for name in listing]
+    Listings[(server, directory)] = listing
+
+    return(listing)
+
+
+def Download_file(server, directory, filename, local_filename, username = '', password = ''):
+    """
+    This function downloads one file, the file gets its name after the
+    download is finished so an interrupted download leaves no broken file
+
+    Keyword arguments:
+    server -- string, name of the ftp server
+    directory -- string, directory on the ftp server
+    filename -- string, name of the file in the directory
+    local_filename -- 'C:/file/to/path/file'
+    username -- string, user name (anonymous login if empty)
+    password -- string, password
+    """
+    part_filename = local_filename + '.part'
+
+    def Retrieve(ftp):
+        with open(part_filename, 'wb') as lf:
+            ftp.retrbinary("RETR " + filename, lf.write, Block_Size)
+
+    try:
+        Run(server, directory, username, password, Retrieve)
+        if os.path.exists(local_filename):
+            os.remove(local_filename)
+        os.rename(part_filename, local_filename)
+    finally:
+        if os.path.exists(part_filename):
+            os.remove(part_filename)
+
+    return()
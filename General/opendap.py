@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""
+Authors: Tim Hessels
+         UNESCO-IHE 2017
+Contact: t.hessels@unesco-ihe.org
+Repository: https://github.com/wateraccounting/wa
+Module: General
+
+Description:
+Binary (DAP2 .dods) access to OPeNDAP servers. The subsets are decoded from
+the XDR stream directly into numpy arrays, so no ascii output and no
+temporary text files are needed. A small local server that serves numpy
+arrays as OPeNDAP datasets is included to test and benchmark the decoder
+offline.
+"""
+# General modules
+import re
+import threading
+import urlparse
+import BaseHTTPServer
+import numpy as np
+import requests
+
+# XDR types of the DAP2 atomic types (Int16 and UInt16 are sent as 32 bits)
+DAP_Types = {'Byte': '>u1',
+             'Int16': '>i4',
+             'UInt16': '>u4',
+             'Int32': '>i4',
+             'UInt32': '>u4',
+             'Float32': '>f4',
+             'Float64': '>f8'}
+
+# numpy kinds that are written by the fixture server
+Numpy_Types = {'u1': 'Byte',
+               'i2': 'Int16',
+               'u2': 'UInt16',
+               'i4': 'Int32',
+               'u4': 'UInt32',
+               'f4': 'Float32',
+               'f8': 'Float64'}
+
+# Declaration of one atomic variable in the DDS, e.g. Float32 precip[lat = 4][lon = 8];
+Declaration = re.compile(r'(Byte|Int16|UInt16|Int32|UInt32|Float32|Float64)\s+([\w.]+)\s*((?:\[[^\]]*\]\s*)*);')
+Dimension = re.compile(r'\[(?:[^=\]]*=\s*)?(\d+)\s*\]')
+
+
+def Decode_dods(content, Var):
+    """
+    This function decodes a DAP2 binary (.dods) response into a numpy array
+
+    Keyword arguments:
+    content -- string, the body of the .dods response
+    Var -- string, name of the requested variable (for a Grid this is the
+           name of the ARRAY part of the Grid)
+
+    Returns:
+    numpy array (float64) with the shape of the requested subset
+    """
+    # Split the DDS and the XDR data
+    index = content.find('\nData:\n')
+    if index == -1:
+        raise ValueError('No DAP2 data found in the response: %s' %content[:200])
+    dds = content[:index]
+    offset = index + len('\nData:\n')
+
+    # The data follows the order of the declarations in the DDS
+    for match in Declaration.finditer(dds):
+        dtype = np.dtype(DAP_Types[match.group(1)])
+        name = match.group(2).split('.')[-1]
+        shape = tuple([int(size) for size in Dimension.findall(match.group(3))])
+
+        if len(shape) == 0:
+            # Scalars are written without length and padded to 4 bytes
+            nbytes = max(dtype.itemsize, 4)
+            start = offset
+        else:
+            # Arrays start with the number of values (two times)
+            nbytes = int(np.prod(shape)) * dtype.itemsize
+            nbytes = nbytes + (-nbytes % 4)
+            start = offset + 8
+
+        if name == Var:
+            size = int(np.prod(shape))
+            if len(shape) == 0 and dtype.itemsize < 4:
+                start = start + 4 - dtype.itemsize
+            data = np.frombuffer(content, dtype=dtype, count=size, offset=start)
+            return(data.reshape(shape).astype(np.float64))
+
+        offset = start + nbytes
+
+    raise KeyError('Variable %s is not found in the DDS: %s' %(Var, dds))
+
+
+def Encode_dods(Var, data, dataset = 'dataset', maps = None):
+    """
+    This function encodes a numpy array as a DAP2 binary (.dods) response
+
+    Keyword arguments:
+    Var -- string, name of the variable
+    data -- numpy array
+    dataset -- string, name of the dataset written in the DDS
+    maps -- list [(name, numpy vector)] with the map of every dimension, the
+            variable is written as a Grid with the maps after the array
+            (a plain array with the dimensions dim0, dim1, ... if None)
+    """
+    data = np.asarray(data)
+    if maps is None:
+        dds = '    %s;\n' %Declare_dods(Var, data, ['dim%d' %i for i in range(data.ndim)])
+        body = Encode_xdr(data)
+    else:
+        names = [name for name, vector in maps]
+        dds = '    Grid {\n      Array:\n        %s;\n      Maps:\n' %Declare_dods(Var, data, names)
+        body = Encode_xdr(data)
+        for name, vector in maps:
+            dds = dds + '        %s;\n' %Declare_dods(name, vector, [name])
+            body = body + Encode_xdr(vector)
+        dds = dds + '    } %s;\n' %Var
+
+    return('Dataset {\n' + dds + '} %s;\n' %dataset + '\nData:\n' + body)
+
+
+def Declare_dods(Var, data, dims):
+    """
+    This function returns the DDS declaration of an array, e.g.
+    'Float32 precip[lat = 4][lon = 8]'
+    """
+    data = np.asarray(data)
+    dap_type = Numpy_Types[data.dtype.str[1:]]
+    return('%s %s%s' %(dap_type, Var, ''.join(['[%s = %d]' %(dim, size) for dim, size in zip(dims, data.shape)])))
+
+
+def Encode_xdr(data):
+    """
+    This function encodes the values of an array in XDR, the number of values
+    (two times) followed by the values padded to a multiple of 4 bytes
+    """
+    data = np.asarray(data)
+    values = data.astype(DAP_Types[Numpy_Types[data.dtype.str[1:]]]).tostring()
+    values = values + '\x00' * (-len(values) % 4)
+    length = np.array([data.size, data.size], dtype='>u4').tostring()
+
+    return(length + values)
+
+
+def Get_dods(url, Var, username = None, password = None):
+    """
+    This function downloads an OPeNDAP subset in binary form and decodes it
+
+    Keyword arguments:
+    url -- 'https://server/path/dataset.dods?Var[0][10:1:20][30:1:40]'
+    Var -- string, name of the variable in the constraint
+    username -- string, user name for the redirected login (optional)
+    password -- string, password for the redirected login (optional)
+    """
+    # open URL
+    try:
+        dataset = requests.get(url, allow_redirects=False, stream = True)
+    except:
+        from requests.packages.urllib3.exceptions import InsecureRequestWarning
+        requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
+        dataset = requests.get(url, allow_redirects=False, stream = True, verify = False)
+
+    # Follow the login redirect of the NASA servers
+    if 'location' in dataset.headers:
+        try:
+            dataset = requests.get(dataset.headers['location'], auth = (username, password), stream = True)
+        except:
+            from requests.packages.urllib3.exceptions import InsecureRequestWarning
+            requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
+            dataset = requests.get(dataset.headers['location'], auth = (username, password), stream = True, verify = False)
+
+    dataset.raise_for_status()
+
+    return(Decode_dods(dataset.content, Var))
+
+
+def Subset_array(data, constraint):
+    """
+    This function applies an OPeNDAP hyperslab ([start:stride:stop], inclusive
+    stop) to a numpy array
+
+    Keyword arguments:
+    data -- numpy array
+    constraint -- string, e.g. '[0][10:1:20][30:1:40]'
+    """
+    slices = []
+    for part in re.findall(r'\[([^\]]*)\]', constraint):
+        values = [int(value) for value in part.split(':')]
+        if len(values) == 1:
+            start, stride, stop = values[0], 1, values[0]
+        elif len(values) == 2:
+            start, stride, stop = values[0], 1, values[1]
+        else:
+            start, stride, stop = values
+        slices.append(slice(start, stop + 1, stride))
+
+    return(data[tuple(slices)])
+
+
+class Fixture_Server(object):
+    """
+    This class serves numpy arrays as OPeNDAP datasets on localhost, so the
+    binary and ascii retrieval can be tested and benchmarked without network.
+
+    Example:
+    server = Fixture_Server({'GLDAS.dods': {'tair_f_inst': Array}})
+    url = server.url + '/GLDAS.dods?tair_f_inst[0][0:1:9][0:1:9]'
+    data = Get_dods(url, 'tair_f_inst')
+    server.close()
+
+    A variable given as (array, [(name, vector)]) is served as a Grid with
+    the maps of its dimensions, as the OPeNDAP servers of the collectors do.
+    The .ascii extension returns the same subset as comma separated text with
+    one header line and a leading index column per row.
+    """
+    def __init__(self, datasets, port = 0):
+        """
+        Keyword arguments:
+        datasets -- dictionary {'path/name': {'Var': numpy array or
+                    (numpy array, [(map name, numpy vector)])}}, the path
+                    is used without the .dods or .ascii extension
+        port -- integer, port of the server (0 picks a free port)
+        """
+        self.datasets = dict([(name.rsplit('.dods', 1)[0].strip('/'), variables)
+                              for name, variables in datasets.items()])
+        server = self
+
+        class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                parsed = urlparse.urlparse(self.path)
+                path = parsed.path.strip('/')
+                constraint = urlparse.unquote(parsed.query)
+                try:
+                    Var = constraint.split('[')[0]
+                    name, extension = path.rsplit('.', 1)
+                    data = server.datasets[name][Var]
+                    maps = None
+                    if isinstance(data, tuple):
+                        # Grid, every map is subset with its dimension
+                        data, maps = data
+                        parts = re.findall(r'\[[^\]]*\]', constraint)
+                        maps = [(map_name, Subset_array(vector, part))
+                                for (map_name, vector), part in zip(maps, parts)]
+                    data = Subset_array(data, constraint)
+                    if extension == 'dods':
+                        body = Encode_dods(Var, data, name, maps)
+                    elif extension == 'ascii':
+                        body = Encode_ascii(Var, data)
+                    else:
+                        raise KeyError(path)
+                except (KeyError, IndexError, ValueError):
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = BaseHTTPServer.HTTPServer(('127.0.0.1', port), Handler)
+        self.url = 'http://127.0.0.1:%d' %self.httpd.server_address[1]
+        self.thread = threading.Thread(target = self.httpd.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def Encode_ascii(Var, data):
+    """
+    This function writes a numpy array in the OPeNDAP ascii layout
+
+    Keyword arguments:
+    Var -- string, name of the variable
+    data -- numpy array
+    """
+    data = np.atleast_2d(data)
+    rows = data.reshape(-1, data.shape[-1])
+    indices = np.ndindex(*data.shape[:-1])
+    lines = ['%s.%s%s' %(Var, Var, ''.join(['[%d]' %size for size in data.shape]))]
+    for index, row in zip(indices, rows):
+        lines.append(''.join(['[%d]' %i for i in index]) + ', ' + ', '.join([repr(float(value)) for value in row]))
+
+    return('\n'.join(lines) + '\n')
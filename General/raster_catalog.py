@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+Authors: Tim Hessels
+         UNESCO-IHE 2018
+Contact: t.hessels@unesco-ihe.org
+Repository: https://github.com/wateraccounting/wa
+Module: General
+
+Description:
+Catalog of the tiff files in a data directory, stored as a SQLite file in the
+directory itself. Every tiff that is written by Save_as_tiff is recorded with
+its variable, product, unit, time step, date, extent and resolution, and the
+files that are put in the directory in another way are added the first time
+the catalog is used after the directory changed. The files of a directory are
+found with a query on the catalog instead of a scan of the directory for every
+date.
+
+The names of the WA+ tiff files look like
+Variable_Product_Unit_Timestep_yyyy.mm.dd.tif, e.g.
+P_CHIRPS.v2.0_mm-month-1_monthly_2005.01.01.tif
+"""
+# General modules
+import os
+import time
+import sqlite3
+import datetime
+
+# Name of the catalog file in every data directory
+Catalog_Name = '.wa_catalog.sqlite'
+
+# Time steps that can be found in the file names
+Timesteps = ['daily', '8-daily', '16-daily', 'weekly', 'monthly', 'yearly']
+
+# The directory is scanned again if it is changed less than Margin seconds
+# before the last scan, because the modification time can be rounded
+Margin = 2.0
+
+Create_Tables = '''
+CREATE TABLE IF NOT EXISTS rasters (
+    name TEXT PRIMARY KEY,
+    variable TEXT,
+    product TEXT,
+    unit TEXT,
+    timestep TEXT,
+    date INTEGER,
+    xmin REAL,
+    ymax REAL,
+    xres REAL,
+    yres REAL,
+    size_x INTEGER,
+    size_y INTEGER);
+CREATE INDEX IF NOT EXISTS rasters_date ON rasters (date);
+CREATE TABLE IF NOT EXISTS scans (
+    folder TEXT PRIMARY KEY,
+    mtime REAL);
+'''
+
+
+def Connect(folder):
+    """
+    This function opens the catalog of the directory, the catalog is created
+    if it does not exists
+
+    Keyword arguments:
+    folder -- 'C:/file/to/path/'
+    """
+    con = sqlite3.connect(os.path.join(folder, Catalog_Name), timeout = 60)
+    con.text_factory = str
+    # A journal file in the directory would change its modification time
+    # with every write, and the directory would be scanned again every time
+    con.execute('PRAGMA journal_mode = MEMORY')
+    con.executescript(Create_Tables)
+
+    return(con)
+
+
+def Parse_name(name):
+    """
+    This function gets the variable, product, unit, time step and date
+    (ordinal) out of the name of a WA+ tiff file, the values that are not in
+    the name are None
+
+    Keyword arguments:
+    name -- string, name of the tiff file
+    """
+    variable = product = unit = timestep = date = None
+
+    parts = name.split('.')
+    try:
+        date = datetime.date(int(parts[-4][-4:]), int(parts[-3]), int(parts[-2])).toordinal()
+        parts = '.'.join(parts[:-3])[:-4].strip('_').split('_')
+    except (ValueError, IndexError):
+        parts = os.path.splitext(name)[0].split('_')
+
+    if len(parts) > 1 and parts[-1] in Timesteps:
+        timestep = parts.pop()
+    if len(parts) > 0:
+        variable = parts[0]
+    if len(parts) > 1:
+        product = parts[1]
+    if len(parts) > 2:
+        unit = '_'.join(parts[2:])
+
+    return(variable, product, unit, timestep, date)
+
+
+def Record(con, name, geo = None, size_X = None, size_Y = None):
+    """
+    This function records one tiff file in the catalog
+
+    Keyword arguments:
+    con -- sqlite3 connection given by Connect
+    name -- string, name of the tiff file in the directory
+    geo -- geotransform of the tiff file (optional)
+    size_X -- number of columns of the tiff file (optional)
+    size_Y -- number of rows of the tiff file (optional)
+    """
+    if geo is None:
+        geo = [None] * 6
+    con.execute('INSERT OR REPLACE INTO rasters VALUES (?,?,?,?,?,?,?,?,?,?,?,?)',
+                (name,) + Parse_name(name) + (geo[0], geo[3], geo[1], geo[5], size_X, size_Y))
+
+
+def Register(file_name, geo = None, size_X = None, size_Y = None):
+    """
+    This function records a tiff file that is written in the catalog of its
+    directory, a failure of the catalog never stops the writing of the data
+
+    Keyword arguments:
+    file_name -- 'C:/file/to/path/file.tif'
+    geo -- geotransform of the tiff file (optional)
+    size_X -- number of columns of the tiff file (optional)
+    size_Y -- number of rows of the tiff file (optional)
+    """
+    folder, name = os.path.split(os.path.abspath(file_name))
+    if not name.endswith('.tif'):
+        return()
+
+    try:
+        con = Connect(folder)
+        with con:
+            Record(con, name, geo, size_X, size_Y)
+        con.close()
+    except sqlite3.Error:
+        pass
+
+    return()
+
+
+def Sync(con, folder):
+    """
+    This function adds the new tiff files in the directory to the catalog and
+    removes the deleted files, the directory is only scanned if it is changed
+    since the last scan
+
+    Keyword arguments:
+    con -- sqlite3 connection given by Connect
+    folder -- 'C:/file/to/path/'
+    """
+    mtime = os.stat(folder).st_mtime
+    row = con.execute('SELECT mtime FROM scans WHERE folder = ?', ('.',)).fetchone()
+    if row is not None and row[0] == mtime:
+        return()
+
+    Now = time.time()
+    names = set([name for name in os.listdir(folder) if name.endswith('.tif')])
+    known = set([name for (name,) in con.execute('SELECT name FROM rasters')])
+
+    with con:
+        con.executemany('DELETE FROM rasters WHERE name = ?', [(name,) for name in known - names])
+        for name in names - known:
+            Record(con, name)
+        if Now - mtime > Margin:
+            con.execute('INSERT OR REPLACE INTO scans VALUES (?,?)', ('.', mtime))
+        else:
+            con.execute('DELETE FROM scans')
+
+    return()
+
+
+def Query(folder, sql, parameters = ()):
+    """
+    This function runs a query on the up to date catalog of the directory,
+    the catalog cannot be used in a read only directory and is than replaced
+    by a catalog in memory
+
+    Keyword arguments:
+    folder -- 'C:/file/to/path/'
+    sql -- string, query on the rasters table
+    parameters -- tuple, parameters of the query
+    """
+    try:
+        con = Connect(folder)
+        Sync(con, folder)
+    except sqlite3.Error:
+        con = sqlite3.connect(':memory:')
+        con.text_factory = str
+        con.executescript(Create_Tables)
+        Sync(con, folder)
+
+    rows = con.execute(sql, parameters).fetchall()
+    con.close()
+
+    return(rows)
+
+
+def Find(folder, pattern = '*'):
+    """
+    This function returns the sorted paths of the tiff files in the directory
+    of which the name matches the pattern (same wildcards as glob)
+
+    Keyword arguments:
+    folder -- 'C:/file/to/path/'
+    pattern -- string, e.g. '*monthly_2005.01.01.tif'
+    """
+    if not os.path.isdir(folder):
+        return([])
+
+    rows = Query(folder, 'SELECT name FROM rasters WHERE name GLOB ? ORDER BY name', (pattern,))
+
+    return([os.path.join(folder, name) for (name,) in rows])
+
+
+def Find_dates(folder, Startdate = None, Enddate = None):
+    """
+    This function returns the names of the tiff files in the directory per
+    date between the start and end date
+
+    Keyword arguments:
+    folder -- 'C:/file/to/path/'
+    Startdate -- 'yyyy-mm-dd' or datetime (optional)
+    Enddate -- 'yyyy-mm-dd' or datetime (optional)
+
+    Returns:
+    dictionary {ordinal: [names]}
+    """
+    if not os.path.isdir(folder):
+        return(dict())
+
+    Start = -1 if Startdate is None else Get_ordinal(Startdate)
+    End = datetime.date.max.toordinal() if Enddate is None else Get_ordinal(Enddate)
+    rows = Query(folder, 'SELECT date, name FROM rasters WHERE date BETWEEN ? AND ? ORDER BY name', (Start, End))
+
+    Files = dict()
+    for date, name in rows:
+        Files.setdefault(date, []).append(name)
+
+    return(Files)
+
+
+def Get_ordinal(Date):
+    """
+    This function returns the ordinal of a date
+
+    Keyword arguments:
+    Date -- 'yyyy-mm-dd' or datetime
+    """
+    if isinstance(Date, basestring):
+        Date = datetime.datetime.strptime(Date[:10], '%Y-%m-%d')
+
+    return(Date.toordinal())
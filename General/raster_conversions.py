@@ -5,14 +5,32 @@ Created on Fri Dec 16 19:04:22 2016
 @author: tih
 """
 import pandas as pd
-import glob
 import gdal
 import osr
 import os
 import numpy as np
 import subprocess
+import hashlib
+import collections
 from pyproj import Proj, transform
 import scipy.interpolate
+import scipy.ndimage
+
+# Open netCDF handles and time axes of this process, see Open_nc_handle
+NC_Handles = collections.OrderedDict()
+NC_Handles_Max = 16
+NC_Handles_Pid = [os.getpid()]
+
+# Fill indices of the last no data masks, see Get_fill_indices
+GF_Indices = collections.OrderedDict()
+GF_Indices_Max = 8
+
+# gdal.Warp and gdal.Translate (GDAL 2.1 and higher) run the gdal utilities
+# inside this process, otherwise the executables of WA_PATHS are used
+GDAL_Utilities = hasattr(gdal, 'Warp') and hasattr(gdal, 'Translate')
+
+# Sinusoidal projection of the MODIS tiles
+MODIS_Projection = "+proj=sinu +lon_0=0 +x_0=0 +y_0=0 +a=6371007.181 +b=6371007.181 +units=m +no_defs"
 
 def Run_command_window(argument):
     """
@@ -54,7 +72,7 @@ def Open_array_info(filename=''):
         f = None
     return(geo_out, proj, size_X, size_Y)
 
-def Open_tiff_array(filename='', band=''):
+def Open_tiff_array(filename='', band='', window=None):
     """
     Opening a tiff array.
 
@@ -63,14 +81,24 @@ def Open_tiff_array(filename='', band=''):
         string that defines the input tiff file or gdal file
     band -- integer
         Defines the band of the tiff that must be opened.
+    window -- [Start_x, End_x, Start_y, End_y] (optional)
+        Pixel window that is read from the band, the window is limited to the
+        size of the tiff
     """
-    f = gdal.Open(filename)
+    if isinstance(filename, basestring):
+        f = gdal.Open(filename)
+    else:
+        f = filename
     if f is None:
         print '%s does not exists' %filename
     else:
         if band is '':
             band = 1
-        Data = f.GetRasterBand(band).ReadAsArray()
+        if window is None:
+            Data = f.GetRasterBand(band).ReadAsArray()
+        else:
+            Start_x, End_x, Start_y, End_y = Limit_window(window, f.RasterXSize, f.RasterYSize)
+            Data = f.GetRasterBand(band).ReadAsArray(Start_x, Start_y, End_x - Start_x, End_y - Start_y)
     return(Data)
 
 def Open_nc_info(NC_filename, Var = None):
@@ -82,9 +110,7 @@ def Open_nc_info(NC_filename, Var = None):
         string that defines the input nc file
 
     """
-    from netCDF4 import Dataset
-
-    fh = Dataset(NC_filename, mode='r')
+    fh, Time_axis = Open_nc_handle(NC_filename)
 
     if Var is None:
         Var = fh.variables.keys()[-1]
@@ -110,7 +136,6 @@ def Open_nc_info(NC_filename, Var = None):
     proj = crso.projection
     epsg = Get_epsg(proj, extension = 'GEOGCS')
     geo_out = tuple([Geo1, Geo2, 0, Geo4, 0, Geo6])
-    fh.close()
 
     return(geo_out, epsg, size_X, size_Y, size_Z, Time)
 
@@ -129,42 +154,31 @@ def Open_nc_array(NC_filename, Var = None, Startdate = '', Enddate = ''):
     Enddate -- "yyyy-mm-dd"
         Defines the enddate (default is from end of array)
     """
-    from netCDF4 import Dataset
-
-    fh = Dataset(NC_filename, mode='r')
+    fh, Time = Open_nc_handle(NC_filename)
     if Var == None:
         Var = fh.variables.keys()[-1]
 
     if Startdate is not '':
-        Time = fh.variables['time'][:]
-        Array_check_start = np.ones(np.shape(Time))
         Date = pd.Timestamp(Startdate)
         Startdate_ord = Date.toordinal()
-        Array_check_start[Time >= Startdate_ord] = 0
-        Start = np.sum(Array_check_start)
+        Start = np.count_nonzero(Time < Startdate_ord)
     else:
         Start = 0
 
     if Enddate is not '':
-        Time = fh.variables['time'][:]
-        Array_check_end = np.zeros(np.shape(Time))
         Date = pd.Timestamp(Enddate)
         Enddate_ord = Date.toordinal()
-        Array_check_end[Enddate_ord >= Time] = 1
-        End = np.sum(Array_check_end)
+        End = np.count_nonzero(Enddate_ord >= Time)
+    elif Time is not None:
+        End = len(Time)
     else:
-        try:
-            Time = fh.variables['time'][:]
-            End = len(Time)
-        except:
-            End = ''
+        End = ''
 
     if (Enddate is not '' or Startdate is not ''):
         Data = fh.variables[Var][int(Start):int(End), :, :]
 
     else:
         Data = fh.variables[Var][:]
-    fh.close()
 
     Data = np.array(Data)
     try:
@@ -174,6 +188,82 @@ def Open_nc_array(NC_filename, Var = None, Startdate = '', Enddate = ''):
 
     return(Data)
 
+def Open_nc_handle(NC_filename):
+    """
+    Opening a nc file for reading and its time axis. The handles are kept
+    open in a small cache of this process, so repeated reads of the same file
+    only read the data. A handle is reopened when the modification time or
+    size of the file changes. Writers must call Close_nc_handle before they
+    open the file, because a file cannot be opened for writing while it is
+    open for reading.
+
+    Keyword Arguments:
+    NC_filename -- 'C:/file/to/path/file.nc'
+        string that defines the input nc file
+
+    Returns:
+    fh -- the open netCDF4 Dataset (do not close it)
+    Time -- numpy array with the time axis (ordinal), or None if the file
+        has no time variable
+    """
+    from netCDF4 import Dataset
+
+    # Handles of a parent process can not be used after a fork
+    if NC_Handles_Pid[0] != os.getpid():
+        NC_Handles.clear()
+        NC_Handles_Pid[0] = os.getpid()
+
+    Path = os.path.abspath(NC_filename)
+    Status = os.stat(Path)
+    Stamp = (Status.st_mtime, Status.st_size)
+
+    # Use the cached handle if the file is not changed
+    Cached = NC_Handles.pop(Path, None)
+    if Cached is not None:
+        if Cached[0] == Stamp:
+            NC_Handles[Path] = Cached
+            return(Cached[1], Cached[2])
+        Cached[1].close()
+
+    fh = Dataset(Path, mode='r')
+    if 'time' in fh.variables:
+        Time = np.array(fh.variables['time'][:])
+    else:
+        Time = None
+    NC_Handles[Path] = (Stamp, fh, Time)
+
+    # Close the least recently used handles
+    while len(NC_Handles) > NC_Handles_Max:
+        Path_old, Cached_old = NC_Handles.popitem(last = False)
+        Cached_old[1].close()
+
+    return(fh, Time)
+
+def Close_nc_handle(NC_filename = None):
+    """
+    Closing the cached handle of a nc file (see Open_nc_handle), or all
+    cached handles if no file is given.
+
+    Keyword Arguments:
+    NC_filename -- 'C:/file/to/path/file.nc'
+        string that defines the nc file
+    """
+    if NC_Handles_Pid[0] != os.getpid():
+        NC_Handles.clear()
+        NC_Handles_Pid[0] = os.getpid()
+
+    if NC_filename is None:
+        Paths = NC_Handles.keys()
+    else:
+        Paths = [os.path.abspath(NC_filename)]
+
+    for Path in Paths:
+        Cached = NC_Handles.pop(Path, None)
+        if Cached is not None:
+            Cached[1].close()
+
+    return()
+
 def Open_ncs_array(NC_Directory, Var, Startdate, Enddate):
     """
     Opening a nc array.
@@ -233,9 +323,6 @@ def Open_nc_dict(input_netcdf, group_name, startdate = '', enddate = ''):
     Enddate -- "yyyy-mm-dd"
         Defines the enddate (default is from end of array)
     """
-    from netCDF4 import Dataset
-    import re
-
     # sort out if the dataset is static or dynamic (written in group_name)
     kind_of_data = group_name.split('_')[-1]
 
@@ -245,31 +332,19 @@ def Open_nc_dict(input_netcdf, group_name, startdate = '', enddate = ''):
         Amount_months = len(time_dates)
 
     # Open the input netcdf and the wanted group name
-    in_nc = Dataset(input_netcdf)
+    in_nc, Time = Open_nc_handle(input_netcdf)
     data = in_nc.groups[group_name]
 
-    # Convert the string into a string that can be retransformed into a dictionary
-    string_dict = str(data)
-    split_dict = str(string_dict.split('\n')[2:-4])
-    split_dict = split_dict.replace("'","")
-    split_dict = split_dict[1:-1]
-    dictionary = dict()
-    split_dict_split = re.split(':|,  ',split_dict)
+    # Load all the arrays at once if the dictionary is saved as a ragged array
+    if getattr(data, 'storage', '') == 'ragged':
+        keys, offsets, values = Open_nc_ragged(input_netcdf, group_name)
+        dictionary = dict(zip(keys.tolist(), np.split(values, offsets[1:-1], axis = -1)))
 
-    # Loop over every attribute and add the array
-    for i in range(0,len(split_dict_split)):
-        number_val = split_dict_split[i]
-        if i % 2 == 0:
-            Array_text = split_dict_split[i + 1].replace(",","")
-            Array_text = Array_text.replace("[","")
-            Array_text = Array_text.replace("]","")
-            # If the array is dynamic add a 2D array
-            if kind_of_data == 'dynamic':
-                tot_length = len(np.fromstring(Array_text,sep = ' '))
-                dictionary[int(number_val)] = np.fromstring(Array_text,sep = ' ').reshape((Amount_months, tot_length/Amount_months))
-            # If the array is static add a 1D array
-            else:
-                dictionary[int(number_val)] = np.fromstring(Array_text,sep = ' ')
+    # Dictionaries of older versions are saved as strings in the attributes
+    else:
+        if kind_of_data != 'dynamic':
+            Amount_months = None
+        dictionary = Parse_nc_dict_string(str(data), Amount_months)
 
     # Clip the dynamic dataset if a start and enddate is defined
     if kind_of_data == 'dynamic':
@@ -306,28 +381,123 @@ def Open_nc_dict(input_netcdf, group_name, startdate = '', enddate = ''):
                 Array = dictionary[key][:,:]
                 Array_new = Array[int(Start):int(End),:]
                 dictionary[key] = Array_new
-    in_nc.close()
 
     return(dictionary)
 
+def Parse_nc_dict_string(string_dict, Amount_months = None):
+    """
+    Convert the string of a nc group with the arrays of a dictionary as
+    attributes into the dictionary.
+
+    Keyword Arguments:
+    string_dict -- string
+        String of the nc group (str(group))
+    Amount_months -- integer
+        Length of the time axis of a dynamic dictionary, None if static
+    """
+    import re
+
+    # Convert the string into a string that can be retransformed into a dictionary
+    split_dict = str(string_dict.split('\n')[2:-4])
+    split_dict = split_dict.replace("'","")
+    split_dict = split_dict[1:-1]
+    dictionary = dict()
+    split_dict_split = re.split(':|,  ',split_dict)
+
+    # Loop over every attribute and add the array
+    for i in range(0,len(split_dict_split)):
+        number_val = split_dict_split[i]
+        if i % 2 == 0:
+            Array_text = split_dict_split[i + 1].replace(",","")
+            Array_text = Array_text.replace("[","")
+            Array_text = Array_text.replace("]","")
+            # If the array is dynamic add a 2D array
+            if Amount_months is not None:
+                tot_length = len(np.fromstring(Array_text,sep = ' '))
+                dictionary[int(number_val)] = np.fromstring(Array_text,sep = ' ').reshape((Amount_months, tot_length/Amount_months))
+            # If the array is static add a 1D array
+            else:
+                dictionary[int(number_val)] = np.fromstring(Array_text,sep = ' ')
+
+    return(dictionary)
+
+def Open_nc_ragged(input_netcdf, group_name):
+    """
+    Opening a nc dictionary that is saved as a ragged array (see
+    data_conversions.Add_NC_Dict) at once.
+
+    Keyword Arguments:
+    input_netcdf -- 'C:/file/to/path/file.nc'
+        string that defines the input nc file
+    group_name -- string
+        Defines the group name that must be opened.
+
+    Returns:
+    keys -- array with the sorted keys of the dictionary
+    offsets -- array, the array of keys[i] is values[..., offsets[i]:offsets[i+1]]
+    values -- array with all the arrays of the dictionary after each other
+              (the last axis), dynamic dictionaries have time as the first axis
+    """
+    in_nc, Time = Open_nc_handle(input_netcdf)
+    data = in_nc.groups[group_name]
+
+    if len(data.dimensions['keys']) == 0:
+        return(np.zeros(0, dtype = np.int64), np.zeros(1, dtype = np.int64), np.zeros(0))
+
+    keys = data.variables['keys'][:]
+    offsets = data.variables['offsets'][:]
+    values = np.asarray(data.variables['values'][:])
+
+    return(np.asarray(keys), np.asarray(offsets), values)
+
+def Open_nc_dict_value(input_netcdf, group_name, key):
+    """
+    Opening the array of one key of a nc dictionary that is saved as a ragged
+    array, only this array is read from the nc file.
+
+    Keyword Arguments:
+    input_netcdf -- 'C:/file/to/path/file.nc'
+        string that defines the input nc file
+    group_name -- string
+        Defines the group name that must be opened.
+    key -- integer
+        Defines the key of the dictionary that must be opened.
+    """
+    in_nc, Time = Open_nc_handle(input_netcdf)
+    data = in_nc.groups[group_name]
+
+    keys = np.asarray(data.variables['keys'][:])
+    i = np.searchsorted(keys, key)
+    if i == len(keys) or keys[i] != key:
+        raise KeyError(key)
+    Start, End = np.asarray(data.variables['offsets'][i:i + 2])
+
+    return(np.asarray(data.variables['values'][..., int(Start):int(End)]))
+
 def Clip_Dataset_GDAL(input_name, output_name, latlim, lonlim):
     """
-    Clip the data to the defined extend of the user (latlim, lonlim) by using the gdal_translate executable of gdal.
+    Clip the data to the defined extend of the user (latlim, lonlim) by using gdal_translate.
 
     Keyword Arguments:
-    input_name -- input data, input directory and filename of the tiff file
+    input_name -- input data, input directory and filename of the tiff file or a gdal file
     output_name -- output data, output filename of the clipped file
     latlim -- [ymin, ymax]
     lonlim -- [xmin, xmax]
     """
-    # Get environmental variable
-    WA_env_paths = os.environ["WA_PATHS"].split(';')
-    GDAL_env_path = WA_env_paths[0]
-    GDALTRANSLATE_PATH = os.path.join(GDAL_env_path, 'gdal_translate.exe')
+    if GDAL_Utilities:
+        # The returned dataset is not kept, so it is closed and written at once
+        gdal.Translate(output_name, input_name, format = 'GTiff',
+                       projWin = [lonlim[0], latlim[1], lonlim[1], latlim[0]])
+
+    else:
+        # Get environmental variable
+        WA_env_paths = os.environ["WA_PATHS"].split(';')
+        GDAL_env_path = WA_env_paths[0]
+        GDALTRANSLATE_PATH = os.path.join(GDAL_env_path, 'gdal_translate.exe')
 
-    # find path to the executable
-    fullCmd = ' '.join(["%s" %(GDALTRANSLATE_PATH), '-projwin %s %s %s %s -of GTiff %s %s'  %(lonlim[0], latlim[1], lonlim[1], latlim[0], input_name, output_name)])
-    Run_command_window(fullCmd)
+        # find path to the executable
+        fullCmd = ' '.join(["%s" %(GDALTRANSLATE_PATH), '-projwin %s %s %s %s -of GTiff %s %s'  %(lonlim[0], latlim[1], lonlim[1], latlim[0], input_name, output_name)])
+        Run_command_window(fullCmd)
 
     return()
 
@@ -349,31 +519,64 @@ def clip_data(input_file, latlim, lonlim):
     except:
         dest_in = input_file
 
-    # Open Array
-    data_in = dest_in.GetRasterBand(1).ReadAsArray()
-
     # Define the array that must remain
-    Geo_in = dest_in.GetGeoTransform()
-    Geo_in = list(Geo_in)
-    Start_x = np.max([int(np.ceil(((lonlim[0]) - Geo_in[0])/ Geo_in[1])),0])
-    End_x = np.min([int(np.floor(((lonlim[1]) - Geo_in[0])/ Geo_in[1])),int(dest_in.RasterXSize)])
-
-    Start_y = np.max([int(np.floor((Geo_in[3] - latlim[1])/ -Geo_in[5])),0])
-    End_y = np.min([int(np.ceil(((latlim[0]) - Geo_in[3])/Geo_in[5])), int(dest_in.RasterYSize)])
+    Geo_in = list(dest_in.GetGeoTransform())
+    Start_x, End_x, Start_y, End_y = Get_window(Geo_in, dest_in.RasterXSize, dest_in.RasterYSize, latlim, lonlim)
 
     #Create new GeoTransform
     Geo_in[0] = Geo_in[0] + Start_x * Geo_in[1]
     Geo_in[3] = Geo_in[3] + Start_y * Geo_in[5]
     Geo_out = tuple(Geo_in)
 
-    data = np.zeros([End_y - Start_y, End_x - Start_x])
-
-    data = data_in[Start_y:End_y,Start_x:End_x]
+    # Open only the window of the array
+    data = dest_in.GetRasterBand(1).ReadAsArray(Start_x, Start_y, End_x - Start_x, End_y - Start_y)
     dest_in = None
 
     return(data, Geo_out)
 
 
+def Get_window(Geo_in, size_X, size_Y, latlim, lonlim):
+    """
+    Get the pixel window of a raster that covers the extend of the user
+    (latlim, lonlim), the window is limited to the size of the raster
+
+    Keyword Arguments:
+    Geo_in -- geotransform of the raster
+    size_X -- number of columns of the raster
+    size_Y -- number of rows of the raster
+    latlim -- [ymin, ymax]
+    lonlim -- [xmin, xmax]
+
+    Returns:
+    [Start_x, End_x, Start_y, End_y], the first and last (excluded) column and row
+    """
+    Start_x = int(np.ceil(((lonlim[0]) - Geo_in[0])/ Geo_in[1]))
+    End_x = int(np.floor(((lonlim[1]) - Geo_in[0])/ Geo_in[1]))
+    Start_y = int(np.floor((Geo_in[3] - latlim[1])/ -Geo_in[5]))
+    End_y = int(np.ceil(((latlim[0]) - Geo_in[3])/Geo_in[5]))
+
+    return(Limit_window([Start_x, End_x, Start_y, End_y], size_X, size_Y))
+
+
+def Limit_window(window, size_X, size_Y):
+    """
+    Limit a pixel window to the size of the raster, the same way a numpy slice
+    is limited
+
+    Keyword Arguments:
+    window -- [Start_x, End_x, Start_y, End_y]
+    size_X -- number of columns of the raster
+    size_Y -- number of rows of the raster
+    """
+    Start_x, End_x, Start_y, End_y = [int(i) for i in window]
+    Start_x = np.min([np.max([Start_x, 0]), int(size_X)])
+    End_x = np.max([np.min([End_x, int(size_X)]), Start_x])
+    Start_y = np.min([np.max([Start_y, 0]), int(size_Y)])
+    End_y = np.max([np.min([End_y, int(size_Y)]), Start_y])
+
+    return([int(Start_x), int(End_x), int(Start_y), int(End_y)])
+
+
 def reproject_dataset_epsg(dataset, pixel_spacing, epsg_to, method = 2):
     """
     A sample function to reproject and resample a GDAL dataset from within
@@ -487,17 +690,46 @@ def reproject_MODIS(input_name, epsg_to):
     # Define the output name
     name_out = ''.join(input_name.split(".")[:-1]) + '_reprojected.tif'
 
-    # Get environmental variable
-    WA_env_paths = os.environ["WA_PATHS"].split(';')
-    GDAL_env_path = WA_env_paths[0]
-    GDALWARP_PATH = os.path.join(GDAL_env_path, 'gdalwarp.exe')
+    if GDAL_Utilities:
+        # The returned dataset is not kept, so it is closed and written at once
+        gdal.Warp(name_out, input_name, format = 'GTiff',
+                  srcSRS = MODIS_Projection, dstSRS = 'EPSG:%s' %epsg_to)
+
+    else:
+        # Get environmental variable
+        WA_env_paths = os.environ["WA_PATHS"].split(';')
+        GDAL_env_path = WA_env_paths[0]
+        GDALWARP_PATH = os.path.join(GDAL_env_path, 'gdalwarp.exe')
 
-    # find path to the executable
-    fullCmd = ' '.join(["%s" %(GDALWARP_PATH), '-overwrite -s_srs "+proj=sinu +lon_0=0 +x_0=0 +y_0=0 +a=6371007.181 +b=6371007.181 +units=m +no_defs"', '-t_srs EPSG:%s -of GTiff' %(epsg_to), input_name, name_out])
-    Run_command_window(fullCmd)
+        # find path to the executable
+        fullCmd = ' '.join(["%s" %(GDALWARP_PATH), '-overwrite -s_srs "%s"' %MODIS_Projection, '-t_srs EPSG:%s -of GTiff' %(epsg_to), input_name, name_out])
+        Run_command_window(fullCmd)
 
     return(name_out)
 
+def reproject_MODIS_MEM(input_name, epsg_to):
+    '''
+    Reproject the merged data file into a gdal memory file. The input projection must be the MODIS projection.
+    The output can be used directly by clip_data, so no reprojected tiff file is written.
+
+    Keywords arguments:
+    input_name -- 'C:/file/to/path/file.tif'
+        string that defines the input tiff file
+    epsg_to -- integer
+        The EPSG code of the output dataset
+    '''
+    if GDAL_Utilities:
+        dest = gdal.Warp('', input_name, format = 'MEM',
+                         srcSRS = MODIS_Projection, dstSRS = 'EPSG:%s' %epsg_to)
+
+    else:
+        # Copy the result of the gdalwarp executable into memory
+        name_out = reproject_MODIS(input_name, epsg_to)
+        dest = gdal.GetDriverByName('MEM').CreateCopy('', gdal.Open(name_out))
+        os.remove(name_out)
+
+    return(dest)
+
 def reproject_dataset_example(dataset, dataset_example, method=1):
     """
     A sample function to reproject and resample a GDAL dataset from within
@@ -511,6 +743,89 @@ def reproject_dataset_example(dataset, dataset_example, method=1):
     method -- 1,2,3,4 default = 1
         1 = Nearest Neighbour, 2 = Bilinear, 3 = lanzcos, 4 = average
     """
+    g, epsg_from, gland, epsg_to = Open_reprojection_datasets(dataset, dataset_example)
+
+    # Set the EPSG codes
+    osng = osr.SpatialReference()
+    osng.ImportFromEPSG(epsg_to)
+    wgs84 = osr.SpatialReference()
+    wgs84.ImportFromEPSG(epsg_from)
+
+    # Get shape and geo transform from example
+    geo_land = gland.GetGeoTransform()
+    col=gland.RasterXSize
+    rows=gland.RasterYSize
+
+    # Create new raster
+    mem_drv = gdal.GetDriverByName('MEM')
+    dest1 = mem_drv.Create('', col, rows, 1, gdal.GDT_Float32)
+    dest1.SetGeoTransform(geo_land)
+    dest1.SetProjection(osng.ExportToWkt())
+
+    # Perform the projection/resampling
+    if method is 1:
+        gdal.ReprojectImage(g, dest1, wgs84.ExportToWkt(), osng.ExportToWkt(), gdal.GRA_NearestNeighbour)
+    if method is 2:
+        gdal.ReprojectImage(g, dest1, wgs84.ExportToWkt(), osng.ExportToWkt(), gdal.GRA_Bilinear)
+    if method is 3:
+        gdal.ReprojectImage(g, dest1, wgs84.ExportToWkt(), osng.ExportToWkt(), gdal.GRA_Lanczos)
+    if method is 4:
+        gdal.ReprojectImage(g, dest1, wgs84.ExportToWkt(), osng.ExportToWkt(), gdal.GRA_Average)
+    return(dest1)
+
+def reproject_array_example(dataset, dataset_example, method=1, Fill=0.0, Plan_Folder=None, Array=None, NoDataValue=None):
+    """
+    This function reprojects and resamples a dataset to the grid of an example
+    dataset and returns the array. The indices and weights of the resampling
+    are calculated once per source grid, example grid and method (see
+    wa.General.reprojection_plan), so a stack of files on the same grid is
+    resampled with numpy only.
+
+    Keywords arguments:
+    dataset -- 'C:/file/to/path/file.tif' or a gdal file (gdal.Open(filename))
+        string that defines the input tiff file or gdal file
+    dataset_example -- 'C:/file/to/path/file.tif' or '.nc' or a gdal file
+        string that defines the example tiff file or gdal file
+    method -- 1,2,3,4 default = 1
+        1 = Nearest Neighbour, 2 = Bilinear, 3 = lanzcos (by gdal), 4 = average
+    Fill -- value of the pixels without data (default 0 as in reproject_dataset_example)
+    Plan_Folder -- 'C:/file/to/path/' where the plans are stored (optional)
+    Array -- array on the grid of the dataset that is resampled instead of
+        the data of the dataset (optional)
+    NoDataValue -- no data value of Array (optional)
+    """
+    import wa.General.reprojection_plan as RP
+
+    # Lanczos is not available as a plan
+    if method not in RP.Methods and Array is None:
+        dest = reproject_dataset_example(dataset, dataset_example, method)
+        return(dest.GetRasterBand(1).ReadAsArray())
+
+    g, epsg_from, gland, epsg_to = Open_reprojection_datasets(dataset, dataset_example)
+
+    plan = RP.Get_plan(g.GetGeoTransform(), epsg_from, [g.RasterXSize, g.RasterYSize],
+                       gland.GetGeoTransform(), epsg_to, [gland.RasterXSize, gland.RasterYSize],
+                       method, Plan_Folder)
+
+    if Array is None:
+        band = g.GetRasterBand(1)
+        Array = band.ReadAsArray()
+        NoDataValue = band.GetNoDataValue()
+
+    Array_out = plan.Apply(Array, NoDataValue, Fill)
+
+    # Same precision as the memory file of reproject_dataset_example
+    return(np.float32(Array_out))
+
+def Open_reprojection_datasets(dataset, dataset_example):
+    """
+    This function opens the dataset that must be reprojected and the example
+    dataset, and returns them with their EPSG codes
+
+    Keywords arguments:
+    dataset -- 'C:/file/to/path/file.tif' or a gdal file (gdal.Open(filename))
+    dataset_example -- 'C:/file/to/path/file.tif' or '.nc' or a gdal file
+    """
     # open dataset that must be transformed
     try:
         if os.path.splitext(dataset)[-1] == '.tif':
@@ -542,33 +857,7 @@ def reproject_dataset_example(dataset, dataset_example, method=1):
             gland = dataset_example
             epsg_to = Get_epsg(gland)
 
-    # Set the EPSG codes
-    osng = osr.SpatialReference()
-    osng.ImportFromEPSG(epsg_to)
-    wgs84 = osr.SpatialReference()
-    wgs84.ImportFromEPSG(epsg_from)
-
-    # Get shape and geo transform from example
-    geo_land = gland.GetGeoTransform()
-    col=gland.RasterXSize
-    rows=gland.RasterYSize
-
-    # Create new raster
-    mem_drv = gdal.GetDriverByName('MEM')
-    dest1 = mem_drv.Create('', col, rows, 1, gdal.GDT_Float32)
-    dest1.SetGeoTransform(geo_land)
-    dest1.SetProjection(osng.ExportToWkt())
-
-    # Perform the projection/resampling
-    if method is 1:
-        gdal.ReprojectImage(g, dest1, wgs84.ExportToWkt(), osng.ExportToWkt(), gdal.GRA_NearestNeighbour)
-    if method is 2:
-        gdal.ReprojectImage(g, dest1, wgs84.ExportToWkt(), osng.ExportToWkt(), gdal.GRA_Bilinear)
-    if method is 3:
-        gdal.ReprojectImage(g, dest1, wgs84.ExportToWkt(), osng.ExportToWkt(), gdal.GRA_Lanczos)
-    if method is 4:
-        gdal.ReprojectImage(g, dest1, wgs84.ExportToWkt(), osng.ExportToWkt(), gdal.GRA_Average)
-    return(dest1)
+    return(g, epsg_from, gland, epsg_to)
 
 def resize_array_example(Array_in, Array_example, method=1):
     """
@@ -643,13 +932,19 @@ def Get_epsg(g, extension = 'tiff'):
        #print 'Was not able to get the projection, so WGS84 is assumed'
     return(epsg_to)
 
-def gap_filling(dataset,NoDataValue, method = 1):
+def gap_filling(dataset,NoDataValue, method = 1, Write_tiff = True):
     """
     This function fills the no data gaps in a numpy array
 
     Keyword arguments:
     dataset -- 'C:/'  path to the source data (dataset that must be filled)
     NoDataValue -- Value that must be filled
+    method -- 1,2,3 default = 1
+        1 = Nearest Neighbour, 2 = Linear,
+        3 = Nearest Neighbour by a distance transform, the fill indices are
+        reused for every dataset with the same no data pixels
+    Write_tiff -- True: a tiff input is filled into a '_GF.tif' file and the
+        name of this file is returned, False: the filled array is returned
     """
     import wa.General.data_conversions as DC
 
@@ -657,7 +952,7 @@ def gap_filling(dataset,NoDataValue, method = 1):
         if dataset.split('.')[-1] == 'tif':
             # Open the numpy array
             data = Open_tiff_array(dataset)
-            Save_as_tiff = 1
+            Save_as_tiff = int(Write_tiff)
         else:
             data = dataset
             Save_as_tiff = 0
@@ -670,9 +965,16 @@ def gap_filling(dataset,NoDataValue, method = 1):
         mask = ~(np.isnan(data))
     else:
         mask = ~(data==NoDataValue)
-    xx, yy = np.meshgrid(np.arange(data.shape[1]), np.arange(data.shape[0]))
-    xym = np.vstack( (np.ravel(xx[mask]), np.ravel(yy[mask])) ).T
-    data0 = np.ravel( data[:,:][mask] )
+
+    if method == 3:
+        data_end = np.array(data)
+        Gaps, Sources = Get_fill_indices(mask)
+        data_end.flat[Gaps] = data_end.flat[Sources]
+
+    else:
+        xx, yy = np.meshgrid(np.arange(data.shape[1]), np.arange(data.shape[0]))
+        xym = np.vstack( (np.ravel(xx[mask]), np.ravel(yy[mask])) ).T
+        data0 = np.ravel( data[:,:][mask] )
 
     if method == 1:
         interp0 = scipy.interpolate.NearestNDInterpolator( xym, data0 )
@@ -696,6 +998,34 @@ def gap_filling(dataset,NoDataValue, method = 1):
 
     return (EndProduct)
 
+def Get_fill_indices(mask):
+    """
+    This function returns the flat indices of the no data pixels and of the
+    nearest pixels with data, calculated by a distance transform. The indices
+    are kept for the last GF_Indices_Max masks of this process.
+
+    Keyword arguments:
+    mask -- [array], True for the pixels with data
+    """
+    Key = (mask.shape, hashlib.sha1(np.packbits(mask)).hexdigest())
+    Cached = GF_Indices.pop(Key, None)
+
+    if Cached is None:
+        Gaps = np.flatnonzero(~mask)
+        if len(Gaps) == 0 or len(Gaps) == mask.size:
+            # nothing to fill or no pixel to fill from
+            Sources = Gaps
+        else:
+            Indices = scipy.ndimage.distance_transform_edt(~mask, return_distances = False, return_indices = True)
+            Sources = np.ravel_multi_index(Indices.reshape(2, -1)[:, Gaps], mask.shape)
+        Cached = (Gaps, Sources)
+
+    GF_Indices[Key] = Cached
+    while len(GF_Indices) > GF_Indices_Max:
+        GF_Indices.popitem(last = False)
+
+    return(Cached)
+
 def Get3Darray_time_series_monthly(Data_Path, Startdate, Enddate, Example_data = None):
     """
     This function creates a datacube
@@ -711,11 +1041,10 @@ def Get3Darray_time_series_monthly(Data_Path, Startdate, Enddate, Example_data =
         str: Path to an example tiff file (all arrays will be reprojected to this example)
     """
 
+    import wa.General.raster_catalog as RCat
+
     # Get a list of dates that needs to be reprojected
     Dates = pd.date_range(Startdate, Enddate, freq = 'MS')
-
-    # Change Working directory
-    os.chdir(Data_Path)
     i = 0
 
     # Loop over the months
@@ -724,11 +1053,11 @@ def Get3Darray_time_series_monthly(Data_Path, Startdate, Enddate, Example_data =
         # Create the end monthly file name
         End_tiff_file_name = 'monthly_%d.%02d.01.tif' %(Date.year, Date.month)
 
-        # Search for this file in directory
-        file_name = glob.glob('*%s' %End_tiff_file_name)
+        # Search for this file in the catalog of the directory
+        file_name = RCat.Find(Data_Path, '*%s' %End_tiff_file_name)
 
         # Select the first file that is found
-        file_name_path = os.path.join(Data_Path, file_name[0])
+        file_name_path = file_name[0]
 
         # Check if an example file is selected
         if Example_data is not None:
@@ -767,9 +1096,8 @@ def Get3Darray_time_series_monthly(Data_Path, Startdate, Enddate, Example_data =
                 else:
                     gland = Example_data
 
-            # reproject dataset
-            dest = reproject_dataset_example(file_name_path, gland, method = 4)
-            Array_one_date = dest.GetRasterBand(1).ReadAsArray()
+            # reproject dataset (all the dates share one reprojection plan)
+            Array_one_date = reproject_array_example(file_name_path, gland, method = 4)
 
         # if there is no example dataset defined
         else:
@@ -853,13 +1181,47 @@ def Moving_average(dataset, Moving_front, Moving_back):
     Moving_front -- Amount of time steps that must be considered in the front of the current month
     Moving_back -- Amount of time steps that must be considered in the back of the current month
     """
+    dataset_out = Moving_averages(dataset, [Moving_front], Moving_back)[Moving_front]
 
-    dataset_out = np.zeros((int(np.shape(dataset)[0]) - Moving_back - Moving_front, int(np.shape(dataset)[1]), int(np.shape(dataset)[2])))
+    return(dataset_out)
 
-    for i in range(Moving_back, (int(np.shape(dataset)[0]) - Moving_front)):
-        dataset_out[i - Moving_back,:,:] = np.nanmean(dataset[i - Moving_back : i + 1 + Moving_front, :,:], 0)
 
-    return(dataset_out)
+def Moving_averages(dataset, Moving_fronts, Moving_back = 0):
+    """
+    This function applies the moving averages with several window lengths over
+    a 3D matrix called dataset. The sums and the amount of values (not nan)
+    are accumulated once over the time axis, so every window is the
+    difference of two accumulated values. The nan values are ignored, a
+    window without values is nan.
+
+    Keyword Arguments:
+    dataset -- 3D matrix [time, ysize, xsize]
+    Moving_fronts -- list of the amounts of time steps that must be considered in the front of the current month
+    Moving_back -- Amount of time steps that must be considered in the back of the current month
+
+    Returns:
+    dictionary {Moving_front: 3D matrix [time - Moving_back - Moving_front, ysize, xsize]}
+    """
+    dataset = np.asarray(dataset, dtype = np.float64)
+    Valid = ~np.isnan(dataset)
+
+    # accumulated sums and amount of values, with a zero in front
+    Sums = np.zeros((dataset.shape[0] + 1,) + dataset.shape[1:])
+    np.cumsum(np.where(Valid, dataset, 0.), axis = 0, out = Sums[1:])
+    Counts = np.zeros((dataset.shape[0] + 1,) + dataset.shape[1:], dtype = np.int32)
+    np.cumsum(Valid, axis = 0, dtype = np.int32, out = Counts[1:])
+
+    dataset_outs = dict()
+    for Moving_front in Moving_fronts:
+        Length = Moving_back + Moving_front + 1
+        Sum = Sums[Length:] - Sums[:-Length]
+        Count = Counts[Length:] - Counts[:-Length]
+        with np.errstate(invalid = 'ignore', divide = 'ignore'):
+            dataset_out = Sum / Count
+        dataset_out[Count == 0] = np.nan
+        dataset_outs[Moving_front] = dataset_out
+
+    return(dataset_outs)
 
 
 def Get_ordinal(Startdate, Enddate, freq = 'MS'):
@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+"""
+Authors: Tim Hessels
+         UNESCO-IHE 2018
+Contact: t.hessels@unesco-ihe.org
+Repository: https://github.com/wateraccounting/wa
+Module: General
+
+Description:
+Reprojection plans for stacks of rasters on a shared grid. A plan contains,
+for every pixel of the target grid, the indices of the source pixels and their
+weights. It is calculated once per source grid, target grid and method, is
+stored on disk, and resamples any number of arrays with numpy only.
+"""
+# General modules
+import os
+import hashlib
+import tempfile
+import numpy as np
+import osr
+
+# Plans of this process and the folder where the plans are stored
+Plans = dict()
+Plan_Folder = os.path.join(tempfile.gettempdir(), 'wa_reprojection_plans')
+
+# Methods that can be calculated with a plan (as in reproject_dataset_example)
+Methods = {1: 'nearest', 2: 'bilinear', 4: 'average'}
+
+
+class Reprojection_Plan(object):
+    """
+    This class resamples arrays from a source grid to a target grid with
+    precalculated indices and weights.
+
+    Example:
+    plan = Reprojection_Plan(geo_in, 4326, [size_X, size_Y], geo_out, 4326, [size_X_out, size_Y_out], 4)
+    Array_out = plan.Apply(Array_in, NoDataValue = -9999)
+    """
+    def __init__(self, geo_in, epsg_from, size_in, geo_out, epsg_to, size_out, method = 1):
+        """
+        Keyword arguments:
+        geo_in -- geotransform of the source grid
+        epsg_from -- integer, EPSG code of the source grid
+        size_in -- [size_X, size_Y] of the source grid
+        geo_out -- geotransform of the target grid
+        epsg_to -- integer, EPSG code of the target grid
+        size_out -- [size_X, size_Y] of the target grid
+        method -- 1 = Nearest Neighbour, 2 = Bilinear, 4 = average
+        """
+        if method not in Methods:
+            raise ValueError('Method %s can not be used in a reprojection plan' %method)
+
+        self.geo_in = tuple(float(value) for value in geo_in)
+        self.epsg_from = int(epsg_from)
+        self.size_in = (int(size_in[0]), int(size_in[1]))
+        self.geo_out = tuple(float(value) for value in geo_out)
+        self.epsg_to = int(epsg_to)
+        self.size_out = (int(size_out[0]), int(size_out[1]))
+        self.method = int(method)
+        self.Index = None
+        self.Weights = None
+
+    def Key(self):
+        """
+        This function returns the name of the plan, which is based on the
+        grids and the method
+        """
+        key = hashlib.md5()
+        key.update(repr((['%.12g' %value for value in self.geo_in], self.epsg_from, self.size_in,
+                         ['%.12g' %value for value in self.geo_out], self.epsg_to, self.size_out,
+                         self.method)))
+        return('Plan_%s_%s' %(Methods[self.method], key.hexdigest()[:16]))
+
+    def Compute(self):
+        """
+        This function calculates the indices and weights of the source pixels
+        for every target pixel
+        """
+        size_X, size_Y = self.size_out
+        rows, cols = np.indices((size_Y, size_X), dtype = np.float64)
+
+        if self.method == 4:
+            # The corners of the target pixels
+            Col_corners = []
+            Row_corners = []
+            for dy, dx in [(0, 0), (0, 1), (1, 0), (1, 1)]:
+                Col, Row = self.Source_Pixel(cols + dx, rows + dy)
+                Col_corners.append(Col)
+                Row_corners.append(Row)
+            Col_min, Col_max = np.min(Col_corners, axis = 0), np.max(Col_corners, axis = 0)
+            Row_min, Row_max = np.min(Row_corners, axis = 0), np.max(Row_corners, axis = 0)
+
+            # Overlap of the target pixel with the source columns and rows
+            Col_index, Col_weights = Overlap(Col_min.ravel(), Col_max.ravel(), self.size_in[0])
+            Row_index, Row_weights = Overlap(Row_min.ravel(), Row_max.ravel(), self.size_in[1])
+
+            Index = Row_index[:, :, None] * self.size_in[0] + Col_index[:, None, :]
+            Weights = Row_weights[:, :, None] * Col_weights[:, None, :]
+            Index = Index.reshape(Index.shape[0], -1)
+            Weights = Weights.reshape(Weights.shape[0], -1)
+
+        else:
+            # The centers of the target pixels
+            Col, Row = self.Source_Pixel(cols + 0.5, rows + 0.5)
+            Col = Col.ravel()
+            Row = Row.ravel()
+            Inside = np.logical_and.reduce([Col >= 0, Col < self.size_in[0], Row >= 0, Row < self.size_in[1]])
+
+            if self.method == 1:
+                Col_index = np.floor(np.where(Inside, Col, 0)).astype(np.int64)[:, None]
+                Row_index = np.floor(np.where(Inside, Row, 0)).astype(np.int64)[:, None]
+                Weights = np.float64(Inside)[:, None]
+
+            else:
+                # The four source pixel centers around the target pixel center
+                Col = np.where(Inside, Col, 0) - 0.5
+                Row = np.where(Inside, Row, 0) - 0.5
+                Col_left = np.floor(Col)
+                Row_top = np.floor(Row)
+                Col_fraction = Col - Col_left
+                Row_fraction = Row - Row_top
+
+                Col_index = np.int64(Col_left)[:, None] + np.array([0, 1, 0, 1])[None, :]
+                Row_index = np.int64(Row_top)[:, None] + np.array([0, 0, 1, 1])[None, :]
+                Weights = np.column_stack([(1 - Col_fraction) * (1 - Row_fraction),
+                                           Col_fraction * (1 - Row_fraction),
+                                           (1 - Col_fraction) * Row_fraction,
+                                           Col_fraction * Row_fraction])
+                Weights[~Inside, :] = 0
+
+            # Neighbours outside the source grid are not used
+            Outside = np.logical_or.reduce([Col_index < 0, Col_index >= self.size_in[0],
+                                            Row_index < 0, Row_index >= self.size_in[1]])
+            Weights[Outside] = 0
+            Index = np.where(Outside, 0, Row_index * self.size_in[0] + Col_index)
+
+        # Remove the columns that are never used
+        Used = np.any(Weights > 0, axis = 0)
+        if not np.any(Used):
+            Used[0] = True
+        self.Index = np.where(Weights[:, Used] > 0, Index[:, Used], 0).astype(np.int64)
+        self.Weights = Weights[:, Used]
+
+        return(self)
+
+    def Source_Pixel(self, cols, rows):
+        """
+        This function returns the (fractional) column and row in the source
+        grid of target pixel coordinates
+
+        Keyword arguments:
+        cols -- array, columns in the target grid
+        rows -- array, rows in the target grid
+        """
+        geo = self.geo_out
+        X = geo[0] + cols * geo[1] + rows * geo[2]
+        Y = geo[3] + cols * geo[4] + rows * geo[5]
+
+        # Transform the coordinates if the projections are different
+        if self.epsg_from != self.epsg_to:
+            X, Y = Transform_Coordinates(X, Y, self.epsg_to, self.epsg_from)
+
+        geo = self.geo_in
+        Col = (X - geo[0]) / geo[1]
+        Row = (Y - geo[3]) / geo[5]
+
+        return(Col, Row)
+
+    def Apply(self, Array, NoDataValue = None, Fill = 0.0):
+        """
+        This function resamples a 2D array [y, x] or a 3D array [time, y, x]
+        of the source grid to the target grid
+
+        Keyword arguments:
+        Array -- numpy array on the source grid
+        NoDataValue -- value of the source pixels that are not used (NaN
+                       values are never used)
+        Fill -- value of the target pixels without valid source pixels (0 as
+                the pixels that are not written by gdal.ReprojectImage)
+        """
+        if self.Index is None:
+            self.Compute()
+
+        Array = np.asarray(Array, dtype = np.float64)
+        Dimensions = Array.ndim
+        if Dimensions == 2:
+            Array = Array[None, :, :]
+
+        size_X, size_Y = self.size_out
+        Array_out = np.ones([Array.shape[0], size_Y, size_X]) * Fill
+
+        for i in range(Array.shape[0]):
+            Values = Array[i, :, :].ravel()[self.Index]
+            Valid = np.logical_and(~np.isnan(Values), self.Weights > 0)
+            if NoDataValue is not None:
+                Valid = np.logical_and(Valid, Values != NoDataValue)
+
+            Weights = np.where(Valid, self.Weights, 0)
+            Sum_weights = np.sum(Weights, axis = 1)
+            Sum_values = np.sum(np.where(Valid, Values, 0) * Weights, axis = 1)
+
+            Data_out = Array_out[i, :, :].ravel()
+            Data_out[Sum_weights > 0] = Sum_values[Sum_weights > 0] / Sum_weights[Sum_weights > 0]
+            Array_out[i, :, :] = Data_out.reshape(size_Y, size_X)
+
+        if Dimensions == 2:
+            Array_out = Array_out[0, :, :]
+
+        return(Array_out)
+
+    def Save(self, filename):
+        """
+        This function stores the plan in a npz file, through a temporary file
+        so parallel runs never read half a plan
+        """
+        if self.Index is None:
+            self.Compute()
+
+        filename_temp = '%s.%d.tmp' %(filename, os.getpid())
+        with open(filename_temp, 'wb') as f:
+            np.savez(f, Index = self.Index, Weights = self.Weights)
+        try:
+            os.rename(filename_temp, filename)
+        except OSError:
+            # The plan is already written by another process
+            os.remove(filename_temp)
+
+    def Load(self, filename):
+        """
+        This function reads the indices and weights of the plan from a npz file
+        """
+        Plan_file = np.load(filename)
+        self.Index = Plan_file['Index']
+        self.Weights = Plan_file['Weights']
+        Plan_file.close()
+
+        return(self)
+
+
+def Get_plan(geo_in, epsg_from, size_in, geo_out, epsg_to, size_out, method = 1, Folder = None):
+    """
+    This function returns the plan of the grids and method. The plan is taken
+    from memory or from the plan folder, or is calculated and stored.
+
+    Keyword arguments:
+    geo_in -- geotransform of the source grid
+    epsg_from -- integer, EPSG code of the source grid
+    size_in -- [size_X, size_Y] of the source grid
+    geo_out -- geotransform of the target grid
+    epsg_to -- integer, EPSG code of the target grid
+    size_out -- [size_X, size_Y] of the target grid
+    method -- 1 = Nearest Neighbour, 2 = Bilinear, 4 = average
+    Folder -- 'C:/file/to/path/' where the plans are stored (default is Plan_Folder)
+    """
+    plan = Reprojection_Plan(geo_in, epsg_from, size_in, geo_out, epsg_to, size_out, method)
+    key = plan.Key()
+    if key in Plans:
+        return(Plans[key])
+
+    if Folder is None:
+        Folder = Plan_Folder
+    filename = os.path.join(Folder, '%s.npz' %key)
+
+    if os.path.exists(filename):
+        plan.Load(filename)
+    else:
+        plan.Compute()
+        try:
+            if not os.path.exists(Folder):
+                os.makedirs(Folder)
+            plan.Save(filename)
+        except (IOError, OSError):
+            print 'Was not able to store the reprojection plan in %s' %Folder
+
+    Plans[key] = plan
+
+    return(plan)
+
+
+def Transform_Coordinates(X, Y, epsg_from, epsg_to):
+    """
+    This function transforms coordinate arrays from one EPSG code to another
+
+    Keyword arguments:
+    X -- array, x coordinates (longitude or easting)
+    Y -- array, y coordinates (latitude or northing)
+    epsg_from -- integer, EPSG code of the coordinates
+    epsg_to -- integer, EPSG code of the output coordinates
+    """
+    srs_from = osr.SpatialReference()
+    srs_from.ImportFromEPSG(int(epsg_from))
+    srs_to = osr.SpatialReference()
+    srs_to.ImportFromEPSG(int(epsg_to))
+
+    # GDAL 3 uses the axis order of the EPSG definition by default
+    if hasattr(srs_from, 'SetAxisMappingStrategy'):
+        srs_from.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+        srs_to.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+
+    transformation = osr.CoordinateTransformation(srs_from, srs_to)
+    Points = np.array(transformation.TransformPoints(np.column_stack([np.ravel(X), np.ravel(Y)]).tolist()))
+
+    return(Points[:, 0].reshape(np.shape(X)), Points[:, 1].reshape(np.shape(Y)))
+
+
+def Overlap(Start, End, Size):
+    """
+    This function returns the source pixels (columns or rows) that overlap
+    with the interval [Start, End] and the length of the overlap
+
+    Keyword arguments:
+    Start -- array, first (fractional) pixel coordinate of every target pixel
+    End -- array, last (fractional) pixel coordinate of every target pixel
+    Size -- integer, number of pixels of the source grid
+    """
+    # Coordinates that could not be transformed are not used
+    Valid = np.logical_and(np.isfinite(Start), np.isfinite(End))
+    Start = np.where(Valid, Start, 0)
+    End = np.where(Valid, End, 0)
+
+    First = np.floor(Start)
+    Amount = max(int(np.max(np.ceil(End) - First)) if len(Start) > 0 else 1, 1)
+
+    Index = np.int64(First)[:, None] + np.arange(Amount)[None, :]
+    Weights = np.minimum(End[:, None], Index + 1) - np.maximum(Start[:, None], Index)
+    Weights = np.maximum(Weights, 0)
+
+    # Pixels outside the source grid are not used
+    Outside = np.logical_or(np.logical_or(Index < 0, Index >= Size), ~Valid[:, None])
+    Weights[Outside] = 0
+    Index[Outside] = 0
+
+    return(Index, Weights)
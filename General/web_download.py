@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""
+Authors: Tim Hessels
+         UNESCO-IHE 2017
+Contact: t.hessels@unesco-ihe.org
+Repository: https://github.com/wateraccounting/wa
+Module: General
+
+Description:
+Concurrent download of files (MODIS tiles) from the NASA data pools. The
+http sessions are kept alive in a pool per host and reused for all the
+downloads of a process, the number of simultaneous downloads is limited per
+host, the files are streamed to disk, and failed downloads are retried with
+an increasing waiting time.
+"""
+# General modules
+import os
+import re
+import glob
+import time
+import threading
+import urlparse
+from multiprocessing.pool import ThreadPool
+import requests
+
+# Number of simultaneous downloads per host (Default_Connections is used for
+# the hosts that are not in the dictionary)
+Host_Connections = {'e4ftl01.cr.usgs.gov': 4,
+                    'n5eil01u.ecs.nsidc.org': 4}
+Default_Connections = 4
+
+# Retry parameters, the waiting time is Backoff * 2**attempt seconds
+Retries = 5
+Backoff = 2.0
+Backoff_Max = 60.0
+
+# Size of the chunks that are written to disk
+Chunk_Size = 1024 * 1024
+
+# Pool of idle keep-alive sessions per host, emptied in a forked process
+Sessions = {}
+Sessions_Lock = threading.Lock()
+Sessions_Pid = os.getpid()
+
+# Listings of the data pool folders that are already downloaded
+Listings = {}
+
+# MODIS tile number in the file name, e.g. MOD13Q1.A2005001.h21v06.006.hdf
+Tile_Name = re.compile(r'\.h(\d\d)v(\d\d)\.')
+Link = re.compile(r'href\s*=\s*["\']?([^"\' >]+)', re.IGNORECASE)
+
+
+def Check_process():
+    """
+    This function empties the pools in a forked process, because the sockets
+    of the parent process cannot be shared
+    """
+    global Sessions_Pid
+    if Sessions_Pid != os.getpid():
+        Sessions.clear()
+        Listings.clear()
+        Sessions_Pid = os.getpid()
+
+
+def Get_session(host):
+    """
+    This function returns an idle keep-alive session for the host, or a new
+    session if all the sessions of the host are in use
+
+    Keyword arguments:
+    host -- string, network location of the url
+    """
+    with Sessions_Lock:
+        Check_process()
+        if len(Sessions.get(host, [])) > 0:
+            return(Sessions[host].pop())
+
+    connections = Host_Connections.get(host, Default_Connections)
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections = 2, pool_maxsize = connections)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    return(session)
+
+
+def Release_session(host, session):
+    """
+    This function puts a session back in the pool of the host
+
+    Keyword arguments:
+    host -- string, network location of the url
+    session -- requests.Session given by Get_session
+    """
+    with Sessions_Lock:
+        if Sessions_Pid == os.getpid():
+            Sessions.setdefault(host, []).append(session)
+
+
+def Open_url(session, url, username = None, password = None, stream = False):
+    """
+    This function opens the url and follows the login redirect of the NASA
+    servers (urs.earthdata.nasa.gov) with the username and password
+
+    Keyword arguments:
+    session -- requests.Session given by Get_session
+    url -- string, url of the file
+    username -- string, user name for the redirected login (optional)
+    password -- string, password for the redirected login (optional)
+    stream -- True to read the content later in chunks
+    """
+    try:
+        response = session.get(url, allow_redirects = False, stream = stream)
+    except requests.exceptions.SSLError:
+        from requests.packages.urllib3.exceptions import InsecureRequestWarning
+        requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
+        session.verify = False
+        response = session.get(url, allow_redirects = False, stream = stream)
+
+    # Follow the login redirect, the cookies stay in the session
+    if 'location' in response.headers:
+        response.close()
+        location = urlparse.urljoin(url, response.headers['location'])
+        response = session.get(location, auth = (username, password), stream = stream)
+
+    response.raise_for_status()
+
+    return(response)
+
+
+def Get_listing(url, username = None, password = None):
+    """
+    This function returns the full urls of all the links in the folder listing
+    of the data pool, the listing is downloaded once per process
+
+    Keyword arguments:
+    url -- string, url of the folder, e.g. 'https://e4ftl01.cr.usgs.gov/MOLT/MOD13Q1.006/2005.01.01/'
+    username -- string, user name for the redirected login (optional)
+    password -- string, password for the redirected login (optional)
+    """
+    with Sessions_Lock:
+        Check_process()
+    if url in Listings:
+        return(Listings[url])
+
+    host = urlparse.urlparse(url).netloc
+    listing = []
+    for attempt in range(Retries):
+        session = Get_session(host)
+        try:
+            response = Open_url(session, url, username, password)
+            listing = [urlparse.urljoin(url, href) for href in Link.findall(response.text)]
+            break
+        except requests.exceptions.RequestException:
+            if attempt < Retries - 1:
+                time.sleep(min(Backoff * 2**attempt, Backoff_Max))
+        finally:
+            Release_session(host, session)
+
+    if len(listing) > 0:
+        Listings[url] = listing
+
+    return(listing)
+
+
+def Download_file(url, file_name, username = None, password = None, min_size = 0):
+    """
+    This function streams one file to disk, a failed download is retried
+    Retries times with an increasing waiting time
+
+    Keyword arguments:
+    url -- string, url of the file
+    file_name -- string, path of the output file
+    username -- string, user name for the redirected login (optional)
+    password -- string, password for the redirected login (optional)
+    min_size -- integer, a smaller file is seen as a failed download
+
+    Returns:
+    True if the file is downloaded or already exists, otherwise False
+    """
+    if os.path.isfile(file_name):
+        return(True)
+
+    host = urlparse.urlparse(url).netloc
+    part_name = file_name + '.part'
+
+    for attempt in range(Retries):
+        session = Get_session(host)
+        response = None
+        try:
+            response = Open_url(session, url, username, password, stream = True)
+            with open(part_name, 'wb') as z:
+                for chunk in response.iter_content(Chunk_Size):
+                    z.write(chunk)
+            response.close()
+
+            # Say that download was succesfull
+            if os.stat(part_name).st_size > min_size:
+                if os.path.exists(file_name):
+                    os.remove(file_name)
+                os.rename(part_name, file_name)
+                return(True)
+
+        except requests.exceptions.HTTPError as error:
+            # A file that is not on the server is not tried again
+            if error.response is not None and error.response.status_code == 404:
+                break
+
+        except (requests.exceptions.RequestException, IOError):
+            pass
+
+        finally:
+            # The session goes back to the pool after any outcome
+            if response is not None:
+                response.close()
+            Release_session(host, session)
+
+        if attempt < Retries - 1:
+            time.sleep(min(Backoff * 2**attempt, Backoff_Max))
+
+    if os.path.exists(part_name):
+        os.remove(part_name)
+
+    return(False)
+
+
+def Download_files(Files, username = None, password = None, min_size = 0):
+    """
+    This function downloads the files simultaneously, with at most
+    Host_Connections downloads per host at the same time
+
+    Keyword arguments:
+    Files -- list of (url, file_name)
+    username -- string, user name for the redirected login (optional)
+    password -- string, password for the redirected login (optional)
+    min_size -- integer, a smaller file is seen as a failed download
+
+    Returns:
+    list with True or False for every file
+    """
+    if len(Files) == 0:
+        return([])
+
+    # Limit the number of connections per host
+    hosts = set([urlparse.urlparse(url).netloc for url, file_name in Files])
+    Semaphores = dict([(host, threading.BoundedSemaphore(Host_Connections.get(host, Default_Connections)))
+                       for host in hosts])
+
+    def Download(File):
+        url, file_name = File
+        with Semaphores[urlparse.urlparse(url).netloc]:
+            return(Download_file(url, file_name, username, password, min_size))
+
+    workers = min(len(Files), sum([Host_Connections.get(host, Default_Connections) for host in hosts]))
+    if workers == 1:
+        return([Download(File) for File in Files])
+
+    pool = ThreadPool(workers)
+    try:
+        Downloaded = pool.map(Download, Files)
+    finally:
+        pool.close()
+        pool.join()
+
+    return(Downloaded)
+
+
+def Download_MODIS_Tiles(url, TilesHorizontal, TilesVertical, output_folder, username, password, hdf_library = None, hdf_pattern = None, min_size = 10000):
+    """
+    This function downloads all the needed MODIS tiles of one date at once
+
+    Keyword arguments:
+    url -- string, url of the folder of the date on the data pool
+    TilesHorizontal -- [TileMin,TileMax] max and min horizontal tile number
+    TilesVertical -- [TileMin,TileMax] max and min vertical tile number
+    output_folder -- 'C:/file/to/path/'
+    username -- string, NASA user name
+    password -- string, NASA password
+    hdf_library -- string, folder with hdf files that are already downloaded (optional)
+    hdf_pattern -- string, begin of the hdf names in the library, e.g. 'MOD13Q1.A2005001'
+    min_size -- integer, a smaller file is seen as a failed download
+
+    Returns:
+    dictionary {(Horizontal, Vertical): file_name}, the file_name is None if
+    the tile is not available
+    """
+    Tiles = dict()
+    for Vertical in range(int(TilesVertical[0]), int(TilesVertical[1]) + 1):
+        for Horizontal in range(int(TilesHorizontal[0]), int(TilesHorizontal[1]) + 1):
+            Tiles[(Horizontal, Vertical)] = None
+
+            # Check the library given by user
+            if hdf_library is not None and hdf_pattern is not None:
+                hdf_name = glob.glob(os.path.join(hdf_library, "%s.h%02dv%02d.*" %(hdf_pattern, Horizontal, Vertical)))
+                if len(hdf_name) == 1:
+                    Tiles[(Horizontal, Vertical)] = hdf_name[0]
+
+    Missing = [Tile for Tile in sorted(Tiles.keys()) if Tiles[Tile] is None]
+    if len(Missing) == 0:
+        return(Tiles)
+
+    # Find the urls of the wanted tiles in the listing of the date
+    Urls = dict()
+    for full_url in Get_listing(url, username, password):
+        if not full_url.lower().endswith('hdf'):
+            continue
+        tile = Tile_Name.search(full_url.split('/')[-1])
+        if tile is not None:
+            Urls[(int(tile.group(1)), int(tile.group(2)))] = full_url
+
+    Files = [(Urls[Tile], os.path.join(output_folder, Urls[Tile].split('/')[-1]))
+             for Tile in Missing if Tile in Urls]
+    Downloaded = Download_files(Files, username, password, min_size)
+
+    for Tile, File, Succes in zip([Tile for Tile in Missing if Tile in Urls], Files, Downloaded):
+        if Succes:
+            Tiles[Tile] = File[1]
+        else:
+            print 'Tile h%02dv%02d from %s is not available' %(Tile[0], Tile[1], url)
+
+    return(Tiles)
@@ -131,54 +131,14 @@ def Create(Dir_Basin, Simulation, Basin, Startdate, Enddate, nc_outname, Example
     leisure_km3 = np.einsum('ij,kij->kij', leisure_array, ETben_tot_km3)
 
 
-    # Create empty arrays
-    DataT = np.zeros([29,len(Dates)])
-    DataI = np.zeros([29,len(Dates)])
-    DataE = np.zeros([29,len(Dates)])
-    DataBT = np.zeros([29,len(Dates)])
-    DataBI = np.zeros([29,len(Dates)])
-    DataBE = np.zeros([29,len(Dates)])
-    DataAgriculture = np.zeros([29,len(Dates)])
-    DataEnvironment = np.zeros([29,len(Dates)])
-    DataEconomic = np.zeros([29,len(Dates)])
-    DataEnergy = np.zeros([29,len(Dates)])
-    DataLeisure = np.zeros([29,len(Dates)])
-    i = 0
-
-    # Loop over the LULC by using the Sheet 2 dictionary
+    # Get the LULC values of every class by using the Sheet 2 dictionary
+    Classes = []
     for LAND_USE in sheet2_classes_dict.keys():
         for CLASS in sheet2_classes_dict[LAND_USE].keys():
-            lulcs = sheet2_classes_dict[LAND_USE][CLASS]
-
-            # Create a mask to ignore non relevant pixels.
-            mask=np.logical_or.reduce([LULC == value for value in lulcs])
-            mask3d = mask * np.ones(len(Dates))[:,None,None]
-
-            # Calculate the spatial sum of the different parameters.
-            T_LU_tot = np.nansum(np.nansum((T_km3 * mask3d),1),1)
-            I_LU_tot = np.nansum(np.nansum((I_km3 * mask3d),1),1)
-            E_LU_tot = np.nansum(np.nansum((E_km3 * mask3d),1),1)
-            BT_LU_tot = np.nansum(np.nansum((Tben_km3 * mask3d),1),1)
-            BI_LU_tot = np.nansum(np.nansum((Iben_km3 * mask3d),1),1)
-            BE_LU_tot = np.nansum(np.nansum((Eben_km3 * mask3d),1),1)
-            Agriculture_LU_tot = np.nansum(np.nansum((agriculture_km3 * mask3d),1),1)
-            Environment_LU_tot = np.nansum(np.nansum((environment_km3 * mask3d),1),1)
-            Economic_LU_tot = np.nansum(np.nansum((economic_km3 * mask3d),1),1)
-            Energy_LU_tot = np.nansum(np.nansum((energy_km3 * mask3d),1),1)
-            Leisure_LU_tot = np.nansum(np.nansum((leisure_km3 * mask3d),1),1)
-
-            DataT[i,:] = T_LU_tot
-            DataBT[i,:] = BT_LU_tot
-            DataI[i,:] = I_LU_tot
-            DataBI[i,:] = BI_LU_tot
-            DataE[i,:] = E_LU_tot
-            DataBE[i,:] = BE_LU_tot
-            DataAgriculture[i,:] = Agriculture_LU_tot
-            DataEnvironment[i,:] = Environment_LU_tot
-            DataEconomic[i,:] = Economic_LU_tot
-            DataEnergy[i,:] = Energy_LU_tot
-            DataLeisure[i,:] = Leisure_LU_tot
-            i += 1
+            Classes.append(sheet2_classes_dict[LAND_USE][CLASS])
+
+    # Calculate the spatial sum of the different parameters for all classes
+    DataT, DataI, DataE, DataBT, DataBI, DataBE, DataAgriculture, DataEnvironment, DataEconomic, DataEnergy, DataLeisure = Start.Zonal_Statistics.Sum_per_Class(LULC, Classes, [T_km3, I_km3, E_km3, Tben_km3, Iben_km3, Eben_km3, agriculture_km3, environment_km3, economic_km3, energy_km3, leisure_km3])
 
     # Calculate non benefial components
     DataNBT = DataT - DataBT
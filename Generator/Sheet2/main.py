@@ -123,57 +123,60 @@ def Calculate(WA_HOME_folder, Basin, P_Product, ET_Product, LAI_Product, NDM_Pro
 
         ###################### Save Data as netCDF files ##############################
 
-        #______________________________Precipitation_______________________________
+        # Write all the input variables of the year in one session
+        with DC.NC_Writer(nc_outname) as nc:
+            #______________________________Precipitation_______________________________
 
-        # 1.) Precipitation data
-        if not "Precipitation" in Variables_NC:
-            # Get the data of Precipitation and save as nc
-            DataCube_Prec = RC.Get3Darray_time_series_monthly(Data_Path_P_Monthly, Startdate_part, Enddate_part, Example_data = Example_dataset)
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_Prec, "Precipitation", "mm/month", 0.01)
-            del DataCube_Prec
+            # 1.) Precipitation data
+            if not "Precipitation" in Variables_NC:
+                # Get the data of Precipitation and save as nc
+                DataCube_Prec = RC.Get3Darray_time_series_monthly(Data_Path_P_Monthly, Startdate_part, Enddate_part, Example_data = Example_dataset)
+                nc.Add_Variable(DataCube_Prec, "Precipitation", "mm/month", 0.01)
+                del DataCube_Prec
 
-        #_______________________________Evaporation________________________________
+            #_______________________________Evaporation________________________________
 
-        # 2.) Evapotranspiration data
-        if not "Actual_Evapotranspiration" in Variables_NC:
-            # Get the data of Evaporation and save as nc
-            DataCube_ET = RC.Get3Darray_time_series_monthly(Data_Path_ET, Startdate_part, Enddate_part, Example_data = Example_dataset)
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_ET, "Actual_Evapotranspiration", "mm/month", 0.01)
-            del DataCube_ET
+            # 2.) Evapotranspiration data
+            if not "Actual_Evapotranspiration" in Variables_NC:
+                # Get the data of Evaporation and save as nc
+                DataCube_ET = RC.Get3Darray_time_series_monthly(Data_Path_ET, Startdate_part, Enddate_part, Example_data = Example_dataset)
+                nc.Add_Variable(DataCube_ET, "Actual_Evapotranspiration", "mm/month", 0.01)
+                del DataCube_ET
 
-        #___________________________Normalized Dry Matter__________________________
+            #___________________________Normalized Dry Matter__________________________
 
-        # 3.) Normalized Dry Matter
-        if not "Normalized_Dry_Matter" in Variables_NC:
-            # Get the data of Evaporation and save as nc
-            DataCube_NDM = RC.Get3Darray_time_series_monthly(Data_Path_NDM, Startdate_part, Enddate_part, Example_data = Example_dataset)
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_NDM, "Normalized_Dry_Matter", "kg_ha", 0.01)
-            del DataCube_NDM
+            # 3.) Normalized Dry Matter
+            if not "Normalized_Dry_Matter" in Variables_NC:
+                # Get the data of Evaporation and save as nc
+                DataCube_NDM = RC.Get3Darray_time_series_monthly(Data_Path_NDM, Startdate_part, Enddate_part, Example_data = Example_dataset)
+                nc.Add_Variable(DataCube_NDM, "Normalized_Dry_Matter", "kg_ha", 0.01)
+                del DataCube_NDM
 
-        #_______________________________Rainy Days_________________________________
+            #_______________________________Rainy Days_________________________________
 
-        if not "Rainy_Days" in Variables_NC:
-            # Get the data of rainy days and save as nc
-            DataCube_RD = RC.Get3Darray_time_series_monthly(Data_Path_RD, Startdate_part, Enddate_part, Example_data = Example_dataset)
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_RD, "Rainy_Days", "amount_of_days", 0.01)
-            del DataCube_RD
+            if not "Rainy_Days" in Variables_NC:
+                # Get the data of rainy days and save as nc
+                DataCube_RD = RC.Get3Darray_time_series_monthly(Data_Path_RD, Startdate_part, Enddate_part, Example_data = Example_dataset)
+                nc.Add_Variable(DataCube_RD, "Rainy_Days", "amount_of_days", 0.01)
+                del DataCube_RD
 
-        #_______________________________Leaf Area Index____________________________
+            #_______________________________Leaf Area Index____________________________
 
-        if not "LAI" in Variables_NC:
-            # Get the data of leave area index and save as nc
-            DataCube_LAI = RC.Get3Darray_time_series_monthly(Data_Path_LAI, Startdate_part, Enddate_part, Example_data = Example_dataset)
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_LAI, "LAI", "m2-m-2", 0.01)
-            del DataCube_LAI
+            if not "LAI" in Variables_NC:
+                # Get the data of leave area index and save as nc
+                DataCube_LAI = RC.Get3Darray_time_series_monthly(Data_Path_LAI, Startdate_part, Enddate_part, Example_data = Example_dataset)
+                nc.Add_Variable(DataCube_LAI, "LAI", "m2-m-2", 0.01)
+                del DataCube_LAI
 
 
         ####################### Calculations Sheet 2 ##########################
         if not ("Interception" in Variables_NC or "Transpiration" in Variables_NC or "Evaporation" in Variables_NC):
             DataCube_I, DataCube_T, DataCube_E = Two.SplitET.ITE(Dir_Basin, nc_outname, Startdate_part, Enddate_part, Simulation)
 
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_I, "Interception", "mm/month", 0.01)
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_T, "Transpiration", "mm/month", 0.01)
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_E, "Evaporation", "mm/month", 0.01)
+            with DC.NC_Writer(nc_outname) as nc:
+                nc.Add_Variable(DataCube_I, "Interception", "mm/month", 0.01)
+                nc.Add_Variable(DataCube_T, "Transpiration", "mm/month", 0.01)
+                nc.Add_Variable(DataCube_E, "Evaporation", "mm/month", 0.01)
             del DataCube_I, DataCube_T, DataCube_E
 
         ######################### Create CSV 2 ################################
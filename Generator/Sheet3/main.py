@@ -142,50 +142,52 @@ def Calculate(WA_HOME_folder, Basin, P_Product, ET_Product, LAI_Product, NDM_Pro
                 Start.Sixteendaily_to_monthly_state.Nearest_Interpolate(Data_Path_NDVI, Startdate_part, Enddate_part)
 
         ###################### Save Data as netCDF files ##############################
-        #______________________________Precipitation_______________________________
-
-        # 1.) Precipitation data
-        if not "Precipitation" in Variables_NC:
-            # Get the data of Precipitation and save as nc
-            DataCube_Prec = RC.Get3Darray_time_series_monthly(Data_Path_P_Monthly, Startdate_part, Enddate_part, Example_data = Example_dataset)
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_Prec, "Precipitation", "mm/month", 0.01)
-            del DataCube_Prec
-
-        #_______________________________Evaporation________________________________
-
-        # 2.) Evapotranspiration data
-        if not "Actual_Evapotranspiration" in Variables_NC:
-            # Get the data of Evaporation and save as nc
-            DataCube_ET = RC.Get3Darray_time_series_monthly(Data_Path_ET, Startdate_part, Enddate_part, Example_data = Example_dataset)
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_ET, "Actual_Evapotranspiration", "mm/month", 0.01)
-            del DataCube_ET
-
-        #___________________________Normalized Dry Matter__________________________
-
-        # 3.) Normalized Dry Matter
-        if not "Normalized_Dry_Matter" in Variables_NC:
-            # Get the data of Evaporation and save as nc
-            DataCube_NDM = RC.Get3Darray_time_series_monthly(Data_Path_NDM, Startdate_part, Enddate_part, Example_data = Example_dataset)
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_NDM, "Normalized_Dry_Matter", "kg_ha", 0.01)
-            del DataCube_NDM
-
-        #_______________________Reference Evaporation______________________________
-
-        # 4.) Reference Evapotranspiration data
-        if not "Reference_Evapotranspiration" in Variables_NC:
-            # Get the data of Precipitation and save as nc
-            DataCube_ETref = RC.Get3Darray_time_series_monthly(Data_Path_ETref, Startdate_part, Enddate_part, Example_data = Example_dataset)
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_ETref, "Reference_Evapotranspiration", "mm/month", 0.01)
-            del DataCube_ETref
-
-        #____________________________________NDVI__________________________________
-
-         # 4.) Reference Evapotranspiration data
-        if not "NDVI" in Variables_NC:
-            # Get the data of Precipitation and save as nc
-            DataCube_NDVI = RC.Get3Darray_time_series_monthly(Data_Path_NDVI, Startdate_part, Enddate_part, Example_data = Example_dataset)
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_NDVI, "NDVI", "Fraction", 0.0001)
-            del DataCube_NDVI
+        # Write all the input variables of the year in one session
+        with DC.NC_Writer(nc_outname) as nc:
+            #______________________________Precipitation_______________________________
+
+            # 1.) Precipitation data
+            if not "Precipitation" in Variables_NC:
+                # Get the data of Precipitation and save as nc
+                DataCube_Prec = RC.Get3Darray_time_series_monthly(Data_Path_P_Monthly, Startdate_part, Enddate_part, Example_data = Example_dataset)
+                nc.Add_Variable(DataCube_Prec, "Precipitation", "mm/month", 0.01)
+                del DataCube_Prec
+
+            #_______________________________Evaporation________________________________
+
+            # 2.) Evapotranspiration data
+            if not "Actual_Evapotranspiration" in Variables_NC:
+                # Get the data of Evaporation and save as nc
+                DataCube_ET = RC.Get3Darray_time_series_monthly(Data_Path_ET, Startdate_part, Enddate_part, Example_data = Example_dataset)
+                nc.Add_Variable(DataCube_ET, "Actual_Evapotranspiration", "mm/month", 0.01)
+                del DataCube_ET
+
+            #___________________________Normalized Dry Matter__________________________
+
+            # 3.) Normalized Dry Matter
+            if not "Normalized_Dry_Matter" in Variables_NC:
+                # Get the data of Evaporation and save as nc
+                DataCube_NDM = RC.Get3Darray_time_series_monthly(Data_Path_NDM, Startdate_part, Enddate_part, Example_data = Example_dataset)
+                nc.Add_Variable(DataCube_NDM, "Normalized_Dry_Matter", "kg_ha", 0.01)
+                del DataCube_NDM
+
+            #_______________________Reference Evaporation______________________________
+
+            # 4.) Reference Evapotranspiration data
+            if not "Reference_Evapotranspiration" in Variables_NC:
+                # Get the data of Precipitation and save as nc
+                DataCube_ETref = RC.Get3Darray_time_series_monthly(Data_Path_ETref, Startdate_part, Enddate_part, Example_data = Example_dataset)
+                nc.Add_Variable(DataCube_ETref, "Reference_Evapotranspiration", "mm/month", 0.01)
+                del DataCube_ETref
+
+            #____________________________________NDVI__________________________________
+
+             # 4.) Reference Evapotranspiration data
+            if not "NDVI" in Variables_NC:
+                # Get the data of Precipitation and save as nc
+                DataCube_NDVI = RC.Get3Darray_time_series_monthly(Data_Path_NDVI, Startdate_part, Enddate_part, Example_data = Example_dataset)
+                nc.Add_Variable(DataCube_NDVI, "NDVI", "Fraction", 0.0001)
+                del DataCube_NDVI
 
         ############################# Calculate Sheet 3 ###########################
 
@@ -195,8 +197,9 @@ def Calculate(WA_HOME_folder, Basin, P_Product, ET_Product, LAI_Product, NDM_Pro
 
             # Calculate Blue and Green ET
             DataCube_ETblue, DataCube_ETgreen = Four.SplitET.Blue_Green(Dir_Basin, nc_outname, ETref_Product, P_Product, Startdate, Enddate)
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_ETblue, "Blue_Evapotranspiration", "mm/month", 0.01)
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_ETgreen, "Green_Evapotranspiration", "mm/month", 0.01)
+            with DC.NC_Writer(nc_outname) as nc:
+                nc.Add_Variable(DataCube_ETblue, "Blue_Evapotranspiration", "mm/month", 0.01)
+                nc.Add_Variable(DataCube_ETgreen, "Green_Evapotranspiration", "mm/month", 0.01)
             del DataCube_ETblue, DataCube_ETgreen
 
     #____________________________ Create the empty dictionaries ____________________________
@@ -90,56 +90,21 @@ def Create(Dir_Basin, Simulation, Basin, Startdate, Enddate, nc_outname):
     NonRecovableFlow_Return_GW_km3 = np.einsum('ij,kij->kij', area_in_m2, DataCube_NonRecovableFlow_Return_GW)/ 1e12
     NonRecovableFlow_Return_SW_km3 = np.einsum('ij,kij->kij', area_in_m2, DataCube_NonRecovableFlow_Return_SW)/ 1e12
 
-    # Create mask for all LU classes
-    All_mask = dict()
-
-    # Create masks
-    for Required_LU_Class in Required_LU_Classes[:-2]:
-        Mask_Class = np.zeros(DataCube_LU.shape)
-        Values_LULC = LU_Classes[Required_LU_Class]
-        for Value_LULC in Values_LULC:
-            Mask_Class[DataCube_LU == Value_LULC] = 1
-
-        All_mask[Required_LU_Class] = Mask_Class
-
-    # Enter additional map for industry and power and energy
-    All_mask['Industry'] = np.zeros(DataCube_LU.shape)
-    All_mask['Power and Energy'] = np.zeros(DataCube_LU.shape)
-
-    # Create empty arrays for the values
-    Values_Total_Supply_GW_km3 = np.zeros([len(Required_LU_Classes),len(Dates)])
-    Values_Total_Supply_SW_km3 = np.zeros([len(Required_LU_Classes),len(Dates)])
-    Values_Non_Consumed_km3 = np.zeros([len(Required_LU_Classes),len(Dates)])
-    Values_Consumed_km3 = np.zeros([len(Required_LU_Classes),len(Dates)])
-    Values_RecovableFlow_Return_GW_km3 = np.zeros([len(Required_LU_Classes),len(Dates)])
-    Values_RecovableFlow_Return_SW_km3 = np.zeros([len(Required_LU_Classes),len(Dates)])
-    Values_NonRecovableFlow_Return_GW_km3 = np.zeros([len(Required_LU_Classes),len(Dates)])
-    Values_NonRecovableFlow_Return_SW_km3 = np.zeros([len(Required_LU_Classes),len(Dates)])
+    # Get the LULC values of every class (no values for industry and power and energy)
+    Classes = [LU_Classes[Required_LU_Class] for Required_LU_Class in Required_LU_Classes[:-2]] + [[], []]
+
+    # Calculate sum per class
+    Values_Total_Supply_GW_km3, Values_Total_Supply_SW_km3, Values_Non_Consumed_km3, Values_Consumed_km3, Values_RecovableFlow_Return_GW_km3, Values_RecovableFlow_Return_SW_km3, Values_NonRecovableFlow_Return_GW_km3, Values_NonRecovableFlow_Return_SW_km3 = Start.Zonal_Statistics.Sum_per_Class(DataCube_LU, Classes, [Total_Supply_GW_km3, Total_Supply_SW_km3, Non_Consumed_km3, Consumed_km3, RecovableFlow_Return_GW_km3, RecovableFlow_Return_SW_km3, NonRecovableFlow_Return_GW_km3, NonRecovableFlow_Return_SW_km3])
 
     # zero values for now
     Values_Consumed_Others = np.zeros([len(Required_LU_Classes),len(Dates)])
     Values_Demand = np.zeros([len(Required_LU_Classes),len(Dates)])
 
-    i = 0
+    # Get the maximum supply of all classes
     Max_value = 0
-
-    # Calculate sum by applying mask over the data
-    for Required_LU_Class in Required_LU_Classes:
-        Mask_one_class = All_mask[Required_LU_Class]
-        Values_Total_Supply_GW_km3[i,:] = np.nansum(np.nansum(Total_Supply_GW_km3 * Mask_one_class,2),1)
-        Values_Total_Supply_SW_km3[i,:] = np.nansum(np.nansum(Total_Supply_SW_km3 * Mask_one_class,2),1)
-        Values_Non_Consumed_km3[i,:] = np.nansum(np.nansum(Non_Consumed_km3 * Mask_one_class,2),1)
-        Values_Consumed_km3[i,:] = np.nansum(np.nansum(Consumed_km3 * Mask_one_class,2),1)
-        Values_RecovableFlow_Return_GW_km3[i,:] = np.nansum(np.nansum(RecovableFlow_Return_GW_km3 * Mask_one_class,2),1)
-        Values_RecovableFlow_Return_SW_km3[i,:] = np.nansum(np.nansum(RecovableFlow_Return_SW_km3 * Mask_one_class,2),1)
-        Values_NonRecovableFlow_Return_GW_km3[i,:] = np.nansum(np.nansum(NonRecovableFlow_Return_GW_km3 * Mask_one_class,2),1)
-        Values_NonRecovableFlow_Return_SW_km3[i,:] = np.nansum(np.nansum(NonRecovableFlow_Return_SW_km3 * Mask_one_class,2),1)
-        i += 1
-
-        Max_value_one_LU = np.nanmax(np.nanmax(Values_Total_Supply_GW_km3+Values_Total_Supply_SW_km3))
-
-        if Max_value_one_LU > Max_value:
-            Max_value = Max_value_one_LU
+    Max_value_all_LU = np.nanmax(np.nanmax(Values_Total_Supply_GW_km3+Values_Total_Supply_SW_km3))
+    if Max_value_all_LU > Max_value:
+        Max_value = Max_value_all_LU
 
     # Check if scaling is needed
     scaling = 1
@@ -117,43 +117,45 @@ def Calculate(WA_HOME_folder, Basin, P_Product, ET_Product, LAI_Product, ETref_P
 
         ###################### Save Data as netCDF files ##############################
 
-        #______________________________Precipitation_______________________________
-
-        # 1.) Precipitation data
-        if not "Precipitation" in Variables_NC:
-            # Get the data of Precipitation and save as nc
-            DataCube_Prec = RC.Get3Darray_time_series_monthly(Data_Path_P_Monthly, Startdate_part, Enddate_part, Example_data = Example_dataset)
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_Prec, "Precipitation", "mm/month", 0.01)
-            del DataCube_Prec
-
-       #_______________________Reference Evaporation______________________________
-
-        # 2.) Reference Evapotranspiration data
-        if not "Reference_Evapotranspiration" in Variables_NC:
-            # Get the data of Precipitation and save as nc
-            DataCube_ETref = RC.Get3Darray_time_series_monthly(Data_Path_ETref, Startdate_part, Enddate_part, Example_data = Example_dataset)
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_ETref, "Reference_Evapotranspiration", "mm/month", 0.01)
-            del DataCube_ETref
-
-        #_______________________________Evaporation________________________________
-
-        # 3.) Evapotranspiration data
-        if not "Actual_Evapotranspiration" in Variables_NC:
-            # Get the data of Evaporation and save as nc
-            DataCube_ET = RC.Get3Darray_time_series_monthly(Data_Path_ET, Startdate_part, Enddate_part, Example_data = Example_dataset)
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_ET, "Actual_Evapotranspiration", "mm/month", 0.01)
-            del DataCube_ET
-
-        #_____________________________________GWF__________________________________
-
-        # 4.) Grey Water Footprint data
-        if not "Grey_Water_Footprint" in Variables_NC:
-            # Get the data of grey water footprint and save as nc
-            GWF_Filepath = os.path.join(Dir_Basin, Data_Path_GWF, "Gray_Water_Footprint_Fraction.tif")
-            dest_GWF = RC.reproject_dataset_example(GWF_Filepath, Example_dataset, method=1)
-            DataCube_GWF = dest_GWF.GetRasterBand(1).ReadAsArray()
-            DC.Add_NC_Array_Static(nc_outname, DataCube_GWF, "Grey_Water_Footprint", "fraction", 0.0001)
-            del DataCube_GWF
+        # Write all the input variables of the year in one session
+        with DC.NC_Writer(nc_outname) as nc:
+            #______________________________Precipitation_______________________________
+
+            # 1.) Precipitation data
+            if not "Precipitation" in Variables_NC:
+                # Get the data of Precipitation and save as nc
+                DataCube_Prec = RC.Get3Darray_time_series_monthly(Data_Path_P_Monthly, Startdate_part, Enddate_part, Example_data = Example_dataset)
+                nc.Add_Variable(DataCube_Prec, "Precipitation", "mm/month", 0.01)
+                del DataCube_Prec
+
+           #_______________________Reference Evaporation______________________________
+
+            # 2.) Reference Evapotranspiration data
+            if not "Reference_Evapotranspiration" in Variables_NC:
+                # Get the data of Precipitation and save as nc
+                DataCube_ETref = RC.Get3Darray_time_series_monthly(Data_Path_ETref, Startdate_part, Enddate_part, Example_data = Example_dataset)
+                nc.Add_Variable(DataCube_ETref, "Reference_Evapotranspiration", "mm/month", 0.01)
+                del DataCube_ETref
+
+            #_______________________________Evaporation________________________________
+
+            # 3.) Evapotranspiration data
+            if not "Actual_Evapotranspiration" in Variables_NC:
+                # Get the data of Evaporation and save as nc
+                DataCube_ET = RC.Get3Darray_time_series_monthly(Data_Path_ET, Startdate_part, Enddate_part, Example_data = Example_dataset)
+                nc.Add_Variable(DataCube_ET, "Actual_Evapotranspiration", "mm/month", 0.01)
+                del DataCube_ET
+
+            #_____________________________________GWF__________________________________
+
+            # 4.) Grey Water Footprint data
+            if not "Grey_Water_Footprint" in Variables_NC:
+                # Get the data of grey water footprint and save as nc
+                GWF_Filepath = os.path.join(Dir_Basin, Data_Path_GWF, "Gray_Water_Footprint_Fraction.tif")
+                dest_GWF = RC.reproject_dataset_example(GWF_Filepath, Example_dataset, method=1)
+                DataCube_GWF = dest_GWF.GetRasterBand(1).ReadAsArray()
+                nc.Add_Static(DataCube_GWF, "Grey_Water_Footprint", "fraction", 0.0001)
+                del DataCube_GWF
 
     ####################### Calculations Sheet 4 ##############################
 
@@ -182,8 +184,9 @@ def Calculate(WA_HOME_folder, Basin, P_Product, ET_Product, LAI_Product, ETref_P
 
             # Calculate Blue and Green ET
             DataCube_ETblue, DataCube_ETgreen = Four.SplitET.Blue_Green(Dir_Basin, nc_outname, ETref_Product, P_Product, Startdate, Enddate)
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_ETblue, "Blue_Evapotranspiration", "mm/month", 0.01)
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_ETgreen, "Green_Evapotranspiration", "mm/month", 0.01)
+            with DC.NC_Writer(nc_outname) as nc:
+                nc.Add_Variable(DataCube_ETblue, "Blue_Evapotranspiration", "mm/month", 0.01)
+                nc.Add_Variable(DataCube_ETgreen, "Green_Evapotranspiration", "mm/month", 0.01)
             del DataCube_ETblue, DataCube_ETgreen
 
         #____________ Calculate non-consumend and Total supply maps by using fractions and consumed maps (blue ET) ____________
@@ -194,8 +197,9 @@ def Calculate(WA_HOME_folder, Basin, P_Product, ET_Product, LAI_Product, ETref_P
             DataCube_Total_Supply, DataCube_Non_Consumed = Four.Total_Supply.Fraction_Based(nc_outname, Startdate_part, Enddate_part)
 
             # Save the Total Supply and non consumed data as NetCDF files
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_Total_Supply, "Total_Supply", "mm/month", 0.01)
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_Non_Consumed, "Non_Consumed_Water", "mm/month", 0.01)
+            with DC.NC_Writer(nc_outname) as nc:
+                nc.Add_Variable(DataCube_Total_Supply, "Total_Supply", "mm/month", 0.01)
+                nc.Add_Variable(DataCube_Non_Consumed, "Non_Consumed_Water", "mm/month", 0.01)
             del DataCube_Total_Supply, DataCube_Non_Consumed
 
         #____________ Apply fractions over total supply to calculate gw and sw supply ____________
@@ -206,8 +210,9 @@ def Calculate(WA_HOME_folder, Basin, P_Product, ET_Product, LAI_Product, ETref_P
             DataCube_Total_Supply_SW, DataCube_Total_Supply_GW = Four.SplitGW_SW_Supply.Fraction_Based(nc_outname, Startdate_part, Enddate_part)
 
             # Save the Total Supply surface water and Total Supply ground water data as NetCDF files
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_Total_Supply_SW, "Total_Supply_Surface_Water", "mm/month", 0.01)
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_Total_Supply_GW, "Total_Supply_Ground_Water", "mm/month", 0.01)
+            with DC.NC_Writer(nc_outname) as nc:
+                nc.Add_Variable(DataCube_Total_Supply_SW, "Total_Supply_Surface_Water", "mm/month", 0.01)
+                nc.Add_Variable(DataCube_Total_Supply_GW, "Total_Supply_Ground_Water", "mm/month", 0.01)
             del DataCube_Total_Supply_SW, DataCube_Total_Supply_GW
 
         #____________ Apply gray water footprint fractions to calculated non recoverable flow based on the non consumed flow ____________
@@ -219,8 +224,9 @@ def Calculate(WA_HOME_folder, Basin, P_Product, ET_Product, LAI_Product, ETref_P
             DataCube_NonRecovableFlow, Datacube_RecovableFlow = Four.SplitNonConsumed_NonRecov.GWF_Based(nc_outname, Startdate_part, Enddate_part)
 
             # Get the data of Evaporation and save as nc
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_NonRecovableFlow, "Non_Recovable_Flow", "mm/month", 0.01)
-            DC.Add_NC_Array_Variable(nc_outname, Datacube_RecovableFlow, "Recovable_Flow", "mm/month", 0.01)
+            with DC.NC_Writer(nc_outname) as nc:
+                nc.Add_Variable(DataCube_NonRecovableFlow, "Non_Recovable_Flow", "mm/month", 0.01)
+                nc.Add_Variable(Datacube_RecovableFlow, "Recovable_Flow", "mm/month", 0.01)
             del DataCube_NonRecovableFlow, Datacube_RecovableFlow
 
         #____________Apply fractions to calculate the non recovarable SW/GW and recovarable SW/GW ____________
@@ -232,8 +238,9 @@ def Calculate(WA_HOME_folder, Basin, P_Product, ET_Product, LAI_Product, ETref_P
             DataCube_NonRecovableFlow_Return_GW, Datacube_NonRecovableFlow_Return_SW = Four.SplitGW_SW_Return.Fraction_Based(nc_outname, "Non_Recovable_Flow", Startdate_part, Enddate_part)
 
             # Get the data of Evaporation and save as nc
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_NonRecovableFlow_Return_GW, "Non_Recovable_Flow_Ground_Water", "mm/month", 0.01)
-            DC.Add_NC_Array_Variable(nc_outname, Datacube_NonRecovableFlow_Return_SW, "Non_Recovable_Flow_Surface_Water", "mm/month", 0.01)
+            with DC.NC_Writer(nc_outname) as nc:
+                nc.Add_Variable(DataCube_NonRecovableFlow_Return_GW, "Non_Recovable_Flow_Ground_Water", "mm/month", 0.01)
+                nc.Add_Variable(Datacube_NonRecovableFlow_Return_SW, "Non_Recovable_Flow_Surface_Water", "mm/month", 0.01)
             del DataCube_NonRecovableFlow_Return_GW, Datacube_NonRecovableFlow_Return_SW
 
         # 2. Recovarable flow
@@ -243,8 +250,9 @@ def Calculate(WA_HOME_folder, Basin, P_Product, ET_Product, LAI_Product, ETref_P
             DataCube_RecovableFlow_Return_GW, Datacube_RecovableFlow_Return_SW = Four.SplitGW_SW_Return.Fraction_Based(nc_outname, "Recovable_Flow", Startdate_part, Enddate_part)
 
             # Get the data of Evaporation and save as nc
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_RecovableFlow_Return_GW, "Recovable_Flow_Ground_Water", "mm/month", 0.01)
-            DC.Add_NC_Array_Variable(nc_outname, Datacube_RecovableFlow_Return_SW, "Recovable_Flow_Surface_Water", "mm/month", 0.01)
+            with DC.NC_Writer(nc_outname) as nc:
+                nc.Add_Variable(DataCube_RecovableFlow_Return_GW, "Recovable_Flow_Ground_Water", "mm/month", 0.01)
+                nc.Add_Variable(Datacube_RecovableFlow_Return_SW, "Recovable_Flow_Surface_Water", "mm/month", 0.01)
             del DataCube_RecovableFlow_Return_GW, Datacube_RecovableFlow_Return_SW
 
         ############################ Create CSV 4 #################################
@@ -111,32 +111,34 @@ def Calculate(WA_HOME_folder, Basin, P_Product, ET_Product, ETref_Product, DEM_P
         # Reference Evapotranspiration
         # DEM flow directions
 
-        #______________________________Precipitation_______________________________
-
-        # 1.) Precipitation data
-        if not "Precipitation" in Variables_NC:
-            # Get the data of Precipitation and save as nc
-            DataCube_Prec = RC.Get3Darray_time_series_monthly(Data_Path_P_Monthly, Startdate_part, Enddate_part, Example_data = Example_dataset)
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_Prec, "Precipitation", "mm/month", 0.01)
-            del DataCube_Prec
-
-        #_______________________________Evaporation________________________________
-
-        # 2.) Evapotranspiration data
-        if not "Actual_Evapotranspiration" in Variables_NC:
-            # Get the data of Evaporation and save as nc
-            DataCube_ET = RC.Get3Darray_time_series_monthly(Data_Path_ET, Startdate_part, Enddate_part, Example_data = Example_dataset)
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_ET, "Actual_Evapotranspiration", "mm/month", 0.01)
-            del DataCube_ET
-
-        #_______________________Reference Evaporation______________________________
-
-        # 3.) Reference Evapotranspiration data
-        if (WaterPIX_filename == "" or Supply_method == "Fraction") and not ("Reference_Evapotranspiration" in Variables_NC):
-            # Get the data of Precipitation and save as nc
-            DataCube_ETref = RC.Get3Darray_time_series_monthly(Data_Path_ETref, Startdate_part, Enddate_part, Example_data = Example_dataset)
-            DC.Add_NC_Array_Variable(nc_outname, DataCube_ETref, "Reference_Evapotranspiration", "mm/month", 0.01)
-            del DataCube_ETref
+        # Write all the input variables of the year in one session
+        with DC.NC_Writer(nc_outname) as nc:
+            #______________________________Precipitation_______________________________
+
+            # 1.) Precipitation data
+            if not "Precipitation" in Variables_NC:
+                # Get the data of Precipitation and save as nc
+                DataCube_Prec = RC.Get3Darray_time_series_monthly(Data_Path_P_Monthly, Startdate_part, Enddate_part, Example_data = Example_dataset)
+                nc.Add_Variable(DataCube_Prec, "Precipitation", "mm/month", 0.01)
+                del DataCube_Prec
+
+            #_______________________________Evaporation________________________________
+
+            # 2.) Evapotranspiration data
+            if not "Actual_Evapotranspiration" in Variables_NC:
+                # Get the data of Evaporation and save as nc
+                DataCube_ET = RC.Get3Darray_time_series_monthly(Data_Path_ET, Startdate_part, Enddate_part, Example_data = Example_dataset)
+                nc.Add_Variable(DataCube_ET, "Actual_Evapotranspiration", "mm/month", 0.01)
+                del DataCube_ET
+
+            #_______________________Reference Evaporation______________________________
+
+            # 3.) Reference Evapotranspiration data
+            if (WaterPIX_filename == "" or Supply_method == "Fraction") and not ("Reference_Evapotranspiration" in Variables_NC):
+                # Get the data of Precipitation and save as nc
+                DataCube_ETref = RC.Get3Darray_time_series_monthly(Data_Path_ETref, Startdate_part, Enddate_part, Example_data = Example_dataset)
+                nc.Add_Variable(DataCube_ETref, "Reference_Evapotranspiration", "mm/month", 0.01)
+                del DataCube_ETref
 
         #____________________________fraction surface water _______________________
 
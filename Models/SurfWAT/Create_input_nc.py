@@ -138,6 +138,7 @@ def main(files_DEM_dir, files_DEM, files_Basin, files_Runoff, files_Extraction,
     lon_n = len(lon_ls)
 
     # Create NetCDF file
+    RC.Close_nc_handle(input_nc)
     nc_file = netCDF4.Dataset(input_nc, 'w')
     nc_file.set_fill_on()
 
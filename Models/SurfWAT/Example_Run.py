@@ -35,6 +35,7 @@ resolution = '15s'
 input_JRC = r"G:\Create_Sheets\Wainganga\JRC\Occurrence\JRC_Occurrence_percent.tif"
 Inflow_Text_Files = []
 include_reservoirs = 1  # 1 = on, 0 = off
+routing_method = 'sweep'  # or 'topological'
 
 # Define start and enddate
 startdate = "2011-01-01"
@@ -44,7 +45,7 @@ enddate = "2011-12-31"
 SurfWAT.Create_input_nc.main(files_DEM_dir, files_DEM, files_Basin, files_Runoff, files_Extraction, startdate, enddate, input_nc, resolution, Format_DEM_dir, Format_DEM, Format_Basin, Format_Runoff, Format_Extraction)
 
 # Run SurfWAT
-SurfWAT.Run_SurfWAT.main(input_nc, output_nc, input_JRC, Inflow_Text_Files, include_reservoirs)
+SurfWAT.Run_SurfWAT.main(input_nc, output_nc, input_JRC, Inflow_Text_Files, include_reservoirs, routing_method)
 
 
 
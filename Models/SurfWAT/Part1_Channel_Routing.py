@@ -9,7 +9,7 @@ import numpy as np
 import time
 import sys
 
-def Run(Runoff_in_m3_month, flow_directions, Basin):
+def Run(Runoff_in_m3_month, flow_directions, Basin, Routing_Method = 'sweep'):
 
     time1 = time.time()
 
@@ -24,47 +24,55 @@ def Run(Runoff_in_m3_month, flow_directions, Basin):
     dataflow_in[0,:,:] = dataflow_in0 * Basin
     dataflow_in[1:,:,:] = Runoff_in_m3_month * Basin
 
-    # The flow directions parameters of HydroSHED
-    Directions = [1, 2, 4, 8, 16, 32, 64, 128]
-
-    # Route the data
-    dataflow_next = dataflow_in[0,:,:]
-    data_flow_tot = np.copy(dataflow_in)
-    dataflow_previous = np.zeros([size_Y, size_X])
-    while np.sum(dataflow_next) != np.sum(dataflow_previous):
-        data_flow_round = np.zeros([int(np.size(Runoff_in_m3_month,0)+1),size_Y, size_X])
-        dataflow_previous = np.copy(dataflow_next)
-        for Direction in Directions:
-
-            data_dir = np.zeros([int(np.size(Runoff_in_m3_month,0)+1),size_Y, size_X])
-            data_dir[:,np.logical_and(flow_directions == Direction,dataflow_next == 1)] = dataflow_in[:,np.logical_and(flow_directions == Direction,dataflow_next == 1)]
-            data_flow = np.zeros([int(np.size(Runoff_in_m3_month,0)+1), size_Y, size_X])
-
-            if Direction == 4:
-                data_flow[:,1:,:] = data_dir[:,:-1,:]
-            if Direction == 2:
-                data_flow[:,1:,1:] = data_dir[:,:-1,:-1]
-            if Direction == 1:
-                data_flow[:,:,1:] = data_dir[:,:,:-1]
-            if Direction == 128:
-                data_flow[:,:-1,1:] = data_dir[:,1:,:-1]
-            if Direction == 64:
-                data_flow[:,:-1,:] = data_dir[:,1:,:]
-            if Direction == 32:
-                data_flow[:,:-1,:-1] = data_dir[:,1:,1:]
-            if Direction == 16:
-                data_flow[:,:,:-1] = data_dir[:,:,1:]
-            if Direction == 8:
-                data_flow[:,1:,:-1] = data_dir[:,:-1,1:]
-
-            data_flow_round += data_flow
-        dataflow_in = np.copy(data_flow_round)
-        dataflow_next[dataflow_in[0,:,:]==0.] = 0
-
-        sys.stdout.write("\rstill %s pixels to go        " %int(np.nansum(dataflow_next)))
-        sys.stdout.flush()
-
-        data_flow_tot += data_flow_round
+    if Routing_Method == 'topological':
+
+        # Order the pixels once from upstream to downstream and route all the months in one pass
+        Flow_Order = Create_Flow_Order(flow_directions, Basin)
+        data_flow_tot = Route_Flow_Order(dataflow_in, Flow_Order)
+
+    else:
+
+        # The flow directions parameters of HydroSHED
+        Directions = [1, 2, 4, 8, 16, 32, 64, 128]
+
+        # Route the data
+        dataflow_next = dataflow_in[0,:,:]
+        data_flow_tot = np.copy(dataflow_in)
+        dataflow_previous = np.zeros([size_Y, size_X])
+        while np.sum(dataflow_next) != np.sum(dataflow_previous):
+            data_flow_round = np.zeros([int(np.size(Runoff_in_m3_month,0)+1),size_Y, size_X])
+            dataflow_previous = np.copy(dataflow_next)
+            for Direction in Directions:
+
+                data_dir = np.zeros([int(np.size(Runoff_in_m3_month,0)+1),size_Y, size_X])
+                data_dir[:,np.logical_and(flow_directions == Direction,dataflow_next == 1)] = dataflow_in[:,np.logical_and(flow_directions == Direction,dataflow_next == 1)]
+                data_flow = np.zeros([int(np.size(Runoff_in_m3_month,0)+1), size_Y, size_X])
+
+                if Direction == 4:
+                    data_flow[:,1:,:] = data_dir[:,:-1,:]
+                if Direction == 2:
+                    data_flow[:,1:,1:] = data_dir[:,:-1,:-1]
+                if Direction == 1:
+                    data_flow[:,:,1:] = data_dir[:,:,:-1]
+                if Direction == 128:
+                    data_flow[:,:-1,1:] = data_dir[:,1:,:-1]
+                if Direction == 64:
+                    data_flow[:,:-1,:] = data_dir[:,1:,:]
+                if Direction == 32:
+                    data_flow[:,:-1,:-1] = data_dir[:,1:,1:]
+                if Direction == 16:
+                    data_flow[:,:,:-1] = data_dir[:,:,1:]
+                if Direction == 8:
+                    data_flow[:,1:,:-1] = data_dir[:,:-1,1:]
+
+                data_flow_round += data_flow
+            dataflow_in = np.copy(data_flow_round)
+            dataflow_next[dataflow_in[0,:,:]==0.] = 0
+
+            sys.stdout.write("\rstill %s pixels to go        " %int(np.nansum(dataflow_next)))
+            sys.stdout.flush()
+
+            data_flow_tot += data_flow_round
 
     print 'time', time.time() - time1
 
@@ -81,3 +89,68 @@ def Run(Runoff_in_m3_month, flow_directions, Basin):
     Routed_Array[:, Basin != 1] = -9999
 
     return(Routed_Array, Accumulated_Pixels, Rivers)
+
+def Create_Flow_Order(flow_directions, Basin):
+    """
+    Orders the pixels of the flow direction grid from upstream to downstream.
+    The pixels are grouped in levels: all the pixels that flow into a pixel
+    of a level are part of one of the previous levels. Only basin pixels
+    pass their flow to the downstream pixel, like in the sweep routing.
+
+    Returns a list with for every level the pixels (flat indices) sorted by
+    their downstream pixel, the start positions of each downstream pixel in
+    that list and the unique downstream pixels.
+    """
+    size_Y, size_X = np.shape(flow_directions)
+    Amount_Pixels = size_Y * size_X
+
+    # The flow directions parameters of HydroSHED and the shift of the downstream pixel (Y, X)
+    Directions = {1: (0, 1), 2: (1, 1), 4: (1, 0), 8: (1, -1), 16: (0, -1), 32: (-1, -1), 64: (-1, 0), 128: (-1, 1)}
+
+    # Find the downstream pixel of every pixel (-1 if the flow leaves the basin or grid)
+    Y, X = np.indices([size_Y, size_X])
+    Downstream = -1 * np.ones(Amount_Pixels, dtype = np.int64)
+    for Direction, (Shift_Y, Shift_X) in Directions.items():
+        Pixels = np.logical_and(flow_directions == Direction, Basin == 1)
+        Y_down = Y[Pixels] + Shift_Y
+        X_down = X[Pixels] + Shift_X
+        Inside = np.logical_and.reduce((Y_down >= 0, Y_down < size_Y, X_down >= 0, X_down < size_X))
+        Downstream[np.ravel_multi_index((Y[Pixels][Inside], X[Pixels][Inside]), (size_Y, size_X))] = np.ravel_multi_index((Y_down[Inside], X_down[Inside]), (size_Y, size_X))
+
+    # Amount of upstream pixels that still need to be routed
+    Has_Downstream = Downstream >= 0
+    In_Degree = np.bincount(Downstream[Has_Downstream], minlength = Amount_Pixels)
+
+    # Kahn's algorithm, one level at the time
+    Flow_Order = []
+    Level = np.nonzero(np.logical_and(In_Degree == 0, Has_Downstream))[0]
+    while len(Level) > 0:
+        Level = Level[np.argsort(Downstream[Level], kind = 'mergesort')]
+        Targets, Starts = np.unique(Downstream[Level], return_index = True)
+        Flow_Order.append((Level, Starts, Targets))
+        np.subtract.at(In_Degree, Downstream[Level], 1)
+        Level = Targets[np.logical_and(In_Degree[Targets] == 0, Has_Downstream[Targets])]
+
+    # Pixels in a loop of flow directions are never released and do not pass their flow
+    Amount_Ordered = np.sum([len(Level) for Level, Starts, Targets in Flow_Order])
+    if Amount_Ordered < np.sum(Has_Downstream):
+        print 'WARNING: %s pixels are part of a flow direction loop and are not routed further' %int(np.sum(Has_Downstream) - Amount_Ordered)
+
+    return(Flow_Order)
+
+def Route_Flow_Order(dataflow_in, Flow_Order):
+    """
+    Accumulates a (time, Y, X) array along the flow order of Create_Flow_Order.
+    Every pixel is visited once, so the costs scale with pixels times time steps.
+    """
+    size_Z, size_Y, size_X = np.shape(dataflow_in)
+
+    # Pixels on the first axis, so the time series of a pixel is contiguous
+    data_flow_tot = np.ascontiguousarray(np.reshape(dataflow_in, (size_Z, size_Y * size_X)).T)
+
+    for Level, Starts, Targets in Flow_Order:
+        data_flow_tot[Targets, :] += np.add.reduceat(data_flow_tot[Level, :], Starts, axis = 0)
+
+    data_flow_tot = np.reshape(data_flow_tot.T, (size_Z, size_Y, size_X))
+
+    return(data_flow_tot)
@@ -25,69 +25,11 @@ def Run(input_nc, output_nc):
     geo_out_example, epsg_example, size_X_example, size_Y_example, size_Z_example, Time_example = RC.Open_nc_info(input_nc)
     geo_out_example = np.array(geo_out_example)
 
-    # Create a river array with a boundary of 1 pixel
-    Rivers_bounds = np.zeros([size_Y_example+2, size_X_example+2])
-    Rivers_bounds[1:-1,1:-1] = Rivers
-
-    # Create a flow direction array with a boundary of 1 pixel
+    # Create the flow direction array (no flow direction is -32768)
     flow_directions[flow_directions==0]=-32768
-    flow_directions_bound = np.ones([size_Y_example+2, size_X_example+2]) * -32768
-    flow_directions_bound[1:-1,1:-1] = flow_directions
-
-    # Create ID Matrix
-    y,x = np.indices((size_Y_example, size_X_example))
-    ID_Matrix = np.int32(np.ravel_multi_index(np.vstack((y.ravel(),x.ravel())),(size_Y_example,size_X_example),mode='clip').reshape(x.shape))
-    ID_Matrix_bound = np.ones([size_Y_example+2, size_X_example+2]) * -32768
-    ID_Matrix_bound[1:-1,1:-1] = ID_Matrix + 1
-    ID_Matrix_bound[flow_directions_bound==-32768]=-32768
-    del  x, y
-
-    # Empty total from and to arrays
-    ID_to_total=np.array([])
-    ID_from_total=np.array([])
-
-    # The flow directions parameters of HydroSHED
-    Directions = [1, 2, 4, 8, 16, 32, 64, 128]
-
-    # Loop over the directions
-    for Direction in Directions:
-
-        # empty from and to arrays for 1 direction
-        data_flow_to = np.zeros([size_Y_example + 2, size_X_example + 2])
-        data_flow_from = np.zeros([size_Y_example + 2, size_X_example + 2])
-
-        # Get the ID of only the rivers
-        data_flow_to_ID = np.zeros([size_Y_example + 2, size_X_example + 2])
-        data_flow_in = np.ones([size_Y_example + 2, size_X_example + 2])	* Rivers_bounds
-
-        # Mask only one direction
-        data_flow_from[flow_directions_bound == Direction] = data_flow_in[flow_directions_bound == Direction] * ID_Matrix_bound[flow_directions_bound == Direction]
-
-        # Add the data flow to ID
-        if Direction == 4:
-            data_flow_to[1:,:] = data_flow_from[:-1,:]
-        if Direction == 2:
-            data_flow_to[1:,1:] = data_flow_from[:-1,:-1]
-        if Direction == 1:
-            data_flow_to[:,1:] = data_flow_from[:,:-1]
-        if Direction == 128:
-            data_flow_to[:-1,1:] = data_flow_from[1:,:-1]
-        if Direction == 64:
-            data_flow_to[:-1,:] = data_flow_from[1:,:]
-        if Direction == 32:
-            data_flow_to[:-1,:-1] = data_flow_from[1:,1:]
-        if Direction == 16:
-            data_flow_to[:,:-1] = data_flow_from[:,1:]
-        if Direction == 8:
-            data_flow_to[1:,:-1] = data_flow_from[:-1,1:]
-
-        # mask out the no river pixels
-        data_flow_to_ID[data_flow_to>0] = ID_Matrix_bound[data_flow_to>0]
-
-        # Collect to and from arrays
-        ID_from_total = np.append(ID_from_total,data_flow_from[data_flow_from!=0].ravel())
-        ID_to_total = np.append(ID_to_total,data_flow_to_ID[data_flow_to_ID!=0].ravel())
 
+    # Create the upstream and downstream structure of the river pixels
+    Downstream, Upstream_Start, Upstream = Create_River_Network(flow_directions, Rivers)
 
     ######################## Define the starting point ############################
 
@@ -119,71 +61,8 @@ def Run(input_nc, output_nc):
             else:
                 End_Points = np.vstack([End_Points, PosPix])
 
-    # Create an empty dictionary for the rivers
-    River_dict = dict()
-
-    # Create empty array for the loop
-    ID_starts_next = []
-    i = 0
-
-    for End_Point in End_Points[1:]:
-
-    # Define starting point
-    # Max_Acc_Pix = np.nanmax(Accumulated_Pixels[ID_Matrix_bound[1:-1,1:-1]>0])
-    # ncol, nrow = np.argwhere(Accumulated_Pixels==Max_Acc_Pix)[0]
-
-    # Add Bounds
-    # col = ncol + 1
-    # row = nrow + 1
-
-        col = End_Point[0] + 1
-        row = End_Point[1] + 1
-
-        ############################ Route the river ##################################
-
-        # Get the ID of the starting point
-        ID_starts = [ID_Matrix_bound[col,row]]
-
-
-        # Keep going on till all the branches are looped
-        while len(ID_starts) > 0:
-            for ID_start in ID_starts:
-                ID_start = int(ID_start)
-
-                # Empty parameters for new starting point
-                new = 0
-                IDs = []
-
-                # Add starting point
-                Arrays_from = np.argwhere(ID_from_total[:] == ID_start)
-                ID_from = ID_to_total[int(Arrays_from[0])]
-                IDs = np.array([ID_from, ID_start])
-                ID_start_now = ID_start
-
-                # Keep going till the branch ends
-                while new == 0:
-
-                    Arrays_to = np.argwhere(ID_to_total[:] == ID_start)
-
-                    # Add IDs to the river dictionary
-                    if len(Arrays_to)>1 or len(Arrays_to) == 0:
-                        River_dict[i] = IDs
-                        i += 1
-                        new = 1
-
-                        # Define the next loop for the new branches
-                        for j in range(0, len(Arrays_to)):
-                            ID_starts_next = np.append(ID_starts_next,ID_from_total[int(Arrays_to[j])])
-
-                        # If it was the last one then empty ID_start_next
-                        if ID_start_now == ID_starts[-1]:
-                            ID_starts = ID_starts_next
-                            ID_starts_next = []
-
-                    # Add pixel to tree for river dictionary
-                    else:
-                        ID_start = ID_from_total[Arrays_to[0]]
-                        IDs = np.append(IDs, ID_start)
+    # Trace the river branches from the end points upstream
+    River_dict = Trace_Rivers(End_Points[1:], Downstream, Upstream_Start, Upstream, size_X_example)
 
     ######################## Create dict distance and dict dem ####################
 
@@ -205,99 +84,156 @@ def Run(input_nc, output_nc):
     Distance[np.logical_or(flow_directions == 64,flow_directions == 4)] = vertical[np.logical_or(flow_directions == 64,flow_directions == 4)]
     Distance[np.logical_or(np.logical_or(np.logical_or(flow_directions == 32,flow_directions == 8),flow_directions == 128),flow_directions == 2)] = diagonal[np.logical_or(np.logical_or(np.logical_or(flow_directions == 32,flow_directions == 8),flow_directions == 128),flow_directions == 2)]
 
-    # Create empty dicionaries for discharge, distance, and DEM
-    Discharge_dict = dict()
-    Distance_dict = dict()
-    DEM_dict = dict()
+    # Get the DEM and the cumulative distance along every branch
+    DEM_dict, Distance_dict = River_Properties(River_dict, DEM, Distance)
 
-    # Create empty arrays needed for the loop
-    River_end = []
-    River_ends = np.zeros([2,3])
+    ########################## Discharge Dictionary ###############################
 
+    # Create empty dicionaries for discharge
+    Discharge_dict = dict()
 
-    # Loop over the branches
+    # The discharge of every pixel in the branch
+    Routed_Pixels = np.float64(Routed_Array.reshape(Routed_Array.shape[0], -1))
     for River_number in range(0,len(River_dict)):
+        Discharge_dict[River_number] = Routed_Pixels[:, River_Pixels(River_dict[River_number])]
 
-        # Get the pixels associated with the river section
-        River = River_dict[River_number]
-        i=1
-
-        # Create empty arrays
-        Distances_river = np.zeros([len(River)])
-        DEM_river = np.zeros([len(River)])
-        Discharge_river = np.zeros([len(River)])
-
-        # for the first pixel get the previous pixel value from another branche
-        row_start = np.argwhere(River_ends[:,0] == River[0])
-        if len(row_start) < 1:
-            Distances_river[0] = 0
-            row, col = np.argwhere(ID_Matrix_bound == River[0])[0][:]
-            DEM_river[0] = DEM[row - 1, col - 1]
-            Discharge_river[0] = -9999
-
-        else:
-            Distances_river[0] = River_ends[row_start, 1]
-            DEM_river[0] = River_ends[row_start, 2]
-            row, col = np.argwhere(ID_Matrix_bound == River[0])[0][:]
-            #Discharge_river[0] = Routed_Discharge[timestep, row - 1, col - 1]
-
-        # For the other pixels get the value of the River ID pixel
-        for River_part in River[1:]:
-            row, col = np.argwhere(ID_Matrix_bound == River_part)[0][:]
-            Distances_river[i] = Distance[row - 1, col - 1]
-            DEM_river[i] = np.max([DEM_river[i-1],DEM[row - 1, col - 1]])
-            #Discharge_river[i] = Routed_Discharge[timestep, row - 1, col - 1]
-
-            if River_part == River[1] and Discharge_river[i-1] == -9999:
-                Discharge_river[i - 1] = Discharge_river[i]
-
-            i += 1
+    return(DEM_dict, River_dict, Distance_dict, Discharge_dict)
 
-        # Write array in dictionary
-        DEM_dict[River_number] = DEM_river
-        Discharge_dict[River_number] = Discharge_river
-        Distance_dict[River_number] = np.cumsum(Distances_river)
 
-        # Save the last pixel value
-        River_end[:] = [River_part , np.cumsum(Distances_river)[-1], DEM_river[-1]]
-        River_ends = np.vstack((River_ends, River_end))
+def Create_River_Network(flow_directions, Rivers):
+    """
+    Creates the compressed adjacency structure of the river pixels from the
+    flow direction grid in one pass over the grid.
+
+    Returns the downstream pixel (flat index) of every pixel (-1 if the pixel
+    is no river pixel, or if the flow leaves the grid or reaches a pixel
+    without flow direction), and for every pixel its upstream river pixels
+    Upstream[Upstream_Start[pixel]:Upstream_Start[pixel + 1]], ordered by
+    flow direction (1, 2, 4, ..., 128).
+    """
+    size_Y, size_X = np.shape(flow_directions)
+    Amount_Pixels = size_Y * size_X
+
+    # The flow directions parameters of HydroSHED and the shift of the downstream pixel (Y, X)
+    Directions = [(1, (0, 1)), (2, (1, 1)), (4, (1, 0)), (8, (1, -1)), (16, (0, -1)), (32, (-1, -1)), (64, (-1, 0)), (128, (-1, 1))]
+
+    # Pixels that can receive flow
+    Y, X = np.indices([size_Y, size_X])
+    Has_Direction = (flow_directions != -32768).ravel()
+
+    # Upstream river pixel of every pixel for every direction (-1 if there is none)
+    Downstream = -1 * np.ones(Amount_Pixels, dtype = np.int64)
+    Upstream_Directions = -1 * np.ones([Amount_Pixels, len(Directions)], dtype = np.int64)
+    for k, (Direction, (Shift_Y, Shift_X)) in enumerate(Directions):
+        Pixels = np.logical_and(flow_directions == Direction, Rivers != 0)
+        Y_down = Y[Pixels] + Shift_Y
+        X_down = X[Pixels] + Shift_X
+        Inside = np.logical_and.reduce((Y_down >= 0, Y_down < size_Y, X_down >= 0, X_down < size_X))
+        Pixels_from = np.ravel_multi_index((Y[Pixels][Inside], X[Pixels][Inside]), (size_Y, size_X))
+        Pixels_to = np.ravel_multi_index((Y_down[Inside], X_down[Inside]), (size_Y, size_X))
+        Pixels_from, Pixels_to = Pixels_from[Has_Direction[Pixels_to]], Pixels_to[Has_Direction[Pixels_to]]
+        Downstream[Pixels_from] = Pixels_to
+        Upstream_Directions[Pixels_to, k] = Pixels_from
+
+    # Compress the upstream pixels
+    Has_Upstream = Upstream_Directions >= 0
+    Upstream_Start = np.zeros(Amount_Pixels + 1, dtype = np.int64)
+    Upstream_Start[1:] = np.cumsum(np.sum(Has_Upstream, axis = 1))
+    Upstream = Upstream_Directions[Has_Upstream]
+
+    return(Downstream, Upstream_Start, Upstream)
+
+
+def Trace_Rivers(End_Points, Downstream, Upstream_Start, Upstream, size_X):
+    """
+    Splits the river network upstream of the end points in branches. A branch
+    starts with the downstream pixel of its first pixel and stops at a
+    confluence or a source. The branches are numbered per end point, level by
+    level, in the order of the upstream structure.
+
+    Returns the river dictionary with for every branch the IDs of the pixels
+    (flat index + 1, -32768 for a pixel outside the grid).
+    """
+    River_dict = dict()
+    i = 0
 
+    for End_Point in End_Points:
 
-    ########################## Discharge Dictionary ###############################
+        # Get the ID of the starting point
+        Starts = [int(End_Point[0]) * size_X + int(End_Point[1])]
 
-    # Create ID Matrix
-    y,x = np.indices((size_Y_example, size_X_example))
-    ID_Matrix = np.int32(np.ravel_multi_index(np.vstack((y.ravel(),x.ravel())),(size_Y_example,size_X_example),mode='clip').reshape(x.shape))
-    ID_Matrix_bound = np.ones([size_Y_example+2, size_X_example+2]) * -32768
-    ID_Matrix_bound[1:-1,1:-1] = ID_Matrix + 1
-    del  x, y
+        # Keep going on till all the branches are looped
+        while len(Starts) > 0:
+            Starts_next = []
+            for Start in Starts:
+                Pixels = [Downstream[Start], Start]
+                Pixel = Start
 
-    # Create empty dicionaries for discharge, distance, and DEM
-    Discharge_dict = dict()
+                # Keep going till the branch ends
+                while Upstream_Start[Pixel + 1] - Upstream_Start[Pixel] == 1:
+                    Pixel = Upstream[Upstream_Start[Pixel]]
+                    Pixels.append(Pixel)
 
-    Amount_months = len(RC.Open_nc_array(input_nc, Var = 'time'))
+                River_dict[i] = River_IDs(np.array(Pixels))
+                i += 1
+
+                # Define the next loop for the new branches
+                Starts_next.extend(Upstream[Upstream_Start[Pixel]:Upstream_Start[Pixel + 1]])
+
+            Starts = Starts_next
+
+    return(River_dict)
+
+
+def River_Properties(River_dict, DEM, Distance):
+    """
+    Calculates for every branch the DEM (the maximum of the pixels downstream
+    within the branch) and the cumulative flow distance, starting from the
+    values at the end of the downstream branch.
+    """
+    DEM_dict = dict()
+    Distance_dict = dict()
+
+    # Values at the last pixel of every branch
+    River_ends = dict()
 
     # Loop over the branches
     for River_number in range(0,len(River_dict)):
 
         # Get the pixels associated with the river section
         River = River_dict[River_number]
-        i=0
+        Pixels = River_Pixels(River)
 
-        # Create empty arrays
-        Discharge_river = np.zeros([Amount_months, len(River)])
+        # For the first pixel get the previous pixel value from another branche
+        Distances_river = np.append(0, Distance.ravel()[Pixels[1:]])
+        DEM_river = np.float64(DEM.ravel()[Pixels])
+        if River[0] in River_ends:
+            Distances_river[0], DEM_river[0] = River_ends[River[0]]
 
-        # For the other pixels get the value of the River ID pixel
-        for River_part in River[:]:
-            row, col = np.argwhere(ID_Matrix_bound == River_part)[0][:]
-            Discharge_river[:,i] = Routed_Array[:, row - 1, col - 1]
-            i += 1
+        # The DEM can only increase in upstream direction
+        DEM_river = np.maximum.accumulate(DEM_river)
 
         # Write array in dictionary
-        Discharge_dict[River_number] = Discharge_river
-        print(River_number)
+        DEM_dict[River_number] = DEM_river
+        Distance_dict[River_number] = np.cumsum(Distances_river)
+
+        # Save the last pixel value
+        River_ends[River[-1]] = (Distance_dict[River_number][-1], DEM_river[-1])
+
+    return(DEM_dict, Distance_dict)
 
-    return(DEM_dict, River_dict, Distance_dict, Discharge_dict)
 
+def River_IDs(Pixels):
+    """
+    Converts flat pixel indices into river IDs (flat index + 1, -32768 for -1).
+    """
+    return(np.where(Pixels >= 0, Pixels + 1, -32768).astype(np.float64))
 
 
+def River_Pixels(River):
+    """
+    Converts river IDs into flat pixel indices. A pixel outside the grid
+    (-32768) is read from the last pixel of the grid, like the ID search on
+    the bounded ID matrix did before.
+    """
+    return(np.where(River > 0, River - 1, -1).astype(np.int64))
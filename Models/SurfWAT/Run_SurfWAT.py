@@ -5,7 +5,7 @@ Created on Mon Mar 12 15:11:17 2018
 @author: tih
 """
 
-def main(input_nc, output_nc, input_JRC, Inflow_Text_Files, include_reservoirs = 1):
+def main(input_nc, output_nc, input_JRC, Inflow_Text_Files, include_reservoirs = 1, routing_method = 'sweep'):
 
     import time
     import wa.General.raster_conversions as RC
@@ -41,7 +41,7 @@ def main(input_nc, output_nc, input_JRC, Inflow_Text_Files, include_reservoirs =
     ###############################################################################
 
     import wa.Models.SurfWAT.Part1_Channel_Routing as Part1_Channel_Routing
-    Routed_Array, Accumulated_Pixels, Rivers = Part1_Channel_Routing.Run(Runoff_in_m3_month, flow_directions, Basin)
+    Routed_Array, Accumulated_Pixels, Rivers = Part1_Channel_Routing.Run(Runoff_in_m3_month, flow_directions, Basin, routing_method)
 
     ###############################################################################
     ################## Create NetCDF Part 1 results ###############################
@@ -65,6 +65,7 @@ def main(input_nc, output_nc, input_JRC, Inflow_Text_Files, include_reservoirs =
     ################################ Save NetCDF ##################################
 
     # Create NetCDF file
+    RC.Close_nc_handle(output_nc)
     nc_file = netCDF4.Dataset(output_nc, 'w', format = 'NETCDF4')
     nc_file.set_fill_on()
 
@@ -148,26 +149,16 @@ def main(input_nc, output_nc, input_JRC, Inflow_Text_Files, include_reservoirs =
     ###############################################################################
 
     # Create NetCDF file
+    RC.Close_nc_handle(output_nc)
     nc_file = netCDF4.Dataset(output_nc, 'r+', format = 'NETCDF4')
     nc_file.set_fill_on()
 
     ###################### Save Dictionaries in NetCDF ############################
 
-    parmsdem = nc_file.createGroup('demdict_static')
-    for k,v in DEM_dict.items():
-        setattr(parmsdem, str(k), str(v.tolist()))
-
-    parmsriver = nc_file.createGroup('riverdict_static')
-    for k,v in River_dict.items():
-        setattr(parmsriver, str(k), str(v.tolist()))
-
-    parmsdist = nc_file.createGroup('distancedict_static')
-    for k,v in Distance_dict.items():
-        setattr(parmsdist, str(k), str(v.tolist()))
-
-    parmsdis = nc_file.createGroup('dischargedict_dynamic')
-    for k,v in Discharge_dict.items():
-        setattr(parmsdis, str(k), str(v.tolist()))
+    DC.Add_NC_Dict(nc_file, 'demdict_static', DEM_dict)
+    DC.Add_NC_Dict(nc_file, 'riverdict_static', River_dict)
+    DC.Add_NC_Dict(nc_file, 'distancedict_static', Distance_dict)
+    DC.Add_NC_Dict(nc_file, 'dischargedict_dynamic', Discharge_dict)
 
     # Close file
     time.sleep(1)
@@ -194,26 +185,16 @@ def main(input_nc, output_nc, input_JRC, Inflow_Text_Files, include_reservoirs =
     ###############################################################################
 
     # Create NetCDF file
+    RC.Close_nc_handle(output_nc)
     nc_file = netCDF4.Dataset(output_nc, 'r+', format = 'NETCDF4')
     nc_file.set_fill_on()
 
     ###################### Save Dictionaries in NetCDF ############################
 
-    parmsdisres = nc_file.createGroup('dischargedictreservoirs_dynamic')
-    for k,v in Discharge_dict_2.items():
-        setattr(parmsdisres, str(k), str(v.tolist()))
-
-    parmsrivresend = nc_file.createGroup('riverdictres_static')
-    for k,v in River_dict_2.items():
-        setattr(parmsrivresend, str(k), str(v.tolist()))
-
-    parmsdemres = nc_file.createGroup('demdictres_static')
-    for k,v in DEM_dict_2.items():
-        setattr(parmsdemres, str(k), str(v.tolist()))
-
-    parmsdistres = nc_file.createGroup('distancedictres_static')
-    for k,v in Distance_dict_2.items():
-        setattr(parmsdistres, str(k), str(v.tolist()))
+    DC.Add_NC_Dict(nc_file, 'dischargedictreservoirs_dynamic', Discharge_dict_2)
+    DC.Add_NC_Dict(nc_file, 'riverdictres_static', River_dict_2)
+    DC.Add_NC_Dict(nc_file, 'demdictres_static', DEM_dict_2)
+    DC.Add_NC_Dict(nc_file, 'distancedictres_static', Distance_dict_2)
 
     # Close file
     time.sleep(1)
@@ -233,14 +214,13 @@ def main(input_nc, output_nc, input_JRC, Inflow_Text_Files, include_reservoirs =
     ###############################################################################
 
     # Create NetCDF file
+    RC.Close_nc_handle(output_nc)
     nc_file = netCDF4.Dataset(output_nc, 'r+', format = 'NETCDF4')
     nc_file.set_fill_on()
 
     ###################### Save Dictionaries in NetCDF ############################
 
-    parmsdisend = nc_file.createGroup('dischargedictend_dynamic')
-    for k,v in Discharge_dict_end.items():
-        setattr(parmsdisend, str(k), str(v.tolist()))
+    DC.Add_NC_Dict(nc_file, 'dischargedictend_dynamic', Discharge_dict_end)
 
     # Close file
     time.sleep(1)
@@ -260,6 +240,7 @@ def main(input_nc, output_nc, input_JRC, Inflow_Text_Files, include_reservoirs =
     ###################### Save Dictionaries in NetCDF ############################
 
     # Create NetCDF file
+    RC.Close_nc_handle(output_nc)
     nc_file = netCDF4.Dataset(output_nc, 'r+', format = 'NETCDF4')
     nc_file.set_fill_on()
 
@@ -0,0 +1,731 @@
+# -*- coding: utf-8 -*-
+"""
+Authors: Gonzalo E. Espinoza-Dávalos
+         IHE Delft 2017
+Contact: g.espinoza@un-ihe.org
+Repository: https://github.com/gespinoza/waterpix
+Module: waterpix
+
+Description:
+Array counterparts of the per-pixel functions in waterpix.functions. Every
+variable is stored in a dictionary of numpy arrays with the months on the
+first axis and the pixels on the remaining axes, i.e. (time, pixels) or
+(time, y, x). Pixel parameters are arrays that broadcast against the
+trailing axes.
+
+The baseflow and the incremental surface runoff are solved in closed form
+(solver='closed'). With solver='fsolve' they are solved with fsolve_array,
+which reproduces the fsolve calls of the per-pixel functions exactly.
+"""
+
+from __future__ import division
+import pandas as pd
+from scipy.optimize import OptimizeResult
+
+np = pd.np
+
+
+def calculate_first_round_array(ds, pixel_pars, infz_bounds,
+                                tolerance_yearly_waterbal, solver='closed'):
+    '''
+    Calculates the water balance for all green pixels of a single year
+    '''
+    # Pixel parameters
+    thetasat, rootdepth, qratio, baseflow_filter = pixel_pars
+    # LAI and soil moisture calculations
+    ds = lai_and_soil_calculations_array(ds, thetasat, rootdepth)
+    # Check P-ET-dsm
+    p_et_dsm = (month_sum(ds['p']) - month_sum(ds['et']) -
+                month_sum(ds['dsm']))
+    second_round = np.where(p_et_dsm <= 0, 20, 0)
+    calc = p_et_dsm > 0
+    # Vegetation and interception calculations
+    ds = veg_int_calc_array(ds)
+    # Numeric solver, all pixels at once
+    qratio = np.broadcast_to(qratio, p_et_dsm.shape)
+
+    def infz_error(infz, active):
+        error = np.full(p_et_dsm.shape, np.nan)
+        error[active] = flows_calculations_first_round_array(
+            infz[active], pixel_subset(ds, active),
+            (qratio[active], baseflow_filter, p_et_dsm[active]), True,
+            solver)
+        return error
+
+    minerror_infz = minimize_scalar_bounded_array(infz_error, infz_bounds,
+                                                  calc)
+    infz = minerror_infz.x
+    error = minerror_infz.fun
+    # Flows calculation
+    ds = flows_calculations_first_round_array(infz, ds,
+                                              (qratio, baseflow_filter,
+                                               p_et_dsm), False, solver)
+    # Water balance fix for when percolation is artificially set to 0
+    maski = (ds['p'] - ds['et'] - ds['Qsw'] - ds['dsm']) < 0
+    ds['Qsw'] = np.where(maski, ds['p'] - ds['et'] - ds['dsm'], ds['Qsw'])
+    ds['Qsw'] = pos_func_array(ds['Qsw'])
+    # Total runoff
+    ds['Qtot'] = ds['Qsw'] + ds['Qgw']
+    second_round[calc & (np.sqrt(error) > tolerance_yearly_waterbal)] = 30
+    # Empty values where the balance was not calculated
+    empty = ~calc | (second_round > 0)
+    for hvar in ['Qsw', 'Qgw', 'Qtot', 'infz', 'perc']:
+        ds[hvar] = np.where(empty, np.nan, ds[hvar])
+    # Return arrays and second round codes
+    ds_out = dict((hvar, ds[hvar]) for hvar in ['Qsw', 'Qgw', 'Qtot', 'dsm',
+                                                'infz', 'thetarz', 'perc'])
+    return ds_out, second_round
+
+
+def flows_calculations_first_round_array(infz, ds, pixel_pars,
+                                         return_error, solver='closed'):
+    '''
+    Perform a first-round single iteration of the water balance (unbalanced)
+    on arrays
+    '''
+    # Pixel parameters
+    qratio, baseflow_filter, p_et_dsm = pixel_pars
+    # Calibration parameter
+    ds['infz'] = infz * np.ones_like(ds['p'])
+    # Runoff
+    ds['Qsw'] = ds['P_Int_2'] / (ds['p'] - ds['interception'] +
+                                 ds['infz'] * (ds['thetasat'] - ds['theta0']))
+    ds['Qgw'] = baseflow_calculation_array(ds['Qsw'], baseflow_filter,
+                                           qratio, solver)
+    # Remaining term of the water balance
+    ds['Rest_Term'] = ds['p'] - ds['et'] - ds['Qsw'] - ds['dsm']
+    ds['perc'] = pos_func_array(ds['Rest_Term'])
+    # Error calculation
+    flows = month_sum(ds['Qsw']) + month_sum(ds['Qgw'])
+    # The per-pixel error is a python float squared with pow(), which can
+    # round differently from the multiplication of numpy's ** 2
+    error = np.power(p_et_dsm - flows, 2)
+    # Return error or arrays
+    if return_error:
+        return np.abs(error)
+    else:
+        return ds
+
+
+def calculate_second_round_array(ds, pixel_pars, default_eff,
+                                 tolerance_monthly_greenpx,
+                                 incrunoff_propfactor_bounds,
+                                 solver='closed'):
+    '''
+    Calculates the water balance for all blue pixels of a single year
+    '''
+    # Pixel parameters
+    (thetasat, rootdepth, qratio, infz, a, b,
+     green_et_yr, blue_et_yr, baseflow_filter) = pixel_pars
+    # LAI and soil moisture calculations
+    ds = lai_and_soil_calculations_array(ds, thetasat, rootdepth)
+    # Vegetation and interception calculations
+    ds = veg_int_calc_array(ds)
+    # Percolation
+    ds['perc'] = a * (ds['thetarz']) ** b
+    # Flows calculation
+    ds = flows_calculations_second_round_array(infz, ds,
+                                               (qratio, baseflow_filter,
+                                                green_et_yr, blue_et_yr),
+                                               default_eff,
+                                               tolerance_monthly_greenpx,
+                                               incrunoff_propfactor_bounds,
+                                               solver)
+    # Total runoff
+    ds['Qtot'] = ds['Qsw'] + ds['Qgw']
+    # Output arrays
+    ds_out = dict((hvar, ds[hvar]) for hvar in [
+        'Qsw', 'delta_Qsw', 'Qgw', 'Qtot', 'dsm', 'infz', 'thetarz', 'perc',
+        'delta_perc', 'supply', 'eff', 'rainfed', 'et_blue', 'et_green'])
+    return ds_out
+
+
+def flows_calculations_second_round_array(infz, ds, pixel_pars, default_eff,
+                                          tolerance_monthly_greenpx,
+                                          incrunoff_propfactor_bounds,
+                                          solver='closed'):
+    '''
+    Perform a second-round single iteration of the water balance (unbalanced)
+    on arrays
+    '''
+    # Pixel parameters
+    qratio, baseflow_filter, green_et_yr, blue_et_yr = pixel_pars
+    # Calibration parameter
+    ds['infz'] = infz * np.ones_like(ds['p'])
+    # ET blue/green partitioning using the budyko curve
+    phi = zeros_and_negatives_array(ds['eto']/ds['p'])
+    ds['budyko'] = budyko_array(phi)
+    ds['et_green'] = np.fmin(1.1*ds['budyko']*ds['p'], ds['et'])
+    et_green_sum = month_nansum(ds['et_green'])
+    ds['et_green'] = np.where(et_green_sum > 0,
+                              (green_et_yr/et_green_sum)*ds['et_green'],
+                              ds['et_green'])
+    ds['et_blue'] = ds['et'] - ds['et_green']
+    et_blue_sum = month_nansum(ds['et_blue'])
+    ds['et_blue'] = np.where(et_blue_sum > 0,
+                             (blue_et_yr/et_blue_sum)*ds['et_blue'],
+                             ds['et_blue'])
+    # Runoff
+    ds['Qsw_green'] = ds['P_Int_2'] / (
+        ds['p'] - ds['interception'] +
+        ds['infz'] * (ds['thetasat'] - ds['theta0']))
+    # Remaining term of the water balance
+    ds['Rest_Term'] = ds['p'] - ds['et'] - ds['Qsw_green'] - ds['dsm']
+    ds['Rest_Term2'] = ds['p'] - ds['et_green'] - ds['Qsw_green'] - ds['dsm']
+    ds['Qgw_green'] = baseflow_calculation_array(ds['Qsw_green'],
+                                                 baseflow_filter, qratio,
+                                                 solver)
+    # Check for months without supply and correct percolation. The
+    # per-pixel loop reads the rows of df.iterrows, which are views of the
+    # data frame only when all its columns are float. Then the months after
+    # the first month with supply read the green percolation based on the
+    # green evapotranspiration. pos_func returns an int zero for negative
+    # values, so the rows are copies when all the months of Rest_Term or
+    # Rest_Term2 are negative.
+    nosup = (ds['et'] - ds['et_green']) < tolerance_monthly_greenpx
+    float_rows = (~np.all(ds['Rest_Term'] < 0, axis=0) &
+                  ~np.all(ds['Rest_Term2'] < 0, axis=0))
+    after_supply = float_rows & np.logical_or.accumulate(~nosup, axis=0)
+    ds['perc'] = np.where(nosup,
+                          np.where(after_supply,
+                                   pos_func_array(ds['Rest_Term2']),
+                                   pos_func_array(ds['Rest_Term'])),
+                          ds['perc'])
+    ds['perc_green'] = np.where(np.any(~nosup, axis=0),
+                                pos_func_array(ds['Rest_Term2']),
+                                pos_func_array(ds['Rest_Term']))
+    # Incremental percolation
+    ds['delta_perc'] = pos_func_array(ds['perc'] - ds['perc_green'])
+    # Fields updated by the incremental runoff calculation
+    for hvar in ['delta_Qsw', 'Qsw', 'Qgw', 'supply', 'eff']:
+        ds[hvar] = np.full(ds['p'].shape, np.nan)
+    ds['rainfed'] = np.ones(ds['p'].shape[1:])
+    # Inc. runoff proportional to SCS equation, find equality factor
+    supply_px = ~(month_nansum(ds['et_blue']) <= 0)
+
+    def factor_error(factor, active):
+        return incremental_runoff_calculation_array(
+            factor, ds, infz, tolerance_monthly_greenpx, True, active,
+            solver)
+
+    minerror_f = minimize_scalar_bounded_array(factor_error,
+                                               incrunoff_propfactor_bounds,
+                                               supply_px)
+    factor = minerror_f.x
+    # Runoff calculations
+    ds = incremental_runoff_calculation_array(factor, ds, infz,
+                                              tolerance_monthly_greenpx,
+                                              False, supply_px, solver)
+    ds['delta_Qsw'] = pos_func_array(ds['delta_Qsw'])
+    ds['Qgw'] = ds['Qgw_green']
+    # No supply
+    ds['delta_Qsw'] = np.where(supply_px, ds['delta_Qsw'], 0.0)
+    ds['Qsw'] = np.where(supply_px, ds['Qsw'], ds['Qsw_green'])
+    ds['supply'] = np.where(supply_px, ds['supply'], 0)
+    ds['eff'] = np.where(supply_px, ds['eff'], -9999)
+    ds['rainfed'] = np.where(supply_px, ds['rainfed'], 1)
+    ds['et_blue'] = np.where(supply_px, ds['et_blue'], 0)
+    ds['et_green'] = np.where(supply_px, ds['et_green'], ds['et'])
+    # Return arrays
+    return ds
+
+
+def incremental_runoff_calculation_array(factor, ds, infz,
+                                         tolerance_monthly_greenpx,
+                                         return_error, where=True,
+                                         solver='closed'):
+    '''
+    Calculate incremental runoff due water supply on arrays. As in the
+    per-pixel version, the arrays in ds are updated in place, so repeated
+    calls start from the percolation values of the previous call. Only the
+    pixels in 'where' are updated.
+    '''
+    where = np.broadcast_to(where, ds['p'].shape[1:])
+    # Check for months without supply
+    nosup = (ds['et'] - ds['et_green']) < tolerance_monthly_greenpx
+    sup = ~nosup & where
+    nosup = nosup & where
+    # No supply
+    np.copyto(ds['delta_Qsw'], 0.0, where=nosup)
+    np.copyto(ds['Qsw'], ds['Qsw_green'], where=nosup)
+    np.copyto(ds['Qgw'], ds['Qgw_green'], where=nosup)
+    np.copyto(ds['supply'], 0.0, where=nosup)
+    np.copyto(ds['eff'], -9999.0, where=nosup)
+    np.copyto(ds['et_green'], ds['et'], where=nosup)
+    np.copyto(ds['et_blue'], 0.0, where=nosup)
+    # Supply and incremental surface runoff
+    rest = ds['p'] - ds['et'] - ds['perc'] - ds['Qsw_green']
+    delta_qsw = delta_qsw_calculation(
+        factor * np.ones_like(rest), rest,
+        infz * (ds['thetasat'] - ds['theta0']), sup, solver)
+    delta_qsw = np.where(delta_qsw > 0, delta_qsw, 0.0)
+    delta_perc = ds['delta_perc']
+    supply_value = ds['et_blue'] + delta_qsw + delta_perc
+    supply_value_wb = -(ds['p'] - ds['et'] - ds['perc'] - ds['Qsw_green'] -
+                        delta_qsw - ds['dsm'])
+    green_perc_err = supply_value - supply_value_wb
+    new_perc_green = pos_func_array(ds['perc_green'] + green_perc_err)
+    new_perc = new_perc_green + delta_perc
+    eff = (supply_value - delta_qsw - delta_perc)/supply_value
+    # Save values
+    np.copyto(ds['delta_Qsw'], delta_qsw, where=sup)
+    np.copyto(ds['Qsw'], ds['Qsw_green'] + delta_qsw, where=sup)
+    np.copyto(ds['supply'], supply_value, where=sup)
+    np.copyto(ds['eff'], eff, where=sup)
+    np.copyto(ds['perc_green'], new_perc_green, where=sup)
+    np.copyto(ds['perc'], new_perc, where=sup)
+    # Store rainfed value
+    np.copyto(ds['rainfed'], np.where(np.any(sup, axis=0), 0.0, 1.0),
+              where=where)
+    # Error calculation, squared with pow() as the per-pixel python float
+    error = np.power(month_sum(ds['delta_Qsw']) -
+                     month_sum(ds['qratio']*ds['supply']) -
+                     month_sum(ds['qratio']*(ds['p'] - ds['et'] - ds['dsm'])) -
+                     month_sum(ds['Qsw_green']), 2)
+    # Return error or arrays
+    if return_error:
+        return np.abs(error)
+    else:
+        return ds
+
+
+def delta_qsw_calculation(factor, rest, infz_term, where, solver='closed'):
+    '''
+    Solve the incremental surface runoff of the months in 'where', given the
+    remaining term of the water balance (p - et - perc - Qsw_green).
+    With u = rest - delta_Qsw the equation is the quadratic
+    (1 - factor)*u**2 - (rest + infz_term)*u + rest*infz_term = 0. The root
+    on the side of the pole (u = infz_term) where the solver starts
+    (delta_Qsw = 0) is used. The months without such a root, or all months
+    with solver='fsolve', are solved with fsolve_array.
+    '''
+    with np.errstate(invalid='ignore', divide='ignore'):
+        disc = (rest - infz_term)**2 + 4*factor*rest*infz_term
+        root = 2*rest*infz_term / (rest + infz_term + np.sqrt(disc))
+        delta_qsw = rest - root
+        closed = ((disc >= 0) & (rest <= infz_term) & (infz_term > 0) &
+                  np.isfinite(delta_qsw))
+    if solver == 'fsolve':
+        closed = np.zeros(rest.shape, dtype=bool)
+    delta_qsw = np.where(where & closed, delta_qsw, np.nan)
+    iterative = where & ~closed
+    if np.any(iterative):
+        def delta_qsw_func(delta_qsw_value, active):
+            return delta_qsw_value - factor*(rest - delta_qsw_value)**2 / (
+                -(rest - delta_qsw_value) + infz_term)
+
+        with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+            delta_qsw = np.where(
+                iterative, fsolve_array(delta_qsw_func, 0.0, iterative).x,
+                delta_qsw)
+    return delta_qsw
+
+
+def lai_and_soil_calculations_array(ds, thetasat, rootdepth):
+    '''
+    Calculate thetasat, lai, and soil moisture parameters on arrays
+    '''
+    # Thetasat and soil moisture
+    ds['thetasat'] = thetasat * np.ones_like(ds['swi'])
+    ds['lai'] = zeros_and_negatives_array(ds['lai'])
+    ds['lai_0'] = np.where(np.isnan(ds['lai']), 0, ds['lai'])
+    # Soil moisture calculations
+    ds['theta0'] = thetasat * ds['swi']/100.0
+    ds['thetao'] = thetasat * ds['swio']/100.0
+    ds['thetax'] = thetasat * ds['swix']/100.0
+    # Argument for exponential function
+    ds['exp_arg'] = exp_arg_func_array(ds['theta0'], ds['thetasat'],
+                                       ds['lai_0'])
+    ds['exp_argo'] = exp_arg_func_array(ds['thetao'], ds['thetasat'],
+                                        ds['lai_0'])
+    ds['exp_argx'] = exp_arg_func_array(ds['thetax'], ds['thetasat'],
+                                        ds['lai_0'])
+    # Soil moisture values - root zone
+    ds['thetarz'] = (0.1*ds['lai_0'] +
+                     (1-0.1*ds['lai_0']) * (ds['exp_arg']))*ds['thetasat']
+    ds['thetarzo'] = (0.1*ds['lai_0'] +
+                      (1-0.1*ds['lai_0']) * (ds['exp_argo']))*ds['thetasat']
+    ds['thetarzx'] = (0.1*ds['lai_0'] +
+                      (1-0.1*ds['lai_0']) * (ds['exp_argx']))*ds['thetasat']
+    # Change in storage
+    ds['dsm'] = rootdepth*(ds['thetarzx'] - ds['thetarzo'])
+    return ds
+
+
+def veg_int_calc_array(ds):
+    '''
+    Calculate vegetation cover, interception, and (P - I)^2 on arrays
+    '''
+    # Vegetation cover
+    ds['vc'] = 1 - np.exp(-0.55*ds['lai'])
+    # Interception
+    ds['interception'] = np.where(
+        np.isnan(ds['lai']) | (ds['rainydays'] == 0.0), 0.0,
+        ds['lai'] * (1 - 1/(1 + ((ds['p']/ds['rainydays']*ds['vc']) /
+                                 ds['lai'])))*ds['rainydays'])
+    # Squared term
+    ds['P_Int_2'] = (ds['p'] - ds['interception']) ** 2
+    # Return arrays
+    return ds
+
+
+def baseflow_calculation_array(qsw_array, filter_par, qratio,
+                               solver='closed'):
+    '''
+    Calculate the baseflow using the runoff ratio and the surface runoff for
+    every pixel of the array. The filtered runoff of the recurrence in
+    functions.baseflow_function is q_temp[i] = filter_par**(i+1)*q0 + c[i],
+    and the yearly balance holds when the sum of q_temp is zero, so q0 is
+    solved directly. With solver='fsolve' the initial value is solved for
+    all pixels at once with fsolve_array instead.
+    '''
+    if solver == 'closed':
+        # Recurrence without the initial value
+        q_temp = baseflow_function_array(0.0, qsw_array, filter_par, qratio,
+                                         True)
+        # Initial value that balances the year
+        powers = filter_par ** np.arange(1, qsw_array.shape[0] + 1)
+        if powers.sum() != 0:
+            q0 = -month_sum(q_temp)/powers.sum()
+            # fsolve keeps the initial guess if the balance is nan
+            q0 = np.where(np.isfinite(q0), q0, 0.0)
+            q_temp = q_temp + powers.reshape(
+                (-1,) + (1,) * (q_temp.ndim - 1))*q0
+        # Baseflow
+        return (1-qratio)/qratio*(qsw_array - q_temp)
+    Qgw_tot = month_vector_sum(qsw_array) * (1-qratio)/qratio
+
+    def baseflow_error(q0, active):
+        return Qgw_tot - month_vector_sum(
+            baseflow_function_array(q0, qsw_array, filter_par, qratio))
+
+    with np.errstate(invalid='ignore', over='ignore'):
+        q0 = fsolve_array(baseflow_error, 0.0,
+                          np.ones(qsw_array.shape[1:], dtype=bool)).x
+    return baseflow_function_array(q0, qsw_array, filter_par, qratio)
+
+
+def baseflow_function_array(q0, qsw_array, filter_par, qratio,
+                            return_filtered=False):
+    '''
+    Calculate the baseflow of every pixel for the initial values q0 of the
+    filter, as functions.baseflow_function does for a single pixel, or the
+    filtered runoff if return_filtered
+    '''
+    q_temp = np.empty(qsw_array.shape)
+    q_temp[0] = filter_par*q0 + 0.5*(1 + filter_par)*(
+        qsw_array[0] - qsw_array[-1])
+    for i in range(1, qsw_array.shape[0]):
+        q_temp[i] = filter_par*q_temp[i-1] + 0.5*(1 + filter_par)*(
+            qsw_array[i] - qsw_array[i-1])
+    if return_filtered:
+        return q_temp
+    # Baseflow
+    qgw_array = (1-qratio)/qratio*(qsw_array - q_temp)
+    return qgw_array
+
+
+def exp_arg_func_array(theta0, thetasat, lai):
+    '''
+    Compute the exponential argument in the calculation of the root depth
+    soil moisture.
+    '''
+    return 1 - np.exp((theta0/thetasat) * (-0.5*lai - 1))
+
+
+def zeros_and_negatives_array(array):
+    '''
+    Replace zeros and negative values to nans
+    '''
+    return np.where(array <= 0, np.nan, array)
+
+
+def pos_func_array(array):
+    '''
+    Force positive values only, nans are kept
+    '''
+    return np.where(array < 0, 0.0, array)
+
+
+def budyko_array(phi):
+    '''
+    Calculate the evaporative index from the dryness index using the
+    budyko curve
+    '''
+    return np.sqrt(phi*np.tanh(1/phi)*(1-np.exp(-phi)))
+
+
+def month_sum(array):
+    '''
+    Sum the months in order, as sum() does on a single pixel
+    '''
+    total = array[0]
+    for i in range(1, array.shape[0]):
+        total = total + array[i]
+    return total
+
+
+def month_vector_sum(array):
+    '''
+    Sum the months as the sum method of a numpy vector does on a single
+    pixel (pairwise summation)
+    '''
+    return np.sum(np.ascontiguousarray(np.rollaxis(array, 0, array.ndim)),
+                  axis=-1)
+
+
+def month_nansum(array):
+    '''
+    Sum the months ignoring nans, as pandas does on a single pixel
+    '''
+    return month_vector_sum(np.where(np.isnan(array), 0, array))
+
+
+def pixel_subset(ds, active):
+    '''
+    Return a dictionary with the values of the active pixels only, the pixel
+    axes are replaced by a single axis
+    '''
+    ds_a = {}
+    for key, value in ds.items():
+        value = np.asarray(value)
+        if value.ndim == active.ndim + 1:
+            ds_a[key] = value[:, active]
+        elif value.ndim == active.ndim:
+            ds_a[key] = value[active]
+        else:
+            ds_a[key] = value
+    return ds_a
+
+
+def minimize_scalar_bounded_array(func, bounds, active, xatol=1e-5,
+                                  maxiter=500):
+    '''
+    Minimize a scalar function of every pixel within the bounds. This is the
+    bounded Brent method of scipy.optimize.minimize_scalar, run in lockstep
+    for all pixels, so every pixel gets the same evaluations and result as
+    with its own minimize_scalar call. func(x, active) returns the values of
+    the pixels in 'active' for the array x, the pixels that converged are
+    not evaluated anymore. The result has the per-pixel x, fun, nfev,
+    status and success (0 and True when converged, 1 and False when maxiter
+    was reached).
+    '''
+    sqrt_eps = np.sqrt(2.2e-16)
+    golden_mean = 0.5 * (3.0 - np.sqrt(5.0))
+    shape = np.shape(active)
+    x1, x2 = bounds
+    # Initial point
+    a = np.full(shape, float(x1))
+    b = np.full(shape, float(x2))
+    xf = np.where(active, x1 + golden_mean * (x2 - x1), np.nan)
+    nfc = xf.copy()
+    fulc = xf.copy()
+    rat = np.zeros(shape)
+    e = np.zeros(shape)
+    fx = np.where(active, func(xf, np.asarray(active)), np.nan)
+    ffulc = fx.copy()
+    fnfc = fx.copy()
+    num = np.where(active, 1, 0)
+    status = np.zeros(shape, dtype=int)
+    xm = 0.5 * (a + b)
+    tol1 = sqrt_eps * np.abs(xf) + xatol / 3.0
+    tol2 = 2.0 * tol1
+    with np.errstate(invalid='ignore', divide='ignore'):
+        active = active & (np.abs(xf - xm) > (tol2 - 0.5 * (b - a)))
+        while np.any(active):
+            # Parabolic fit
+            parabolic = np.abs(e) > tol1
+            r = (xf - nfc) * (fx - ffulc)
+            q = (xf - fulc) * (fx - fnfc)
+            p = (xf - fulc) * q - (xf - nfc) * r
+            q = 2.0 * (q - r)
+            p = np.where(q > 0.0, -p, p)
+            q = np.abs(q)
+            accept = (parabolic & (np.abs(p) < np.abs(0.5*q*e)) &
+                      (p > q*(a - xf)) & (p < q*(b - xf)))
+            rat_p = p / q
+            x = xf + rat_p
+            si = np.sign(xm - xf) + ((xm - xf) == 0)
+            rat_p = np.where(((x - a) < tol2) | ((b - x) < tol2),
+                             tol1 * si, rat_p)
+            # Golden-section step
+            e_g = np.where(xf >= xm, a - xf, b - xf)
+            e = np.where(accept, rat, e_g)
+            rat = np.where(accept, rat_p, golden_mean*e_g)
+            # Evaluation
+            si = np.sign(rat) + (rat == 0)
+            x = np.where(active, xf + si * np.maximum(np.abs(rat), tol1), xf)
+            fu = np.where(active, func(x, active), fx)
+            num = num + active
+            # Update of the interval and the points
+            better = active & (fu <= fx)
+            worse = active & ~(fu <= fx)
+            shift = worse & ((fu <= fnfc) | (nfc == xf))
+            replace = (worse & ~shift &
+                       ((fu <= ffulc) | (fulc == xf) | (fulc == nfc)))
+            a = np.where(better & (x >= xf), xf,
+                         np.where(worse & (x < xf), x, a))
+            b = np.where(better & ~(x >= xf), xf,
+                         np.where(worse & ~(x < xf), x, b))
+            fulc, ffulc = (np.where(better | shift, nfc,
+                                    np.where(replace, x, fulc)),
+                           np.where(better | shift, fnfc,
+                                    np.where(replace, fu, ffulc)))
+            nfc, fnfc = (np.where(better, xf, np.where(shift, x, nfc)),
+                         np.where(better, fx, np.where(shift, fu, fnfc)))
+            xf, fx = np.where(better, x, xf), np.where(better, fu, fx)
+            xm = 0.5 * (a + b)
+            tol1 = sqrt_eps * np.abs(xf) + xatol / 3.0
+            tol2 = 2.0 * tol1
+            # Pixels that reached the maximum number of evaluations
+            status = np.where(active & (num >= maxiter), 1, status)
+            active = (active & (num < maxiter) &
+                      (np.abs(xf - xm) > (tol2 - 0.5 * (b - a))))
+    return OptimizeResult(x=xf, fun=fx, nfev=num, status=status,
+                          success=(status == 0))
+
+
+def fsolve_array(func, x0, active, xtol=1.49012e-08, maxfev=400,
+                 factor=100.0):
+    '''
+    Find the root of a scalar function of every pixel, starting at x0. This
+    is the hybrd method of MINPACK that scipy.optimize.fsolve uses (with a
+    forward-difference jacobian), for a single unknown and run in lockstep
+    for all pixels, so every pixel gets the same evaluations and result as
+    with its own fsolve call. func(x, active) returns the values of the
+    pixels in 'active' for the array x, the pixels that stopped are not
+    evaluated anymore. The result has the per-pixel x, fun, nfev, status
+    (the info code of MINPACK, 1 when converged) and success.
+    '''
+    # Machine precision as defined in MINPACK (dpmpar)
+    epsmch = 2.22044604926e-16
+    eps = np.sqrt(max(np.finfo(float).eps, epsmch))
+    shape = np.shape(active)
+    active = np.array(active, dtype=bool)
+    # Initial point
+    x = np.where(active, float(x0), np.nan)
+    fvec = np.where(active, func(x, active), np.nan)
+    fnorm = np.abs(fvec)
+    nfev = np.where(active, 1, 0)
+    it = np.ones(shape, dtype=int)
+    ncsuc = np.zeros(shape, dtype=int)
+    ncfail = np.zeros(shape, dtype=int)
+    nslow1 = np.zeros(shape, dtype=int)
+    nslow2 = np.zeros(shape, dtype=int)
+    status = np.zeros(shape, dtype=int)
+    # Pixels that evaluate the jacobian, the others evaluate a step
+    jac = active.copy()
+    jeval = np.zeros(shape, dtype=bool)
+    diag = np.ones(shape)
+    delta = np.zeros(shape)
+    xnorm = np.zeros(shape)
+    r = np.zeros(shape)
+    q = np.zeros(shape)
+    qtf = np.zeros(shape)
+    p = np.zeros(shape)
+    pnorm = np.zeros(shape)
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        while np.any(active):
+            step = active & ~jac
+            # Dogleg step
+            temp = np.where(r != 0, r,
+                            np.where(epsmch*np.abs(r) == 0, epsmch,
+                                     epsmch*np.abs(r)))
+            x_gn = (qtf - 0.0) / temp
+            qnorm = np.abs(diag*x_gn)
+            grad = (0.0 + r*qtf) / diag
+            gnorm = np.abs(grad)
+            grad_n = (grad/gnorm) / diag
+            temp = np.abs(0.0 + r*grad_n)
+            sgnorm = np.where(gnorm != 0, (gnorm/temp)/temp, 0.0)
+            bnorm = np.abs(qtf)
+            temp = (bnorm/gnorm)*(bnorm/qnorm)*(sgnorm/delta)
+            temp = (temp - (delta/qnorm)*(sgnorm/delta)**2 +
+                    np.sqrt((temp - (delta/qnorm))**2 +
+                            (1.0 - (delta/qnorm)**2) *
+                            (1.0 - (sgnorm/delta)**2)))
+            alpha = np.where(gnorm == 0, delta/qnorm,
+                             np.where(sgnorm >= delta, 0.0,
+                                      ((delta/qnorm) *
+                                       (1.0 - (sgnorm/delta)**2))/temp))
+            grad = np.where(gnorm == 0, grad, grad_n)
+            temp = (1.0 - alpha)*np.minimum(sgnorm, delta)
+            x_dl = np.where(qnorm <= delta, x_gn, temp*grad + alpha*x_gn)
+            p = np.where(step, -x_dl, p)
+            pnorm = np.where(step, np.abs(diag*p), pnorm)
+            delta = np.where(step & (it == 1), np.minimum(delta, pnorm),
+                             delta)
+            # Evaluation, forward difference or step
+            h = eps*np.abs(x)
+            h = np.where(h == 0, eps, h)
+            fu = np.where(active, func(np.where(jac, x + h, x + p), active),
+                          np.nan)
+            nfev = nfev + active
+            # Jacobian and its QR factorization
+            fjac = (fu - fvec) / h
+            acnorm = np.abs(fjac)
+            ajnorm = np.where(fjac < 0, -acnorm, acnorm)
+            a = np.where(acnorm != 0, fjac/ajnorm + 1.0, fjac)
+            first = jac & (it == 1)
+            diag = np.where(first, np.where(acnorm == 0, 1.0, acnorm), diag)
+            xnorm = np.where(first, np.abs(diag*x), xnorm)
+            delta = np.where(first, np.where(factor*xnorm == 0, factor,
+                                             factor*xnorm), delta)
+            temp = -(0.0 + a*fvec) / a
+            qtf = np.where(jac, np.where(a == 0, fvec, fvec + a*temp), qtf)
+            r = np.where(jac, -np.where(acnorm != 0, ajnorm, acnorm), r)
+            q = np.where(jac, np.where(a == 0, 1.0,
+                                       1.0 - ((0.0 + 1.0*a)/a)*a), q)
+            diag = np.where(jac, np.maximum(diag, acnorm), diag)
+            jeval = jeval | jac
+            # Actual and predicted reduction of the step
+            fnorm1 = np.abs(fu)
+            actred = np.where(fnorm1 < fnorm, 1.0 - (fnorm1/fnorm)**2, -1.0)
+            prediction = qtf + (0.0 + r*p)
+            temp = np.abs(prediction)
+            prered = np.where(temp < fnorm, 1.0 - (temp/fnorm)**2, 0.0)
+            ratio = np.where(prered > 0, actred/prered, 0.0)
+            # Update of the step bound
+            fail = ~(ratio >= 0.1)
+            ncsuc = np.where(step, np.where(fail, 0, ncsuc + 1), ncsuc)
+            ncfail = np.where(step, np.where(fail, ncfail + 1, 0), ncfail)
+            delta_s = np.where((ratio >= 0.5) | (ncsuc > 1),
+                               np.maximum(delta, pnorm/0.5), delta)
+            delta_s = np.where(np.abs(ratio - 1.0) <= 0.1, pnorm/0.5,
+                               delta_s)
+            delta = np.where(step, np.where(fail, 0.5*delta, delta_s), delta)
+            # Successful steps
+            success = step & ~(ratio < 1e-4)
+            x = np.where(success, x + p, x)
+            fvec = np.where(success, fu, fvec)
+            xnorm = np.where(success, np.abs(diag*x), xnorm)
+            fnorm = np.where(success, fnorm1, fnorm)
+            it = it + success
+            # Progress of the iteration
+            nslow1 = np.where(step, np.where(actred >= 0.001, 0, nslow1 + 1),
+                              nslow1)
+            nslow2 = np.where(step, np.where(actred >= 0.1, 0,
+                                             nslow2 + jeval), nslow2)
+            # Convergence and termination
+            small = 0.1*np.maximum(0.1*delta, pnorm) <= epsmch*xnorm
+            converged = (delta <= xtol*xnorm) | (fnorm == 0)
+            stopped = ((nfev >= maxfev) | small | (nslow2 == 5) |
+                       (nslow1 == 10))
+            code = np.where(nslow1 == 10, 5,
+                            np.where(nslow2 == 5, 4, np.where(small, 3, 2)))
+            status = np.where(step, np.where(converged, 1,
+                                             np.where(stopped, code, 0)),
+                              status)
+            active = active & ~(step & (converged | stopped))
+            # Rank one update of the jacobian, or a new jacobian after two
+            # failed steps
+            update = step & active & (ncfail != 2)
+            qtf_new = 0.0 + q*fu
+            v = (qtf_new - prediction) / pnorm
+            u = diag*((diag*p) / pnorm)
+            qtf = np.where(update & (ratio >= 1e-4), qtf_new, qtf)
+            r = np.where(update, r + v*u, r)
+            jeval = jeval & ~update
+            jac = step & active & (ncfail == 2)
+    return OptimizeResult(x=x, fun=fvec, nfev=nfev, status=status,
+                          success=(status == 1))
@@ -12,8 +12,7 @@ from math import exp, sqrt
 import pandas as pd
 from scipy.optimize import minimize_scalar
 from scipy.optimize import fsolve
-import rpy2.robjects as robjects
-from rpy2.robjects import pandas2ri
+from wa.Models.waterpix.kriging import ordinary_kriging_array
 
 np = pd.np
 
@@ -573,12 +572,35 @@ def monthly_reducer(array, periods, nodata_value=-9999):
 
 
 def array_interpolation(lon_ls, lat_ls, infz_array_in, min_infz,
-                        return_single_value):
+                        return_single_value, kriging_engine='r'):
     '''
-    Interpolate missing values in an array using kriging in R
+    Interpolate missing values in an array using kriging, in R (autoKrige)
+    or with numpy and scipy (kriging_engine='numpy')
     '''
     # Replace values smaller than the minimum
     infz_array_in[infz_array_in < min_infz] = np.nan
+    # Kriging
+    if kriging_engine == 'numpy':
+        infz_array_out = ordinary_kriging_array(infz_array_in,
+                                                np.array(lon_ls),
+                                                np.array(lat_ls))
+    else:
+        infz_array_out = r_kriging_interpolation(lon_ls, lat_ls,
+                                                 infz_array_in)
+    # Return
+    if not return_single_value:
+        return infz_array_out
+    else:
+        x, y = return_single_value
+        return infz_array_out[y, x]
+
+
+def r_kriging_interpolation(lon_ls, lat_ls, infz_array_in):
+    '''
+    Interpolate missing values in an array using autoKrige in R
+    '''
+    import rpy2.robjects as robjects
+    from rpy2.robjects import pandas2ri
     # Total values in array
     n_values = np.isfinite(infz_array_in).sum()
     # Load function
@@ -623,10 +645,5 @@ def array_interpolation(lon_ls, lat_ls, infz_array_in, min_infz,
     kriging_interpolation = robjects.r['kriging_interpolation']
     # Execute kriging function and get array
     r_array = kriging_interpolation(lon_ls, lat_ls, infz_array_in, n_values)
-    infz_array_out = np.array(r_array)
     # Return
-    if not return_single_value:
-        return infz_array_out
-    else:
-        x, y = return_single_value
-        return infz_array_out[y, x]
+    return np.array(r_array)
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Authors: Gonzalo E. Espinoza-Dávalos
+         IHE Delft 2017
+Contact: g.espinoza@un-ihe.org
+Repository: https://github.com/gespinoza/waterpix
+Module: waterpix
+
+Description:
+Input layer of waterpix. The monthly variables of the input netcdf are read
+in blocks of columns (all the latitudes of a range of longitudes for the
+months of a year), and the missing values of the soil moisture and rainy
+days cubes are filled once before the cells loops with the same values as
+replace_with_closest, instead of reading the whole variable for every cell
+with missing values. The runoff ratio of every year is filled and clipped
+once in the same way.
+"""
+
+from __future__ import division
+import pandas as pd
+
+np = pd.np
+
+# Variables of which the missing values are replaced by the closest values
+GAP_FILL_VARIABLES = ['SWI_M', 'SWIo_M', 'SWIx_M', 'RainyDays_M']
+
+# Maximum number of values in a block that is read from the netcdf
+BLOCK_VALUES = 2**23
+
+
+def gap_fills(var, mask, time_chunk=12):
+    '''
+    Calculate the values of the missing cells (nan or fill value) of a
+    monthly variable inside mask, i.e. the mean of the closest cells with
+    values in the same month as replace_with_closest. Returns a dictionary
+    {time index: (latitude indices, longitude indices, values)}.
+    '''
+    fill_value = var._FillValue
+    fills = {}
+    for t1 in range(0, var.shape[0], time_chunk):
+        cube = np.array(var[t1:t1 + time_chunk, :, :])
+        missing = (np.isnan(cube) | np.isclose(cube, fill_value)) & mask
+        for t in np.nonzero(missing.any(axis=(1, 2)))[0]:
+            lati, loni = np.nonzero(missing[t])
+            fills[t1 + t] = (lati, loni,
+                             neighbor_means(cube[t], (lati, loni)))
+    return fills
+
+
+def qratio_maps(var, mask, min_qratio):
+    '''
+    Read the runoff ratio of every year with the values below min_qratio set
+    to min_qratio. The cells inside mask with the fill value get the mean of
+    the closest cells of the year (also set to at least min_qratio), masked
+    cells stay nan. Returns a list with the map of every year.
+    '''
+    fill_value = var._FillValue
+    maps = []
+    for yyyyi in range(var.shape[0]):
+        values = var[yyyyi, :, :]
+        qratio = np.ma.filled(values.astype('f8'), np.nan)
+        # Closest values, the masked cells have the fill value (below
+        # min_qratio) as in the per-pixel loops
+        with np.errstate(invalid='ignore'):
+            neighbors = np.array(values, dtype='f8')
+            neighbors[neighbors < min_qratio] = min_qratio
+            lati, loni = np.nonzero(np.isclose(qratio, fill_value) & mask)
+            qratio[lati, loni] = neighbor_means(neighbors, (lati, loni))
+            qratio[qratio < min_qratio] = min_qratio
+        maps.append(qratio)
+    return maps
+
+
+def neighbor_means(array, cells):
+    '''
+    Calculate the mean of the closest cells with values around every cell,
+    the squares grow until they contain values as in get_mean_neighbors.
+    Cells without any value in the array stay nan.
+    '''
+    x_i, y_i = cells
+    n_x, n_y = array.shape
+    values = np.full(len(x_i), np.nan)
+    todo = np.arange(len(x_i))
+    size = 1
+    while len(todo) > 0 and size <= max(n_x, n_y):
+        # Offsets of the square in the order of get_neighbors
+        offsets = np.arange(-size, size + 1)
+        x_off = np.repeat(offsets, len(offsets))
+        y_off = np.tile(offsets, len(offsets))
+        center = (x_off == 0) & (y_off == 0)
+        x_off, y_off = x_off[~center], y_off[~center]
+        # Limit the memory of the indices
+        chunk = max(1, BLOCK_VALUES // len(x_off))
+        found = np.zeros(len(todo), dtype=bool)
+        for c1 in range(0, len(todo), chunk):
+            cells_c = todo[c1:c1 + chunk]
+            x_nb = x_i[cells_c, None] + x_off
+            y_nb = y_i[cells_c, None] + y_off
+            inside = ((x_nb >= 0) & (x_nb < n_x) &
+                      (y_nb >= 0) & (y_nb < n_y))
+            full = inside.all(axis=1)
+            # Squares inside the array, nan counts as zero as in np.nanmean
+            nb_values = array[x_nb[full], y_nb[full]]
+            valid = ~np.isnan(nb_values)
+            count = valid.sum(axis=1)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                means = np.where(valid, nb_values, 0).sum(axis=1) / count
+            values[cells_c[full]] = np.where(count > 0, means, np.nan)
+            found[c1:c1 + chunk][full] = count > 0
+            # Squares at the edges of the array
+            for j in np.nonzero(~full)[0]:
+                nb_values = array[x_nb[j][inside[j]], y_nb[j][inside[j]]]
+                if not np.isnan(nb_values).all():
+                    values[cells_c[j]] = np.nanmean(nb_values)
+                    found[c1 + j] = True
+        todo = todo[~found]
+        size += 1
+    return values
+
+
+def read_block(var, time_index, columns, fills=None):
+    '''
+    Read the months of a block of columns of a monthly variable, the fill
+    values are replaced by nan and the missing values in fills are replaced
+    by the closest values
+    '''
+    ti1, ti2 = time_index
+    c1, c2 = columns
+    values = np.array(var[ti1:ti2, :, c1:c2])
+    values[np.isclose(values, var._FillValue)] = np.nan
+    if fills is not None:
+        for t in range(ti1, ti2):
+            if t in fills:
+                lati, loni, fill_values = fills[t]
+                inside = (loni >= c1) & (loni < c2)
+                values[t - ti1, lati[inside],
+                       loni[inside] - c1] = fill_values[inside]
+    return values
+
+
+def block_columns(loni, time_n, lat_n, lon_n):
+    '''
+    Return the range of columns of the block that contains the column loni
+    '''
+    width = max(1, BLOCK_VALUES // max(1, time_n * lat_n))
+    c1 = (loni // width) * width
+    return c1, min(c1 + width, lon_n)
+
+
+def pixel_values(ncv, var_name, time_index, point, blocks, fills):
+    '''
+    Return the monthly values of a cell, the block of columns of the cell is
+    read once and kept in blocks until a cell of another block is read
+    '''
+    lati, loni = point
+    var = ncv[var_name]
+    columns = block_columns(loni, time_index[1] - time_index[0],
+                            var.shape[1], var.shape[2])
+    key = (time_index, columns)
+    if var_name not in blocks or blocks[var_name][0] != key:
+        blocks[var_name] = (key, read_block(var, time_index, columns,
+                                            fills.get(var_name)))
+    return np.array(blocks[var_name][1][:, lati, loni - columns[0]])
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+Authors: Gonzalo E. Espinoza-Dávalos
+         IHE Delft 2017
+Contact: g.espinoza@un-ihe.org
+Repository: https://github.com/gespinoza/waterpix
+Module: waterpix
+
+Description:
+Ordinary kriging with numpy and scipy, a replacement of autoKrige (R package
+automap) without R. The variogram model is fitted automatically to the
+experimental variogram as in autofitVariogram, and every cell is predicted
+from its closest values (KD-tree neighbourhood). The cells are predicted in
+chunks, so the memory does not grow with the size of the grid.
+"""
+
+from __future__ import division
+import pandas as pd
+from scipy.optimize import least_squares
+from scipy.spatial import cKDTree
+
+np = pd.np
+
+# Maximum number of values in the arrays of a chunk
+CHUNK_VALUES = 2**22
+
+# Maximum number of points used in the experimental variogram
+VARIOGRAM_POINTS = 2000
+
+# Boundaries of the distance classes of the experimental variogram, in
+# percentage of 0.35 times the diagonal of the extent (as in automap)
+VARIOGRAM_BOUNDARIES = [2, 4, 6, 9, 12, 15, 25, 35, 50, 65, 80, 100]
+
+# Minimum number of point pairs in a distance class
+VARIOGRAM_MIN_PAIRS = 5
+
+# Minimum nugget of the gaussian model, in fraction of the sill. Without a
+# nugget the kriging systems of the gaussian model are (nearly) singular.
+GAUSSIAN_MIN_NUGGET = 0.01
+
+
+def spherical(h, nugget, psill, rng):
+    '''
+    Spherical variogram model
+    '''
+    hr = np.minimum(h / rng, 1.0)
+    return np.where(h > 0, nugget + psill*(1.5*hr - 0.5*hr**3), 0.0)
+
+
+def exponential(h, nugget, psill, rng):
+    '''
+    Exponential variogram model
+    '''
+    return np.where(h > 0, nugget + psill*(1 - np.exp(-h / rng)), 0.0)
+
+
+def gaussian(h, nugget, psill, rng):
+    '''
+    Gaussian variogram model
+    '''
+    return np.where(h > 0, nugget + psill*(1 - np.exp(-(h / rng)**2)), 0.0)
+
+
+VARIOGRAM_MODELS = {'Sph': spherical, 'Exp': exponential, 'Gau': gaussian}
+
+
+def ordinary_kriging_array(input_array, x_vector, y_vector, n_neighbors=32,
+                           models=('Sph', 'Exp', 'Gau')):
+    '''
+    Interpolate the finite values of an array to the other cells with
+    ordinary kriging, the finite values are kept (kriging is an exact
+    interpolator). The value of cell [j, i] is located at (x_vector[i],
+    y_vector[j]).
+    '''
+    input_array = np.array(input_array, dtype='f8')
+    y_grid, x_grid = np.meshgrid(np.asarray(y_vector, dtype='f8'),
+                                 np.asarray(x_vector, dtype='f8'),
+                                 indexing='ij')
+    finite = np.isfinite(input_array)
+    points = np.column_stack((x_grid[finite], y_grid[finite]))
+    values = input_array[finite]
+    targets = np.column_stack((x_grid[~finite], y_grid[~finite]))
+    output_array = input_array.copy()
+    # Trivial cases
+    if len(values) == 0 or len(targets) == 0:
+        return output_array
+    if len(values) < 3 or np.ptp(values) == 0:
+        output_array[~finite] = np.mean(values)
+        return output_array
+    # Variogram and prediction. The variogram is fitted again without the
+    # model if any of its kriging systems is (nearly) singular.
+    models = list(models)
+    while True:
+        variogram = fit_variogram(points, values, models)
+        prediction = ordinary_kriging(points, values, targets, variogram,
+                                      n_neighbors)
+        if not np.any(np.isnan(prediction)) or \
+                variogram[0] not in models or len(models) == 1:
+            break
+        models.remove(variogram[0])
+    output_array[~finite] = np.where(np.isnan(prediction), np.mean(values),
+                                     prediction)
+    return output_array
+
+
+def experimental_variogram(points, values):
+    '''
+    Calculate the experimental variogram in the distance classes of automap.
+    Returns the number of pairs, mean distance and semivariance of the
+    classes with enough pairs.
+    '''
+    # Sample of the points
+    if len(values) > VARIOGRAM_POINTS:
+        sample = np.random.RandomState(0).choice(len(values),
+                                                 VARIOGRAM_POINTS,
+                                                 replace=False)
+        points = points[sample]
+        values = values[sample]
+    diagonal = np.hypot(*np.ptp(points, axis=0))
+    boundaries = np.array(VARIOGRAM_BOUNDARIES) * 0.35 * diagonal / 100
+    # Sums per distance class, in chunks of rows
+    n_classes = len(boundaries)
+    count = np.zeros(n_classes)
+    sum_dist = np.zeros(n_classes)
+    sum_sq = np.zeros(n_classes)
+    chunk = max(1, CHUNK_VALUES // len(values))
+    for i1 in range(0, len(values), chunk):
+        dist = np.hypot(points[i1:i1 + chunk, None, 0] - points[None, :, 0],
+                        points[i1:i1 + chunk, None, 1] - points[None, :, 1])
+        sq = (values[i1:i1 + chunk, None] - values[None, :])**2
+        # Every pair is counted twice, the cell itself is not counted
+        inside = (dist > 0) & (dist <= boundaries[-1])
+        classes = np.searchsorted(boundaries, dist[inside])
+        count += np.bincount(classes, minlength=n_classes) / 2
+        sum_dist += np.bincount(classes, dist[inside], n_classes) / 2
+        sum_sq += np.bincount(classes, sq[inside], n_classes) / 2
+    # Merge the classes with few pairs into the next class
+    merged = []
+    acc = np.zeros(3)
+    for j in range(n_classes):
+        acc += [count[j], sum_dist[j], sum_sq[j]]
+        if acc[0] >= VARIOGRAM_MIN_PAIRS:
+            merged.append(acc)
+            acc = np.zeros(3)
+    merged = np.array(merged).reshape(-1, 3)
+    n_pairs = merged[:, 0]
+    return n_pairs, merged[:, 1] / n_pairs, merged[:, 2] / (2 * n_pairs)
+
+
+def fit_variogram(points, values, models):
+    '''
+    Fit the variogram models to the experimental variogram with the weights
+    n_pairs/dist^2 (fit.method 7 of gstat) and return the best fit as
+    (model, nugget, psill, range). The nugget of the gaussian model is at
+    least GAUSSIAN_MIN_NUGGET times the sill.
+    '''
+    n_pairs, dist, gamma = experimental_variogram(points, values)
+    diagonal = np.hypot(*np.ptp(points, axis=0))
+    if len(gamma) < 3:
+        # Not enough distance classes, pure nugget at the sample variance
+        return ('Sph', np.var(values), 0.0, diagonal)
+    # Initial values as in autofitVariogram
+    nugget_0 = np.min(gamma)
+    psill_0 = max(np.mean([np.max(gamma), np.median(gamma)]) - nugget_0,
+                  1e-6 * np.max(gamma))
+    range_0 = 0.1 * diagonal
+    weights = np.sqrt(n_pairs) / dist
+    best = None
+    for model in models:
+        func = VARIOGRAM_MODELS[model]
+
+        def residuals(parms):
+            return weights * (func(dist, *parms) - gamma)
+
+        fit_res = least_squares(residuals, x0=(nugget_0, psill_0, range_0),
+                                bounds=((0, 0, 1e-6 * diagonal),
+                                        (np.inf, np.inf, np.inf)))
+        nugget, psill, rng = fit_res.x
+        cost = fit_res.cost
+        if model == 'Gau' and nugget < GAUSSIAN_MIN_NUGGET*(nugget + psill):
+            # Same sill with the minimum nugget
+            sill = nugget + psill
+            nugget = GAUSSIAN_MIN_NUGGET * sill
+            psill = sill - nugget
+            cost = 0.5 * np.sum(residuals((nugget, psill, rng))**2)
+        if best is None or cost < best[0]:
+            best = (cost, (model, nugget, psill, rng))
+    return best[1]
+
+
+def ordinary_kriging(points, values, targets, variogram, n_neighbors):
+    '''
+    Predict the values at the targets with ordinary kriging from the closest
+    n_neighbors points of every target. The prediction is nan for the
+    targets with a (nearly) singular kriging system, recognised by a value
+    further from the values of the neighbours than their range.
+    '''
+    model, nugget, psill, rng = variogram
+    func = VARIOGRAM_MODELS[model]
+    tree = cKDTree(points)
+    k = min(n_neighbors, len(values))
+    prediction = np.full(len(targets), np.nan)
+    chunk = max(1, CHUNK_VALUES // (k + 1)**2)
+    for i1 in range(0, len(targets), chunk):
+        dist, idx = tree.query(targets[i1:i1 + chunk], k)
+        dist = dist.reshape(-1, k)
+        idx = idx.reshape(-1, k)
+        # Kriging systems of the chunk
+        nb_points = points[idx]
+        nb_dist = np.hypot(nb_points[:, :, None, 0] - nb_points[:, None, :, 0],
+                           nb_points[:, :, None, 1] - nb_points[:, None, :, 1])
+        lhs = np.ones((len(idx), k + 1, k + 1))
+        lhs[:, :k, :k] = func(nb_dist, nugget, psill, rng)
+        lhs[:, k, k] = 0
+        rhs = np.ones((len(idx), k + 1, 1))
+        rhs[:, :k, 0] = func(dist, nugget, psill, rng)
+        # Weights
+        try:
+            weights = np.linalg.solve(lhs, rhs)[:, :k, 0]
+        except np.linalg.LinAlgError:
+            continue
+        nb_values = values[idx]
+        pred = np.sum(weights * nb_values, axis=1)
+        low = np.min(nb_values, axis=1)
+        high = np.max(nb_values, axis=1)
+        with np.errstate(invalid='ignore'):
+            plausible = ((pred >= 2*low - high) & (pred <= 2*high - low))
+        prediction[i1:i1 + chunk] = np.where(plausible, pred, np.nan)
+    return prediction
@@ -8,15 +8,22 @@ Module: waterpix
 """
 
 from __future__ import division
+import os
+import shutil
+import tempfile
 import datetime as dt
 from warnings import filterwarnings
 import pandas as pd
 import netCDF4
 from wa.Models.waterpix.functions import (calculate_first_round, calculate_second_round,
                                 return_empty_df_columns, get_neighbors,
-                                percolation_fit_error,
-                                replace_with_closest, budyko,
+                                percolation_fit_error, budyko,
                                 monthly_reducer, array_interpolation)
+from wa.Models.waterpix.array_functions import (calculate_first_round_array,
+                                                calculate_second_round_array)
+from wa.Models.waterpix.input_functions import (GAP_FILL_VARIABLES, gap_fills,
+                                                qratio_maps, read_block,
+                                                pixel_values)
 
 from scipy.optimize import least_squares
 
@@ -31,10 +38,45 @@ def run(input_nc, output_nc,
         et_separation_no_periods=2, baseflow_filter=0.5,
         perc_fit_parms_bounds=((0.1, 4.5), (7500, 10.0)),
         tolerance_monthly_greenpx=5, tolerance_yearly_waterbal=10,
-        incrunoff_propfactor_bounds=(1.0, 15.0)):
+        incrunoff_propfactor_bounds=(1.0, 15.0), engine='pixel',
+        cores=False, kriging_engine='r', array_solver='closed'):
     '''
     Executes the main module of waterpix
+
+    The engine parameter selects how the water balance is evaluated:
+    'pixel' loops over the cells one by one, 'array' evaluates all the cells
+    of a year at once on numpy arrays.
+
+    The array_solver parameter selects how the array engine solves the
+    baseflow and the incremental surface runoff: 'closed' in closed form,
+    'fsolve' with the iterations of the fsolve calls of the pixel engine.
+    The closed forms agree with the iterative solutions within about 1e-12
+    (check waterpix_closed_forms of Benchmarks/Run_Checks.py). The
+    calibration of the incremental runoff and the percolation fit amplify
+    such differences: single monthly values of the second round can move
+    by a quarter of their range, as with 1e-13 noise on the iterative
+    solutions. With 'fsolve' both engines give the same output (check
+    waterpix_engines).
+
+    The cores parameter is the number of worker processes of the tiled
+    execution of the array engine. The grid is split in blocks of rows that
+    are evaluated in parallel in both rounds and in the percolation fits,
+    the inputs are shared with the workers through memory-mapped arrays.
+    The infz interpolation runs between the two rounds on the whole grid.
+    It can be 'False' to run in a single process.
+
+    The kriging_engine parameter selects the kriging of the infz
+    interpolation: 'r' runs autoKrige in R through rpy2, 'numpy' runs the
+    ordinary kriging of waterpix.kriging without R.
     '''
+    if engine not in ['pixel', 'array']:
+        raise ValueError('Unknown engine: {0}'.format(engine))
+    if cores and engine != 'array':
+        raise ValueError('The tiled execution needs the array engine')
+    if kriging_engine not in ['r', 'numpy']:
+        raise ValueError('Unknown kriging engine: {0}'.format(kriging_engine))
+    if array_solver not in ['closed', 'fsolve']:
+        raise ValueError('Unknown array solver: {0}'.format(array_solver))
     # Read file and get lat, lon, and time data
     started = dt.datetime.now()
     print 'Reading input netcdf ...'
@@ -114,12 +156,6 @@ def run(input_nc, output_nc,
     p_fv = ncv['Precipitation_M']._FillValue
     et_fv = ncv['Evapotranspiration_M']._FillValue
     eto_fv = ncv['ReferenceET_M']._FillValue
-    lai_fv = ncv['LeafAreaIndex_M']._FillValue
-    swi_fv = ncv['SWI_M']._FillValue
-    swio_fv = ncv['SWIo_M']._FillValue
-    swix_fv = ncv['SWIx_M']._FillValue
-    qratio_fv = ncv['RunoffRatio_Y']._FillValue
-    rainydays_fv = ncv['RainyDays_M']._FillValue
     thetasat_fv = ncv['SaturatedWaterContent']._FillValue
     rootdepth_fv = ncv['RootDepth']._FillValue
     # Copy data
@@ -344,6 +380,15 @@ def run(input_nc, output_nc,
                                   1, np.nan)
         # Store green pixels
         gpix_var[yyyyi, :, :] = gpix_array
+    # Missing values of the soil moisture, rainy days and runoff ratio
+    print 'Filling missing values...'
+    basin_array = np.ma.filled(inp_basinb[:], 0).astype(bool)
+    fills = dict((var, gap_fills(ncv[var], basin_array))
+                 for var in GAP_FILL_VARIABLES)
+    qratios = qratio_maps(ncv['RunoffRatio_Y'], basin_array, min_qratio)
+    thetasat_arr = ncv['SaturatedWaterContent'][:, :]
+    rootdepth_arr = ncv['RootDepth'][:, :]
+    blocks = {}
     # First round
     print 'FIRST ROUND'
     print 'Running...'
@@ -353,67 +398,64 @@ def run(input_nc, output_nc,
         yyyyi = years_ls.index(yyyy)
         ti1 = time_indeces[yyyy][0]
         ti2 = time_indeces[yyyy][-1] + 1
+        if engine == 'array':
+            basin_array = np.ma.filled(inp_basinb[:], 0).astype(bool)
+            green_array = basin_array & (
+                np.ma.filled(gpix_var[yyyyi, :, :], 0) == 1)
+            ds, (thetasat, rootdepth, qratio) = _array_inputs(
+                ncv, green_array, (ti1, ti2), qratios[yyyyi],
+                (default_thetasat, default_rootdepth), fills)
+            et = np.array(ds['et'])
+            # Calculate first round
+            ds_out, second_round = _calculate_tiles(
+                _round_tile, green_array,
+                (ds, (thetasat, rootdepth, qratio, baseflow_filter)),
+                (calculate_first_round_array, infz_bounds,
+                 tolerance_yearly_waterbal, array_solver), cores)
+            # Store values in output NetCDF
+            calc = second_round == 0
+            calc_array = _pixels_array(green_array, calc)
+            for var, values in [(ss_var, ds_out['Qsw']),
+                                (bf_var, ds_out['Qgw']),
+                                (sr_var, ds_out['Qtot']),
+                                (dsm_var, ds_out['dsm']),
+                                (per_var, ds_out['perc']),
+                                (rdsm_var, ds_out['thetarz']),
+                                (etbm_var, 0), (etgm_var, et),
+                                (sup_var, 0), (incss_var, 0),
+                                (incper_var, 0)]:
+                _write_array(var, slice(ti1, ti2), calc_array,
+                             np.broadcast_to(values, et.shape)[:, calc])
+            _write_array(infz_var, yyyyi, calc_array,
+                         ds_out['infz'][0, calc])
+            _write_array(rco_var, yyyyi, green_array, second_round)
+            _write_array(rco_var, yyyyi, basin_array & ~green_array, 10)
+            _write_array(gpix_var, yyyyi, ~basin_array, std_fv)
+            continue
         # Cells loops
         for loni, lati in np.ndindex(lon_n, lat_n):
             if inp_basinb[lati, loni]:
                 if gpix_var[yyyyi, lati, loni] == 1:
                     # Read data
-                    p = np.array(ncv['Precipitation_M'][ti1:ti2,
-                                                        lati, loni])
-                    et = np.array(ncv['Evapotranspiration_M'][ti1:ti2,
-                                                              lati, loni])
-                    lai = np.array(ncv['LeafAreaIndex_M'][ti1:ti2,
-                                                          lati, loni])
-                    swi = np.array(ncv['SWI_M'][ti1:ti2,
-                                                lati, loni])
-                    swio = np.array(ncv['SWIo_M'][ti1:ti2,
-                                                  lati, loni])
-                    swix = np.array(ncv['SWIx_M'][ti1:ti2,
-                                                  lati, loni])
-                    rainydays = np.array(ncv['RainyDays_M'][ti1:ti2,
-                                                            lati, loni])
-                    qratio = float(ncv['RunoffRatio_Y'][yyyyi, lati, loni])
-                    # Check for NoData values
-                    p[np.isclose(p, p_fv)] = np.nan
-                    et[np.isclose(et, et_fv)] = np.nan
-                    lai[np.isclose(lai, lai_fv)] = np.nan
-                    # Check for NoData values - arrays
-                    swi[np.isclose(swi, swi_fv)] = np.nan
-                    if np.isnan(swi).any():
-                        swi_arr = np.array(ncv['SWI_M'])
-                        swi = replace_with_closest(swi, swi_arr,
-                                                   (lati, loni), (ti1, ti2))
-                    swio[np.isclose(swio, swio_fv)] = np.nan
-                    if np.isnan(swio).any():
-                        swio_arr = np.array(ncv['SWIo_M'])
-                        swio = replace_with_closest(swio, swio_arr,
-                                                    (lati, loni), (ti1, ti2))
-                    swix[np.isclose(swix, swix_fv)] = np.nan
-                    if np.isnan(swix).any():
-                        swix_arr = np.array(ncv['SWIx_M'])
-                        swix = replace_with_closest(swix, swix_arr,
-                                                    (lati, loni), (ti1, ti2))
-                    if np.isclose(qratio, qratio_fv):
-                        qratio_arr = np.array(ncv['RunoffRatio_Y'])
-                        qratio_arr[qratio_arr < min_qratio] = min_qratio
-                        qratio = replace_with_closest(qratio,
-                                                      qratio_arr,
-                                                      (lati, loni),
-                                                      (yyyyi, yyyyi + 1))
-                    elif qratio < min_qratio:
-                        qratio = min_qratio
-                    rainydays[np.isclose(rainydays, rainydays_fv)] = np.nan
-                    if np.isnan(rainydays).any():
-                        rainydays_arr = np.array(ncv['RainyDays_M'])
-                        rainydays = replace_with_closest(rainydays,
-                                                         rainydays_arr,
-                                                         (lati, loni),
-                                                         (ti1, ti2))
-                    thetasat = float(ncv['SaturatedWaterContent'][lati,
-                                                                  loni])
+                    p = pixel_values(ncv, 'Precipitation_M', (ti1, ti2),
+                                     (lati, loni), blocks, fills)
+                    et = pixel_values(ncv, 'Evapotranspiration_M', (ti1, ti2),
+                                      (lati, loni), blocks, fills)
+                    lai = pixel_values(ncv, 'LeafAreaIndex_M', (ti1, ti2),
+                                       (lati, loni), blocks, fills)
+                    swi = pixel_values(ncv, 'SWI_M', (ti1, ti2),
+                                       (lati, loni), blocks, fills)
+                    swio = pixel_values(ncv, 'SWIo_M', (ti1, ti2),
+                                        (lati, loni), blocks, fills)
+                    swix = pixel_values(ncv, 'SWIx_M', (ti1, ti2),
+                                        (lati, loni), blocks, fills)
+                    rainydays = pixel_values(ncv, 'RainyDays_M', (ti1, ti2),
+                                             (lati, loni), blocks, fills)
+                    qratio = float(qratios[yyyyi][lati, loni])
+                    thetasat = float(thetasat_arr[lati, loni])
                     if np.isnan(thetasat) or thetasat == thetasat_fv:
                         thetasat = default_thetasat
-                    rootdepth = float(ncv['RootDepth'][lati, loni])
+                    rootdepth = float(rootdepth_arr[lati, loni])
                     if np.isnan(rootdepth) or rootdepth == rootdepth_fv:
                         rootdepth = default_rootdepth
                     # Dataframe
@@ -485,44 +527,23 @@ def run(input_nc, output_nc,
         infz_array_in[np.isclose(infz_array_in, std_fv)] = np.nan
         infz_array_out = array_interpolation(inp_lon[:], inp_lat[:],
                                              infz_array_in, infz_bounds[0],
-                                             False)
+                                             False, kriging_engine)
         infz_array_all[yyyyi, :, :] = np.where(rco_var[yyyyi, :, :] > 0,
                                                infz_array_out[:, :],
                                                infz_array_in[:, :])
         # Fit rdsm and percolation
-        # percolation_fit_func(yyyyi, perc_fit_min_no_of_values). Returns a,b,
-        for loni, lati in np.ndindex(lon_n, lat_n):
-            if rco_var[yyyyi, lati, loni] > 0:
-                n_nb = 3  # minimum_neighboring_cells_offset
-                rdsm_fit = []
-                while len(rdsm_fit) < perc_fit_min_no_of_values:
-                    tot_neighbors_ls = get_neighbors(lati, loni,
-                                                     lat_n, lon_n,
-                                                     n_nb)
-                    # Vector with values
-                    rdsm_fit = np.array(
-                        [rdsm_var[ti1:ti2, y, x] for y, x in tot_neighbors_ls]
-                        ).flatten()
-                    perc_fit = np.array(
-                        [per_var[ti1:ti2, y, x] for y, x in tot_neighbors_ls]
-                        ).flatten()
-                    # Remove small percolation values (~0)
-                    rdsm_perc_cond = np.logical_and(perc_fit > 0.01,
-                                                    rdsm_fit != std_fv)
-                    rdsm_fit = rdsm_fit[rdsm_perc_cond]
-                    perc_fit = perc_fit[rdsm_perc_cond]
-                    n_nb += 1
-                # Fit
-                fit_res = least_squares(percolation_fit_error,
-                                        x0=perc_fit_parms_first_guess,
-                                        bounds=perc_fit_parms_bounds,
-                                        args=(rdsm_fit, perc_fit),
-                                        loss='soft_l1')
-                # Store fit parameters in output netcdf
-                a_var[yyyyi, lati, loni] = fit_res.x[0]
-                b_var[yyyyi, lati, loni] = fit_res.x[1]
-                infz_var[yyyyi, lati, loni] = infz_array_all[yyyyi,
-                                                             lati, loni]
+        blue_array = np.ma.filled(rco_var[yyyyi, :, :], 0) > 0
+        a, b = _calculate_tiles(
+            _percolation_fits, blue_array,
+            (np.array(rdsm_var[ti1:ti2, :, :]),
+             np.array(per_var[ti1:ti2, :, :]), np.nonzero(blue_array)),
+            (perc_fit_min_no_of_values, perc_fit_parms_first_guess,
+             perc_fit_parms_bounds, std_fv), cores)
+        # Store fit parameters in output netcdf
+        _write_array(a_var, yyyyi, blue_array, a)
+        _write_array(b_var, yyyyi, blue_array, b)
+        _write_array(infz_var, yyyyi, blue_array,
+                     infz_array_all[yyyyi, :, :][blue_array])
     # Second round
     print 'SECOND ROUND'
     print 'Running...'
@@ -533,66 +554,60 @@ def run(input_nc, output_nc,
         yyyyi = years_ls.index(yyyy)
         ti1 = time_indeces[yyyy][0]
         ti2 = time_indeces[yyyy][-1] + 1
+        if engine == 'array':
+            blue_array = np.ma.filled(rco_var[yyyyi, :, :], 0) > 0
+            ds, (thetasat, rootdepth, qratio) = _array_inputs(
+                ncv, blue_array, (ti1, ti2), qratios[yyyyi],
+                (default_thetasat, default_rootdepth), fills)
+            ds['qratio'] = qratio
+            infz, a, b, green_et_yr, blue_et_yr = [
+                np.ma.filled(var[yyyyi, :, :].astype('f8'),
+                             np.nan)[blue_array]
+                for var in [infz_var, a_var, b_var, etg_var, etb_var]]
+            # Calculate second round
+            ds_out = _calculate_tiles(
+                _round_tile, blue_array,
+                (ds, (thetasat, rootdepth, qratio, infz, a, b,
+                      green_et_yr, blue_et_yr, baseflow_filter)),
+                (calculate_second_round_array, default_eff,
+                 tolerance_monthly_greenpx, incrunoff_propfactor_bounds,
+                 array_solver), cores)
+            # Store values in output NetCDF
+            for var, key in [(ss_var, 'Qsw'), (incss_var, 'delta_Qsw'),
+                             (bf_var, 'Qgw'), (sr_var, 'Qtot'),
+                             (dsm_var, 'dsm'), (per_var, 'perc'),
+                             (incper_var, 'delta_perc'),
+                             (sup_var, 'supply'), (rdsm_var, 'thetarz'),
+                             (effi_var, 'eff'), (etbm_var, 'et_blue'),
+                             (etgm_var, 'et_green')]:
+                _write_array(var, slice(ti1, ti2), blue_array, ds_out[key])
+            _write_array(gpix_var, yyyyi, blue_array, ds_out['rainfed'])
+            continue
         # Cells loops
         for loni, lati in np.ndindex(lon_n, lat_n):
             if rco_var[yyyyi, lati, loni] > 0:
                 # Read data
-                p = np.array(ncv['Precipitation_M'][ti1:ti2,
-                                                    lati, loni])
-                et = np.array(ncv['Evapotranspiration_M'][ti1:ti2,
-                                                          lati, loni])
-                eto = np.array(ncv['ReferenceET_M'][ti1:ti2, lati, loni])
-                lai = np.array(ncv['LeafAreaIndex_M'][ti1:ti2,
-                                                      lati, loni])
-                swi = np.array(ncv['SWI_M'][ti1:ti2,
-                                            lati, loni])
-                swio = np.array(ncv['SWIo_M'][ti1:ti2,
-                                              lati, loni])
-                swix = np.array(ncv['SWIx_M'][ti1:ti2,
-                                              lati, loni])
-                rainydays = np.array(ncv['RainyDays_M'][ti1:ti2,
-                                                        lati, loni])
-                qratio = float(ncv['RunoffRatio_Y'][yyyyi, lati, loni])
-                # Check for NoData values
-                p[np.isclose(p, p_fv)] = np.nan
-                et[np.isclose(et, et_fv)] = np.nan
-                lai[np.isclose(lai, lai_fv)] = np.nan
-                # Check for NoData values - arrays
-                swi[np.isclose(swi, swi_fv)] = np.nan
-                if np.isnan(swi).any():
-                    swi_arr = np.array(ncv['SWI_M'])
-                    swi = replace_with_closest(swi, swi_arr,
-                                               (lati, loni), (ti1, ti2))
-                swio[np.isclose(swio, swio_fv)] = np.nan
-                if np.isnan(swio).any():
-                    swio_arr = np.array(ncv['SWIo_M'])
-                    swio = replace_with_closest(swio, swio_arr,
-                                                (lati, loni), (ti1, ti2))
-                swix[np.isclose(swix, swix_fv)] = np.nan
-                if np.isnan(swix).any():
-                    swix_arr = np.array(ncv['SWIx_M'])
-                    swix = replace_with_closest(swix, swix_arr,
-                                                (lati, loni), (ti1, ti2))
-                if np.isclose(qratio, qratio_fv):
-                    qratio_arr = np.array(ncv['RunoffRatio_Y'])
-                    qratio_arr[qratio_arr < min_qratio] = min_qratio
-                    qratio = replace_with_closest(qratio,
-                                                  qratio_arr,
-                                                  (lati, loni),
-                                                  (yyyyi, yyyyi + 1))
-                elif qratio < min_qratio:
-                    qratio = min_qratio
-                rainydays[np.isclose(rainydays, rainydays_fv)] = np.nan
-                if np.isnan(rainydays).any():
-                    rainydays_arr = np.array(ncv['RainyDays_M'])
-                    rainydays = replace_with_closest(rainydays,
-                                                     rainydays_arr,
-                                                     (lati, loni), (ti1, ti2))
-                thetasat = float(ncv['SaturatedWaterContent'][lati, loni])
+                p = pixel_values(ncv, 'Precipitation_M', (ti1, ti2),
+                                 (lati, loni), blocks, fills)
+                et = pixel_values(ncv, 'Evapotranspiration_M', (ti1, ti2),
+                                  (lati, loni), blocks, fills)
+                eto = pixel_values(ncv, 'ReferenceET_M', (ti1, ti2),
+                                   (lati, loni), blocks, fills)
+                lai = pixel_values(ncv, 'LeafAreaIndex_M', (ti1, ti2),
+                                   (lati, loni), blocks, fills)
+                swi = pixel_values(ncv, 'SWI_M', (ti1, ti2),
+                                   (lati, loni), blocks, fills)
+                swio = pixel_values(ncv, 'SWIo_M', (ti1, ti2),
+                                    (lati, loni), blocks, fills)
+                swix = pixel_values(ncv, 'SWIx_M', (ti1, ti2),
+                                    (lati, loni), blocks, fills)
+                rainydays = pixel_values(ncv, 'RainyDays_M', (ti1, ti2),
+                                         (lati, loni), blocks, fills)
+                qratio = float(qratios[yyyyi][lati, loni])
+                thetasat = float(thetasat_arr[lati, loni])
                 if np.isnan(thetasat) or thetasat == thetasat_fv:
                     thetasat = default_thetasat
-                rootdepth = float(
-                    ncv['RootDepth'][lati, loni])
+                rootdepth = float(rootdepth_arr[lati, loni])
                 if np.isnan(rootdepth) or rootdepth == rootdepth_fv:
                     rootdepth = default_rootdepth
                 # Additional parameters for second round
@@ -670,3 +685,159 @@ def run(input_nc, output_nc,
     print 'Time elapsed: {0}'.format(ended - started)
     # Return noutput NetCDF file location
     return output_nc
+
+
+def _array_inputs(ncv, mask, time_index, qratio_arr, defaults, fills):
+    '''
+    Read the monthly inputs and the pixel parameters of the cells in mask for
+    the array engine. Missing values are replaced as in the per-pixel loops,
+    with the values of gap_fills and the runoff ratio map of qratio_maps.
+    '''
+    default_thetasat, default_rootdepth = defaults
+    # Monthly variables
+    ds = {}
+    for key, var in [('p', 'Precipitation_M'), ('et', 'Evapotranspiration_M'),
+                     ('eto', 'ReferenceET_M'), ('lai', 'LeafAreaIndex_M'),
+                     ('swi', 'SWI_M'), ('swio', 'SWIo_M'), ('swix', 'SWIx_M'),
+                     ('rainydays', 'RainyDays_M')]:
+        ds[key] = read_block(ncv[var], time_index, (0, mask.shape[1]),
+                             fills.get(var))[:, mask]
+    # Runoff ratio
+    qratio = qratio_arr[mask]
+    # Static variables
+    thetasat = np.ma.filled(
+        ncv['SaturatedWaterContent'][:, :].astype('f8'), np.nan)[mask]
+    thetasat[np.isnan(thetasat) | (
+        thetasat == ncv['SaturatedWaterContent']._FillValue)] = \
+        default_thetasat
+    rootdepth = np.ma.filled(
+        ncv['RootDepth'][:, :].astype('f8'), np.nan)[mask]
+    rootdepth[np.isnan(rootdepth) | (
+        rootdepth == ncv['RootDepth']._FillValue)] = default_rootdepth
+    # Return
+    return ds, (thetasat, rootdepth, qratio)
+
+
+def _round_tile(inputs, pixels, func, *args):
+    '''
+    Evaluate a round of the array engine (func) for a slice of the pixels,
+    the pixels are on the last axis of the inputs
+    '''
+    ds, pixel_pars = inputs
+    ds = dict((key, np.array(values[..., pixels]))
+              for key, values in ds.items())
+    pixel_pars = tuple(np.array(value[..., pixels]) if np.ndim(value) > 0
+                       else value for value in pixel_pars)
+    return func(ds, pixel_pars, *args)
+
+
+def _percolation_fits(inputs, pixels, min_no_of_values, first_guess,
+                      bounds, std_fv):
+    '''
+    Fit the percolation equation (perc = a*rdsm^b) of a slice of the pixels
+    to the root depth soil moisture and percolation of the neighboring
+    cells, the neighborhood grows until it contains enough values
+    '''
+    rdsm, perc, (lati_ls, loni_ls) = inputs
+    lati_ls = lati_ls[pixels]
+    loni_ls = loni_ls[pixels]
+    n_y, n_x = rdsm.shape[1:]
+    a = np.full(len(lati_ls), np.nan)
+    b = np.full(len(lati_ls), np.nan)
+    for j in range(len(lati_ls)):
+        n_nb = 3  # minimum_neighboring_cells_offset
+        rdsm_fit = []
+        while len(rdsm_fit) < min_no_of_values:
+            tot_neighbors_ls = get_neighbors(lati_ls[j], loni_ls[j],
+                                             n_y, n_x, n_nb)
+            # Vector with values
+            rdsm_fit = np.array(
+                [rdsm[:, y, x] for y, x in tot_neighbors_ls]).flatten()
+            perc_fit = np.array(
+                [perc[:, y, x] for y, x in tot_neighbors_ls]).flatten()
+            # Remove small percolation values (~0)
+            rdsm_perc_cond = np.logical_and(perc_fit > 0.01,
+                                            rdsm_fit != std_fv)
+            rdsm_fit = rdsm_fit[rdsm_perc_cond]
+            perc_fit = perc_fit[rdsm_perc_cond]
+            n_nb += 1
+        # Fit
+        fit_res = least_squares(percolation_fit_error,
+                                x0=first_guess,
+                                bounds=bounds,
+                                args=(rdsm_fit, perc_fit),
+                                loss='soft_l1')
+        a[j], b[j] = fit_res.x
+    return a, b
+
+
+def _calculate_tiles(func, mask, inputs, args, cores):
+    '''
+    Evaluate func(inputs, pixels, *args) for the cells in mask, in the order
+    of np.nonzero(mask). With cores, the grid is split in tiles of rows that
+    are evaluated in worker processes on the memory-mapped inputs, and the
+    outputs of the tiles are joined along the pixels (last) axis.
+    '''
+    if not cores:
+        return func(inputs, slice(None), *args)
+    from joblib import Parallel, delayed, dump, effective_n_jobs
+    # Tiles of rows, a few per worker to balance the load
+    lat_n = mask.shape[0]
+    tiles_n = min(4*effective_n_jobs(cores), lat_n)
+    rows = [r[0] for r in np.array_split(np.arange(lat_n), tiles_n)]
+    limits = np.searchsorted(np.nonzero(mask)[0], rows + [lat_n])
+    tiles = [slice(i1, i2) for i1, i2 in zip(limits[:-1], limits[1:])
+             if i2 > i1]
+    if len(tiles) < 2:
+        return func(inputs, slice(None), *args)
+    # Share the inputs through a memory-mapped file
+    temp_dir = tempfile.mkdtemp()
+    try:
+        inputs_file = os.path.join(temp_dir, 'inputs.pkl')
+        dump(inputs, inputs_file)
+        outputs = Parallel(n_jobs=cores)(
+            delayed(_tile_worker)(func, inputs_file, pixels, args)
+            for pixels in tiles)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return _join_tiles(outputs)
+
+
+def _tile_worker(func, inputs_file, pixels, args):
+    '''
+    Evaluate a tile in a worker process
+    '''
+    from joblib import load
+    return func(load(inputs_file, mmap_mode='r'), pixels, *args)
+
+
+def _join_tiles(outputs):
+    '''
+    Join the outputs of the tiles along the pixels (last) axis
+    '''
+    first = outputs[0]
+    if isinstance(first, dict):
+        return dict((key, _join_tiles([out[key] for out in outputs]))
+                    for key in first)
+    if isinstance(first, tuple):
+        return tuple(_join_tiles(list(out)) for out in zip(*outputs))
+    return np.concatenate(outputs, axis=-1)
+
+
+def _pixels_array(mask, pixels):
+    '''
+    Return the cells of mask that are selected in the vector of pixels
+    '''
+    array = np.zeros(mask.shape, dtype=bool)
+    array[mask] = pixels
+    return array
+
+
+def _write_array(var, index, mask, values):
+    '''
+    Store the values of the cells in mask in a netcdf variable, the rest of
+    the cells keep their current values
+    '''
+    array = var[index, :, :]
+    array[..., mask] = values
+    var[index, :, :] = array
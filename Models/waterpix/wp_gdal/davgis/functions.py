@@ -21,8 +21,7 @@ import gdal
 import pandas as pd
 import netCDF4
 from scipy.interpolate import griddata
-import rpy2.robjects as robjects
-from rpy2.robjects import pandas2ri
+from wa.Models.waterpix.kriging import ordinary_kriging_array
 
 np = pd.np
 
@@ -734,9 +733,10 @@ def Interpolation_Default(input_shp, field_name, output_tiff,
 
 
 def Kriging_Interpolation_Points(input_shp, field_name, output_tiff, cellsize,
-                                 bbox=None):
+                                 bbox=None, engine='r'):
     """
-    Interpolate point data using Ordinary Kriging
+    Interpolate point data using Ordinary Kriging, in R (engine='r') or with
+    numpy and scipy (engine='numpy')
 
     Reference: https://cran.r-project.org/web/packages/automap/automap.pdf
     """
@@ -772,19 +772,25 @@ def Kriging_Interpolation_Points(input_shp, field_name, output_tiff, cellsize,
     # Run kriging
     x_vector = np.arange(xmin + cellsize/2, xmax + cellsize/2, cellsize)
     y_vector = np.arange(ymin + cellsize/2, ymax + cellsize/2, cellsize)
-    out_array = Kriging_Interpolation_Array(points_array, x_vector, y_vector)
+    out_array = Kriging_Interpolation_Array(points_array, x_vector, y_vector,
+                                            engine)
     # Save array as raster
     Array_to_Raster(out_array, output_tiff, ll_corner, cellsize, srs_wkt)
     # Return
     return output_tiff
 
 
-def Kriging_Interpolation_Array(input_array, x_vector, y_vector):
+def Kriging_Interpolation_Array(input_array, x_vector, y_vector, engine='r'):
     """
-    Interpolate data in an array using Ordinary Kriging
+    Interpolate data in an array using Ordinary Kriging, in R (engine='r') or
+    with numpy and scipy (engine='numpy')
 
     Reference: https://cran.r-project.org/web/packages/automap/automap.pdf
     """
+    if engine == 'numpy':
+        return ordinary_kriging_array(input_array, x_vector, y_vector)
+    import rpy2.robjects as robjects
+    from rpy2.robjects import pandas2ri
     # Total values in array
     n_values = np.isfinite(input_array).sum()
     # Load function
@@ -43,43 +43,39 @@ def calc_ETref(Dir, tmin_str, tmax_str, humid_str, press_str, wind_str, down_sho
     # Create array to store results
     ETref = np.zeros(raster_shape)
 								
-    # gap fill
-    tmin_str_GF = RC.gap_filling(tmin_str,-9999)
-    tmax_str_GF = RC.gap_filling(tmax_str,-9999)
-    humid_str_GF = RC.gap_filling(humid_str,-9999)
-    press_str_GF = RC.gap_filling(press_str,-9999)
-    wind_str_GF = RC.gap_filling(wind_str,-9999)
-    down_short_str_GF = RC.gap_filling(down_short_str,np.nan)
-    down_long_str_GF = RC.gap_filling(down_long_str,np.nan)
+    # gap fill, the filled arrays are kept in memory on the grid of the input files
+    tmin_GF = Gap_fill(tmin_str,-9999)
+    tmax_GF = Gap_fill(tmax_str,-9999)
+    humid_GF = Gap_fill(humid_str,-9999)
+    press_GF = Gap_fill(press_str,-9999)
+    wind_GF = Gap_fill(wind_str,-9999)
+    down_short_GF = Gap_fill(down_short_str,np.nan)
+    down_long_GF = Gap_fill(down_long_str,np.nan)
     if up_long_str is not 'not':				
-        up_long_str_GF = RC.gap_filling(up_long_str,np.nan)
+        up_long_GF = Gap_fill(up_long_str,np.nan)
     else:
-        up_long_str_GF = 'nan'							
+        up_long_GF = 'nan'							
     
     
-    #dictionary containing all tthe paths to the input-maps
-    inputs = dict({'tmin':tmin_str_GF,'tmax':tmax_str_GF,'humid':humid_str_GF,'press':press_str_GF,'wind':wind_str_GF,'down_short':down_short_str_GF,'down_long':down_long_str_GF,'up_long':up_long_str_GF})
+    #dictionary containing all the gap filled input-maps
+    inputs = dict({'tmin':tmin_GF,'tmax':tmax_GF,'humid':humid_GF,'press':press_GF,'wind':wind_GF,'down_short':down_short_GF,'down_long':down_long_GF,'up_long':up_long_GF})
    
     
     #dictionary containing numpy arrays of al initial and intermediate variables    
     input_array = dict({'tmin':None,'tmax':None,'humid':None,'press':None,'wind':None,'albedo':None,'down_short':None,'down_long':None,'up_short':None,'up_long':None,'net_radiation':None,'ea':None,'es':None,'delta':None})
     
     #APPLY LAPSE RATE CORRECTION ON TEMPERATURE
-    tmin = lapse_rate(Dir, inputs['tmin'], DEMmap_str)
-    tmax = lapse_rate(Dir, inputs['tmax'], DEMmap_str)
+    tmin = lapse_rate(Dir, tmin_str, DEMmap_str, Array = inputs['tmin'])
+    tmax = lapse_rate(Dir, tmax_str, DEMmap_str, Array = inputs['tmax'])
 				
     #PROCESS PRESSURE MAPS 
-    press =adjust_P(Dir, inputs['press'], DEMmap_str)
+    press =adjust_P(Dir, press_str, DEMmap_str, Array = inputs['press'])
     
     #PREPARE HUMIDITY MAPS
-    dest = RC.reproject_dataset_example(inputs['humid'], DEMmap_str, method = 2)
-    humid=dest.GetRasterBand(1).ReadAsArray()
-    dest = None
+    humid = RC.reproject_array_example(humid_str, DEMmap_str, method = 2, Array = inputs['humid'])
     
     #CORRECT WIND MAPS
-    dest = RC.reproject_dataset_example(inputs['wind'], DEMmap_str,method = 2)
-    wind=dest.GetRasterBand(1).ReadAsArray()*0.75
-    dest = None
+    wind = RC.reproject_array_example(wind_str, DEMmap_str, method = 2, Array = inputs['wind'])*0.75
    
     #PROCESS GLDAS DATA
     input_array['ea'], input_array['es'], input_array['delta'] = process_GLDAS(tmax,tmin,humid,press)
@@ -91,13 +87,9 @@ def calc_ETref(Dir, tmin_str, tmax_str, humid_str, press_str, wind_str, down_sho
     if up_long_str == 'not':
         
         #CORRECT WIND MAPS
-        dest = RC.reproject_dataset_example(down_short_str, DEMmap_str,method = 2)
-        Short_Net_data=dest.GetRasterBand(1).ReadAsArray()*0.75
-        dest = None    
+        Short_Net_data = RC.reproject_array_example(down_short_str, DEMmap_str, method = 2)*0.75
 								
-        dest = RC.reproject_dataset_example(down_long_str, DEMmap_str,method = 2)
-        Short_Clear_data=dest.GetRasterBand(1).ReadAsArray()*0.75
-        dest = None    
+        Short_Clear_data = RC.reproject_array_example(down_long_str, DEMmap_str, method = 2)*0.75
 								
         # Calculate Long wave Net radiation
         Rnl = 4.903e-9 * (((tmin + 273.16)**4+(tmax + 273.16)**4)/2)*(0.34 - 0.14 * np.sqrt(ea)) * (1.35 * Short_Net_data/Short_Clear_data -0.35)
@@ -108,21 +100,15 @@ def calc_ETref(Dir, tmin_str, tmax_str, humid_str, press_str, wind_str, down_sho
        
     else:
         #OPEN DOWNWARD SHORTWAVE RADIATION
-        dest = RC.reproject_dataset_example(inputs['down_short'], DEMmap_str,method = 2)
-        down_short=dest.GetRasterBand(1).ReadAsArray()
-        dest = None
+        down_short = RC.reproject_array_example(down_short_str, DEMmap_str, method = 2, Array = inputs['down_short'])
         down_short, tau, bias = slope_correct(down_short,press,ea,DEMmap_str,DOY)
         
         #OPEN OTHER RADS
         up_short = down_short*0.23
         
-        dest =  RC.reproject_dataset_example(inputs['down_long'], DEMmap_str,method = 2)
-        down_long=dest.GetRasterBand(1).ReadAsArray()
-        dest = None
+        down_long = RC.reproject_array_example(down_long_str, DEMmap_str, method = 2, Array = inputs['down_long'])
                 
-        dest =  RC.reproject_dataset_example(inputs['up_long'], DEMmap_str,method = 2)
-        up_long=dest.GetRasterBand(1).ReadAsArray()
-        dest = None
+        up_long = RC.reproject_array_example(up_long_str, DEMmap_str, method = 2, Array = inputs['up_long'])
                
         #OPEN NET RADIATION AND CONVERT W*m-2 TO MJ*d-1*m-2
         net_radiation = ((down_short-up_short) + (down_long-up_long))*86400/10**6
@@ -140,6 +126,18 @@ def calc_ETref(Dir, tmin_str, tmax_str, humid_str, press_str, wind_str, down_sho
     
     #return a reference ET map (numpy array), a dictionary containing all intermediate information and a bias of the slope correction on down_short
     return ETref
+
+def Gap_fill(input_str, NoDataValue):
+    """
+    This function fills the no data gaps of an input map by the nearest
+    pixels and returns the array (float32 like the _GF.tif files before), the
+    fill indices are shared by the maps and days with the same gaps
+
+    Keyword arguments:
+    input_str -- 'C:/'  path to the input tiff file
+    NoDataValue -- Value that must be filled
+    """
+    return np.float32(RC.gap_filling(input_str, NoDataValue, method = 3, Write_tiff = False))
 				
 				
 				
@@ -20,7 +20,7 @@ import glob
 # import WA+ modules
 from wa.General import data_conversions as DC
 from wa.General import raster_conversions as RC
-from wa.Products.ETref.SlopeInfluence_ETref import SlopeInfluence	
+from wa.Products.ETref.SlopeInfluence_ETref import SlopeInfluence_Tables	
 
 def CollectLANDSAF(SourceLANDSAF, Dir, Startdate, Enddate, latlim, lonlim):
     """
@@ -60,12 +60,15 @@ def CollectLANDSAF(SourceLANDSAF, Dir, Startdate, Enddate, latlim, lonlim):
     dlon = geo_out[1]
     lat = geo_out[3] + (np.arange(size_Y)+0.5)*dlat
     lon = geo_out[0] + (np.arange(size_X)+0.5)*dlon			
+
+    # Folder of the slope and solar tables of the DEM
+    Dir_Tables = os.path.join(Dir,'HydroSHED','DEM','SlopeInfluence_Tables')
 				
 				
     for date in Dates:
         # day of year
         day=date.dayofyear
-        Horizontal, Sloping, sinb, sinb_hor, fi, slope, ID  = SlopeInfluence(demmap,lat,lon,day)   
+        Horizontal, Sloping, sinb, sinb_hor, fi, slope, ID  = SlopeInfluence_Tables(demmap,lat,lon,day,Dir_Tables)   
             
                       
         SIDname = os.path.join(SIDdir,'SAF_SID_Daily_W-m2_' + date.strftime('%Y-%m-%d') + '.tif')
@@ -12,9 +12,8 @@ import os
 import numpy as np
 
 # import WA+ modules
-from wa.General import data_conversions as DC
 from wa.General import raster_conversions as RC
-from SlopeInfluence_ETref import SlopeInfluence				
+from SlopeInfluence_ETref import SlopeInfluence_Tables				
 					
 def process_GLDAS(Tmax, Tmin, humidity, surface_pressure):
     """
@@ -48,36 +47,29 @@ def process_GLDAS(Tmax, Tmin, humidity, surface_pressure):
     
     return ea, es, delta
 
-def lapse_rate(Dir,temperature_map, DEMmap):    
+def lapse_rate(Dir,temperature_map, DEMmap, Array = None):    
     """
     This function downscales the GLDAS temperature map by using the DEM map
   				
     Keyword arguments:
     temperature_map -- 'C:/' path to the temperature map
     DEMmap -- 'C:/' path to the DEM map
+    Array -- array on the grid of the temperature map that is used instead of
+        the data of the temperature map, e.g. the gap filled data (optional)
     """
 				
     # calculate average altitudes corresponding to T resolution
-    dest = RC.reproject_dataset_example(DEMmap, temperature_map,method = 4)				
-    DEM_ave_out_name = os.path.join(Dir,'HydroSHED', 'DEM','DEM_ave.tif')
-    geo_out, proj, size_X, size_Y = RC.Open_array_info(temperature_map)				
-    DEM_ave_data = dest.GetRasterBand(1).ReadAsArray()
-    DC.Save_as_tiff(DEM_ave_out_name, DEM_ave_data, geo_out, proj)
-    dest = None
+    DEM_ave_data = RC.reproject_array_example(DEMmap, temperature_map, method = 4)
    
     # determine lapse-rate [degress Celcius per meter]
     lapse_rate_number = 0.0065
     
-    # open maps as numpy arrays
-    dest = RC.reproject_dataset_example(DEM_ave_out_name, DEMmap, method = 2)			
-    dem_avg=dest.GetRasterBand(1).ReadAsArray()
+    # open maps as numpy arrays (the average altitudes are resampled with the plan of the temperature map)
+    dem_avg = RC.reproject_array_example(temperature_map, DEMmap, method = 2, Array = DEM_ave_data)
     dem_avg[dem_avg<0]=0
-    dest = None
 
     # Open the temperature dataset
-    dest = RC.reproject_dataset_example(temperature_map, DEMmap, method = 2)	
-    T=dest.GetRasterBand(1).ReadAsArray()
-    dest = None
+    T = RC.reproject_array_example(temperature_map, DEMmap, method = 2, Array = Array)
     
     # Open Demmap
     demmap = RC.Open_tiff_array(DEMmap)
@@ -89,31 +81,25 @@ def lapse_rate(Dir,temperature_map, DEMmap):
     
     return T
     
-def adjust_P(Dir, pressure_map, DEMmap):
+def adjust_P(Dir, pressure_map, DEMmap, Array = None):
     """
     This function downscales the GLDAS air pressure map by using the DEM map
   				
     Keyword arguments:
     pressure_map -- 'C:/' path to the pressure map
     DEMmap -- 'C:/' path to the DEM map
+    Array -- array on the grid of the pressure map that is used instead of
+        the data of the pressure map, e.g. the gap filled data (optional)
     """	
 
     # calculate average latitudes
-    destDEMave = RC.reproject_dataset_example(DEMmap, pressure_map, method = 4)				
-    DEM_ave_out_name = os.path.join(Dir, 'HydroSHED', 'DEM','DEM_ave.tif')
-    geo_out, proj, size_X, size_Y = RC.Open_array_info(pressure_map)				
-    DEM_ave_data = destDEMave.GetRasterBand(1).ReadAsArray()
-    DC.Save_as_tiff(DEM_ave_out_name, DEM_ave_data, geo_out, proj)    
+    DEM_ave_data = RC.reproject_array_example(DEMmap, pressure_map, method = 4)
 
-    # open maps as numpy arrays
-    dest = RC.reproject_dataset_example(DEM_ave_out_name, DEMmap, method = 2)
-    dem_avg=dest.GetRasterBand(1).ReadAsArray()
-    dest = None
+    # open maps as numpy arrays (the average altitudes are resampled with the plan of the pressure map)
+    dem_avg = RC.reproject_array_example(pressure_map, DEMmap, method = 2, Array = DEM_ave_data)
     
     # open maps as numpy arrays
-    dest = RC.reproject_dataset_example(pressure_map, DEMmap, method = 2)
-    P=dest.GetRasterBand(1).ReadAsArray()
-    dest = None
+    P = RC.reproject_array_example(pressure_map, DEMmap, method = 2, Array = Array)
     
     demmap = RC.Open_tiff_array(DEMmap)
     dem_avg[demmap<=0]=0
@@ -122,8 +108,6 @@ def adjust_P(Dir, pressure_map, DEMmap):
     # calculate second part
     P = P + (101.3*((293-0.0065*(demmap-dem_avg))/293)**5.26 - 101.3)
 
-    os.remove(DEM_ave_out_name)
-
     return P
 
 def slope_correct(down_short_hor, pressure, ea, DEMmap, DOY):
@@ -140,21 +124,8 @@ def slope_correct(down_short_hor, pressure, ea, DEMmap, DOY):
     DOY -- day of the year
     """	
 
-    # Get Geo Info
-    GeoT, Projection, xsize, ysize = RC.Open_array_info(DEMmap)	
-    
-    minx = GeoT[0]
-    miny = GeoT[3] + xsize*GeoT[4] + ysize*GeoT[5] 
-    
-    x = np.flipud(np.arange(xsize)*GeoT[1] + minx + GeoT[1]/2)
-    y = np.flipud(np.arange(ysize)*-GeoT[5] + miny + -GeoT[5]/2)
-    
-    # Calculate Extraterrestrial Solar Radiation [W m-2]
-    demmap = RC.Open_tiff_array(DEMmap)   
-    demmap[demmap<0]=0
-    
-	# apply the slope correction			
-    Ra_hor, Ra_slp, sinb, sinb_hor, fi, slope, ID = SlopeInfluence(demmap,y,x,DOY)
+	# apply the slope correction (the terrain and solar tables are stored next to the DEM)
+    Ra_hor, Ra_slp, sinb, sinb_hor, fi, slope, ID = slope_tables(DEMmap, DOY)
     
     # Calculate atmospheric transmissivity
     Rs_hor = down_short_hor
@@ -197,5 +168,59 @@ def slope_correct(down_short_hor, pressure, ea, DEMmap, DOY):
 
     bias = np.nansum(Rs_hor)/np.nansum(Rs_equiv)
 
-    return Rs_equiv, tau, bias				
-				
\ No newline at end of file
+    return Rs_equiv, tau, bias
+
+def slope_tables(DEMmap, DOY):
+    """
+    This function opens the extraterrestrial solar radiation on the horizontal
+    and sloping terrain of the DEM for one day of the year. The slope, slope
+    direction and the daily tables are calculated once and stored in the
+    SlopeInfluence_Tables folder next to the DEM map.
+
+    Keyword arguments:
+    DEMmap -- 'C:/' path to the DEM map
+    DOY -- day of the year
+    """
+    # Get Geo Info
+    GeoT, Projection, xsize, ysize = RC.Open_array_info(DEMmap)
+
+    minx = GeoT[0]
+    miny = GeoT[3] + xsize*GeoT[4] + ysize*GeoT[5]
+
+    x = np.flipud(np.arange(xsize)*GeoT[1] + minx + GeoT[1]/2)
+    y = np.flipud(np.arange(ysize)*-GeoT[5] + miny + -GeoT[5]/2)
+
+    # Calculate Extraterrestrial Solar Radiation [W m-2]
+    demmap = RC.Open_tiff_array(DEMmap)
+    demmap[demmap<0]=0
+
+    Dir_Tables = os.path.join(os.path.dirname(os.path.abspath(DEMmap)), 'SlopeInfluence_Tables')
+
+    return(SlopeInfluence_Tables(demmap,y,x,DOY,Dir_Tables))
+
+def create_slope_tables(DEMmap, DOYs, cores = False):
+    """
+    This function precalculates the slope tables of the DEM for all the days
+    of the year that are needed, so the daily ETref calculations only have to
+    read them.
+
+    Keyword arguments:
+    DEMmap -- 'C:/' path to the DEM map
+    DOYs -- list with the days of the year
+    cores -- The number of cores used to run the routine.
+             It can be 'False' to avoid using parallel computing
+             routines.
+    """
+    DOYs = np.unique(DOYs)
+
+    # The first day also creates the slope and slope direction table
+    slope_tables(DEMmap, int(DOYs[0]))
+
+    if not cores:
+        for DOY in DOYs[1:]:
+            slope_tables(DEMmap, int(DOY))
+    else:
+        from joblib import Parallel, delayed
+        Parallel(n_jobs=cores)(delayed(slope_tables)(DEMmap, int(DOY)) for DOY in DOYs[1:])
+
+    return()
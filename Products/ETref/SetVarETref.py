@@ -15,6 +15,7 @@ from joblib import Parallel, delayed
 from wa.General import raster_conversions as RC
 from wa.General import data_conversions as DC
 from wa.Products.ETref.CalcETref import calc_ETref
+from wa.Products.ETref.Interpolate_Meteo_ETref import create_slope_tables
 
 
 def SetVariables(Dir, Startdate, Enddate, latlim, lonlim, pixel_size, cores, LANDSAF, Waitbar):
@@ -37,7 +38,20 @@ def SetVariables(Dir, Startdate, Enddate, latlim, lonlim, pixel_size, cores, LAN
     """	
     # Make an array of the days of which the ET is taken
     Dates = pd.date_range(Startdate,Enddate,freq = 'D')
-	
+
+    # Load DEM
+    DEMmap_str=os.path.join(Dir,'HydroSHED','DEM','DEM_HydroShed_m_3s.tif')
+    if pixel_size:
+        dest, ulx, lry, lrx, uly, epsg_to = RC.reproject_dataset_epsg(DEMmap_str, pixel_spacing = pixel_size, epsg_to=4326, method = 2)
+        DEMmap_str=os.path.join(Dir,'HydroSHED','DEM','DEM_HydroShed_m_reshaped_for_ETref.tif')
+        DEM_data = dest.GetRasterBand(1).ReadAsArray()
+        geo_dem = [ulx, pixel_size, 0.0, uly, 0.0, - pixel_size]
+        DC.Save_as_tiff(name=DEMmap_str, data=DEM_data, geo=geo_dem, projection='4326')
+
+    # Calculate the slope tables of the DEM once for all days of the year (used for the CFSR slope correction)
+    if LANDSAF != 1:
+        create_slope_tables(DEMmap_str, [Date.dayofyear for Date in Dates], cores)
+
     # Create Waitbar
     if Waitbar == 1:
         import wa.Functions.Start.WaitbarConsole as Waitbar
@@ -46,7 +60,7 @@ def SetVariables(Dir, Startdate, Enddate, latlim, lonlim, pixel_size, cores, LAN
         Waitbar.printWaitBar(amount, total_amount, prefix = 'Progress:', suffix = 'Complete', length = 50)
     
     # Pass variables to parallel function and run
-    args = [Dir, lonlim, latlim, pixel_size, LANDSAF]
+    args = [Dir, lonlim, latlim, pixel_size, LANDSAF, DEMmap_str]
     if not cores:
         for Date in Dates:
             ETref(Date, args)
@@ -69,7 +83,7 @@ def ETref(Date, args):
 	"""
 	
 	# unpack the arguments
-    [Dir, lonlim, latlim, pixel_size, LANDSAF] = args
+    [Dir, lonlim, latlim, pixel_size, LANDSAF, DEMmap_str] = args
 
     # Set the paths
     nameTmin='Tair-min_GLDAS-NOAH_C_daily_' + Date.strftime('%Y.%m.%d') + ".tif"
@@ -122,17 +136,6 @@ def ETref(Date, args):
    # The day of year
     DOY=Date.dayofyear
 
-    # Load DEM 
-    if not pixel_size:
-        DEMmap_str=os.path.join(Dir,'HydroSHED','DEM','DEM_HydroShed_m_3s.tif')
-    else:
-        DEMmap_str=os.path.join(Dir,'HydroSHED','DEM','DEM_HydroShed_m_3s.tif')
-        dest, ulx, lry, lrx, uly, epsg_to = RC.reproject_dataset_epsg(DEMmap_str, pixel_spacing = pixel_size, epsg_to=4326, method = 2)			
-        DEMmap_str=os.path.join(Dir,'HydroSHED','DEM','DEM_HydroShed_m_reshaped_for_ETref.tif')
-        DEM_data = dest.GetRasterBand(1).ReadAsArray()
-        geo_dem = [ulx, pixel_size, 0.0, uly, 0.0, - pixel_size]            
-        DC.Save_as_tiff(name=DEMmap_str, data=DEM_data, geo=geo_dem, projection='4326')
-
     # Calc ETref	
     ETref = calc_ETref(Dir, tmin_str, tmax_str, humid_str, press_str, wind_str, input1_str, input2_str, input3_str, DEMmap_str, DOY)
 
@@ -8,6 +8,8 @@ Repository: https://github.com/wateraccounting/wa
 Module: Products/ETref
 '''
 # import general python modules
+import os
+import hashlib
 import numpy as np
 
 def SlopeInfluence(DEMmap,latitude,longitude,day):
@@ -32,9 +34,23 @@ def SlopeInfluence(DEMmap,latitude,longitude,day):
     # Be carefull with high latitudes (>66, polar circle)! Calculations for regions without sunset
     # (all day sun) are not calculated correctly.
     
-    # Solar constant
-    G = 1367.0
-    
+    # Calculate the slope and the slope direction of the terrain
+    lat, slope, slopedir = SlopeAspect(DEMmap, latitude, longitude)
+
+    # Calculate the solar radiation on the horizontal and sloping terrain
+    return(SolarInfluence(lat, slope, slopedir, day))
+
+def SlopeAspect(DEMmap, latitude, longitude):
+
+    '''
+    This function calculates the slope and the slope direction of the terrain.
+    These only depend on the DEM and the grid, not on the day.
+
+    DEMmap -- numpy array with the DEM
+    latitude -- numpy array with the latitude
+    longitude -- numpy array with the longitude
+    '''
+
     # If lat/lon are not a matrix but a vector create matrixes
     if not latitude.shape == longitude.shape:
         latitude = np.tile(latitude.reshape(len(latitude),1),[1,len(longitude)])
@@ -68,14 +84,7 @@ def SlopeInfluence(DEMmap,latitude,longitude,day):
     
     # Calculate slope
     slope = np.arctan((np.abs(dy_lat) + np.abs(dy_lon)) / np.sqrt(dlon**2+dlat**2))
-    
-    # declination of earth
-    delta = np.arcsin(np.sin(23.45/360*2*np.pi)*np.sin((360.0/365.0)*(day-81)/360*2*np.pi))
-    # EQ 2
-    D2 = 1 / (1 + 0.033* np.cos(day/365*2*np.pi))
-    
-    constant =  G / D2 / (2*np.pi) 
-    
+
     # Slope direction
     with np.errstate(divide='ignore'):
         slopedir = np.arctan(dy_lon/dy_lat) 
@@ -87,7 +96,31 @@ def SlopeInfluence(DEMmap,latitude,longitude,day):
         # Correction ip dy_lat > 0
         slopedir[np.logical_and(dy_lat > 0, dy_lon < 0)] = np.pi + slopedir[np.logical_and(dy_lat > 0, dy_lon < 0)]
         slopedir[np.logical_and(dy_lat > 0, dy_lon >= 0)] = -np.pi + slopedir[np.logical_and(dy_lat > 0, dy_lon >= 0)]
+
+    return(lat, slope, slopedir)
+
+def SolarInfluence(lat, slope, slopedir, day):
+
+    '''
+    This function calculates the solar radiation of one day on the horizontal
+    and the sloping terrain.
+
+    lat -- numpy array with the latitude [rad]
+    slope -- numpy array with the slope [rad] (see SlopeAspect)
+    slopedir -- numpy array with the slope direction [rad] (see SlopeAspect)
+    day -- Day of the year
+    '''
+
+    # Solar constant
+    G = 1367.0
+
+    # declination of earth
+    delta = np.arcsin(np.sin(23.45/360*2*np.pi)*np.sin((360.0/365.0)*(day-81)/360*2*np.pi))
+    # EQ 2
+    D2 = 1 / (1 + 0.033* np.cos(day/365*2*np.pi))
     
+    constant =  G / D2 / (2*np.pi) 
+
     # Now calculate the expected clear sky radiance day by day for:
     # - A horizontal surface
     # - A mountaneous surface (slopes)
@@ -150,6 +183,74 @@ def SlopeInfluence(DEMmap,latitude,longitude,day):
 
     return(Horizontal,Sloping, sinb, sinb_hor, fi, slope, np.where(np.ravel(TwoPeriod == True)))
 
+def SlopeInfluence_Tables(DEMmap,latitude,longitude,day,Dir_Tables):
+
+    '''
+    This function gives the same output as SlopeInfluence, but reads the
+    results from tables stored on disk. The slope and slope direction are
+    stored once per DEM and grid, and the solar radiation once per day of
+    the year (maximum 366 tables). Missing tables are calculated and stored.
+
+    DEMmap -- numpy array with the DEM
+    latitude -- numpy array with the latitude
+    longitude -- numpy array with the longitude
+    day -- Day of the year
+    Dir_Tables -- 'C:/' path to the folder where the tables are stored
+    '''
+
+    # Define the folder of this DEM and grid
+    Dir_DEM = Tables_Folder(DEMmap,latitude,longitude,Dir_Tables)
+    if not os.path.exists(Dir_DEM):
+        try:
+            os.makedirs(Dir_DEM)
+        except OSError:
+            pass
+
+    # Open or create the static table
+    Static_filename = os.path.join(Dir_DEM, 'Slope_Aspect.npz')
+    if os.path.exists(Static_filename):
+        Static = np.load(Static_filename)
+        lat, slope, slopedir = Static['lat'], Static['slope'], Static['slopedir']
+    else:
+        lat, slope, slopedir = SlopeAspect(DEMmap, latitude, longitude)
+        Save_Table(Static_filename, lat = lat, slope = slope, slopedir = slopedir)
+
+    # Open or create the table of this day
+    Day_filename = os.path.join(Dir_DEM, 'SlopeInfluence_DOY%03d.npz' %day)
+    if os.path.exists(Day_filename):
+        Day_Table = np.load(Day_filename)
+        Horizontal, Sloping, sinb, sinb_hor, TwoPeriod = Day_Table['Horizontal'], Day_Table['Sloping'], Day_Table['sinb'], Day_Table['sinb_hor'], Day_Table['TwoPeriod']
+        fi = 0.75 + 0.25*np.cos(slope) - (0.5*slope/np.pi)
+        ID = np.where(np.ravel(TwoPeriod))
+    else:
+        Horizontal, Sloping, sinb, sinb_hor, fi, slope, ID = SolarInfluence(lat, slope, slopedir, day)
+        TwoPeriod = np.zeros(slope.shape, dtype = bool)
+        TwoPeriod.flat[ID] = True
+        Save_Table(Day_filename, Horizontal = Horizontal, Sloping = Sloping, sinb = sinb, sinb_hor = sinb_hor, TwoPeriod = TwoPeriod)
+
+    return(Horizontal, Sloping, sinb, sinb_hor, fi, slope, ID)
+
+def Tables_Folder(DEMmap,latitude,longitude,Dir_Tables):
+    # The folder name is based on the content of the DEM and the grid, so
+    # tables of an old DEM or grid are never used
+    key = hashlib.md5()
+    for array in [DEMmap, latitude, longitude]:
+        array = np.ascontiguousarray(array, dtype = np.float64)
+        key.update(str(array.shape))
+        key.update(array.tostring())
+    return(os.path.join(Dir_Tables, 'SlopeInfluence_%s' %key.hexdigest()[:16]))
+
+def Save_Table(filename, **arrays):
+    # Write to a temporary file first, so parallel runs never read half a table
+    filename_temp = '%s.%d.tmp' %(filename, os.getpid())
+    with open(filename_temp, 'wb') as f:
+        np.savez(f, **arrays)
+    try:
+        os.rename(filename_temp, filename)
+    except OSError:
+        # The table is already written by another process
+        os.remove(filename_temp)
+
 def Table1a(sunrise,sunset):
     f1 = np.sin(sunset) - np.sin(sunrise)
     f2 = np.cos(sunset) - np.cos(sunrise)
@@ -16,8 +16,8 @@ This data is used within a water accounting framework.
 """
 
 
-from wa import General, Collect_Tools, WebAccounts, Collect, Products, Sheets, Models, Generator, Functions
+from wa import General, Collect_Tools, WebAccounts, Collect, Products, Sheets, Models, Generator, Functions, Benchmarks
 
-__all__ = ['General', 'Collect_Tools', 'WebAccounts', 'Collect', 'Products', 'Sheets', 'Models', 'Generator', 'Functions']
+__all__ = ['General', 'Collect_Tools', 'WebAccounts', 'Collect', 'Products', 'Sheets', 'Models', 'Generator', 'Functions', 'Benchmarks']
 
 __version__ = '0.1'